@@ -1,26 +1,110 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request as HTTPRequest
+from fastapi.responses import PlainTextResponse
 import uvicorn
 from dotenv import load_dotenv
+import logging
 import os
+import threading
+import time
 from pydantic import BaseModel
 
 from src.agent.agent import generate
+from src.logs import configure_logging
+from src.metrics import CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, REGISTRY
+from src import tracing
+from src.tools.rag_client import close_rag_client
+from src.tools import rag_inprocess
 
-app = FastAPI()
+logger = logging.getLogger("ai.api")
+
+
+def _preload_rag() -> None:
+    try:
+        rag_inprocess.get_inprocess_rag().preload()
+    except Exception:
+        # The tool reports the error on its first call
+        logger.exception("In-process RAG preload failed")
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    configure_logging()
+    if rag_inprocess.enabled():
+        # Index and models load off the startup path, like in the RAG service
+        threading.Thread(target=_preload_rag, name="ai-rag-preload", daemon=True).start()
+    yield
+    await close_rag_client()
+    rag_inprocess.close_inprocess_rag()
+
+
+app = FastAPI(lifespan=lifespan)
 
 class Request(BaseModel):
     message: str
 
+@app.middleware("http")
+async def observe_requests(request: HTTPRequest, call_next):
+    """Trace every request, then count and time it per route template.
+
+    A request id from the caller (the UI) is kept, or a new one is created;
+    it is echoed in the response and forwarded to the RAG service.
+    """
+    HTTP_IN_FLIGHT.inc()
+    t0 = time.perf_counter()
+    status = 500
+    with tracing.start_trace(
+        f"{request.method} {request.url.path}",
+        request_id=request.headers.get(tracing.REQUEST_ID_HEADER),
+        parent_id=request.headers.get(tracing.PARENT_SPAN_HEADER),
+        debug=tracing.parse_debug(request.headers.get(tracing.DEBUG_HEADER)),
+    ) as request_trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers[tracing.REQUEST_ID_HEADER] = request_trace.trace_id
+            return response
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - t0
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+            logger.info(
+                "%s %s %d",
+                request.method, route, status,
+                extra={"method": request.method, "route": route, "status": status,
+                       "duration_ms": round(elapsed * 1000.0, 3), "request_id": request_trace.trace_id},
+            )
+
 @app.get("/ai/health/")
 def health():
     return {"status": 201}
 
+@app.get("/metrics")
+@app.get("/ai/metrics")
+def metrics():
+    """Counters and histograms of this process in the Prometheus text format.
+
+    With RAG_MODE=inprocess the RAG library's metrics are included.
+    """
+    text = REGISTRY.render()
+    if rag_inprocess.enabled():
+        text += rag_inprocess.get_inprocess_rag().render_metrics()
+    return PlainTextResponse(text, media_type=CONTENT_TYPE)
+
 @app.post("/ai/generate/")
 def generate_(request: Request):
     try:
-        think, answer, interaction = generate(request.message)
-        return {"message": answer, "thinking": think, "interaction": interaction}
+        think, answer, interaction = tracing.call(generate, request.message)
+        body = {"message": answer, "thinking": think, "interaction": interaction}
+        request_trace = tracing.current_trace()
+        if request_trace is not None and request_trace.debug is not None:
+            # Spans of this turn: LLM calls, tools and the RAG requests (with RAG's Server-Timing)
+            body["debug"] = request_trace.debug_info()
+        return body
     except Exception as e:
+        logger.exception("Generation failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
@@ -30,4 +114,4 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=PORT
-    )
\ No newline at end of file
+    )
@@ -1,13 +1,12 @@
-from langgraph.graph import START, StateGraph, END # Adicionado END para clareza
-from langgraph.prebuilt import tools_condition, ToolNode
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_core.load import load
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import MessagesState
-from langchain_ollama import ChatOllama
+import logging
+import threading
 
-from src.tools.rag import search_rag
-from src.tools.web_search import web_search
+from src import tracing
+from src.metrics import LLM_CALL_SECONDS, LLM_TOKENS
+
+# LangGraph, the Ollama client and the tools are imported and wired on the
+# first call to get_graph(), so importing this module (and starting the API)
+# stays cheap.
 
 sys_msg_content = """You are a helpful assistant.
 You have access to the following tools: 'search_rag' and 'web_search'.
@@ -15,29 +14,67 @@ Use them when you need to find information to answer the user's question.
 When asked about any financial information, you MUST use the search_rag tool to find the information.
 Always cite the source of the information you provide, even if no tool was used.
 If the retrieved information is not relevant, use the web_search tool to find more information."""
-sys_msg = SystemMessage(content=sys_msg_content)
 
-llm = ChatOllama(model="qwen3:latest", temperature=0)
-tools = [search_rag, web_search]
-llm_with_tools = llm.bind_tools(tools)
-memory = MemorySaver()
+MODEL = "qwen3:latest"
+
+logger = logging.getLogger("ai.agent")
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def build_graph():
+    """Build the assistant graph: ChatOllama with the tools bound, plus a ToolNode."""
+    from langchain_ollama import ChatOllama
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.graph import START, MessagesState, StateGraph
+    from langgraph.prebuilt import ToolNode, tools_condition
+
+    from src.tools.rag import search_rag
+    from src.tools.web_search import web_search
 
-def assistant(state: MessagesState):
-    result = llm_with_tools.invoke(state["messages"])
-    return {"messages": [result]}
+    llm = ChatOllama(model=MODEL, temperature=0)
+    tools = [search_rag, web_search]
+    llm_with_tools = llm.bind_tools(tools)
+    memory = MemorySaver()
 
-builder = StateGraph(MessagesState)
+    def assistant(state: MessagesState):
+        with LLM_CALL_SECONDS.time(model=MODEL), tracing.span("llm", model=MODEL) as span:
+            result = llm_with_tools.invoke(state["messages"])
+        usage = getattr(result, "usage_metadata", None) or {}
+        LLM_TOKENS.inc(usage.get("input_tokens", 0), kind="input")
+        LLM_TOKENS.inc(usage.get("output_tokens", 0), kind="output")
+        tool_calls = [call["name"] for call in getattr(result, "tool_calls", None) or []]
+        if span is not None:
+            span.attributes.update(usage=usage, tool_calls=tool_calls)
+        logger.info(
+            "LLM call: %d input / %d output tokens", usage.get("input_tokens", 0), usage.get("output_tokens", 0),
+            extra={"model": MODEL, "usage": usage, "tool_calls": tool_calls},
+        )
+        return {"messages": [result]}
 
-builder.add_node("assistant", assistant)
-builder.add_node("tools", ToolNode(tools))
+    builder = StateGraph(MessagesState)
+
+    builder.add_node("assistant", assistant)
+    builder.add_node("tools", ToolNode(tools))
+
+    builder.add_edge(START, "assistant")
+    builder.add_conditional_edges(
+        "assistant",
+        tools_condition,
+    )
+    builder.add_edge("tools", "assistant")
+    return builder.compile(checkpointer=memory)
+
+
+def get_graph():
+    """The compiled graph, built once on first use."""
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            _graph = build_graph()
+    return _graph
 
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges(
-    "assistant",
-    tools_condition,
-)
-builder.add_edge("tools", "assistant")
-graph = builder.compile(checkpointer=memory)
 
 def extract_thinking(message: str):
     message = message.replace("<think>", "")
@@ -45,9 +82,12 @@ def extract_thinking(message: str):
     return think, answer
 
 def generate(message: str) -> str:
-    initial_state = {"messages": [sys_msg, HumanMessage(content=message)]}
-    final_state = graph.invoke(initial_state, config={"configurable": {"thread_id": "1"}})
+    from langchain_core.load import load
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    initial_state = {"messages": [SystemMessage(content=sys_msg_content), HumanMessage(content=message)]}
+    final_state = get_graph().invoke(initial_state, config={"configurable": {"thread_id": "1"}})
     answer = final_state["messages"][-1].content
     interaction = load(final_state["messages"])
     think, answer = extract_thinking(answer)
-    return think, answer, interaction
\ No newline at end of file
+    return think, answer, interaction
@@ -0,0 +1,19 @@
+"""Structured logging for the AI service.
+
+Modules log through ``logging.getLogger("ai.<area>")``; the ``ai`` logger
+writes text or JSON lines (AI_LOG_FORMAT=json) at AI_LOG_LEVEL (INFO),
+through the shared ``observability.logs`` module.
+"""
+
+import logging
+from typing import Optional
+
+from observability import logs
+
+ROOT_LOGGER = "ai"
+ENV_PREFIX = "AI"
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.Logger:
+    """Route the ``ai`` loggers to stderr; calling it again only updates the settings."""
+    return logs.configure_logging(ROOT_LOGGER, ENV_PREFIX, level, fmt)
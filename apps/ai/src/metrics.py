@@ -0,0 +1,77 @@
+"""Metrics of the AI service: LLM calls, tools and HTTP requests.
+
+Defined on this service's own ``Registry`` from ``observability.metrics``
+and rendered by ``GET /metrics`` (with the RAG library's registry appended
+when it runs in-process).
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from observability.metrics import (  # noqa: F401 (re-exported)
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# ---------------------------
+# AI service metrics
+# ---------------------------
+# LLM turns take seconds to minutes on a CPU-only Ollama
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+LLM_CALL_SECONDS = histogram(
+    "ai_llm_call_seconds",
+    "Duration of each chat model call made by the agent, by model",
+    ["model"],
+    buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = counter(
+    "ai_llm_tokens_total",
+    "Tokens reported by the chat model, by kind (input or output)",
+    ["kind"],
+)
+TOOL_CALL_SECONDS = histogram(
+    "ai_tool_call_seconds",
+    "Duration of each tool call, by tool",
+    ["tool"],
+)
+TOOL_CALLS = counter(
+    "ai_tool_calls_total",
+    "Tool calls, by tool and outcome (ok or error)",
+    ["tool", "outcome"],
+)
+HTTP_REQUESTS = counter(
+    "ai_http_requests_total",
+    "HTTP requests served, by method, route and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "ai_http_request_seconds",
+    "HTTP request latency, by method and route",
+    ["method", "route"],
+    buckets=LLM_BUCKETS,
+)
+HTTP_IN_FLIGHT = gauge("ai_http_requests_in_flight", "HTTP requests being served")
+
+
+@contextmanager
+def track_tool(tool: str) -> Iterator[None]:
+    """Time a tool call and count it as an error if it raises."""
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        TOOL_CALL_SECONDS.observe(time.perf_counter() - t0, tool=tool)
+        TOOL_CALLS.inc(tool=tool, outcome=outcome)
@@ -1,91 +1,144 @@
+import contextlib
 import os
-import requests
-from typing import Dict, Any
-from langchain_core.tools import tool
+import httpx
+from typing import Dict, Any, Optional
+from langchain_core.tools import StructuredTool, tool
+
+from src import tracing
+from src.metrics import track_tool
+from src.tools.rag_client import RAGServiceError, get_rag_client
+from src.tools.rag_inprocess import enabled as inprocess_enabled, get_inprocess_rag
 
 def _get_rag_service_url() -> str:
     """Obtém a URL do serviço RAG a partir das variáveis de ambiente."""
     return os.getenv("RAG_SERVICE_URL", "http://localhost:8080")
 
+def _parse_server_timing(value: Optional[str]) -> Dict[str, float]:
+    """Durações por estágio do cabeçalho Server-Timing ("embed;dur=1.2, search;dur=3.4")."""
+    timings: Dict[str, float] = {}
+    for entry in (value or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, dur = param.strip().partition("=")
+            if key == "dur" and name:
+                with contextlib.suppress(ValueError):
+                    timings[name] = float(dur)
+    return timings
+
+def _request_headers() -> Dict[str, str]:
+    # Same request id as the chat turn, with the current span as the parent of RAG's spans
+    return {"Content-Type": "application/json", **tracing.propagation_headers()}
+
+def _annotate(span: Optional[tracing.Span], response: httpx.Response) -> None:
+    if span is not None:
+        span.attributes.update(status=response.status_code,
+                               rag_timings_ms=_parse_server_timing(response.headers.get("Server-Timing")))
+
 def _make_rag_request(query: str, k: int = 10) -> Dict[str, Any]:
-    """Faz requisição para o serviço RAG com tratamento de erros."""
-    url = f"{_get_rag_service_url()}/rag/similar"
+    """Faz requisição para o serviço RAG com tratamento de erros.
+
+    Usa o cliente compartilhado (conexões reaproveitadas, novas tentativas e
+    circuit breaker); falhas chegam como RAGServiceError com a mensagem final.
+    Com RAG_MODE=inprocess a busca roda neste processo, sem HTTP.
+    """
+    if inprocess_enabled():
+        return get_inprocess_rag().search(query, k)
     payload = {
         "text": query,
         "k": k
     }
-    
-    timeout = int(os.getenv("RAG_TIMEOUT", "30"))
-    
+    with tracing.span("rag.request", url=f"{_get_rag_service_url()}/rag/similar", k=k) as span:
+        response = get_rag_client().post("/rag/similar", payload, headers=_request_headers())
+        _annotate(span, response)
     try:
-        response = requests.post(
-            url,
-            json=payload,
-            timeout=timeout,
-            headers={"Content-Type": "application/json"}
-        )
-        response.raise_for_status()
         return response.json()
-        
-    except requests.exceptions.ConnectionError:
-        raise Exception(f"Não foi possível conectar ao serviço RAG em {url}")
-    except requests.exceptions.Timeout:
-        raise Exception(f"Timeout ao acessar o serviço RAG (>{timeout}s)")
-    except requests.exceptions.HTTPError as e:
-        raise Exception(f"Erro HTTP do serviço RAG: {e.response.status_code} - {e.response.text}")
-    except Exception as e:
-        raise Exception(f"Erro inesperado ao acessar o serviço RAG: {str(e)}")
+    except ValueError as e:
+        raise RAGServiceError(f"Resposta inválida do serviço RAG: {e}") from e
 
-@tool
-def search_rag(query: str, k: int = 10) -> str:
+async def _amake_rag_request(query: str, k: int = 10) -> Dict[str, Any]:
+    """Versão assíncrona de _make_rag_request, sem bloquear o event loop."""
+    if inprocess_enabled():
+        return await get_inprocess_rag().asearch(query, k)
+    payload = {
+        "text": query,
+        "k": k
+    }
+    with tracing.span("rag.request", url=f"{_get_rag_service_url()}/rag/similar", k=k) as span:
+        response = await get_rag_client().apost("/rag/similar", payload, headers=_request_headers())
+        _annotate(span, response)
+    try:
+        return response.json()
+    except ValueError as e:
+        raise RAGServiceError(f"Resposta inválida do serviço RAG: {e}") from e
+
+def _format_results(result: Dict[str, Any]) -> str:
+    results = result.get("results", [])
+
+    if not results:
+        return "Nenhum resultado encontrado para a consulta."
+
+    # Formatar resultados
+    formatted_results = []
+    for i, item in enumerate(results, 1):
+        value = item.get("value", "N/A")
+        file = item.get("file", "N/A")
+        formatted_results.append(f"{i}. {value} (fonte: {file})")
+
+    return "\n".join(formatted_results)
+
+def _search_rag(query: str, k: int = 10) -> str:
     """
     Search the RAG database for the most relevant information.
-    
+
     Args:
         query: Text to search for
         k: Number of results to return (default: 10)
-    
+
     Returns:
         Formatted string with search results
     """
     try:
-        result = _make_rag_request(query, k)
-        results = result.get("results", [])
-        
-        if not results:
-            return "Nenhum resultado encontrado para a consulta."
-        
-        # Formatar resultados
-        formatted_results = []
-        for i, item in enumerate(results, 1):
-            value = item.get("value", "N/A")
-            file = item.get("file", "N/A")
-            formatted_results.append(f"{i}. {value} (fonte: {file})")
-        
-        return "\n".join(formatted_results)
-        
+        with track_tool("search_rag"), tracing.span("tool.search_rag", query=query, k=k):
+            result = _make_rag_request(query, k)
+        return _format_results(result)
+
     except Exception as e:
         return f"Erro na busca RAG: {str(e)}"
 
+async def _asearch_rag(query: str, k: int = 10) -> str:
+    try:
+        with track_tool("search_rag"), tracing.span("tool.search_rag", query=query, k=k):
+            result = await _amake_rag_request(query, k)
+        return _format_results(result)
+
+    except Exception as e:
+        return f"Erro na busca RAG: {str(e)}"
+
+# Sync and async implementations: graph.invoke uses the first, graph.ainvoke the second
+search_rag = StructuredTool.from_function(func=_search_rag, coroutine=_asearch_rag, name="search_rag")
+
 @tool
 def rag_health_check() -> str:
     """Check if the RAG service is healthy and responding."""
-    url = f"{_get_rag_service_url()}/rag/health/"
+    if inprocess_enabled():
+        try:
+            get_inprocess_rag().store()
+            return "✅ Busca RAG em processo pronta (índice aberto)."
+        except Exception as e:
+            return f"❌ Erro ao abrir o índice RAG em processo: {str(e)}"
     timeout = int(os.getenv("RAG_TIMEOUT", "10"))
-    
+
     try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
+        # Shared client: pooled connections, retries and the circuit breaker
+        response = get_rag_client().get("/rag/health/", timeout=timeout)
         data = response.json()
-        
+
         if data.get("status") == 201:
             return "✅ Serviço RAG está funcionando corretamente."
         else:
             return f"⚠️ Serviço RAG respondeu com status inesperado: {data}"
-            
-    except requests.exceptions.ConnectionError:
-        return f"❌ Não foi possível conectar ao serviço RAG em {url}"
-    except requests.exceptions.Timeout:
-        return f"⏰ Timeout ao verificar o serviço RAG (>{timeout}s)"
+
+    except RAGServiceError as e:
+        return f"❌ {e}"
     except Exception as e:
-        return f"❌ Erro ao verificar o serviço RAG: {str(e)}"
\ No newline at end of file
+        return f"❌ Erro ao verificar o serviço RAG: {str(e)}"
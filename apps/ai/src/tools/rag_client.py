@@ -0,0 +1,339 @@
+"""Shared HTTP client for the RAG service.
+
+One connection-pooled ``httpx`` client (plus an async twin) is reused by
+every tool call, so requests go over kept-alive connections instead of a
+new TCP connection each time. Transient failures (connection errors,
+connect timeouts, 502/503) are retried a bounded number of times with
+full-jitter exponential backoff, and a circuit breaker fails fast while the
+RAG service keeps failing, probing it again after a cool-down. A 503 with
+Retry-After is RAG shedding load (saturated, or its index still building):
+it is retried but not counted against the breaker, since the service is up.
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+from src import tracing
+from src.metrics import counter, gauge
+
+# Not 504: RAG answers it when its own search timed out, and that search is
+# still running on its executor; a retry would only pile up more work
+RETRY_STATUSES = (502, 503)
+
+RAG_RETRIES = counter("ai_rag_retries_total", "Retried requests to the RAG service, by reason", ["reason"])
+RAG_REJECTED = counter("ai_rag_breaker_rejections_total", "RAG requests failed fast by the open circuit breaker")
+RAG_BREAKER_OPEN = gauge("ai_rag_breaker_open", "1 while the RAG circuit breaker is open or half-open")
+
+
+@dataclass(frozen=True)
+class RAGClientSettings:
+    """Connection, retry and circuit-breaker limits for calls to the RAG service.
+
+    - timeout_s / connect_timeout_s: read/write and connection timeouts.
+    - max_connections / keepalive_s: pool size and idle keep-alive per client.
+    - retries: extra attempts after the first one for transient failures.
+    - backoff_s / max_backoff_s: base and cap of the jittered backoff.
+    - breaker_failures: consecutive failures that open the circuit.
+    - breaker_reset_s: how long the circuit stays open before a probe.
+    """
+
+    base_url: str = "http://localhost:8080"
+    timeout_s: float = 30.0
+    connect_timeout_s: float = 2.0
+    max_connections: int = 10
+    keepalive_s: float = 30.0
+    retries: int = 2
+    backoff_s: float = 0.1
+    max_backoff_s: float = 2.0
+    breaker_failures: int = 5
+    breaker_reset_s: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "RAGClientSettings":
+        return cls(
+            base_url=os.getenv("RAG_SERVICE_URL", "http://localhost:8080").rstrip("/"),
+            timeout_s=float(os.getenv("RAG_TIMEOUT", "30")),
+            connect_timeout_s=float(os.getenv("RAG_CONNECT_TIMEOUT", "2")),
+            max_connections=max(1, int(os.getenv("RAG_POOL_SIZE", "10"))),
+            keepalive_s=float(os.getenv("RAG_KEEPALIVE", "30")),
+            retries=max(0, int(os.getenv("RAG_RETRIES", "2"))),
+            backoff_s=float(os.getenv("RAG_RETRY_BACKOFF", "0.1")),
+            max_backoff_s=float(os.getenv("RAG_RETRY_MAX_BACKOFF", "2")),
+            breaker_failures=max(1, int(os.getenv("RAG_BREAKER_FAILURES", "5"))),
+            breaker_reset_s=float(os.getenv("RAG_BREAKER_RESET", "30")),
+        )
+
+
+class RAGServiceError(Exception):
+    """A request to the RAG service failed; the message is shown to the agent."""
+
+
+class CircuitOpen(RAGServiceError):
+    """Raised without calling the RAG service while the circuit is open."""
+
+    def __init__(self, retry_in_s: float) -> None:
+        super().__init__(f"Serviço RAG indisponível; nova tentativa em {retry_in_s:.0f}s")
+        self.retry_in_s = retry_in_s
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failures, then lets one probe through per ``reset_s``.
+
+    Closed: calls pass. Open: calls fail fast until ``reset_s`` has passed.
+    Half-open: a single probe is allowed; its success closes the circuit and
+    its failure opens it again for another ``reset_s``.
+    """
+
+    def __init__(self, failures: int = 5, reset_s: float = 30.0) -> None:
+        self.failures = failures
+        self.reset_s = reset_s
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_s:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen unless a call may go through now; True if that call is the probe."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_s or self._probing:
+                RAG_REJECTED.inc()
+                raise CircuitOpen(max(self.reset_s - waited, 0.0))
+            self._probing = True
+            return True
+
+    def end_probe(self) -> None:
+        """Let another probe through if this one ended without a success or failure being recorded.
+
+        E.g. it raised something other than an HTTP error, or was cancelled;
+        otherwise the circuit would stay half-open and reject every call.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+        RAG_BREAKER_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._probing = False
+            opened = self._opened_at is not None
+        RAG_BREAKER_OPEN.set(1 if opened else 0)
+
+
+class RAGClient:
+    """Pooled sync/async client with retries and a circuit breaker.
+
+    ``transport`` / ``async_transport`` replace the network (e.g.
+    ``httpx.MockTransport`` in tests).
+    """
+
+    def __init__(
+        self,
+        settings: Optional[RAGClientSettings] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.settings = settings or RAGClientSettings.from_env()
+        self.breaker = CircuitBreaker(self.settings.breaker_failures, self.settings.breaker_reset_s)
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _options(self) -> Dict[str, Any]:
+        s = self.settings
+        return {
+            "base_url": s.base_url,
+            "timeout": httpx.Timeout(s.timeout_s, connect=s.connect_timeout_s),
+            "limits": httpx.Limits(
+                max_connections=s.max_connections,
+                max_keepalive_connections=s.max_connections,
+                keepalive_expiry=s.keepalive_s,
+            ),
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(transport=self._transport, **self._options())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(transport=self._async_transport, **self._options())
+        return self._async_client
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff; a short Retry-After from RAG is honoured."""
+        cap = min(self.settings.max_backoff_s, self.settings.backoff_s * (2 ** attempt))
+        delay = random.uniform(0, cap)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            with contextlib.suppress(ValueError):
+                delay = max(delay, min(float(retry_after), self.settings.max_backoff_s))
+        return delay
+
+    def _error(self, exc: Optional[Exception], response: Optional[httpx.Response]) -> RAGServiceError:
+        if response is not None:
+            return RAGServiceError(f"Erro HTTP do serviço RAG: {response.status_code} - {response.text}")
+        if isinstance(exc, httpx.TimeoutException):
+            return RAGServiceError(f"Timeout ao acessar o serviço RAG (>{self.settings.timeout_s:g}s)")
+        if isinstance(exc, httpx.TransportError):
+            return RAGServiceError(f"Não foi possível conectar ao serviço RAG em {self.settings.base_url}")
+        return RAGServiceError(f"Erro inesperado ao acessar o serviço RAG: {exc}")
+
+    @staticmethod
+    def _retry_reason(exc: Optional[Exception], response: Optional[httpx.Response]) -> Optional[str]:
+        """Why a failed attempt may be retried, or None when it must not be.
+
+        A read timeout is not retried: the search may still be running and a
+        retry would only add load to a slow service.
+        """
+        if response is not None:
+            return f"status_{response.status_code}" if response.status_code in RETRY_STATUSES else None
+        if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)):
+            return type(exc).__name__
+        return None
+
+    @staticmethod
+    def _shedding(response: Optional[httpx.Response]) -> bool:
+        """A deliberate 503 from RAG (saturated or building its index), which says when to come back."""
+        return response is not None and response.status_code == 503 and "Retry-After" in response.headers
+
+    def _settle(self, exc: Optional[Exception], response: Optional[httpx.Response], attempt: int) -> str:
+        """Book a failed attempt: raise RAGServiceError when giving up, else return the retry reason."""
+        if response is not None and response.status_code < 500:
+            # The request was wrong, not the service: no retry and no breaker failure
+            self.breaker.record_success()
+            raise self._error(exc, response)
+        if not self._shedding(response):
+            self.breaker.record_failure()
+        reason = self._retry_reason(exc, response)
+        if reason is None or attempt >= self.settings.retries or self.breaker.state != "closed":
+            raise self._error(exc, response) from exc
+        RAG_RETRIES.inc(reason=reason)
+        return reason
+
+    def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Send a request (``httpx`` keyword arguments); returns the 2xx response or raises RAGServiceError."""
+        attempt = 0
+        while True:
+            probe = self.breaker.before_call()
+            exc: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            try:
+                try:
+                    response = self.client.request(method, path, **kwargs)
+                    if response.status_code < 400:
+                        self.breaker.record_success()
+                        return response
+                except httpx.HTTPError as e:
+                    exc = e
+                reason = self._settle(exc, response, attempt)
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            delay = self._backoff(attempt, response)
+            time.sleep(delay)
+            tracing.add_span("rag.backoff", delay * 1000.0, attempt=attempt + 1, reason=reason)
+            attempt += 1
+
+    async def arequest(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        """Async ``request``: same retries and breaker, without blocking the event loop."""
+        attempt = 0
+        while True:
+            probe = self.breaker.before_call()
+            exc: Optional[Exception] = None
+            response: Optional[httpx.Response] = None
+            try:
+                try:
+                    response = await self.async_client.request(method, path, **kwargs)
+                    if response.status_code < 400:
+                        self.breaker.record_success()
+                        return response
+                except httpx.HTTPError as e:
+                    exc = e
+                reason = self._settle(exc, response, attempt)
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+            delay = self._backoff(attempt, response)
+            await asyncio.sleep(delay)
+            tracing.add_span("rag.backoff", delay * 1000.0, attempt=attempt + 1, reason=reason)
+            attempt += 1
+
+    def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        """GET ``path``; returns the 2xx response or raises RAGServiceError."""
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """POST ``payload`` as JSON; returns the 2xx response or raises RAGServiceError."""
+        return self.request("POST", path, json=payload, headers=headers)
+
+    async def apost(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        return await self.arequest("POST", path, json=payload, headers=headers)
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+
+_client: Optional[RAGClient] = None
+_client_lock = threading.Lock()
+
+
+def get_rag_client() -> RAGClient:
+    """The process-wide client, created from the environment on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = RAGClient()
+    return _client
+
+
+async def close_rag_client() -> None:
+    """Close the pooled connections of the process-wide client, if it was created."""
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+        await client.aclose()
@@ -0,0 +1,256 @@
+"""In-process search over the RAG library (RAG_MODE=inprocess).
+
+When the AI and RAG services run on the same machine, ``search_rag`` can
+import ``apps/rag/src`` and search the index directly instead of posting to
+``/rag/similar``: no network hop and no JSON round-trip per tool call. The
+models load once per process through the library's registry
+(``get_processor``), the index is opened once (or memory-mapped from
+RAG_SNAPSHOT), and searches run on the library's bounded executor with the
+same limits as the service (RAG_EXECUTOR_WORKERS, RAG_MAX_IN_FLIGHT,
+RAG_REQUEST_TIMEOUT, RAG_MAX_K, RAG_SEARCH_PROFILE). The result has the same
+``{"results": [...], "search": {...}}`` shape as the HTTP response.
+
+The library is loaded as the ``rag_library`` package rather than from
+``sys.path``, so its top-level module names (``metrics``, ``logs``,
+``tracing``, ``serving``, ...) never shadow installed packages; the imports
+between its modules resolve inside that package.
+
+The RAG dependencies must be installed in the AI environment and an index
+must already exist: this mode serves it but does not build it. The version's
+lexical index is loaded from the store's directory with it (a snapshot
+carries its own), and searches follow the alias to the version it points to now. The embedded
+Qdrant store can only be opened by one process, so next to a running RAG
+service use RAG_VECTOR_BACKEND=numpy or a snapshot.
+"""
+
+import asyncio
+import builtins
+import importlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import os
+import sys
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+from src import tracing
+from src.tools.rag_client import RAGServiceError
+
+DEFAULT_SRC_DIR = Path(__file__).resolve().parents[3] / "rag" / "src"
+LIBRARY_PACKAGE = "rag_library"
+
+
+def enabled() -> bool:
+    """True when RAG_MODE selects the in-process path instead of HTTP (the default)."""
+    return os.getenv("RAG_MODE", "http").lower() == "inprocess"
+
+
+def rag_src_dir() -> str:
+    return os.getenv("RAG_SRC_DIR") or str(DEFAULT_SRC_DIR)
+
+
+class _LibraryFinder(importlib.abc.MetaPathFinder):
+    """Finds ``rag_library.<name>`` among the modules of the RAG source directory."""
+
+    def __init__(self, src_dir: str) -> None:
+        self.src_dir = src_dir
+        self.names = frozenset(p.stem for p in Path(src_dir).glob("*.py"))
+        self.builtins = dict(vars(builtins), __import__=self._import)
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None) -> Optional[importlib.machinery.ModuleSpec]:
+        package, _, name = fullname.rpartition(".")
+        if package != LIBRARY_PACKAGE or name not in self.names:
+            return None
+        origin = os.path.join(self.src_dir, f"{name}.py")
+        return importlib.util.spec_from_file_location(fullname, origin, loader=_LibraryLoader(fullname, origin, self))
+
+    def _import(self, name: str, globals: Any = None, locals: Any = None, fromlist: Any = (), level: int = 0) -> ModuleType:
+        # The library imports its own modules by their top-level names ("from vector_store import ...")
+        top = name.partition(".")[0]
+        if level or top not in self.names:
+            return builtins.__import__(name, globals, locals, fromlist, level)
+        module = importlib.import_module(f"{LIBRARY_PACKAGE}.{name}")
+        return module if fromlist else sys.modules[f"{LIBRARY_PACKAGE}.{top}"]
+
+
+class _LibraryLoader(importlib.machinery.SourceFileLoader):
+    def __init__(self, fullname: str, path: str, finder: _LibraryFinder) -> None:
+        super().__init__(fullname, path)
+        self.finder = finder
+
+    def exec_module(self, module: ModuleType) -> None:
+        # Builtins of this module only: its import statements go through the finder
+        module.__builtins__ = self.finder.builtins
+        super().exec_module(module)
+
+
+_finder: Optional[_LibraryFinder] = None
+_finder_lock = threading.Lock()
+
+
+def import_library(name: str, src_dir: Optional[str] = None) -> ModuleType:
+    """A module of the RAG library, loaded from ``src_dir`` (RAG_SRC_DIR) as ``rag_library.<name>``."""
+    global _finder
+    src_dir = os.path.abspath(src_dir or rag_src_dir())
+    with _finder_lock:
+        if _finder is None:
+            package = importlib.util.module_from_spec(
+                importlib.machinery.ModuleSpec(LIBRARY_PACKAGE, None, is_package=True)
+            )
+            package.__path__ = []
+            sys.modules[LIBRARY_PACKAGE] = package
+            _finder = _LibraryFinder(src_dir)
+            sys.meta_path.insert(0, _finder)
+        elif _finder.src_dir != src_dir:
+            raise RAGServiceError(f"Biblioteca RAG já carregada de {_finder.src_dir}, não de {src_dir}")
+    return importlib.import_module(f"{LIBRARY_PACKAGE}.{name}")
+
+
+class InProcessRAG:
+    """Serves searches from the RAG library loaded into this process.
+
+    ``store`` replaces the index opened from the environment (e.g. a
+    NumpyVectorStore built in tests).
+    """
+
+    def __init__(self, src_dir: Optional[str] = None, store: Any = None) -> None:
+        self.src_dir = src_dir or rag_src_dir()
+        self._store = store
+        self._executor: Any = None
+        self._lock = threading.Lock()
+
+    def _module(self, name: str) -> ModuleType:
+        return import_library(name, self.src_dir)
+
+    def store(self) -> Any:
+        """The index to search, opened on first use; raises RAGServiceError while none exists."""
+        with self._lock:
+            if self._store is None:
+                snapshot_path = os.getenv("RAG_SNAPSHOT")
+                if snapshot_path:
+                    self._store = self._module("snapshot").install_snapshot(snapshot_path)
+                else:
+                    alias = self._module("index_versions").DEFAULT_ALIAS
+                    lexical_index = self._module("lexical_index")
+                    vector_store = self._module("vector_store")
+
+                    store = vector_store.open_default_store()
+                    vectors = vector_store.as_vector_store(store)
+                    if not vectors.collection_exists(alias):
+                        raise RAGServiceError(f"Índice RAG ainda não foi construído em {vector_store.data_dir()}")
+                    # Exact lookups and hybrid search need the BM25 index saved with
+                    # the version; without it results would silently differ from the service
+                    version = vectors.get_alias(alias) or alias
+                    if lexical_index.get_lexical_index(vectors, version) is None:
+                        raise RAGServiceError(
+                            f"Índice lexical da versão {version} não encontrado em {vector_store.data_dir()}; "
+                            "reconstrua o índice ou use RAG_SNAPSHOT"
+                        )
+                    self._store = store
+            return self._store
+
+    @property
+    def executor(self) -> Any:
+        with self._lock:
+            if self._executor is None:
+                serving = self._module("serving")
+                self._executor = serving.BoundedExecutor(serving.ServingSettings.from_env(), thread_name_prefix="ai-rag")
+            return self._executor
+
+    def preload(self) -> None:
+        """Open the index and load the models ahead of the first tool call."""
+        self.store()
+        self._module("csv_chunk_processor").get_processor()
+
+    def _search(self, query: str, k: int) -> Dict[str, Any]:
+        rag_tracing = self._module("tracing")
+        find_top_k_rows = self._module("csv_chunk_processor").find_top_k_rows
+
+        store = self.store()
+        settings = self.executor.settings
+        trace = self._module("search_profiles").SearchTrace(settings.default_profile)
+        headers = tracing.propagation_headers()
+        # The library's spans join the AI request, under the tool's span
+        with rag_tracing.start_trace(
+            "rag.inprocess",
+            request_id=headers.get(tracing.REQUEST_ID_HEADER),
+            parent_id=headers.get(tracing.PARENT_SPAN_HEADER),
+        ):
+            trace.mark_started()
+            rows = find_top_k_rows(query, store, k=min(max(k, 1), settings.max_k), trace=trace)
+        results = [{"value": r.get("value"), "file": r.get("file"), "score": r.get("score")} for r in rows]
+        return {"results": results, "search": trace.as_dict()}
+
+    def _annotated(self, query: str, k: int) -> Dict[str, Any]:
+        with tracing.span("rag.inprocess", k=k) as span:
+            result = self._search(query, k)
+            if span is not None:
+                span.attributes["rag_timings_ms"] = result["search"].get("timings_ms", {})
+        return result
+
+    def search(self, query: str, k: int = 10) -> Dict[str, Any]:
+        """Search on the executor and wait; errors come as RAGServiceError like the HTTP path."""
+        serving = self._module("serving")
+        executor = self.executor
+        try:
+            future = executor.submit(self._annotated, query, k)
+        except serving.ExecutorSaturated as e:
+            raise RAGServiceError("Busca RAG saturada, tente novamente") from e
+        try:
+            return future.result(timeout=executor.settings.request_timeout_s)
+        except FutureTimeout as e:
+            raise RAGServiceError(
+                f"Timeout na busca RAG (>{executor.settings.request_timeout_s:g}s)"
+            ) from e
+
+    async def asearch(self, query: str, k: int = 10) -> Dict[str, Any]:
+        """Async ``search``: the event loop only awaits the executor."""
+        serving = self._module("serving")
+        executor = self.executor
+        try:
+            return await executor.run(self._annotated, query, k, timeout=executor.settings.request_timeout_s)
+        except serving.ExecutorSaturated as e:
+            raise RAGServiceError("Busca RAG saturada, tente novamente") from e
+        except asyncio.TimeoutError as e:
+            raise RAGServiceError(
+                f"Timeout na busca RAG (>{executor.settings.request_timeout_s:g}s)"
+            ) from e
+
+    def render_metrics(self) -> str:
+        """The library's metrics (search stages, table cache) in the Prometheus text format."""
+        metrics = sys.modules.get(f"{LIBRARY_PACKAGE}.metrics")
+        if metrics is None:
+            return ""
+        return metrics.REGISTRY.render()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_rag: Optional[InProcessRAG] = None
+_rag_lock = threading.Lock()
+
+
+def get_inprocess_rag() -> InProcessRAG:
+    """The process-wide instance, created on first use."""
+    global _rag
+    with _rag_lock:
+        if _rag is None:
+            _rag = InProcessRAG()
+    return _rag
+
+
+def close_inprocess_rag() -> None:
+    """Stop the search threads, if the in-process path was used."""
+    global _rag
+    with _rag_lock:
+        rag, _rag = _rag, None
+    if rag is not None:
+        rag.shutdown()
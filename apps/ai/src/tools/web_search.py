@@ -1,9 +1,22 @@
-from langchain_community.tools import DuckDuckGoSearchResults
 from langchain_core.tools import tool
 
-search = DuckDuckGoSearchResults(output_format="list", num_results=10)
+from src import tracing
+from src.metrics import track_tool
+
+_search = None
+
+
+def get_search():
+    """DuckDuckGo search client, created on the first web search."""
+    global _search
+    if _search is None:
+        from langchain_community.tools import DuckDuckGoSearchResults
+
+        _search = DuckDuckGoSearchResults(output_format="list", num_results=10)
+    return _search
 
 @tool
 def web_search(query: str) -> str:
     """Search the web for the most relevant information."""
-    return search.invoke(query)
\ No newline at end of file
+    with track_tool("web_search"), tracing.span("tool.web_search"):
+        return get_search().invoke(query)
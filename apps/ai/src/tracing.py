@@ -0,0 +1,35 @@
+"""Request-scoped spans of the AI service (see ``observability.tracing``).
+
+The agent's LLM calls, tools and RAG requests are spans of the chat turn;
+they go to AI_TRACE_FILE as JSON lines with ``"service": "ai"``, and
+AI_DEBUG_HEADER limits what an ``X-Debug`` header may ask for.
+"""
+
+from observability.tracing import (  # noqa: F401 (re-exported)
+    DEBUG_HEADER,
+    PARENT_SPAN_HEADER,
+    PROFILERS,
+    REQUEST_ID_HEADER,
+    JsonLinesExporter,
+    Span,
+    Trace,
+    Tracer,
+    clean_id,
+    new_id,
+    run_profiled,
+)
+
+SERVICE = "ai"
+TRACE_FILE_ENV = "AI_TRACE_FILE"
+DEBUG_HEADER_ENV = "AI_DEBUG_HEADER"
+
+TRACER = Tracer(SERVICE, TRACE_FILE_ENV, DEBUG_HEADER_ENV)
+
+get_exporter = TRACER.get_exporter
+current_trace = TRACER.current_trace
+parse_debug = TRACER.parse_debug
+start_trace = TRACER.start_trace
+span = TRACER.span
+add_span = TRACER.add_span
+propagation_headers = TRACER.propagation_headers
+call = TRACER.call
@@ -18,6 +18,8 @@ def load_main_module():
     # Stub package 'src' and subpackages so `from src.agent.agent import generate` succeeds
     if 'src' not in sys.modules:
         sys.modules['src'] = types.ModuleType('src')
+        # The light modules (metrics, logging) are still importable from src/
+        sys.modules['src'].__path__ = [str(Path(ai_root) / 'src')]
     if 'src.agent' not in sys.modules:
         pkg = types.ModuleType('src.agent')
         sys.modules['src.agent'] = pkg
@@ -127,3 +129,36 @@ def test_generate_exception_produces_500(monkeypatch):
     assert r.status_code == 500
 
 
+
+
+def test_metrics_endpoint_counts_requests():
+    app = get_app()
+    client = TestClient(app)
+    client.get("/ai/health/")
+    r = client.get("/ai/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'ai_http_requests_total{method="GET",route="/ai/health/",status="200"}' in r.text
+    assert "# TYPE ai_llm_call_seconds histogram" in r.text
+
+
+def test_request_id_is_kept_and_debug_returns_spans(monkeypatch):
+    ai_main = load_main_module()
+
+    def fake_generate(msg: str):
+        with ai_main.tracing.span("llm", model="stub"):
+            pass
+        return ("t", "m", [])
+
+    monkeypatch.setattr(ai_main, "generate", fake_generate)
+    client = TestClient(ai_main.app)
+    r = client.post("/ai/generate/", json={"message": "ping"}, headers={"X-Request-ID": "turn-7", "X-Debug": "timing"})
+    assert r.status_code == 200
+    assert r.headers["x-request-id"] == "turn-7"
+    debug = r.json()["debug"]
+    assert debug["request_id"] == "turn-7"
+    assert [s["name"] for s in debug["spans"]] == ["llm"]
+    # Sem o cabeçalho a resposta não muda, mas ganha um id novo
+    r = client.post("/ai/generate/", json={"message": "ping"})
+    assert "debug" not in r.json()
+    assert r.headers["x-request-id"] != "turn-7"
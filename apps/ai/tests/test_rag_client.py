@@ -0,0 +1,172 @@
+"""
+Testes do cliente HTTP do serviço RAG: novas tentativas, circuit breaker e versão assíncrona.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.tools.rag_client import CircuitOpen, RAGClient, RAGClientSettings, RAGServiceError  # noqa: E402
+
+
+def make_client(handler, **overrides):
+    settings = RAGClientSettings(
+        base_url="http://rag.test", retries=2, backoff_s=0.001, max_backoff_s=0.01,
+        breaker_failures=3, breaker_reset_s=0.2, **overrides,
+    )
+    return RAGClient(settings, transport=httpx.MockTransport(handler),
+                     async_transport=httpx.MockTransport(handler))
+
+
+def test_transient_failures_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"results": []})
+
+    client = make_client(handler)
+    assert client.post("/rag/similar", {"text": "x"}).json() == {"results": []}
+    assert len(calls) == 3
+    assert client.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"detail": "bad"})
+
+    client = make_client(handler)
+    with pytest.raises(RAGServiceError, match="400"):
+        client.post("/rag/similar", {"text": ""})
+    assert len(calls) == 1
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_fails_fast_then_probes():
+    healthy = [False]
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if not healthy[0]:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"results": []})
+
+    client = make_client(handler)
+    with pytest.raises(RAGServiceError, match="conectar"):
+        client.post("/rag/similar", {"text": "x"})
+    # Três falhas seguidas abrem o circuito: a próxima chamada nem chega ao serviço
+    assert len(calls) == 3
+    with pytest.raises(CircuitOpen):
+        client.post("/rag/similar", {"text": "x"})
+    assert len(calls) == 3
+
+    healthy[0] = True
+    time.sleep(0.25)
+    assert client.post("/rag/similar", {"text": "x"}).status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_async_post_shares_retries_and_breaker():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"results": [{"value": "v", "file": "f.csv"}]})
+
+    client = make_client(handler)
+
+    async def run():
+        try:
+            return (await client.apost("/rag/similar", {"text": "x"})).json()
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run())["results"][0]["value"] == "v"
+    assert len(calls) == 2
+
+
+def test_gateway_timeout_from_rag_is_not_retried():
+    """504: a busca estourou o prazo no RAG e continua rodando lá; repetir só aumentaria a carga."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(504, json={"detail": "Search timed out"})
+
+    client = make_client(handler)
+    with pytest.raises(RAGServiceError, match="504"):
+        client.post("/rag/similar", {"text": "x"})
+    assert len(calls) == 1
+
+
+def test_probe_that_raises_unexpectedly_does_not_wedge_the_breaker():
+    """Se a sondagem falha com um erro que não é do httpx, a próxima chamada pode sondar de novo."""
+    mode = ["down"]
+
+    def handler(request):
+        if mode[0] == "down":
+            raise httpx.ConnectError("refused", request=request)
+        if mode[0] == "bug":
+            raise RuntimeError("bug no transporte")
+        return httpx.Response(200, json={"results": []})
+
+    client = make_client(handler)
+    with pytest.raises(RAGServiceError):
+        client.post("/rag/similar", {"text": "x"})
+    assert client.breaker.state == "open"
+
+    time.sleep(0.25)
+    mode[0] = "bug"
+    with pytest.raises(RuntimeError):
+        client.post("/rag/similar", {"text": "x"})
+    mode[0] = "up"
+    assert client.post("/rag/similar", {"text": "x"}).status_code == 200
+    assert client.breaker.state == "closed"
+
+
+def test_load_shedding_from_rag_does_not_open_the_breaker():
+    """503 com Retry-After (RAG saturado ou construindo o índice): o serviço está de pé, o circuito continua fechado."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, headers={"Retry-After": "0"}, json={"detail": "RAG service is saturated"})
+
+    client = make_client(handler)
+    for _ in range(3):
+        with pytest.raises(RAGServiceError, match="503"):
+            client.post("/rag/similar", {"text": "x"})
+    assert len(calls) == 9
+    assert client.breaker.state == "closed"
+
+
+def test_health_check_goes_through_the_shared_client(monkeypatch):
+    from src.tools import rag as rag_tool
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"status": 201})
+
+    client = make_client(handler)
+    monkeypatch.delenv("RAG_MODE", raising=False)
+    monkeypatch.setattr(rag_tool, "get_rag_client", lambda: client)
+    assert "funcionando" in rag_tool.rag_health_check.invoke({})
+    assert [r.url.path for r in calls] == ["/rag/health/", "/rag/health/"]
@@ -0,0 +1,128 @@
+"""
+Testes da busca RAG em processo (RAG_MODE=inprocess), sem HTTP até o serviço RAG.
+
+Testes de integração (marcador ``integration``): carregam a biblioteca do
+apps/rag e precisam das dependências dela no ambiente; sem elas são pulados.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.integration
+for _dependency in ("numpy", "pandas", "qdrant_client"):
+    pytest.importorskip(_dependency, reason="dependências do apps/rag não instaladas")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src import tracing  # noqa: E402
+from src.tools import rag as rag_tool  # noqa: E402
+from src.tools import rag_inprocess  # noqa: E402
+from src.tools.rag_client import RAGServiceError  # noqa: E402
+from src.tools.rag_inprocess import InProcessRAG, import_library  # noqa: E402
+
+RAG_SRC = str(rag_inprocess.DEFAULT_SRC_DIR)
+
+# Embedder e reranker sem pesos de modelo, como na suíte do apps/rag
+os.environ.setdefault("RAG_EMBEDDER", "hashing")
+os.environ.setdefault("RAG_RERANKER", "overlap")
+# Índices e cache de tabelas num diretório temporário, nunca em apps/rag/src
+DATA_DIR = tempfile.mkdtemp(prefix="ai-rag-tests-")
+os.environ["RAG_DATA_DIR"] = DATA_DIR
+os.environ["RAG_TABLE_CACHE_DIR"] = os.path.join(DATA_DIR, "table_cache")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _data_dir():
+    yield
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def rag(tmp_path):
+    import pandas as pd
+
+    register_table = import_library("csv_chunk_processor", RAG_SRC).register_table
+    rebuild_index = import_library("index_versions", RAG_SRC).rebuild_index
+    set_lexical_index = import_library("lexical_index", RAG_SRC).set_lexical_index
+    NumpyVectorStore = import_library("vector_store", RAG_SRC).NumpyVectorStore
+
+    table = tmp_path / "pessoas.csv"
+    df = pd.DataFrame({"id": [1, 2, 3], "nome": ["Ana Souza", "Bruno Lima", "Carla Dias"],
+                       "cargo": ["analista", "gerente", "diretora"]})
+    df.to_csv(table, index=False)
+    register_table("pessoas.csv", df)
+    store = NumpyVectorStore(tmp_path / "db")
+    rebuild_index([str(table)], client=store)
+    rag = InProcessRAG(RAG_SRC, store=store)
+    try:
+        yield rag
+    finally:
+        rag.shutdown()
+        for name in list(store.list_collections()) + ["csv_chunks"]:
+            set_lexical_index(store, name, None)
+
+
+def test_search_returns_the_http_response_shape(rag):
+    result = rag.search("Bruno Lima", k=2)
+    assert [set(r) for r in result["results"]] == [{"value", "file", "score"}] * len(result["results"])
+    assert "Bruno Lima" in result["results"][0]["value"]
+    assert result["results"][0]["file"] == "pessoas.csv"
+    assert result["search"]["timings_ms"]
+
+
+def test_search_rag_tool_skips_http_when_inprocess(rag, monkeypatch):
+    monkeypatch.setenv("RAG_MODE", "inprocess")
+    monkeypatch.setattr(rag_tool, "get_inprocess_rag", lambda: rag)
+    monkeypatch.setattr(rag_tool, "get_rag_client", lambda: pytest.fail("HTTP não deveria ser usado"))
+
+    assert "Carla Dias" in rag_tool.search_rag.invoke({"query": "Carla Dias", "k": 1})
+    assert "Ana Souza" in asyncio.run(rag_tool.search_rag.ainvoke({"query": "Ana Souza", "k": 1}))
+
+
+def test_library_spans_join_the_ai_trace(rag):
+    with tracing.start_trace("POST /ai/generate/", debug="timing") as trace, tracing.span("tool.search_rag"):
+        rag.search("Ana Souza", k=1)
+    spans = {s["name"]: s for s in trace.debug_info()["spans"]}
+    assert spans["rag.inprocess"]["parent_id"] == spans["tool.search_rag"]["span_id"]
+    assert spans["rag.inprocess"]["attributes"]["rag_timings_ms"]
+
+
+def test_index_opened_from_disk_brings_the_versions_lexical_index(rag, monkeypatch):
+    """Processo novo, sem o índice lexical em memória: ele é lido do disco e a busca exata continua valendo."""
+    lexical_index = import_library("lexical_index", RAG_SRC)
+    vector_store = import_library("vector_store", RAG_SRC)
+
+    store = rag.store()
+    monkeypatch.setattr(lexical_index, "_indexes", {})
+    monkeypatch.setattr(vector_store, "open_default_store", lambda base_dir=None: store)
+    fresh = InProcessRAG(RAG_SRC)
+    try:
+        fresh.store()
+        version = store.get_alias("csv_chunks")
+        assert lexical_index._indexes[(store.location, version)] is not None
+        result = fresh.search("Bruno Lima", k=1)
+        assert result["search"]["lexical"] == "exact"
+        assert "Bruno Lima" in result["results"][0]["value"]
+
+        # Sem o índice lexical salvo o modo em processo não sobe
+        monkeypatch.setattr(lexical_index, "_indexes", {})
+        (store.artifacts_dir(version) / "lexical.json.gz").unlink()
+        with pytest.raises(RAGServiceError, match="lexical"):
+            InProcessRAG(RAG_SRC).store()
+    finally:
+        fresh.shutdown()
+
+
+def test_library_does_not_shadow_top_level_modules(rag):
+    """A biblioteca fica em ``rag_library``: nomes como ``metrics`` e ``tracing`` continuam livres para outros pacotes."""
+    rag.search("Ana Souza", k=1)
+    assert RAG_SRC not in sys.path
+    assert "rag_library.tracing" in sys.modules
+    assert all(name not in sys.modules for name in ("metrics", "logs", "serving", "vector_store"))
+    assert "rag_search_stage_seconds" in rag.render_metrics()
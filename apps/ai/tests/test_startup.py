@@ -0,0 +1,18 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+AI_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ["langgraph", "langchain_ollama", "langchain_community"]
+
+
+def test_importing_main_defers_the_agent_graph():
+    """Importing main.py must not build the graph or import LangGraph/Ollama/DuckDuckGo."""
+    probe = (
+        "import json, sys; sys.path.insert(0, '.'); import main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    # Fresh interpreter: test_api.py replaces src.agent.agent with a stub in this process
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=AI_DIR, capture_output=True, text=True, check=True)
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
@@ -0,0 +1,156 @@
+"""
+Benchmark dos backends de inferência (PyTorch × ONNX Runtime × ONNX int8).
+
+Uso:
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --backends torch onnx-int8 --threads 2 --out backends.json
+
+Cada backend roda num subprocesso próprio (RSS e tempo de carga isolados) e
+usa o mesmo backend para o modelo de embeddings e o cross-encoder. Mede o
+tempo de carga, embeddings/s sobre os chunks dos CSVs de `src/archives` (ou
+`--csv-dir`), pares/s do cross-encoder, o pico de RSS do processo e, contra o
+PyTorch como referência, a qualidade nas perguntas dos testes: cosseno médio
+dos vetores das perguntas, recall@k da busca densa e concordância do top-1
+após o re-ranking. Os backends ONNX precisam de `onnxruntime` e `optimum`.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from bench_projection import QUESTIONS, recall, top_k  # noqa: E402
+from csv_chunk_processor import ARCHIVES_DIR, CSVChunkProcessor  # noqa: E402
+from model_backends import BACKENDS, BackendConfig  # noqa: E402
+from table_reader import is_table_file, read_table  # noqa: E402
+
+
+def chunk_texts(csv_dir: str, limit: int) -> List[str]:
+    # build_chunks não usa o modelo de embeddings
+    builder = CSVChunkProcessor.__new__(CSVChunkProcessor)
+    texts: List[str] = []
+    for name in sorted(f for f in os.listdir(csv_dir) if is_table_file(f)):
+        texts.extend(c["text"] for c in builder.build_chunks(read_table(os.path.join(csv_dir, name)), name))
+    return texts[:limit]
+
+
+def rate(fn, items: int, repeat: int) -> float:
+    """Itens/s do melhor de ``repeat`` execuções de ``fn``."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return items / best
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    config = BackendConfig(args.worker, args.threads)
+    t0 = time.perf_counter()
+    processor = CSVChunkProcessor(embedding_backend=config, cross_encoder_backend=config)
+    load_s = time.perf_counter() - t0
+
+    texts = chunk_texts(args.csv_dir, args.max_chunks)
+    encode = processor.embedder.encode
+    encode(texts[: args.batch_size], batch_size=args.batch_size, show_progress_bar=False)
+    embeddings = np.asarray(encode(texts, batch_size=args.batch_size, show_progress_bar=False), dtype=np.float32)
+    queries = np.asarray(encode(QUESTIONS, batch_size=args.batch_size, show_progress_bar=False), dtype=np.float32)
+    result: Dict[str, Any] = {
+        "backend": args.worker,
+        "threads": args.threads,
+        "load_s": round(load_s, 2),
+        "chunks": len(texts),
+        "embeddings_per_s": round(rate(
+            lambda: encode(texts, batch_size=args.batch_size, show_progress_bar=False), len(texts), args.repeat
+        ), 1),
+        "queries": queries.tolist(),
+        "top_k": top_k(embeddings, queries, args.k).tolist(),
+    }
+
+    if processor.reranker is not None:
+        candidates = top_k(embeddings, queries, args.rerank_depth)
+        pairs = [(q, texts[i]) for q, row in zip(QUESTIONS, candidates) for i in row]
+        predict = processor.reranker.predict
+        predict(pairs[: args.batch_size], batch_size=args.batch_size)
+        scores = np.asarray(predict(pairs, batch_size=args.batch_size)).reshape(candidates.shape)
+        result["pairs_per_s"] = round(rate(lambda: predict(pairs, batch_size=args.batch_size), len(pairs), args.repeat), 1)
+        result["rerank_top1"] = [int(row[j]) for row, j in zip(candidates, scores.argmax(axis=1))]
+
+    # ru_maxrss é em KB no Linux
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_backend(backend: str, args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        path = tmp.name
+    try:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--worker", backend, "--result", path,
+            "--csv-dir", args.csv_dir, "--threads", str(args.threads), "--batch-size", str(args.batch_size),
+            "--max-chunks", str(args.max_chunks), "--k", str(args.k), "--rerank-depth", str(args.rerank_depth),
+            "--repeat", str(args.repeat),
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"backend": backend, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.unlink(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--csv-dir", default=ARCHIVES_DIR)
+    parser.add_argument("--threads", type=int, default=0, help="threads intra-op (0 = padrão da biblioteca)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-chunks", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-depth", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    raw = {b: run_backend(b, args) for b in backends}
+    reference = raw["torch"]
+    results: List[Dict[str, Any]] = []
+    for backend in args.backends:
+        data = raw[backend]
+        row = {k: v for k, v in data.items() if k not in ("queries", "top_k", "rerank_top1")}
+        if "error" not in data and "error" not in reference:
+            q, q_ref = np.asarray(data["queries"]), np.asarray(reference["queries"])
+            cosines = np.sum(q * q_ref, axis=1) / (np.linalg.norm(q, axis=1) * np.linalg.norm(q_ref, axis=1))
+            row["query_cosine"] = round(float(np.mean(cosines)), 4)
+            row[f"recall@{args.k}"] = round(recall(np.asarray(reference["top_k"]), np.asarray(data["top_k"])), 3)
+            if "rerank_top1" in data and "rerank_top1" in reference:
+                same = np.mean([a == b for a, b in zip(data["rerank_top1"], reference["rerank_top1"])])
+                row["rerank_top1_agreement"] = round(float(same), 3)
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
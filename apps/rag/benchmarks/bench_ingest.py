@@ -0,0 +1,267 @@
+"""
+Benchmark da ingestão: chunking, embeddings, upsert e ponta a ponta.
+
+Uso:
+    python benchmarks/bench_ingest.py --rows 1000 10000 --out ingest.json
+    python benchmarks/bench_ingest.py --shapes articles --rows 100000 --text-words 120 --store numpy
+    python benchmarks/bench_ingest.py --rows 1000000 --skip-e2e --sample-chunks 20000
+    python benchmarks/bench_ingest.py --rows 10000 --out depois.json --compare antes.json
+
+Para cada formato (`--shapes`, ver synthetic_csv.py) e tamanho (`--rows`)
+gera um CSV sintético e mede, em subprocessos próprios (pico de RSS isolado):
+
+- estágios: leitura da tabela, `build_chunks` (linhas/s e chunks/s), índice
+  léxico (linhas/s), `generate_embeddings` (chunks/s) e upsert no store
+  (pontos/s); embeddings e upsert usam os primeiros `--sample-chunks` chunks;
+- ponta a ponta: `process_csvs_as_chunks` num store vazio (linhas/s, chunks/s).
+
+O embedder padrão é o `hashing` (sem pesos), que isola o custo do pipeline;
+`--embedder sentence-transformers` mede com o modelo real. As variáveis
+RAG_* do ambiente valem nos subprocessos (ex.: RAG_COMPACT_PAYLOADS=1) e são
+gravadas no JSON junto com o commit, o Python e a máquina. Com `--compare`,
+imprime a razão novo/antigo de cada métrica dos casos em comum.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_csv import SHAPES, write_csv  # noqa: E402
+
+STORES = ("qdrant", "numpy")
+COLLECTION = "bench_ingest"
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss é em KB no Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _open_store(kind: str, path: str):
+    from vector_store import NumpyVectorStore, QdrantVectorStore
+
+    if kind == "numpy":
+        return NumpyVectorStore(path)
+    from qdrant_client import QdrantClient
+
+    return QdrantVectorStore(QdrantClient(path=path))
+
+
+def _per_s(items: int, seconds: float) -> float:
+    return round(items / seconds, 1) if seconds > 0 else 0.0
+
+
+def run_stages(args: argparse.Namespace) -> Dict[str, Any]:
+    from csv_chunk_processor import CSVChunkProcessor
+    from lexical_index import BM25Index
+    from table_reader import read_table
+
+    t0 = time.perf_counter()
+    processor = CSVChunkProcessor()
+    load_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df = read_table(args.csv)
+    read_s = time.perf_counter() - t0
+    name = os.path.basename(args.csv)
+
+    t0 = time.perf_counter()
+    chunks = processor.build_chunks(df, name)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    processor.index_rows_lexically(df, name, BM25Index())
+    lexical_s = time.perf_counter() - t0
+
+    sample = chunks[: args.sample_chunks]
+    t0 = time.perf_counter()
+    for start in range(0, len(sample), args.batch_size):
+        processor.generate_embeddings(sample[start:start + args.batch_size])
+    embed_s = time.perf_counter() - t0
+
+    store = _open_store(args.store, os.path.join(args.workdir, "store"))
+    store.ensure_collection(COLLECTION, int(processor.embedding_dim))
+    t0 = time.perf_counter()
+    for start in range(0, len(sample), args.batch_size):
+        batch = sample[start:start + args.batch_size]
+        store.upsert(
+            COLLECTION,
+            ids=[c["id"] for c in batch],
+            vectors=[c["embedding"] for c in batch],
+            payloads=[c["metadata"] for c in batch],
+        )
+    upsert_s = time.perf_counter() - t0
+
+    return {
+        "rows": int(len(df)),
+        "columns": int(len(df.columns)),
+        "chunks": len(chunks),
+        "sampled_chunks": len(sample),
+        "model_load_s": round(load_s, 3),
+        "read_s": round(read_s, 3),
+        "build_chunks_s": round(build_s, 3),
+        "build_rows_per_s": _per_s(len(df), build_s),
+        "build_chunks_per_s": _per_s(len(chunks), build_s),
+        "lexical_rows_per_s": _per_s(len(df), lexical_s),
+        "embed_chunks_per_s": _per_s(len(sample), embed_s),
+        "upsert_points_per_s": _per_s(len(sample), upsert_s),
+        "stages_peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_e2e(args: argparse.Namespace) -> Dict[str, Any]:
+    from csv_chunk_processor import CSVChunkProcessor, process_csvs_as_chunks
+
+    processor = CSVChunkProcessor()
+    store = _open_store(args.store, os.path.join(args.workdir, "store"))
+    t0 = time.perf_counter()
+    results, _ = process_csvs_as_chunks(
+        [args.csv], collection_name=COLLECTION, client=store, progress=None,
+        build_lexical_index=not args.no_lexical, processor=processor,
+    )
+    e2e_s = time.perf_counter() - t0
+    if "error" in results[0]:
+        raise RuntimeError(results[0]["error"])
+    return {
+        "e2e_s": round(e2e_s, 3),
+        "e2e_rows_per_s": _per_s(results[0]["total_rows"], e2e_s),
+        "e2e_chunks_per_s": _per_s(results[0]["total_chunks"], e2e_s),
+        "e2e_peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    result = run_stages(args) if args.worker == "stages" else run_e2e(args)
+    with open(args.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def worker_env(args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["RAG_EMBEDDER"] = args.embedder
+    # Só a ingestão é medida; o cache de tabelas vai para o diretório temporário (os artefatos
+    # de cada versão ficam com a store, que também está nele)
+    env["RAG_RERANKER"] = "none"
+    env["RAG_TABLE_CACHE_DIR"] = os.path.join(workdir, "table_cache")
+    return env
+
+
+def spawn(kind: str, csv_path: str, args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    result = os.path.join(workdir, "result.json")
+    try:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--worker", kind, "--csv", csv_path, "--result", result,
+            "--workdir", workdir, "--store", args.store, "--embedder", args.embedder,
+            "--batch-size", str(args.batch_size), "--sample-chunks", str(args.sample_chunks),
+        ] + (["--no-lexical"] if args.no_lexical else [])
+        proc = subprocess.run(cmd, env=worker_env(args, workdir), capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {f"{kind}_error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+        with open(result, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def environment(env: Dict[str, str]) -> Dict[str, Any]:
+    """Commit, Python, máquina e variáveis RAG_* de ``env``, para comparar execuções."""
+    def git(*cmd: str) -> Optional[str]:
+        try:
+            out = subprocess.run(["git", *cmd], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+            return out.stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rag_env": {k: v for k, v in sorted(env.items()) if k.startswith("RAG_") and not k.endswith("_DIR")},
+    }
+
+
+def compare(results: List[Dict[str, Any]], path: str) -> None:
+    with open(path, encoding="utf-8") as f:
+        old = {(r["shape"], r["rows"]): r for r in json.load(f)["results"]}
+    for row in results:
+        before = old.get((row["shape"], row["rows"]))
+        if before is None:
+            continue
+        ratios = {
+            key: round(value / before[key], 2)
+            for key, value in row.items()
+            if (key.endswith("_per_s") or key.endswith("_rss_mb")) and before.get(key)
+        }
+        print(json.dumps({"shape": row["shape"], "rows": row["rows"], "new/old": ratios}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=SHAPES)
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--columns", type=int, default=None, help="total de colunas (padrão: as do formato)")
+    parser.add_argument("--text-words", type=int, default=None, help="palavras por campo de texto livre")
+    parser.add_argument("--embedder", default="hashing", help="RAG_EMBEDDER dos subprocessos")
+    parser.add_argument("--store", choices=STORES, default="qdrant")
+    parser.add_argument("--batch-size", type=int, default=256, help="chunks por lote de embeddings/upsert")
+    parser.add_argument("--sample-chunks", type=int, default=50000, help="chunks medidos nos estágios de embeddings e upsert")
+    parser.add_argument("--no-lexical", action="store_true", help="ponta a ponta sem o índice léxico")
+    parser.add_argument("--skip-e2e", action="store_true")
+    parser.add_argument("--data-dir", default=None, help="reaproveita os CSVs gerados nesta pasta")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--csv", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_ingest_data_")
+    results: List[Dict[str, Any]] = []
+    try:
+        for shape in args.shapes:
+            for rows in args.rows:
+                csv_path = os.path.join(
+                    data_dir, f"{shape}_{rows}_c{args.columns or 'def'}_w{args.text_words}_s{args.seed}.csv"
+                )
+                if not os.path.exists(csv_path):
+                    write_csv(csv_path, shape, rows, args.columns, args.text_words, args.seed)
+                row: Dict[str, Any] = {"shape": shape, "rows": rows, "csv_mb": round(os.path.getsize(csv_path) / 2**20, 1)}
+                row.update(spawn("stages", csv_path, args))
+                if not args.skip_e2e:
+                    row.update(spawn("e2e", csv_path, args))
+                results.append(row)
+                print(json.dumps(row))
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.compare:
+        compare(results, args.compare)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(worker_env(args, "")), "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
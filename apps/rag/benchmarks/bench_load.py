@@ -0,0 +1,396 @@
+"""
+Teste de carga HTTP dos serviços RAG (`/rag/similar`) e AI (`/ai/generate/`).
+
+Uso:
+    python benchmarks/bench_load.py rag --url http://localhost:8080 --concurrency 1 2 4 8 16
+    python benchmarks/bench_load.py rag --mode open --rate 5 10 20 40 --duration 30 --slo-ms 500
+    python benchmarks/bench_load.py rag --spawn --stub-embedder --concurrency 1 4 16 --out carga_rag.json
+    python benchmarks/bench_load.py ai --spawn --stub-llm --llm-token-ms 20 --tool-call-rate 0.5 --concurrency 1 2 4
+
+Modos:
+- `closed` (padrão): `--concurrency` clientes, cada um envia a próxima
+  requisição quando a anterior termina; um passo por nível de concorrência;
+- `open`: chegadas a `--rate` requisições/s (Poisson ou uniformes), sem
+  esperar as respostas; a latência conta a partir do horário previsto de
+  envio, então a fila do lado do cliente aparece na medida. Acima de
+  `--max-in-flight` requisições pendentes, as chegadas são descartadas e
+  contadas como erro `dropped`.
+
+As perguntas vêm de `--mix`, um JSON (lista) ou JSONL de itens
+`{"text": "...", "weight": 2, "body": {...}}` (`body` substitui o corpo
+padrão do serviço); sem `--mix`, as perguntas de `retrieval_queries.json`
+com peso igual. Cada passo tem `--warmup` s de aquecimento fora da medida
+e reporta vazão (respostas OK/s), taxa e tipos de erro (HTTP, timeout,
+conexão), percentis e histograma de latência. O ponto de saturação é o
+último passo saudável: erro até `--max-error-rate`, p99 até `--slo-ms` e,
+no modo aberto, vazão de pelo menos 95% da taxa oferecida (no fechado,
+pelo menos 5% a mais que o passo anterior).
+
+Com `--spawn` o serviço sobe localmente numa porta livre: o RAG a partir de
+um snapshot temporário (sem tocar no índice de `src/db`; `--stub-embedder`
+usa RAG_EMBEDDER=hashing e RAG_RERANKER=overlap, sem pesos) e o AI com
+`--ai-python`, apontando para o `stub_ollama.py` com `--stub-llm` e, se
+`--tool-call-rate` > 0, para um RAG também local.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_ingest import environment  # noqa: E402
+from bench_startup import SERVICES, _free_port  # noqa: E402
+
+ENDPOINTS = {"rag": "/rag/similar", "ai": "/ai/generate/"}
+DEFAULT_URLS = {"rag": "http://localhost:8080", "ai": "http://localhost:8000"}
+# Limites superiores (ms) dos baldes do histograma; o último balde é "acima"
+HISTOGRAM_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+# ---------------------------
+# Mistura de perguntas
+# ---------------------------
+def load_mix(path: Optional[str], service: str, k: int) -> Tuple[List[Dict[str, Any]], List[float]]:
+    """Corpos das requisições e seus pesos."""
+    if path is None:
+        with open(os.path.join(BENCH_DIR, "retrieval_queries.json"), encoding="utf-8") as f:
+            items = [{"text": q["query"]} for q in json.load(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        items = json.loads(raw) if raw.lstrip().startswith("[") else [
+            json.loads(line) for line in raw.splitlines() if line.strip()
+        ]
+    bodies, weights = [], []
+    for item in items:
+        if "body" in item:
+            body = item["body"]
+        elif service == "rag":
+            body = {"text": item["text"], "k": k}
+        else:
+            body = {"message": item["text"]}
+        bodies.append(body)
+        weights.append(float(item.get("weight", 1.0)))
+    return bodies, weights
+
+
+# ---------------------------
+# Geração de carga
+# ---------------------------
+class Recorder:
+    """Resultados de um passo: (início, fim, tipo de erro ou None)."""
+
+    def __init__(self) -> None:
+        self.samples: List[Tuple[float, float, Optional[str]]] = []
+
+    def add(self, start: float, end: float, error: Optional[str]) -> None:
+        self.samples.append((start, end, error))
+
+
+async def send(client: httpx.AsyncClient, url: str, body: Dict[str, Any]) -> Optional[str]:
+    """Envia uma requisição; devolve o tipo de erro ou None."""
+    try:
+        response = await client.post(url, json=body)
+        await response.aread()
+    except httpx.TimeoutException:
+        return "timeout"
+    except httpx.TransportError:
+        return "connect"
+    return None if response.status_code < 400 else f"http_{response.status_code}"
+
+
+async def closed_loop(url: str, mix: Tuple[List[Dict[str, Any]], List[float]], concurrency: int,
+                      args: argparse.Namespace, rng: random.Random) -> Tuple[Recorder, float, float]:
+    recorder = Recorder()
+    bodies, weights = mix
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        warm, deadline = t0 + args.warmup, t0 + args.warmup + args.duration
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                body = rng.choices(bodies, weights)[0]
+                start = time.perf_counter()
+                error = await send(client, url, body)
+                if start >= warm:
+                    recorder.add(start, time.perf_counter(), error)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return recorder, warm, deadline
+
+
+async def open_loop(url: str, mix: Tuple[List[Dict[str, Any]], List[float]], rate: float,
+                    args: argparse.Namespace, rng: random.Random) -> Tuple[Recorder, float, float]:
+    recorder = Recorder()
+    bodies, weights = mix
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        t0 = time.perf_counter()
+        warm, deadline = t0 + args.warmup, t0 + args.warmup + args.duration
+        pending: set = set()
+
+        async def one(intended: float, body: Dict[str, Any]) -> None:
+            error = await send(client, url, body)
+            if intended >= warm:
+                recorder.add(intended, time.perf_counter(), error)
+
+        intended = t0
+        while True:
+            intended += rng.expovariate(rate) if args.arrival == "poisson" else 1.0 / rate
+            if intended >= deadline:
+                break
+            await asyncio.sleep(max(intended - time.perf_counter(), 0.0))
+            if len(pending) >= args.max_in_flight:
+                if intended >= warm:
+                    recorder.add(intended, intended, "dropped")
+                continue
+            task = asyncio.ensure_future(one(intended, rng.choices(bodies, weights)[0]))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+    return recorder, warm, deadline
+
+
+def histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    counts = np.histogram(latencies_ms, bins=[0.0] + HISTOGRAM_MS + [float("inf")])[0]
+    labels = [f"<={b}" for b in HISTOGRAM_MS] + [f">{HISTOGRAM_MS[-1]}"]
+    return {label: int(c) for label, c in zip(labels, counts)}
+
+
+def summarize(recorder: Recorder, warm: float, deadline: float) -> Dict[str, Any]:
+    ok = [(s, e) for s, e, err in recorder.samples if err is None]
+    # Até a última resposta: as enviadas no fim da janela também contam, no tempo que levaram
+    window = max([deadline] + [e for _s, e in ok]) - warm
+    errors = Counter(err for _s, _e, err in recorder.samples if err is not None)
+    latencies = [(e - s) * 1000.0 for s, e in ok]
+    total = len(recorder.samples)
+    row: Dict[str, Any] = {
+        "requests": total,
+        "throughput_rps": round(len(ok) / window, 2),
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "errors": dict(errors),
+    }
+    if latencies:
+        p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        row["latency_ms"] = {
+            "p50": round(float(p50), 1), "p90": round(float(p90), 1), "p95": round(float(p95), 1),
+            "p99": round(float(p99), 1), "max": round(max(latencies), 1), "mean": round(float(np.mean(latencies)), 1),
+        }
+        row["histogram_ms"] = histogram(latencies)
+    return row
+
+
+def saturation(rows: List[Dict[str, Any]], args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """Marca os passos saturados e devolve o último passo saudável antes do primeiro saturado."""
+    last_healthy: Optional[Dict[str, Any]] = None
+    saturated = False
+    for i, row in enumerate(rows):
+        p99 = row.get("latency_ms", {}).get("p99")
+        healthy = row["error_rate"] <= args.max_error_rate and p99 is not None
+        if healthy and args.slo_ms is not None:
+            healthy = p99 <= args.slo_ms
+        if args.mode == "open":
+            healthy = healthy and row["throughput_rps"] >= 0.95 * row["offered_rps"]
+        elif i > 0:
+            # Mais clientes sem ganho de vazão: as requisições só esperam na fila do serviço
+            healthy = healthy and row["throughput_rps"] >= 1.05 * rows[i - 1]["throughput_rps"]
+        row["saturated"] = not healthy
+        saturated = saturated or not healthy
+        if not saturated:
+            last_healthy = row
+    if last_healthy is None:
+        return None
+    level = "offered_rps" if args.mode == "open" else "concurrency"
+    return {level: last_healthy[level], "throughput_rps": last_healthy["throughput_rps"],
+            "p99_ms": last_healthy["latency_ms"]["p99"]}
+
+
+# ---------------------------
+# Serviços locais (--spawn)
+# ---------------------------
+def build_snapshot(path: str) -> None:
+    """Ingere os arquivos de src/archives num store temporário e exporta o snapshot."""
+    sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+    from index_versions import rebuild_index
+    from snapshot import export_snapshot
+    from vector_store import NumpyVectorStore
+
+    store = NumpyVectorStore(os.path.join(os.path.dirname(path), "store"))
+    _, client = rebuild_index(client=store, progress=None)
+    export_snapshot(path, client=client)
+
+
+def _start(stack: contextlib.ExitStack, cmd: List[str], cwd: str, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    stack.callback(os.close, log)
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def stop() -> None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    stack.callback(stop)
+    return proc
+
+
+def _wait_ready(proc: subprocess.Popen, method: str, url: str, body: Optional[Dict[str, Any]],
+                timeout_s: float, log_path: str) -> None:
+    t0 = time.perf_counter()
+    with httpx.Client(timeout=5.0) as client:
+        while time.perf_counter() - t0 < timeout_s:
+            if proc.poll() is not None:
+                with open(log_path, encoding="utf-8") as f:
+                    tail = f.read()[-2000:]
+                raise RuntimeError(f"{url}: process exited with code {proc.returncode}\n{tail}")
+            try:
+                if client.request(method, url, json=body).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout_s}s (log: {log_path})")
+
+
+def spawn_rag(stack: contextlib.ExitStack, workdir: str, args: argparse.Namespace) -> str:
+    env = dict(os.environ)
+    if args.stub_embedder:
+        env.update({"RAG_EMBEDDER": "hashing", "RAG_RERANKER": "overlap"})
+    snapshot = os.path.join(workdir, "index.ragsnap")
+    print("[PROC] Construindo o snapshot do índice...")
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--build-snapshot", snapshot], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    port = _free_port()
+    env.update({"RAG_PORT": str(port), "RAG_SNAPSHOT": snapshot, "RAG_WATCH_ARCHIVES": "0"})
+    log_path = os.path.join(workdir, "rag.log")
+    proc = _start(stack, [sys.executable, "main.py"], SERVICES["rag"]["dir"], env, log_path)
+    url = f"http://127.0.0.1:{port}"
+    _wait_ready(proc, "POST", url + ENDPOINTS["rag"], {"text": "smartphone", "k": 1}, args.spawn_timeout, log_path)
+    print(f"[OK] RAG em {url}")
+    return url
+
+
+def spawn_ai(stack: contextlib.ExitStack, workdir: str, args: argparse.Namespace) -> str:
+    env = dict(os.environ)
+    if args.stub_llm:
+        port = _free_port()
+        cmd = [
+            sys.executable, os.path.join(BENCH_DIR, "stub_ollama.py"), "--port", str(port),
+            "--first-token-ms", str(args.llm_first_token_ms), "--token-ms", str(args.llm_token_ms),
+            "--tokens", str(args.llm_tokens), "--parallel", str(args.llm_parallel),
+            "--tool-call-rate", str(args.tool_call_rate), "--seed", str(args.seed),
+        ]
+        log_path = os.path.join(workdir, "ollama.log")
+        proc = _start(stack, cmd, BENCH_DIR, env, log_path)
+        env["OLLAMA_HOST"] = f"http://127.0.0.1:{port}"
+        _wait_ready(proc, "GET", env["OLLAMA_HOST"] + "/api/version", None, args.spawn_timeout, log_path)
+        print(f"[OK] Ollama simulado em {env['OLLAMA_HOST']}")
+    if args.rag_url:
+        env["RAG_SERVICE_URL"] = args.rag_url
+    elif args.tool_call_rate > 0:
+        env["RAG_SERVICE_URL"] = spawn_rag(stack, workdir, args)
+    port = _free_port()
+    env["AI_PORT"] = str(port)
+    log_path = os.path.join(workdir, "ai.log")
+    proc = _start(stack, [args.ai_python, "main.py"], SERVICES["ai"]["dir"], env, log_path)
+    url = f"http://127.0.0.1:{port}"
+    _wait_ready(proc, "GET", url + SERVICES["ai"]["health"], None, args.spawn_timeout, log_path)
+    print(f"[OK] AI em {url}")
+    return url
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", nargs="?", choices=sorted(ENDPOINTS))
+    parser.add_argument("--url", default=None, help="URL base do serviço (padrão: localhost na porta do serviço)")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8, 16], help="modo fechado")
+    parser.add_argument("--rate", nargs="+", type=float, default=[1, 2, 5, 10, 20], help="modo aberto, req/s")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos por passo")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout de cada requisição (s)")
+    parser.add_argument("--mix", default=None, help="JSON/JSONL de perguntas com pesos")
+    parser.add_argument("--k", type=int, default=5, help="k das buscas no RAG")
+    parser.add_argument("--slo-ms", type=float, default=None, help="p99 máximo de um passo saudável")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    spawn = parser.add_argument_group("serviços locais")
+    spawn.add_argument("--spawn", action="store_true", help="sobe o serviço localmente")
+    spawn.add_argument("--stub-embedder", action="store_true", help="RAG com embedder por hashing, sem pesos")
+    spawn.add_argument("--stub-llm", action="store_true", help="AI com o stub_ollama.py")
+    spawn.add_argument("--llm-first-token-ms", type=float, default=200.0)
+    spawn.add_argument("--llm-token-ms", type=float, default=20.0)
+    spawn.add_argument("--llm-tokens", type=int, default=50)
+    spawn.add_argument("--llm-parallel", type=int, default=1)
+    spawn.add_argument("--tool-call-rate", type=float, default=0.0)
+    spawn.add_argument("--rag-url", default=None, help="RAG usado pelo AI local (padrão: sobe um RAG local)")
+    spawn.add_argument("--ai-python", default=sys.executable, help="interpretador com as dependências do AI")
+    spawn.add_argument("--spawn-timeout", type=float, default=300.0)
+    parser.add_argument("--build-snapshot", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build_snapshot:
+        build_snapshot(args.build_snapshot)
+        return
+    if args.service is None:
+        parser.error("service is required")
+
+    rng = random.Random(args.seed)
+    mix = load_mix(args.mix, args.service, args.k)
+    levels = args.concurrency if args.mode == "closed" else args.rate
+    rows: List[Dict[str, Any]] = []
+    workdir = tempfile.mkdtemp(prefix="bench_load_")
+    try:
+        with contextlib.ExitStack() as stack:
+            base = args.url or DEFAULT_URLS[args.service]
+            if args.spawn:
+                base = spawn_rag(stack, workdir, args) if args.service == "rag" else spawn_ai(stack, workdir, args)
+            url = base.rstrip("/") + ENDPOINTS[args.service]
+            for level in levels:
+                if args.mode == "closed":
+                    recorder, warm, deadline = asyncio.run(closed_loop(url, mix, int(level), args, rng))
+                    row: Dict[str, Any] = {"concurrency": int(level)}
+                else:
+                    recorder, warm, deadline = asyncio.run(open_loop(url, mix, float(level), args, rng))
+                    row = {"offered_rps": float(level)}
+                row.update(summarize(recorder, warm, deadline))
+                rows.append(row)
+                print(json.dumps({k: v for k, v in row.items() if k != "histogram_ms"}))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    point = saturation(rows, args)
+    print(json.dumps({"saturation": point}))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(dict(os.environ)), "args": vars(args),
+                       "service": args.service, "mode": args.mode, "saturation": point, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
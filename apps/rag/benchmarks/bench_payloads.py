@@ -0,0 +1,115 @@
+"""
+Benchmark dos payloads completos × compactos (dicionário por versão do índice).
+
+Uso:
+    python benchmarks/bench_payloads.py --rows 5000 --limit 500
+    python benchmarks/bench_payloads.py --csv src/archives/payroll.csv --out bench.json
+
+Monta os chunks de uma tabela (sintética ou `--csv`) com vetores aleatórios,
+grava duas coleções no Qdrant local (uma com cada esquema de payload) e mede
+bytes de payload por ponto (JSON), bytes de payload por resposta, o tempo de
+decodificação da resposta (JSON dos payloads, como num cliente HTTP do Qdrant
+server, mais o dicionário no modo compacto) e a latência da busca local.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from qdrant_client import QdrantClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from csv_chunk_processor import CSVChunkProcessor  # noqa: E402
+from payload_codec import PayloadDictionary, decode_hits  # noqa: E402
+from vector_store import QdrantVectorStore, ScoredHit  # noqa: E402
+
+
+def synthetic_table(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(1, rows + 1),
+        "name": [f"Pessoa {i}" for i in range(rows)],
+        "department": rng.choice(["vendas", "rh", "ti", "financeiro"], rows),
+        "competency": rng.choice([f"2025-{m:02d}" for m in range(1, 13)], rows),
+        "gross_salary": np.round(rng.uniform(2000, 20000, rows), 2),
+        "net_salary": np.round(rng.uniform(1500, 15000, rows), 2),
+        "bonus": np.round(rng.uniform(0, 3000, rows), 2),
+    })
+
+
+def bench_schema(compact: bool, chunks: List[Dict[str, Any]], vectors: np.ndarray,
+                 queries: np.ndarray, args: argparse.Namespace) -> Dict[str, Any]:
+    dictionary = PayloadDictionary() if compact else None
+    payloads = [dictionary.encode(c["metadata"]) if dictionary else c["metadata"] for c in chunks]
+    path = tempfile.mkdtemp(prefix="bench_payloads_")
+    try:
+        store = QdrantVectorStore(QdrantClient(path=path))
+        store.ensure_collection("bench", vectors.shape[1])
+        for start in range(0, len(chunks), 1024):
+            end = start + 1024
+            store.upsert("bench", [c["id"] for c in chunks[start:end]], vectors[start:end], payloads[start:end])
+
+        store.query_batch("bench", queries[:1], limit=args.limit)
+        latencies, decode_ms, response_bytes = [], [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            hits = store.query_batch("bench", q[None, :], limit=args.limit)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            body = json.dumps([h.payload for h in hits[0]], ensure_ascii=False)
+            response_bytes.append(len(body.encode("utf-8")))
+            t0 = time.perf_counter()
+            received = [[ScoredHit(h.id, h.score, p) for h, p in zip(hits[0], json.loads(body))]]
+            decode_hits(dictionary, received)
+            decode_ms.append((time.perf_counter() - t0) * 1000.0)
+        store.client.close()
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    sizes = [len(json.dumps(p, ensure_ascii=False).encode("utf-8")) for p in payloads]
+    return {
+        "schema": "compact" if compact else "full",
+        "points": len(chunks),
+        "payload_bytes_per_point": round(float(np.mean(sizes)), 1),
+        "response_payload_kb": round(float(np.mean(response_bytes)) / 1024, 1),
+        "decode_p50_ms": round(float(np.percentile(decode_ms, 50)), 3),
+        "search_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=None, help="tabela de origem (padrão: sintética)")
+    parser.add_argument("--rows", type=int, default=5000, help="linhas da tabela sintética")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=500, help="pontos retornados por busca (prefetch)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else synthetic_table(args.rows)
+    name = os.path.basename(args.csv) if args.csv else "payroll.csv"
+    # build_chunks não usa o modelo de embeddings
+    processor = CSVChunkProcessor.__new__(CSVChunkProcessor)
+    chunks = processor.build_chunks(df, name)
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((len(chunks), args.dim)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    results = [bench_schema(compact, chunks, vectors, queries, args) for compact in (False, True)]
+    for row in results:
+        print(json.dumps(row))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Recall@k × dimensão dos embeddings reduzidos (PCA e projeção aleatória).
+
+Uso:
+    python benchmarks/bench_projection.py
+    python benchmarks/bench_projection.py --dims 32 64 128 --k 5 10 --dtypes float32 float16 --out recall.json
+
+Embeda uma vez os chunks dos CSVs de `src/archives` (ou `--csv-dir`) e as
+perguntas dos testes, e para cada tipo de projeção, dimensão e dtype
+compara o top-k da busca reduzida com o top-k da busca com o vetor completo
+(recall@k = fração do top-k completo recuperada). Também informa os bytes
+por vetor, para escolher o equilíbrio memória × qualidade. A PCA é ajustada
+numa amostra dos chunks, como na ingestão (RAG_PROJECTION_SAMPLE).
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from csv_chunk_processor import ARCHIVES_DIR, CSVChunkProcessor  # noqa: E402
+from index_versions import sample_chunk_texts  # noqa: E402
+from projection import Projection  # noqa: E402
+from table_reader import is_table_file, read_table  # noqa: E402
+from vector_store import l2_normalize  # noqa: E402
+
+# Perguntas de tests/conftest.py (sample_questions) e das buscas de tests/test_rag_pytest.py
+QUESTIONS = [
+    "Qual é o produto mais caro?",
+    "Quais são os artigos sobre tecnologia?",
+    "Existe algum documento sobre sustentabilidade?",
+    "Quais produtos têm desconto?",
+    "Há artigos sobre inovação?",
+    "Qual o preço do smartphone?",
+    "Quais são os títulos dos artigos?",
+    "Existe algum relatório sobre IA?",
+    "Quais produtos estão em promoção?",
+    "Há documentos sobre blockchain?",
+    "smartphone",
+    "inteligência artificial",
+    "relatório",
+    "celular",
+    "telefone móvel",
+    "dispositivo móvel",
+    "bônus do Bruno Lima no dia 2025-06-28",
+]
+
+
+def top_k(matrix: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = l2_normalize(queries) @ l2_normalize(matrix).T
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+def recall(reference: np.ndarray, found: np.ndarray) -> float:
+    return float(np.mean([len(set(r) & set(f)) / len(r) for r, f in zip(reference, found)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv-dir", default=ARCHIVES_DIR)
+    parser.add_argument("--dims", type=int, nargs="+", default=[16, 32, 64, 96, 128, 192, 256])
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 50])
+    parser.add_argument("--kinds", nargs="+", default=["pca", "random"])
+    parser.add_argument("--dtypes", nargs="+", default=["float32", "float16"])
+    parser.add_argument("--sample", type=int, default=int(os.getenv("RAG_PROJECTION_SAMPLE", "4096")))
+    parser.add_argument("--questions", default=None, help="arquivo com uma pergunta por linha")
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    processor = CSVChunkProcessor()
+    paths = sorted(os.path.join(args.csv_dir, f) for f in os.listdir(args.csv_dir) if is_table_file(f))
+    texts: List[str] = []
+    for path in paths:
+        texts.extend(c["text"] for c in processor.build_chunks(read_table(path), os.path.basename(path)))
+    embeddings = np.asarray(processor.embedder.encode(texts, show_progress_bar=False), dtype=np.float32)
+    queries = np.asarray(processor.embedder.encode(questions, show_progress_bar=False), dtype=np.float32)
+    sample = np.asarray(
+        processor.embedder.encode(sample_chunk_texts(paths, processor, args.sample), show_progress_bar=False)
+    )
+    full_dim = embeddings.shape[1]
+    ks = [k for k in args.k if k <= len(texts)]
+    reference = {k: top_k(embeddings, queries, k) for k in ks}
+    print(json.dumps({"chunks": len(texts), "questions": len(questions), "full_dim": full_dim}))
+
+    results: List[Dict[str, object]] = []
+    for kind in args.kinds:
+        for dim in args.dims:
+            if dim >= full_dim:
+                continue
+            for dtype in args.dtypes:
+                if kind == "pca":
+                    projection = Projection.fit_pca(sample, dim, dtype=dtype)
+                else:
+                    projection = Projection.random(full_dim, dim, dtype=dtype)
+                stored = projection.apply(embeddings).astype(dtype).astype(np.float32)
+                projected_queries = projection.apply(queries)
+                row: Dict[str, object] = {
+                    "kind": kind,
+                    "dim": projection.dim,
+                    "dtype": dtype,
+                    "bytes_per_vector": projection.dim * np.dtype(dtype).itemsize,
+                    "memory_ratio": round(projection.dim * np.dtype(dtype).itemsize / (full_dim * 4), 3),
+                }
+                for k in ks:
+                    row[f"recall@{k}"] = round(recall(reference[k], top_k(stored, projected_queries, k)), 3)
+                results.append(row)
+                print(json.dumps(row))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "full_dim": full_dim, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Qualidade × latência da busca (find_top_k_semantic e find_top_k_rows).
+
+Uso:
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --profiles fast balanced --rerank on off --prefetch 10 50
+    python benchmarks/bench_retrieval.py --quantization none float16 pca:128 pca:128:float16 --out retrieval.json
+
+Roda as perguntas rotuladas de `retrieval_queries.json` (as de
+tests/conftest.py e tests/test_rag_pytest.py, mais buscas exatas na folha,
+sem as que não têm resposta nos dados, como descontos e promoções) contra
+os CSVs de `src/archives`, para cada combinação de:
+
+- `--quantization`: como os vetores são guardados, um índice por opção:
+  `none` (float32), `float16`, `pca:DIM[:float16]` e `random:DIM[:float16]`
+  (ver RAG_PROJECTION);
+- `--profiles`: perfil de busca (prefetch, HNSW, re-ranking, léxico);
+- `--rerank`: `on` (re-ranqueia todos os candidatos) ou `off`;
+- `--prefetch`: candidatos buscados (padrão: o do perfil).
+
+Para cada função reporta recall@k (fração das linhas relevantes, até k,
+cobertas pelo top-k; um chunk cobre a linha da célula ou as linhas da
+janela), MRR e a latência p50/p95/p99 de cada estágio do SearchTrace
+(embed, search, rerank, lexical, rows, format) e do total. Usa o embedder e
+o reranker do ambiente (RAG_EMBEDDER / RAG_RERANKER).
+"""
+
+import argparse
+import dataclasses
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_ingest import environment  # noqa: E402
+from csv_chunk_processor import (  # noqa: E402
+    ARCHIVES_DIR,
+    CSVChunkProcessor,
+    find_top_k_rows,
+    find_top_k_semantic,
+    process_csvs_as_chunks,
+    register_table,
+)
+from index_versions import sample_chunk_texts  # noqa: E402
+from projection import Projection, set_projection  # noqa: E402
+from search_profiles import PROFILES, SearchTrace  # noqa: E402
+from table_reader import is_table_file, read_table  # noqa: E402
+from vector_store import NumpyVectorStore, VectorStore, as_vector_store  # noqa: E402
+
+QUERIES_FILE = os.path.join(BENCH_DIR, "retrieval_queries.json")
+RowKey = Tuple[str, int]
+
+
+# ---------------------------
+# Rótulos e métricas
+# ---------------------------
+def load_queries(path: str, csv_dir: str) -> List[Tuple[str, Set[RowKey]]]:
+    """(pergunta, linhas relevantes) com os rótulos resolvidos para índices de linha."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    tables: Dict[str, Any] = {}
+    queries: List[Tuple[str, Set[RowKey]]] = []
+    for item in raw:
+        relevant: Set[RowKey] = set()
+        for label in item["relevant"]:
+            file = label["file"]
+            if file not in tables:
+                tables[file] = read_table(os.path.join(csv_dir, file))
+            df = tables[file]
+            mask = np.ones(len(df), dtype=bool)
+            for column, value in label.get("where", {}).items():
+                values = value if isinstance(value, list) else [value]
+                mask &= df[column].astype(str).isin([str(v) for v in values]).to_numpy()
+            relevant.update((file, int(i)) for i in np.flatnonzero(mask))
+        if not relevant:
+            raise ValueError(f"No rows match the labels of '{item['query']}'")
+        queries.append((item["query"], relevant))
+    return queries
+
+
+def chunk_rows(result: Dict[str, Any]) -> Set[RowKey]:
+    """Linhas cobertas por um resultado de find_top_k_semantic."""
+    payload = result.get("snippet") or {}
+    file = payload.get("csv_file")
+    if payload.get("chunk_type") == "cell":
+        return {(file, int(payload.get("row_index", -1)))}
+    if payload.get("chunk_type") == "row_window":
+        return {(file, r) for r in range(int(payload.get("row_start", 0)), int(payload.get("row_end", -1)) + 1)}
+    return set()
+
+
+def score(ranked: List[Set[RowKey]], relevant: Set[RowKey], ks: Iterable[int]) -> Dict[str, float]:
+    """recall@k e MRR de uma lista de resultados (cada um cobre um conjunto de linhas)."""
+    metrics: Dict[str, float] = {}
+    for k in ks:
+        covered = set().union(*ranked[:k]) & relevant
+        metrics[f"recall@{k}"] = len(covered) / min(len(relevant), k)
+    first = next((rank for rank, rows in enumerate(ranked, start=1) if rows & relevant), None)
+    metrics["mrr"] = 1.0 / first if first else 0.0
+    return metrics
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3)}
+
+
+# ---------------------------
+# Índices
+# ---------------------------
+def parse_quantization(spec: str, input_dim: int, processor: CSVChunkProcessor,
+                       csv_paths: List[str]) -> Optional[Projection]:
+    """Projeção que guarda os vetores como ``spec`` pede (None para float32 completo)."""
+    if spec == "none":
+        return None
+    if spec == "float16":
+        # Projeção identidade: só muda o tipo dos vetores guardados
+        return Projection("pca", np.zeros(input_dim), np.eye(input_dim), dtype="float16")
+    parts = spec.split(":")
+    if len(parts) not in (2, 3) or parts[0] not in ("pca", "random"):
+        raise ValueError(f"Invalid quantization '{spec}', expected none, float16, pca:DIM[:float16] or random:DIM[:float16]")
+    dim, dtype = int(parts[1]), parts[2] if len(parts) == 3 else "float32"
+    if parts[0] == "random":
+        return Projection.random(input_dim, dim, dtype=dtype)
+    texts = sample_chunk_texts(csv_paths, processor, int(os.getenv("RAG_PROJECTION_SAMPLE", "4096")))
+    return Projection.fit_pca(processor.embedder.encode(texts, show_progress_bar=False), dim, dtype=dtype)
+
+
+def build_index(store: VectorStore, name: str, projection: Optional[Projection],
+                processor: CSVChunkProcessor, csv_paths: List[str]) -> None:
+    set_projection(store, name, projection)
+    results, _ = process_csvs_as_chunks(
+        csv_paths=csv_paths, collection_name=name, client=store, progress=None, processor=processor,
+    )
+    failed = [r for r in results if "error" in r]
+    if failed:
+        raise RuntimeError("; ".join(f"{r['csv_path']}: {r['error']}" for r in failed))
+
+
+def open_store(kind: str, path: str) -> VectorStore:
+    if kind == "numpy":
+        return NumpyVectorStore(path)
+    from qdrant_client import QdrantClient
+
+    return as_vector_store(QdrantClient(":memory:"))
+
+
+# ---------------------------
+# Execução
+# ---------------------------
+def run_config(
+    store: VectorStore,
+    collection: str,
+    quantization: str,
+    processor: CSVChunkProcessor,
+    queries: List[Tuple[str, Set[RowKey]]],
+    profile_name: str,
+    rerank: str,
+    prefetch: Optional[int],
+    args: argparse.Namespace,
+) -> List[Dict[str, Any]]:
+    profile = PROFILES[profile_name]
+    # "on" re-ranqueia todos os candidatos buscados, "off" nenhum
+    profile = dataclasses.replace(profile, rerank_depth=1 << 30 if rerank == "on" else 0)
+    k = max(args.k)
+    functions = {
+        "semantic": (find_top_k_semantic, lambda results: [chunk_rows(r) for r in results]),
+        "rows": (find_top_k_rows, lambda results: [{(r["file"], r["row_index"])} for r in results]),
+    }
+    out: List[Dict[str, Any]] = []
+    for function, (search, to_rows) in functions.items():
+        quality: List[Dict[str, float]] = []
+        timings: Dict[str, List[float]] = {}
+        exact = 0
+        for repeat in range(args.repeat + 1):
+            for text, relevant in queries:
+                trace = SearchTrace(profile)
+                t0 = time.perf_counter()
+                results = search(text=text, client=store, k=k, collection_name=collection,
+                                 prefetch=prefetch, processor=processor, trace=trace)
+                total_ms = (time.perf_counter() - t0) * 1000.0
+                if repeat == 0:
+                    # Primeira passada: aquecimento e qualidade (a busca é determinística)
+                    quality.append(score(to_rows(results), relevant, args.k))
+                    exact += trace.lexical == "exact"
+                    continue
+                for stage, ms in dict(trace.timings, total=total_ms).items():
+                    timings.setdefault(stage, []).append(ms)
+        row: Dict[str, Any] = {
+            "function": function,
+            "quantization": quantization,
+            "profile": profile_name,
+            "rerank": rerank,
+            "prefetch": prefetch if prefetch is not None else "profile",
+        }
+        for metric in quality[0]:
+            row[metric] = round(float(np.mean([q[metric] for q in quality])), 3)
+        row["lexical_exact_share"] = round(exact / len(queries), 3)
+        if timings:
+            row["latency_ms"] = {stage: percentiles(samples) for stage, samples in timings.items()}
+        out.append(row)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=QUERIES_FILE, help="JSON de perguntas rotuladas")
+    parser.add_argument("--csv-dir", default=ARCHIVES_DIR)
+    parser.add_argument("--quantization", nargs="+", default=["none", "float16"])
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--rerank", nargs="+", default=["on", "off"], choices=["on", "off"])
+    parser.add_argument("--prefetch", nargs="+", type=int, default=None, help="padrão: o prefetch do perfil")
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 5, 10])
+    parser.add_argument("--repeat", type=int, default=5, help="passadas medidas, após uma de aquecimento")
+    parser.add_argument("--store", choices=["qdrant", "numpy"], default="qdrant")
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries, args.csv_dir)
+    csv_paths = sorted(os.path.join(args.csv_dir, f) for f in os.listdir(args.csv_dir) if is_table_file(f))
+    for path in csv_paths:
+        # As linhas são formatadas a partir destas tabelas, não da pasta padrão
+        register_table(os.path.basename(path), read_table(path))
+    processor = CSVChunkProcessor()
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    store = open_store(args.store, workdir)
+
+    results: List[Dict[str, Any]] = []
+    prefetches: List[Optional[int]] = list(args.prefetch) if args.prefetch else [None]
+    try:
+        for spec in args.quantization:
+            collection = "bench_retrieval_" + spec.replace(":", "_")
+            projection = parse_quantization(spec, int(processor.embedding_dim), processor, csv_paths)
+            build_index(store, collection, projection, processor, csv_paths)
+            for profile, rerank, prefetch in itertools.product(args.profiles, args.rerank, prefetches):
+                for row in run_config(store, collection, spec, processor, queries, profile, rerank, prefetch, args):
+                    results.append(row)
+                    summary = {k: v for k, v in row.items() if k != "latency_ms"}
+                    summary["total_p50_ms"] = row.get("latency_ms", {}).get("total", {}).get("p50")
+                    print(json.dumps(summary, ensure_ascii=False))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(dict(os.environ)), "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark de inicialização dos serviços RAG e AI (tempo de import e de /health).
+
+Uso:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --services rag ai --runs 5 --serve --out startup.json
+    python benchmarks/bench_startup.py --max-import-s 1.5   # falha (exit 1) acima do limite
+
+Para cada serviço mede, em interpretadores novos, o tempo de `import main`
+(p50 e mínimo de `--runs` execuções) e lista os módulos pesados que o import
+carregou (torch, sentence_transformers, langgraph...). Com `--serve`, sobe o
+serviço (sem ingestão nem observação da pasta) e mede o tempo até o primeiro
+200 em /health. Serve de guarda contra regressões: sai com código 1 se algum
+módulo pesado for importado no startup ou se o import passar de
+`--max-import-s`. O serviço AI roda com `--ai-python` (padrão: este Python).
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+APPS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "onnxruntime",
+    "qdrant_client",
+    "langgraph",
+    "langchain_ollama",
+    "langchain_community",
+]
+
+SERVICES = {
+    "rag": {"dir": os.path.join(APPS_DIR, "rag"), "port_env": "RAG_PORT", "health": "/rag/health/"},
+    "ai": {"dir": os.path.join(APPS_DIR, "ai"), "port_env": "AI_PORT", "health": "/ai/health/"},
+}
+
+IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, ".")
+t0 = time.perf_counter()
+import main  # noqa: F401
+elapsed = time.perf_counter() - t0
+print(json.dumps({"import_s": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({"RAG_INGEST_ON_STARTUP": "0", "RAG_WATCH_ARCHIVES": "0", "RAG_PRELOAD_MODELS": "0"})
+    return env
+
+
+def measure_import(python: str, service: Dict[str, str]) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [python, "-c", IMPORT_PROBE % (HEAVY_MODULES,)],
+        cwd=service["dir"], env=_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_health(python: str, service: Dict[str, str], timeout_s: float) -> float:
+    """Segundos do início do processo até o primeiro 200 em /health."""
+    port = _free_port()
+    env = _env()
+    env[service["port_env"]] = str(port)
+    url = f"http://127.0.0.1:{port}{service['health']}"
+    # Um único cliente: criar um por tentativa (contexto SSL) distorce a medida
+    client = httpx.Client(timeout=0.5)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [python, "main.py"], cwd=service["dir"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            if proc.poll() is not None:
+                raise RuntimeError(f"main.py exited with code {proc.returncode}")
+            try:
+                if client.get(url).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"{url} not ready after {timeout_s}s")
+    finally:
+        client.close()
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", default=["rag", "ai"], choices=sorted(SERVICES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="mede também o tempo até /health responder")
+    parser.add_argument("--ai-python", default=sys.executable, help="interpretador com as dependências do AI")
+    parser.add_argument("--max-import-s", type=float, default=None, help="limite do p50 do import")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    failed = False
+    for name in args.services:
+        service = SERVICES[name]
+        python = args.ai_python if name == "ai" else sys.executable
+        runs = [measure_import(python, service) for _ in range(args.runs)]
+        times = [r["import_s"] for r in runs]
+        heavy = sorted({m for r in runs for m in r["heavy"]})
+        row: Dict[str, Any] = {
+            "service": name,
+            "import_p50_s": round(float(np.percentile(times, 50)), 3),
+            "import_min_s": round(min(times), 3),
+            "heavy_modules": heavy,
+        }
+        if args.serve:
+            row["health_s"] = round(measure_health(python, service, args.timeout), 3)
+        if heavy or (args.max_import_s is not None and row["import_p50_s"] > args.max_import_s):
+            failed = True
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark do backend NumPy (memmap, força bruta) contra o Qdrant local.
+
+Uso:
+    python benchmarks/bench_vector_store.py --sizes 10000 100000 1000000
+    python benchmarks/bench_vector_store.py --sizes 10000 --backends numpy --out bench.json
+
+Para cada tamanho mede o tempo de carga (em lotes de --batch pontos; o padrão,
+256, é o lote da ingestão), a latência p50/p95/p99 de consultas
+individuais, a vazão de consultas em lote e o recall@k do Qdrant em relação ao
+NumPy (ambos fazem busca exata no modo local, então o esperado é 1.0).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+from vector_store import NumpyVectorStore, QdrantVectorStore, VectorStore  # noqa: E402
+
+COLLECTION = "bench"
+
+
+def _random_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    vecs = rng.standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
+
+
+def _open(backend: str, path: str) -> VectorStore:
+    if backend == "numpy":
+        return NumpyVectorStore(path)
+    return QdrantVectorStore(QdrantClient(path=path))
+
+
+def _load(store: VectorStore, size: int, dim: int, seed: int, batch: int = 256) -> float:
+    rng = np.random.default_rng(seed)
+    store.ensure_collection(COLLECTION, dim)
+    t0 = time.perf_counter()
+    for start in range(0, size, batch):
+        n = min(batch, size - start)
+        ids = list(range(start + 1, start + n + 1))
+        payloads = [{"csv_file": f"file_{i % 8}.csv", "row_index": i} for i in ids]
+        store.upsert(COLLECTION, ids, _random_vectors(rng, n, dim), payloads)
+    return time.perf_counter() - t0
+
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 3) for p in (50, 95, 99)}
+
+
+def bench_backend(
+    backend: str, size: int, dim: int, queries: np.ndarray, k: int, seed: int, batch: int = 256
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix=f"bench-{backend}-") as tmp:
+        store = _open(backend, tmp)
+        load_s = _load(store, size, dim, seed, batch)
+
+        latencies = []
+        results = []
+        for q in queries:
+            t0 = time.perf_counter()
+            hits = store.query_batch(COLLECTION, q[None, :], limit=k)[0]
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+            results.append([h.id for h in hits])
+
+        t0 = time.perf_counter()
+        store.query_batch(COLLECTION, queries, limit=k)
+        batch_s = time.perf_counter() - t0
+
+        return {
+            "backend": backend,
+            "size": size,
+            "load_batch": batch,
+            "load_s": round(load_s, 3),
+            "load_points_per_s": round(size / load_s, 1) if load_s else None,
+            "query_latency_ms": _percentiles(latencies),
+            "batch_qps": round(len(queries) / batch_s, 1) if batch_s else None,
+            "_ids": results,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--backends", nargs="+", default=["numpy", "qdrant"], choices=["numpy", "qdrant"])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=256, help="pontos por upsert na carga (o lote da ingestão)")
+    parser.add_argument("--out", help="grava o resultado em JSON neste arquivo")
+    args = parser.parse_args()
+
+    queries = _random_vectors(np.random.default_rng(args.seed + 1), args.queries, args.dim)
+    report: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        runs = [bench_backend(b, size, args.dim, queries, args.k, args.seed, args.batch) for b in args.backends]
+        if len(runs) == 2:
+            reference, other = runs[0]["_ids"], runs[1]["_ids"]
+            overlap = [len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(reference, other)]
+            runs[1][f"recall@{args.k}_vs_{runs[0]['backend']}"] = round(float(np.mean(overlap)), 4)
+        for run in runs:
+            run.pop("_ids")
+            print(json.dumps(run), flush=True)
+        report.extend(runs)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"dim": args.dim, "k": args.k, "queries": args.queries, "runs": report}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
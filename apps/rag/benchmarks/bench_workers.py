@@ -0,0 +1,146 @@
+"""
+Benchmark de vazão do serviço RAG com 1..N workers do uvicorn.
+
+Uso:
+    python src/snapshot.py export --ingest --out index.ragsnap
+    python benchmarks/bench_workers.py --snapshot index.ragsnap --workers 1 2 4
+    python benchmarks/bench_workers.py --snapshot index.ragsnap --workers 1 4 --profile fast --out bench.json
+
+Para cada quantidade de workers sobe `main.py` com RAG_WORKERS e RAG_SNAPSHOT
+(todos os workers mapeiam o mesmo snapshot em memória), dispara consultas em
+malha fechada (cada cliente envia a próxima assim que recebe a resposta) e
+mede vazão e latência p50/p95/p99. O speedup é relativo a 1 worker.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+
+RAG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+DEFAULT_QUERIES = [
+    "Qual o bônus de Ana Souza?",
+    "Quais produtos custam mais de 100?",
+    "Quem trabalha no departamento de vendas?",
+    "Qual o salário líquido em 2025-06?",
+    "Documentos publicados em 2025",
+]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout_s: float) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"RAG service exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/rag/health/", timeout=1.0, trust_env=False).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("RAG service did not become ready")
+
+
+def _client_loop(url: str, queries: List[str], profile: str, stop: threading.Event,
+                 latencies: List[float], errors: List[int]) -> None:
+    with httpx.Client(timeout=30.0, trust_env=False) as client:
+        i = 0
+        while not stop.is_set():
+            body = {"text": queries[i % len(queries)], "k": 5, "profile": profile}
+            t0 = time.perf_counter()
+            try:
+                r = client.post(f"{url}/rag/similar", json=body)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            else:
+                errors.append(1)
+            i += 1
+
+
+def bench_workers(workers: int, args: argparse.Namespace, queries: List[str]) -> Dict[str, Any]:
+    env = dict(os.environ, RAG_WORKERS=str(workers), RAG_SNAPSHOT=os.path.abspath(args.snapshot),
+               RAG_PORT=str(args.port))
+    proc = subprocess.Popen([sys.executable, "main.py"], cwd=RAG_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_ready(url, proc, args.startup_timeout)
+        # Warm up every worker (model load, page cache) before measuring
+        with httpx.Client(timeout=120.0, trust_env=False) as client:
+            for _ in range(workers * 4):
+                client.post(f"{url}/rag/similar", json={"text": queries[0], "profile": args.profile})
+
+        latencies: List[float] = []
+        errors: List[int] = []
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=_client_loop, args=(url, queries, args.profile, stop, latencies, errors))
+            for _ in range(args.concurrency)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    arr = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "qps": round(len(latencies) / elapsed, 1),
+        **{f"p{p}_ms": round(float(np.percentile(arr, p)), 2) for p in (50, 95, 99)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snapshot", required=True, help="snapshot exportado com src/snapshot.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=None, help="clientes simultâneos (padrão: 4× max workers)")
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos medidos por rodada")
+    parser.add_argument("--profile", default="balanced")
+    parser.add_argument("--queries", default=None, help="arquivo com uma consulta por linha")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--out", default=None, help="grava os resultados em JSON")
+    args = parser.parse_args()
+    if args.concurrency is None:
+        args.concurrency = 4 * max(args.workers)
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    results = []
+    for workers in args.workers:
+        row = bench_workers(workers, args, queries)
+        row["speedup"] = round(row["qps"] / results[0]["qps"], 2) if results and results[0]["qps"] else 1.0
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Servidor que imita a API de chat do Ollama, com latência por token configurável.
+
+Uso:
+    python benchmarks/stub_ollama.py --port 11434
+    python benchmarks/stub_ollama.py --port 11500 --first-token-ms 300 --token-ms 25 --tokens 80 --parallel 2
+    OLLAMA_HOST=http://127.0.0.1:11500 uv run -C apps/ai python main.py
+
+Responde `POST /api/chat` (streaming NDJSON ou JSON único, como o Ollama),
+`GET /api/tags`, `GET /api/version` e `POST /api/show`. A resposta tem o
+formato do qwen3 que o agente espera (`<think>...</think>resposta`), com
+`--think-tokens` + `--tokens` tokens: o primeiro sai após `--first-token-ms`
+(prefill) e os seguintes a cada `--token-ms` (± `--jitter`). Só `--parallel`
+requisições geram ao mesmo tempo, as demais esperam na fila (como
+OLLAMA_NUM_PARALLEL). Com `--tool-call-rate`, essa fração das perguntas do
+usuário recebe uma chamada à ferramenta `search_rag` com a pergunta, e a
+resposta final vem depois da mensagem da ferramenta.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = [
+    "os", "dados", "indicam", "que", "o", "valor", "solicitado", "consta", "na", "base", "consultada", "e",
+    "pode", "ser", "conferido", "na", "fonte", "citada", "conforme", "os", "registros", "disponíveis", "no",
+    "período", "informado",
+]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class StubLLM:
+    """Gera respostas no formato do Ollama com o tempo de prefill e de decodificação configurados."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.slots = asyncio.Semaphore(args.parallel)
+
+    def _delay(self, ms: float) -> float:
+        jitter = self.args.jitter
+        return max(ms * (1 + self.rng.uniform(-jitter, jitter)), 0.0) / 1000.0
+
+    def plan(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Decide entre chamar uma ferramenta e responder (tokens ou tool_calls)."""
+        messages: List[Dict[str, Any]] = body.get("messages") or []
+        last = messages[-1] if messages else {}
+        tools = [t.get("function", {}).get("name") for t in body.get("tools") or []]
+        if (last.get("role") == "user" and "search_rag" in tools
+                and self.rng.random() < self.args.tool_call_rate):
+            query = str(last.get("content", ""))
+            return {"tool_calls": [{"function": {"name": "search_rag", "arguments": {"query": query}}}]}
+        think = [self.rng.choice(WORDS) for _ in range(self.args.think_tokens)]
+        answer = [self.rng.choice(WORDS) for _ in range(self.args.tokens)]
+        tokens = ["<think>"] + [w + " " for w in think] + ["</think>"] + [w + " " for w in answer]
+        return {"tokens": tokens}
+
+    async def generate(self, body: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Mensagens parciais do Ollama, terminando na mensagem com ``done``."""
+        model = body.get("model", "stub")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages") or [])
+        plan = self.plan(body)
+        async with self.slots:
+            started = time.perf_counter()
+            await asyncio.sleep(self._delay(self.args.first_token_ms))
+            prefill_s = time.perf_counter() - started
+            if "tool_calls" in plan:
+                yield {"model": model, "created_at": _now(), "done": False,
+                       "message": {"role": "assistant", "content": "", "tool_calls": plan["tool_calls"]}}
+                generated = 1
+            else:
+                for i, token in enumerate(plan["tokens"]):
+                    if i:
+                        await asyncio.sleep(self._delay(self.args.token_ms))
+                    yield {"model": model, "created_at": _now(), "done": False,
+                           "message": {"role": "assistant", "content": token}}
+                generated = len(plan["tokens"])
+            total_s = time.perf_counter() - started
+        yield {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(total_s * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill_s * 1e9),
+            "eval_count": generated,
+            "eval_duration": int((total_s - prefill_s) * 1e9),
+        }
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI()
+    llm = StubLLM(args)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        if body.get("stream", True):
+            async def lines() -> AsyncIterator[str]:
+                async for message in llm.generate(body):
+                    yield json.dumps(message, ensure_ascii=False) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        content: List[str] = []
+        tool_calls: Optional[List[Dict[str, Any]]] = None
+        final: Dict[str, Any] = {}
+        async for message in llm.generate(body):
+            if message["done"]:
+                final = message
+            else:
+                content.append(message["message"]["content"])
+                tool_calls = message["message"].get("tool_calls") or tool_calls
+        final["message"] = {"role": "assistant", "content": "".join(content)}
+        if tool_calls:
+            final["message"]["tool_calls"] = tool_calls
+        return JSONResponse(final)
+
+    @app.get("/api/tags")
+    def tags():
+        return {"models": [{"name": args.model, "model": args.model, "modified_at": _now(), "size": 0}]}
+
+    @app.get("/api/version")
+    def version():
+        return {"version": "0.0.0-stub"}
+
+    @app.post("/api/show")
+    def show():
+        return {"modelfile": "", "parameters": "", "template": "", "details": {"family": "stub"},
+                "capabilities": ["completion", "tools", "thinking"]}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", default="qwen3:latest")
+    parser.add_argument("--first-token-ms", type=float, default=200.0, help="prefill, antes do primeiro token")
+    parser.add_argument("--token-ms", type=float, default=20.0, help="intervalo entre tokens")
+    parser.add_argument("--tokens", type=int, default=50, help="tokens da resposta")
+    parser.add_argument("--think-tokens", type=int, default=10, help="tokens do bloco <think>")
+    parser.add_argument("--jitter", type=float, default=0.1, help="variação relativa das latências")
+    parser.add_argument("--parallel", type=int, default=1, help="gerações simultâneas (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--tool-call-rate", type=float, default=0.0, help="fração de perguntas com search_rag")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
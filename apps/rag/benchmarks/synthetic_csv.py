@@ -0,0 +1,213 @@
+"""
+Gerador de CSVs sintéticos no formato dos arquivos de `src/archives`.
+
+Uso:
+    python benchmarks/synthetic_csv.py --shape payroll --rows 100000 --out folha_100k.csv
+    python benchmarks/synthetic_csv.py --shape articles --rows 1000000 --text-words 120 --out artigos_1m.csv
+    python benchmarks/synthetic_csv.py --shape products --rows 50000 --columns 12 --out produtos.csv
+
+Formatos (`--shape`): `payroll` (folha de pagamento, mesmas colunas de
+`payroll.csv`), `products` (catálogo, como `products.csv`) e `articles`
+(artigos, como `articles.csv`). `--columns` fixa o total de colunas: menos
+que o formato corta as últimas, mais acrescenta atributos numéricos,
+categóricos e de texto curto. `--text-words` é o tamanho, em palavras, dos
+campos de texto livre (descrição, conteúdo). A tabela é gerada e gravada em
+blocos, então 1M de linhas cabe em pouca memória; a mesma semente gera o
+mesmo arquivo.
+"""
+
+import argparse
+import os
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = np.array([
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+    "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "William",
+])
+LAST_NAMES = np.array([
+    "Souza", "Lima", "Silva", "Santos", "Oliveira", "Pereira", "Costa", "Rodrigues", "Almeida", "Nascimento",
+    "Carvalho", "Gomes", "Martins", "Araújo", "Ribeiro", "Ferreira", "Barbosa", "Rocha", "Dias", "Teixeira",
+])
+CATEGORIES = np.array([
+    "Eletrônicos", "Informática", "Casa", "Esportes", "Livros", "Moda", "Beleza", "Brinquedos", "Ferramentas",
+    "Alimentos",
+])
+WORDS = np.array([
+    "dados", "sistema", "tecnologia", "inteligência", "artificial", "modelo", "empresa", "mercado", "cliente",
+    "produto", "serviço", "processo", "qualidade", "desempenho", "segurança", "rede", "nuvem", "plataforma",
+    "usuário", "equipe", "projeto", "gestão", "análise", "resultado", "custo", "valor", "tempo", "energia",
+    "bateria", "tela", "câmera", "memória", "armazenamento", "processador", "design", "material", "conforto",
+    "durabilidade", "garantia", "entrega", "preço", "oferta", "pesquisa", "estudo", "futuro", "inovação",
+    "sustentável", "digital", "aplicação", "desenvolvimento", "software", "hardware", "algoritmo",
+    "aprendizado", "automação", "indústria", "saúde", "educação", "finanças", "investimento", "crescimento",
+    "estratégia", "relatório", "tendência", "impacto", "sociedade", "ambiente", "cidade", "transporte",
+    "comunicação", "informação", "conhecimento", "experiência", "solução", "desafio", "oportunidade",
+    "eficiência", "integração", "recurso", "ferramenta", "biblioteca", "linguagem", "código", "teste", "versão",
+    "funcionalidade", "interface", "acesso", "controle", "monitoramento", "indicador", "meta", "orçamento",
+    "receita", "despesa", "lucro", "contrato", "fornecedor", "parceria", "logística",
+])
+TAGS = np.array([
+    "IA", "tecnologia", "futuro", "inovação", "sustentabilidade", "dados", "nuvem", "segurança", "educação",
+    "saúde", "finanças", "carreira", "produtividade", "programação", "mercado",
+])
+
+SHAPES = ("payroll", "products", "articles")
+
+
+def _text(rng: np.random.Generator, n: int, words: int) -> List[str]:
+    if words <= 0:
+        return [""] * n
+    picks = WORDS[rng.integers(0, len(WORDS), size=(n, words))]
+    return [" ".join(row).capitalize() + "." for row in picks]
+
+
+def _dates(rng: np.random.Generator, n: int, year: int) -> np.ndarray:
+    start = np.datetime64(f"{year}-01-01")
+    return (start + rng.integers(0, 365, n).astype("timedelta64[D]")).astype(str)
+
+
+def _payroll(rng: np.random.Generator, offset: int, n: int, text_words: int) -> pd.DataFrame:
+    # Doze competências por funcionário, como em payroll.csv
+    positions = offset + np.arange(n)
+    employees = positions // 12 + 1
+    months = positions % 12 + 1
+    base = np.round(rng.uniform(2500, 20000, n), -2)
+    bonus = np.where(rng.random(n) < 0.3, np.round(rng.uniform(100, 3000, n), -1), 0.0)
+    benefits = rng.choice([400.0, 600.0, 800.0], n)
+    other = np.where(rng.random(n) < 0.2, np.round(rng.uniform(50, 500, n), -1), 0.0)
+    inss = np.round(np.minimum(base * 0.11, 908.86), 2)
+    irrf = np.round(np.maximum((base + bonus - inss) * 0.075 - 150, 0), 2)
+    other_deductions = np.where(rng.random(n) < 0.1, np.round(rng.uniform(50, 400, n), -1), 0.0)
+    return pd.DataFrame({
+        "employee_id": [f"E{e:06d}" for e in employees],
+        "name": np.char.add(np.char.add(FIRST_NAMES[employees % len(FIRST_NAMES)], " "),
+                            LAST_NAMES[(employees // len(FIRST_NAMES)) % len(LAST_NAMES)]),
+        "competency": [f"2025-{m:02d}" for m in months],
+        "base_salary": base,
+        "bonus": bonus,
+        "benefits_vt_vr": benefits,
+        "other_earnings": other,
+        "deductions_inss": inss,
+        "deductions_irrf": irrf,
+        "other_deductions": other_deductions,
+        "net_pay": np.round(base + bonus + benefits + other - inss - irrf - other_deductions, 2),
+        "payment_date": [f"2025-{m:02d}-28" for m in months],
+    })
+
+
+def _products(rng: np.random.Generator, offset: int, n: int, text_words: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": offset + np.arange(1, n + 1),
+        "name": [f"Produto {w.capitalize()} {i}" for w, i in zip(WORDS[rng.integers(0, len(WORDS), n)],
+                                                                  offset + np.arange(1, n + 1))],
+        "description": _text(rng, n, text_words),
+        "category": CATEGORIES[rng.integers(0, len(CATEGORIES), n)],
+        "price": np.round(rng.uniform(9.9, 5000, n), 2),
+        "rating": np.round(rng.uniform(1, 5, n), 1),
+        "features": [", ".join(row) for row in WORDS[rng.integers(0, len(WORDS), size=(n, 4))]],
+    })
+
+
+def _articles(rng: np.random.Generator, offset: int, n: int, text_words: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": offset + np.arange(1, n + 1),
+        "title": _text(rng, n, 5),
+        "summary": _text(rng, n, max(text_words // 4, 1)),
+        "content": _text(rng, n, text_words),
+        "author": np.char.add(np.char.add(FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), n)], " "),
+                              LAST_NAMES[rng.integers(0, len(LAST_NAMES), n)]),
+        "publication_date": _dates(rng, n, 2024),
+        "tags": [", ".join(row) for row in TAGS[rng.integers(0, len(TAGS), size=(n, 3))]],
+        "read_time": rng.integers(2, 20, n),
+    })
+
+
+GENERATORS: Dict[str, Callable[[np.random.Generator, int, int, int], pd.DataFrame]] = {
+    "payroll": _payroll,
+    "products": _products,
+    "articles": _articles,
+}
+DEFAULT_TEXT_WORDS = {"payroll": 0, "products": 20, "articles": 60}
+
+
+def _extra_columns(rng: np.random.Generator, df: pd.DataFrame, total: int) -> pd.DataFrame:
+    n = len(df)
+    for i in range(len(df.columns), total):
+        name = f"attr_{i + 1:02d}"
+        kind = i % 3
+        if kind == 0:
+            df[name] = np.round(rng.uniform(0, 1000, n), 2)
+        elif kind == 1:
+            df[name] = CATEGORIES[rng.integers(0, len(CATEGORIES), n)]
+        else:
+            df[name] = _text(rng, n, 3)
+    return df
+
+
+def iter_frames(
+    shape: str,
+    rows: int,
+    columns: Optional[int] = None,
+    text_words: Optional[int] = None,
+    seed: int = 0,
+    block_rows: int = 50_000,
+) -> Iterator[pd.DataFrame]:
+    """Blocos de até ``block_rows`` linhas de uma tabela sintética ``shape``."""
+    if shape not in GENERATORS:
+        raise ValueError(f"Unknown shape '{shape}', expected one of {list(SHAPES)}")
+    words = DEFAULT_TEXT_WORDS[shape] if text_words is None else text_words
+    for offset in range(0, rows, block_rows):
+        # Semente por bloco: um bloco não depende das linhas que vêm depois dele
+        rng = np.random.default_rng([seed, offset])
+        df = GENERATORS[shape](rng, offset, min(block_rows, rows - offset), words)
+        if columns is not None:
+            df = df.iloc[:, :columns] if columns <= len(df.columns) else _extra_columns(rng, df, columns)
+        yield df
+
+
+def synthetic_frame(
+    shape: str,
+    rows: int,
+    columns: Optional[int] = None,
+    text_words: Optional[int] = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """A tabela sintética inteira em memória (para tabelas grandes, use write_csv)."""
+    return pd.concat(list(iter_frames(shape, rows, columns, text_words, seed)), ignore_index=True)
+
+
+def write_csv(
+    path: str,
+    shape: str,
+    rows: int,
+    columns: Optional[int] = None,
+    text_words: Optional[int] = None,
+    seed: int = 0,
+) -> str:
+    """Grava uma tabela sintética ``shape`` em ``path``, um bloco por vez."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, df in enumerate(iter_frames(shape, rows, columns, text_words, seed)):
+            df.to_csv(f, header=i == 0, index=False)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", choices=SHAPES, required=True)
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--columns", type=int, default=None, help="total de colunas (padrão: as do formato)")
+    parser.add_argument("--text-words", type=int, default=None, help="palavras por campo de texto livre")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    write_csv(args.out, args.shape, args.rows, args.columns, args.text_words, args.seed)
+    print(f"[OK] {args.out}: {args.rows} linhas ({args.shape})")
+
+
+if __name__ == "__main__":
+    main()
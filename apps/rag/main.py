@@ -1,49 +1,545 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import logging
+import threading
+import time
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import uvicorn
 from dotenv import load_dotenv
 import os
 from pydantic import BaseModel
 import sys
 
-from src.csv_chunk_processor import process_csvs_as_chunks, find_top_k_rows
+# Make the modules in src importable the same way the tests import them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from archive_watcher import ArchiveWatcher  # noqa: E402
+from csv_chunk_processor import (  # noqa: E402
+    ARCHIVES_DIR,
+    archive_csv_paths,
+    find_top_k_rows,
+    find_top_k_rows_batch,
+    get_processor,
+    hydrate_rows,
+    select_top_k_rows,
+)
+from index_versions import DEFAULT_ALIAS, rebuild_index, update_files, version_is_current  # noqa: E402
+from ingest_jobs import IngestBusy, IngestJob, IngestJobManager  # noqa: E402
+from logs import configure_logging  # noqa: E402
+from metrics import (  # noqa: E402
+    CONTENT_TYPE,
+    EXECUTOR_IN_FLIGHT,
+    EXECUTOR_QUEUED,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    REGISTRY,
+)
+from search_profiles import SearchTrace  # noqa: E402
+from snapshot import export_snapshot, install_snapshot  # noqa: E402
+from table_reader import is_table_file  # noqa: E402
+import tracing  # noqa: E402
+from serving import BoundedExecutor, ExecutorSaturated, ServingSettings  # noqa: E402
+from vector_store import as_vector_store, data_dir, open_default_store  # noqa: E402
+
+
+logger = logging.getLogger("rag.api")
+
+_executor: BoundedExecutor | None = None
+
+
+def get_executor() -> BoundedExecutor:
+    global _executor
+    if _executor is None:
+        _executor = BoundedExecutor(ServingSettings.from_env(), thread_name_prefix="rag-search")
+    return _executor
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    configure_logging()
+    get_executor()
+    if os.getenv("RAG_SNAPSHOT"):
+        # Memory-mapping a snapshot is cheap, so serve it from the first request
+        _get_client()
+    elif os.getenv("RAG_INGEST_ON_STARTUP", "1") != "0":
+        # Build a fresh version in the background unless the served one is current
+        threading.Thread(target=_ingest_if_stale, name="rag-startup-ingest", daemon=True).start()
+    if not os.getenv("RAG_SNAPSHOT") and os.getenv("RAG_WATCH_ARCHIVES", "1") != "0":
+        _start_watcher()
+    # The store and the models load off the startup path; /rag/health answers meanwhile
+    threading.Thread(target=_preload, name="rag-preload", daemon=True).start()
+    yield
+    global _executor, _jobs, _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+    if _jobs is not None:
+        _jobs.shutdown()
+        _jobs = None
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Read when /metrics is scraped, from whichever executor is serving
+EXECUTOR_IN_FLIGHT.set_function(lambda: _executor.in_flight if _executor is not None else 0)
+EXECUTOR_QUEUED.set_function(lambda: _executor.queued if _executor is not None else 0)
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """Trace every request, then count and time it per route template (not per raw path).
+
+    The request id and parent span come from the caller's headers, so the
+    spans join the caller's trace; the id is echoed in the response.
+    """
+    HTTP_IN_FLIGHT.inc()
+    t0 = time.perf_counter()
+    status = 500
+    with tracing.start_trace(
+        f"{request.method} {request.url.path}",
+        request_id=request.headers.get(tracing.REQUEST_ID_HEADER),
+        parent_id=request.headers.get(tracing.PARENT_SPAN_HEADER),
+        debug=tracing.parse_debug(request.headers.get(tracing.DEBUG_HEADER)),
+    ) as request_trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            response.headers[tracing.REQUEST_ID_HEADER] = request_trace.trace_id
+            return response
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - t0
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+            logger.debug(
+                "%s %s %d",
+                request.method, route, status,
+                extra={"method": request.method, "route": route, "status": status,
+                       "duration_ms": round(elapsed * 1000.0, 3), "request_id": request_trace.trace_id},
+            )
 
-app = FastAPI()
 
 class SimilarRequest(BaseModel):
     text: str
     k: int | None = 10
+    prefetch: int | None = None
+    # Return rows as NDJSON, one per line, while they are formatted
+    stream: bool = False
+    # Search profile (fast, balanced, accurate) and soft latency budget
+    profile: str | None = None
+    deadline_ms: int | None = None
+    timeout_ms: int | None = None
+    # Routing hints: search only these shards (e.g. ["payroll"])
+    shards: list[str] | None = None
+
+class SimilarBatchRequest(BaseModel):
+    texts: list[str]
+    k: int | None = 10
+    prefetch: int | None = None
+    profile: str | None = None
+    deadline_ms: int | None = None
+    timeout_ms: int | None = None
+    shards: list[str] | None = None
+
+class IngestRequest(BaseModel):
+    # File names inside src/archives to re-ingest into the live version; when
+    # omitted, a new version is built from all table files there
+    files: list[str] | None = None
 
+# Store serving searches; None until an index version exists
 _rag_client = None
+# Store the ingestion jobs write new versions to (the same one, outside snapshot mode)
+_store = None
+_rag_client_lock = threading.RLock()
+_jobs: IngestJobManager | None = None
+_watcher: ArchiveWatcher | None = None
+
+
+def _open_store():
+    global _store
+    with _rag_client_lock:
+        if _store is None:
+            _store = open_default_store()
+    return _store
+
+
+def _get_client():
+    """Return the store serving searches, or None while no index exists yet.
+
+    With RAG_SNAPSHOT set the index is memory-mapped from that snapshot file;
+    otherwise the persisted store is served as soon as it holds a version of
+    the collection. Building versions is the job of the ingestion jobs.
+    """
+    global _rag_client
+    with _rag_client_lock:
+        if _rag_client is None:
+            snapshot_path = os.getenv("RAG_SNAPSHOT")
+            if snapshot_path:
+                _rag_client = install_snapshot(snapshot_path)
+            else:
+                store = _open_store()
+                if as_vector_store(store).collection_exists(DEFAULT_ALIAS):
+                    _rag_client = store
+    return _rag_client
+
+
+def _preload() -> None:
+    """Open the served store and, unless RAG_PRELOAD_MODELS=0, load torch and the models."""
+    _get_client()
+    if os.getenv("RAG_PRELOAD_MODELS", "1") != "0":
+        get_processor()
+
+
+def _run_ingest(job: IngestJob):
+    if job.kind == "update":
+        return update_files(job.csv_paths, job.deleted, client=_open_store(), progress=job.on_progress)
+    summary, _ = rebuild_index(job.csv_paths, client=_open_store(), progress=job.on_progress)
+    return summary
+
+
+def _ingest_succeeded(_job: IngestJob) -> None:
+    global _rag_client
+    with _rag_client_lock:
+        if _rag_client is None:
+            _rag_client = _open_store()
+
+
+def get_jobs() -> IngestJobManager:
+    global _jobs
+    if _jobs is None:
+        _jobs = IngestJobManager(_run_ingest, on_success=_ingest_succeeded)
+    return _jobs
+
+
+def _start_ingest(csv_paths: list[str]) -> IngestJob:
+    """Start an ingestion job, or return the one already queued or running."""
+    try:
+        return get_jobs().submit(csv_paths)
+    except IngestBusy as e:
+        return e.job
+
+
+def _ingest_if_stale() -> IngestJob | None:
+    """Rebuild from the archives unless the live version's manifest already matches them.
+
+    Hashing the archives and loading the embedder to compare it take a
+    while, so this runs off the startup path; restarts then serve the
+    existing version instead of re-embedding everything.
+    """
+    paths = archive_csv_paths()
+    try:
+        if version_is_current(paths, client=_open_store()):
+            logger.info("index is current, skipping the startup ingestion", extra={"files": len(paths)})
+            return None
+    except Exception:
+        logger.exception("could not compare the index with the archives")
+    return _start_ingest(paths)
+
+
+def _on_archives_changed(changed: list[str], deleted: list[str]) -> bool:
+    """ArchiveWatcher callback: re-ingest only the changed files in place.
+
+    Returns False while another job is running so the watcher retries later.
+    Without an index yet, a full rebuild covers the change.
+    """
+    try:
+        if _get_client() is None:
+            get_jobs().submit(archive_csv_paths())
+        else:
+            get_jobs().submit(changed, kind="update", deleted=deleted)
+    except IngestBusy:
+        return False
+    return True
+
+
+def _start_watcher() -> ArchiveWatcher:
+    global _watcher
+    if _watcher is None:
+        _watcher = ArchiveWatcher(
+            ARCHIVES_DIR,
+            _on_archives_changed,
+            interval_s=float(os.getenv("RAG_WATCH_INTERVAL", "2")),
+            debounce_s=float(os.getenv("RAG_WATCH_DEBOUNCE", "3")),
+        )
+        _watcher.start()
+    return _watcher
+
+
+def _to_result(item):
+    # Map to backward-compatible schema expected by the AI app
+    return {
+        "value": item.get("value"),
+        "file": item.get("file"),
+        "score": item.get("score"),
+    }
+
+
+def _resolve_limits(k: int | None, prefetch: int | None) -> tuple[int, int | None]:
+    """Validate k/prefetch and clamp them to the configured maximums.
+
+    A missing prefetch stays None so the search profile chooses it.
+    """
+    settings = get_executor().settings
+    k = 10 if k is None else k
+    if k < 1 or (prefetch is not None and prefetch < 1):
+        raise HTTPException(status_code=400, detail="'k' and 'prefetch' must be positive")
+    if prefetch is not None:
+        prefetch = min(prefetch, settings.max_prefetch)
+    return min(k, settings.max_k), prefetch
+
+
+def _new_trace(profile: str | None, deadline_ms: int | None, shards: list[str] | None = None) -> SearchTrace:
+    try:
+        return SearchTrace(profile or get_executor().settings.default_profile, deadline_ms, shards)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _search(text: str, k: int, prefetch: int | None, trace: SearchTrace):
+    trace.mark_started()
+    # Use row-level semantic search that returns full rows with headers
+    topk = find_top_k_rows(text, _get_client(), k=k, prefetch=prefetch, trace=trace)
+    return [_to_result(item) for item in topk]
+
+
+def _select(text: str, k: int, prefetch: int | None, trace: SearchTrace):
+    trace.mark_started()
+    return select_top_k_rows(text, _get_client(), k=k, prefetch=prefetch, trace=trace)
+
+
+def _ndjson_lines(ordered, df_cache):
+    for item in hydrate_rows(ordered, df_cache):
+        yield json.dumps(_to_result(item), ensure_ascii=False) + "\n"
+
+
+def _search_batch(texts: list[str], k: int, prefetch: int | None, trace: SearchTrace):
+    trace.mark_started()
+    items = []
+    entries = find_top_k_rows_batch(texts, _get_client(), k=k, prefetch=prefetch, trace=trace)
+    for entry in entries:
+        if "error" in entry:
+            items.append({"error": entry["error"]})
+        else:
+            items.append({"results": [_to_result(item) for item in entry["results"]]})
+    return items
+
+
+def _log_search(trace: SearchTrace, results: int, queries: int = 1) -> None:
+    summary = trace.as_dict()
+    logger.info(
+        "Search done: %d results (%s)", results, summary["profile"],
+        extra={"queries": queries, "results": results, **summary},
+    )
+
+
+def _with_debug(body: dict) -> dict:
+    """Add the request's spans (and profile) when it was sent with ``X-Debug``."""
+    request_trace = tracing.current_trace()
+    if request_trace is not None and request_trace.debug is not None:
+        body["debug"] = request_trace.debug_info()
+    return body
+
+
+def _server_timing(trace: SearchTrace) -> str:
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in trace.timings.items())
+
+
+def _saturated(e: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="RAG service is saturated, retry later",
+        headers={"Retry-After": str(e.retry_after_s)},
+    )
+
+
+async def _require_index():
+    """Fail fast with 503 while the first index version is still being built."""
+    client = _rag_client
+    if client is None:
+        client = await _run_bounded(_get_client, timeout=None)
+    if client is None:
+        job = _start_ingest(archive_csv_paths())
+        eta = job.eta_s()
+        retry_after = int(eta) + 1 if eta is not None else get_executor().settings.retry_after_s
+        raise HTTPException(
+            status_code=503,
+            detail=f"RAG index is being built (job {job.id}), retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+async def _run_bounded(fn, *args, timeout: float | None):
+    """Run blocking work on the search executor, mapping overload to HTTP errors."""
+    try:
+        return await get_executor().run(fn, *args, timeout=timeout)
+    except ExecutorSaturated as e:
+        raise _saturated(e) from e
+    except asyncio.TimeoutError as e:
+        raise HTTPException(status_code=504, detail="RAG search timed out") from e
+
 
 @app.get("/rag/health/")
 def health():
     return {"status": 201}
 
+@app.get("/metrics")
+@app.get("/rag/metrics")
+def metrics():
+    """Counters and histograms of this process in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/rag/similar")
-def similar(req: SimilarRequest):
-    global _rag_client
+async def similar(req: SimilarRequest, response: Response):
     if not req.text or not isinstance(req.text, str):
         raise HTTPException(status_code=400, detail="'text' must be a non-empty string")
-    if _rag_client is None:
-        _, _rag_client = process_csvs_as_chunks()
-    # Use row-level semantic search that returns full rows with headers
-    topk = find_top_k_rows(req.text, _rag_client, k=10)
-    # Map to backward-compatible schema expected by the AI app
-    results = []
-    for item in topk:
-        results.append({
-            "value": item.get("value"),
-            "file": item.get("file"),
-            "score": item.get("score"),
-        })
-    print(results)
-    return {"results": results}
+    k, prefetch = _resolve_limits(req.k, req.prefetch)
+    trace = _new_trace(req.profile, req.deadline_ms, req.shards)
+    await _require_index()
+    timeout = get_executor().resolve_timeout(req.timeout_ms)
+    if req.stream:
+        # Rank within the request timeout, then stream rows as they are formatted
+        ordered, df_cache = await _run_bounded(
+            tracing.call, _select, req.text, k, prefetch, trace, timeout=timeout
+        )
+        try:
+            lines = get_executor().stream(_ndjson_lines, ordered, df_cache)
+        except ExecutorSaturated as e:
+            raise _saturated(e) from e
+        return StreamingResponse(
+            lines,
+            media_type="application/x-ndjson",
+            headers={"X-Search-Profile": trace.profile.name, "Server-Timing": _server_timing(trace)},
+        )
+    results = await _run_bounded(tracing.call, _search, req.text, k, prefetch, trace, timeout=timeout)
+    _log_search(trace, len(results))
+    response.headers["Server-Timing"] = _server_timing(trace)
+    return _with_debug({"results": results, "search": trace.as_dict()})
+
+@app.post("/rag/similar/batch")
+async def similar_batch(req: SimilarBatchRequest):
+    """Search many texts at once; items come back in input order.
+
+    Each item is either {"results": [...]} or {"error": "..."}, so one bad query
+    does not fail the whole batch.
+    """
+    executor = get_executor()
+    if not req.texts:
+        raise HTTPException(status_code=400, detail="'texts' must be a non-empty list")
+    if len(req.texts) > executor.settings.max_batch_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {executor.settings.max_batch_size} texts per batch",
+        )
+    k, prefetch = _resolve_limits(req.k, req.prefetch)
+    trace = _new_trace(req.profile, req.deadline_ms, req.shards)
+    await _require_index()
+    timeout = executor.resolve_timeout(req.timeout_ms)
+    items = await _run_bounded(tracing.call, _search_batch, req.texts, k, prefetch, trace, timeout=timeout)
+    _log_search(trace, sum(len(item.get("results", [])) for item in items), queries=len(items))
+    return _with_debug({"items": items, "search": trace.as_dict()})
+
+def _prepare_workers(workers: int) -> None:
+    """Give every worker process the same read-only, memory-mapped index.
+
+    The embedded Qdrant database can only be opened by one process, so with
+    several workers the index is built once here, exported as a snapshot and
+    memory-mapped by each worker (the vectors are shared in the page cache).
+    Native thread pools are split between the workers to avoid oversubscription.
+    """
+    if not os.getenv("RAG_SNAPSHOT"):
+        path = data_dir() / "serving.ragsnap"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _, client = rebuild_index()
+        export_snapshot(path, client=client)
+        if hasattr(client, "close"):
+            client.close()
+        os.environ["RAG_SNAPSHOT"] = str(path)
+    threads = str(max(1, (os.cpu_count() or 1) // workers))
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, threads)
+
+
+@app.post("/rag/ingest", status_code=202)
+def start_ingest(req: IngestRequest | None = None):
+    """Start a background ingestion.
+
+    Without ``files`` every archive goes into a new index version; searches
+    keep using the current version until the new one is validated and
+    swapped in. With ``files`` only those are re-ingested, in place, into
+    the live version (like the archive watcher does), so the other files
+    stay indexed. Poll GET /rag/ingest/{job_id} for progress.
+    """
+    if os.getenv("RAG_SNAPSHOT"):
+        raise HTTPException(status_code=409, detail="Serving a read-only snapshot; ingestion is disabled")
+    files = req.files if req is not None else None
+    if files is None:
+        paths = archive_csv_paths()
+    else:
+        if not files or any(os.path.basename(f) != f or not is_table_file(f) for f in files):
+            raise HTTPException(
+                status_code=400,
+                detail="'files' must be CSV, Parquet or Arrow file names inside the archives folder",
+            )
+        paths = [os.path.join(ARCHIVES_DIR, f) for f in files]
+        missing = [f for f, p in zip(files, paths) if not os.path.exists(p)]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {missing}")
+        if _get_client() is None:
+            # A version built from part of the archives would drop the rest from search
+            raise HTTPException(
+                status_code=409,
+                detail="No index version to update yet; omit 'files' to build one from all archives",
+            )
+    try:
+        job = get_jobs().submit(paths, kind="update" if files is not None else "rebuild")
+    except IngestBusy as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "An ingestion job is already running", "job": e.job.as_dict()},
+        ) from e
+    return {"job": job.as_dict()}
+
+
+@app.get("/rag/ingest")
+def list_ingest_jobs():
+    return {"jobs": [job.as_dict() for job in get_jobs().list()]}
+
+
+@app.get("/rag/ingest/{job_id}")
+def ingest_status(job_id: str):
+    job = get_jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job '{job_id}'")
+    return {"job": job.as_dict()}
+
 
 if __name__ == "__main__":
     load_dotenv()
     PORT = int(os.getenv("RAG_PORT", 8080))
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=PORT
-    )
\ No newline at end of file
+    WORKERS = int(os.getenv("RAG_WORKERS", 1))
+    if WORKERS > 1:
+        _prepare_workers(WORKERS)
+        # Workers import the app by name; each one loads RAG_SNAPSHOT at startup
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=PORT,
+            workers=WORKERS,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+            # Workers preload torch and the models in a background thread, which slows their first
+            # pings (the option is new in uvicorn 0.37, the minimum in pyproject.toml)
+            timeout_worker_healthcheck=int(os.getenv("RAG_WORKER_HEALTHCHECK_TIMEOUT", 120)),
+        )
+    else:
+        uvicorn.run(
+            app,
+            host="0.0.0.0",
+            port=PORT
+        )
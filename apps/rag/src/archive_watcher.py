@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from table_reader import TABLE_EXTENSIONS
+
+FileState = Tuple[int, int]
+
+# Called with (changed paths, deleted file names); returns False to retry later
+ChangeHandler = Callable[[List[str], List[str]], bool]
+
+logger = logging.getLogger("rag.watcher")
+
+
+class ArchiveWatcher:
+    """Polls a folder for added, modified and deleted data files.
+
+    Files are compared by (mtime, size) every ``interval_s``. Changes are
+    debounced: they are handed to ``on_change`` only once no file has changed
+    for ``debounce_s``, so a file that is still being copied is ingested once,
+    complete. Polling (rather than inotify) keeps this dependency-free and
+    works on network and container-mounted folders.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        on_change: ChangeHandler,
+        interval_s: float = 2.0,
+        debounce_s: float = 3.0,
+        extensions: Tuple[str, ...] = TABLE_EXTENSIONS,
+    ) -> None:
+        self.folder = folder
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self.debounce_s = debounce_s
+        self.extensions = extensions
+        self._seen = self.scan()
+        self._pending: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def scan(self) -> Dict[str, FileState]:
+        state: Dict[str, FileState] = {}
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return state
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith(self.extensions):
+                st = entry.stat()
+                state[entry.name] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def poll(self, now: Optional[float] = None) -> Optional[Tuple[List[str], List[str]]]:
+        """Scan once; return (changed paths, deleted names) when a debounced batch is ready."""
+        now = time.monotonic() if now is None else now
+        current = self.scan()
+        for name in set(current) | set(self._seen):
+            if current.get(name) != self._seen.get(name):
+                self._pending[name] = now
+        self._seen = current
+        if not self._pending or now - max(self._pending.values()) < self.debounce_s:
+            return None
+        changed = sorted(os.path.join(self.folder, n) for n in self._pending if n in current)
+        deleted = sorted(n for n in self._pending if n not in current)
+        return changed, deleted
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                batch = self.poll()
+                if batch is not None and self.on_change(*batch):
+                    self._pending.clear()
+            except Exception:
+                # Keep watching; the pending changes are retried on the next poll
+                logger.exception("Archive watcher poll failed", extra={"folder": self.folder})
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rag-archive-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+            self._thread = None
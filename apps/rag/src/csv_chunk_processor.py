@@ -1,19 +1,86 @@
+import contextlib
+import hashlib
+import logging
 import os
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, List, Dict, Any, Iterator, Optional, Sequence, Set, Tuple, Union
 
 import numpy as np
 import pandas as pd
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
 
-try:
-    from sentence_transformers import CrossEncoder
-    CROSS_ENCODER_AVAILABLE = True
-except Exception:
-    CrossEncoder = None  # type: ignore
-    CROSS_ENCODER_AVAILABLE = False
+from embedders import Embedder, Reranker, create_embedder, create_reranker
+from lexical_index import (
+    BM25Index,
+    get_lexical_index,
+    reciprocal_rank_fusion,
+    save_lexical_index,
+    serving_lexical_index,
+)
+from metrics import TABLE_LOAD_SECONDS
+from model_backends import BackendConfig
+from payload_codec import (
+    compact_payloads_enabled,
+    decode_hits,
+    file_selector,
+    get_payload_dictionary,
+    save_payload_dictionary,
+)
+from projection import get_projection
+from search_profiles import SearchProfile, SearchTrace
+from sharding import get_router
+from table_reader import is_table_file, iter_batches, read_table
+import tracing
+from vector_store import VectorStore, as_vector_store, open_default_store
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import PointStruct
+
+# A bare QdrantClient is still accepted wherever a store is expected
+StoreLike = Union["QdrantClient", VectorStore]
+
+# Receives ingestion events: {"event": "file_started" | "chunks_done" |
+# "file_done" | "file_failed", "csv_path": ..., plus "chunks", "result" or "error"}
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+logger = logging.getLogger("rag.ingest")
+
+# Rows read, chunked and embedded at a time per file (rounded up to whole row windows)
+INGEST_BATCH_ROWS = int(os.getenv("RAG_INGEST_BATCH_ROWS", "4096"))
+
+
+def chunk_point_id(csv_filename: str, position: int) -> int:
+    """Stable point id of the ``position``-th chunk of a file (63-bit hash).
+
+    Ids do not depend on the other files, so one file can be re-ingested
+    without renumbering (or colliding with) the rest of the collection.
+    """
+    digest = hashlib.blake2b(f"{csv_filename}\0{position}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+def log_progress(event: Dict[str, Any]) -> None:
+    """Default progress callback: one log record per file started, done or failed."""
+    kind = event["event"]
+    path = event["csv_path"]
+    if kind == "file_started":
+        logger.info("Processando %s", path, extra={"event": kind, "csv_path": path})
+    elif kind == "file_done":
+        result = event["result"]
+        logger.info(
+            "%s: %s chunks | %s linhas × %s colunas",
+            path, result["total_chunks"], result["total_rows"], result["total_columns"],
+            extra={
+                "event": kind,
+                "csv_path": path,
+                "chunks": result["total_chunks"],
+                "rows": result["total_rows"],
+                "columns": result["total_columns"],
+            },
+        )
+    elif kind == "file_failed":
+        logger.error("%s: %s", path, event["error"], extra={"event": kind, "csv_path": path})
 
 
 class CSVChunkProcessor:
@@ -23,6 +90,7 @@ class CSVChunkProcessor:
     - Dual indexing: cell-level chunks and row-window chunks.
     - Every chunk includes the original CSV header for context.
     - Optional cross-encoder re-ranking for improved accuracy.
+    - Pluggable embedder and reranker (see embedders.py).
     - Returns the original file name with each search result.
     """
 
@@ -30,16 +98,32 @@ class CSVChunkProcessor:
         self,
         embedding_model_name: str = "all-MiniLM-L6-v2",
         cross_encoder_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        embedding_backend: Optional[BackendConfig] = None,
+        cross_encoder_backend: Optional[BackendConfig] = None,
+        embedder: Optional[Embedder] = None,
+        reranker: Optional[Reranker] = None,
     ) -> None:
-        self.embedder = SentenceTransformer(embedding_model_name)
+        """Use ``embedder`` / ``reranker`` when given; otherwise create them from the config.
+
+        RAG_EMBEDDER / RAG_RERANKER pick the implementations and
+        RAG_EMBEDDING_BACKEND / RAG_CROSS_ENCODER_BACKEND their inference backend.
+        """
+        self.embedding_backend = embedding_backend or BackendConfig.from_env("EMBEDDING")
+        self.cross_encoder_backend = cross_encoder_backend or BackendConfig.from_env("CROSS_ENCODER")
+        self.embedder: Embedder = (
+            embedder if embedder is not None else create_embedder(embedding_model_name, self.embedding_backend)
+        )
         self.embedding_dim = self.embedder.get_sentence_embedding_dimension()
+        self.embedding_model_name = embedding_model_name
         self.cross_encoder_name = cross_encoder_name
-        self.cross_encoder = None
-        if CROSS_ENCODER_AVAILABLE:
-            try:
-                self.cross_encoder = CrossEncoder(cross_encoder_name)
-            except Exception:
-                self.cross_encoder = None
+        self.reranker: Optional[Reranker] = (
+            reranker if reranker is not None else create_reranker(cross_encoder_name, self.cross_encoder_backend)
+        )
+
+    @property
+    def cross_encoder(self) -> Optional[Reranker]:
+        """Historical name of ``reranker``."""
+        return self.reranker
 
     # ---------------------------
     # Chunking helpers
@@ -53,22 +137,24 @@ class CSVChunkProcessor:
         values = ["" if pd.isna(v) else str(v) for v in df.iloc[idx].tolist()]
         return ",".join(values)
 
+    @classmethod
     def _cell_chunk_text(
-        self,
+        cls,
         df: pd.DataFrame,
         row_idx: int,
         col_name: str,
         csv_filename: str,
         id_column: str,
+        row_offset: int = 0,
     ) -> Tuple[str, Dict[str, Any]]:
-        header = self._header_line(df)
-        row_csv = self._row_as_csv(df, row_idx)
+        header = cls._header_line(df)
+        row_csv = cls._row_as_csv(df, row_idx)
         value = df.iloc[row_idx][col_name]
         value_str = "[valor não disponível]" if pd.isna(value) else str(value)
         row_id = (
             df.iloc[row_idx][id_column]
             if id_column in df.columns
-            else row_idx + 1
+            else row_offset + row_idx + 1
         )
 
         text = (
@@ -82,31 +168,33 @@ class CSVChunkProcessor:
             "csv_file": csv_filename,
             "row_id": int(row_id) if isinstance(row_id, (int, np.integer)) else str(row_id),
             "column_name": col_name,
-            "row_index": int(row_idx),
+            "row_index": int(row_offset + row_idx),
             "original_value": None if pd.isna(value) else value_str,
             "chunk_type": "cell",
         }
         return text, payload
 
+    @classmethod
     def _row_window_chunk_text(
-        self,
+        cls,
         df: pd.DataFrame,
         start_row: int,
         end_row: int,
         csv_filename: str,
+        row_offset: int = 0,
     ) -> Tuple[str, Dict[str, Any]]:
-        header = self._header_line(df)
-        window_lines = [self._row_as_csv(df, i) for i in range(start_row, end_row)]
+        header = cls._header_line(df)
+        window_lines = [cls._row_as_csv(df, i) for i in range(start_row, end_row)]
         window_preview = "\n".join(window_lines)
         text = (
             f"CSV: {csv_filename}\n"
             f"Header: {header}\n"
-            f"Rows {start_row + 1}-{end_row}:\n{window_preview}"
+            f"Rows {row_offset + start_row + 1}-{row_offset + end_row}:\n{window_preview}"
         )
         payload = {
             "csv_file": csv_filename,
-            "row_start": int(start_row),
-            "row_end": int(end_row - 1),
+            "row_start": int(row_offset + start_row),
+            "row_end": int(row_offset + end_row - 1),
             "chunk_type": "row_window",
         }
         return text, payload
@@ -123,7 +211,9 @@ class CSVChunkProcessor:
         rows_per_window: int = 20,
         include_cell_chunks: bool = True,
         include_row_windows: bool = True,
+        row_offset: int = 0,
     ) -> List[Dict[str, Any]]:
+        """Chunks of ``df``; with ``row_offset`` it is a slice of a larger table starting at that row."""
         chunks: List[Dict[str, Any]] = []
         chunk_id = start_chunk_id
 
@@ -139,6 +229,7 @@ class CSVChunkProcessor:
                         col_name=col_name,
                         csv_filename=csv_filename,
                         id_column=id_column,
+                        row_offset=row_offset,
                     )
                     chunks.append({
                         "id": chunk_id,
@@ -157,6 +248,7 @@ class CSVChunkProcessor:
                     start_row=start,
                     end_row=end,
                     csv_filename=csv_filename,
+                    row_offset=row_offset,
                 )
                 chunks.append({
                     "id": chunk_id,
@@ -178,66 +270,182 @@ class CSVChunkProcessor:
         return chunks
 
     @staticmethod
-    def to_qdrant_points(chunks: List[Dict[str, Any]]) -> List[PointStruct]:
+    def to_qdrant_points(chunks: List[Dict[str, Any]]) -> List["PointStruct"]:
+        from qdrant_client.models import PointStruct
+
         return [
             PointStruct(id=c["id"], vector=c["embedding"], payload=c["metadata"])  # type: ignore[arg-type]
             for c in chunks
         ]
 
+    @staticmethod
+    def count_chunks(
+        n_rows: int,
+        columns: Sequence[str],
+        id_column: str = "id",
+        rows_per_window: int = 20,
+        include_cell_chunks: bool = True,
+        include_row_windows: bool = True,
+    ) -> int:
+        """Number of chunks build_chunks produces for a table, without building them."""
+        total = 0
+        if include_cell_chunks:
+            total += n_rows * len([c for c in columns if c != id_column])
+        if include_row_windows and rows_per_window > 0:
+            total += -(-n_rows // rows_per_window)
+        return total
+
+    @staticmethod
+    def lexical_rows(df: pd.DataFrame) -> List[Tuple[str, List[Any]]]:
+        """(text, values) of every row of ``df``, as BM25Index.replace_file takes them."""
+        return [
+            (_format_row_with_header(df, row_idx), [v for v in df.iloc[row_idx].tolist() if not pd.isna(v)])
+            for row_idx in range(len(df))
+        ]
+
+    @classmethod
+    def index_rows_lexically(cls, df: pd.DataFrame, csv_filename: str, index: BM25Index) -> None:
+        """(Re)index every row of ``df`` in the BM25 index, replacing the file's old rows at once."""
+        index.replace_file(csv_filename, cls.lexical_rows(df))
+
     def process_csv_to_qdrant(
         self,
         csv_path: str,
         collection_name: str,
-        client: Optional[QdrantClient] = None,
-        start_chunk_id: int = 1,
+        client: Optional[StoreLike] = None,
+        start_chunk_id: Optional[int] = None,
         id_column: str = "id",
         rows_per_window: int = 20,
         include_cell_chunks: bool = True,
         include_row_windows: bool = True,
+        lexical_index: Optional[BM25Index] = None,
+        embed_batch_size: int = 256,
+        progress: Optional[ProgressCallback] = None,
+        replace_existing: bool = False,
+        columns: Optional[Sequence[str]] = None,
+        compact_payloads: Optional[bool] = None,
+        batch_rows: int = INGEST_BATCH_ROWS,
     ) -> Dict[str, Any]:
+        """Chunk, embed and upsert one table file (CSV, Parquet or Arrow IPC).
+
+        The file is read in record batches of about ``batch_rows`` rows (a
+        multiple of ``rows_per_window``, so windows never straddle two
+        batches); only one batch and its chunks are in memory at a time.
+        Only ``columns`` are read and chunked when given. With
+        ``compact_payloads`` (default: RAG_COMPACT_PAYLOADS for new collections,
+        otherwise the schema the collection was created with) payloads are
+        dictionary-encoded, see payload_codec. Point ids are chunk_point_id(file, position) unless ``start_chunk_id``
+        asks for sequential ids. With ``replace_existing`` the file's new points
+        are upserted over the previous ones and the previous points left over
+        are deleted afterwards, for re-ingesting a changed file in place.
+        """
         if client is None:
-            client = QdrantClient(path=Path(__file__).parent / "db")
+            client = open_default_store()
+        store = as_vector_store(client)
 
-        # Load CSV
-        df = pd.read_csv(csv_path)
         csv_filename = Path(csv_path).name
 
+        if compact_payloads is None:
+            compact_payloads = get_payload_dictionary(store, collection_name) is not None or (
+                compact_payloads_enabled() and not store.collection_exists(collection_name)
+            )
+        dictionary = get_payload_dictionary(store, collection_name, create=True) if compact_payloads else None
+        dictionary_size = None
+
+        # Versions built with a projection store reduced vectors (see projection)
+        projection = get_projection(store, collection_name)
+        dim = projection.dim if projection is not None else int(self.embedding_dim)
+
         # Ensure collection exists
-        try:
-            client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=self.embedding_dim, distance=Distance.COSINE),
+        store.ensure_collection(collection_name, dim, projection.dtype if projection is not None else "float32")
+        # Looked up before encoding: a file new to the collection has nothing to replace
+        selector = file_selector(store, collection_name, csv_filename) if replace_existing else None
+
+        if rows_per_window > 0 and include_row_windows:
+            batch_rows = -(-max(batch_rows, 1) // rows_per_window) * rows_per_window
+        lexical_rows: List[Tuple[str, List[Any]]] = []
+        point_ids: Set[int] = set()
+        chunk_id = start_chunk_id or 1
+        total_rows = 0
+        total_columns = 0
+        # Record batches of the table (memory-mapped Arrow for Parquet/IPC and cached CSVs)
+        for df in iter_batches(csv_path, columns=columns, batch_rows=batch_rows):
+            total_columns = len(df.columns)
+            if lexical_index is not None:
+                lexical_rows.extend(self.lexical_rows(df))
+            chunks = self.build_chunks(
+                df=df,
+                csv_filename=csv_filename,
+                start_chunk_id=chunk_id,
+                id_column=id_column,
+                rows_per_window=rows_per_window,
+                include_cell_chunks=include_cell_chunks,
+                include_row_windows=include_row_windows,
+                row_offset=total_rows,
             )
-        except Exception:
-            pass
-
-        # Build chunks
-        chunks = self.build_chunks(
-            df=df,
-            csv_filename=csv_filename,
-            start_chunk_id=start_chunk_id,
-            id_column=id_column,
-            rows_per_window=rows_per_window,
-            include_cell_chunks=include_cell_chunks,
-            include_row_windows=include_row_windows,
-        )
+            if start_chunk_id is None:
+                for position, c in enumerate(chunks, start=chunk_id - 1):
+                    c["id"] = chunk_point_id(csv_filename, position)
+            chunk_id += len(chunks)
+            total_rows += len(df)
+            del df
+            if dictionary is not None:
+                for c in chunks:
+                    c["metadata"] = dictionary.encode(c["metadata"])
+                if dictionary_size != (len(dictionary.files), len(dictionary.columns)):
+                    # Persist new codes before any point that uses them is written
+                    save_payload_dictionary(store, collection_name)
+                    dictionary_size = (len(dictionary.files), len(dictionary.columns))
+
+            # Embed and upsert in batches, reporting progress after each one
+            for start in range(0, len(chunks), embed_batch_size):
+                batch = self.generate_embeddings(chunks[start:start + embed_batch_size])
+                vectors = [c["embedding"] for c in batch]
+                store.upsert(
+                    collection_name,
+                    ids=[c["id"] for c in batch],
+                    vectors=projection.apply(vectors) if projection is not None else vectors,
+                    payloads=[c["metadata"] for c in batch],
+                )
+                for c in batch:
+                    # Only needed for the upsert; keeps peak memory at one batch
+                    c.pop("embedding", None)
+                if progress is not None:
+                    progress({"event": "chunks_done", "csv_path": csv_path, "chunks": len(batch)})
+            if selector is not None:
+                point_ids.update(c["id"] for c in chunks)
 
-        # Embed and upsert
-        chunks = self.generate_embeddings(chunks)
-        points = self.to_qdrant_points(chunks)
-        client.upsert(collection_name=collection_name, points=points)
+        if lexical_index is not None:
+            # The whole file at once: searches see its old rows or its new ones
+            lexical_index.replace_file(csv_filename, lexical_rows)
+        if selector is not None:
+            # Points of the new version overwrote theirs in place (same ids); only
+            # now drop the stale ones, so searches never see the file missing
+            store.delete_by_field(collection_name, *selector, keep_ids=point_ids)
 
         return {
             "csv_path": csv_path,
             "csv_filename": csv_filename,
             "collection_name": collection_name,
-            "total_chunks": len(points),
-            "total_rows": int(len(df)),
-            "total_columns": int(len(df.columns)),
-            "embedding_dimension": int(self.embedding_dim),
+            "total_chunks": chunk_id - (start_chunk_id or 1),
+            "total_rows": total_rows,
+            "total_columns": total_columns,
+            "embedding_dimension": dim,
         }
 
 
+ARCHIVES_DIR = os.path.join(os.path.dirname(__file__), "archives")
+
+
+def archive_csv_paths() -> List[str]:
+    """Table files (CSV, Parquet, Arrow IPC) of the default archives folder."""
+    return [
+        os.path.join(ARCHIVES_DIR, file)
+        for file in os.listdir(ARCHIVES_DIR)
+        if is_table_file(file)
+    ]
+
+
 def process_csvs_as_chunks(
     csv_paths: Optional[List[str]] = None,
     collection_name: str = "csv_chunks",
@@ -245,72 +453,101 @@ def process_csvs_as_chunks(
     rows_per_window: int = 20,
     include_cell_chunks: bool = True,
     include_row_windows: bool = True,
-    client: Optional[QdrantClient] = None,
+    client: Optional[StoreLike] = None,
+    build_lexical_index: bool = True,
+    progress: Optional[ProgressCallback] = log_progress,
+    processor: Optional[CSVChunkProcessor] = None,
 ):
-    processor = CSVChunkProcessor()
+    if processor is None:
+        processor = get_processor()
     if client is None:
-        client = QdrantClient(path=Path(__file__).parent / "db")
+        client = open_default_store()
+    store = as_vector_store(client)
+    lexical_index = get_lexical_index(store, collection_name, create=True) if build_lexical_index else None
 
     results: List[Dict[str, Any]] = []
-    global_chunk_id = 1
 
     if csv_paths is None:
-        csv_folder = os.path.join(os.path.dirname(__file__), "archives")
-        csv_paths = [
-            os.path.join(csv_folder, file)
-            for file in os.listdir(csv_folder)
-            if file.lower().endswith(".csv")
-        ]
+        csv_paths = archive_csv_paths()
 
+    notify = progress or (lambda event: None)
     for csv_path in csv_paths:
         try:
-            print(f"[PROC] Processando {csv_path}...")
+            notify({"event": "file_started", "csv_path": csv_path})
             result = processor.process_csv_to_qdrant(
                 csv_path=csv_path,
                 collection_name=collection_name,
                 client=client,
-                start_chunk_id=global_chunk_id,
                 id_column=id_column,
                 rows_per_window=rows_per_window,
                 include_cell_chunks=include_cell_chunks,
                 include_row_windows=include_row_windows,
+                lexical_index=lexical_index,
+                progress=progress,
             )
             results.append(result)
-            global_chunk_id += result["total_chunks"]
-            print(
-                f"[OK] {csv_path}: {result['total_chunks']} chunks | "
-                f"{result['total_rows']} linhas × {result['total_columns']} colunas"
-            )
+            notify({"event": "file_done", "csv_path": csv_path, "result": result})
         except Exception as e:
-            print(f"[ERRO] {csv_path}: {e}")
+            notify({"event": "file_failed", "csv_path": csv_path, "error": str(e)})
             results.append({"csv_path": csv_path, "error": str(e)})
 
+    if lexical_index is not None:
+        # Saved with the version so that restarts and other processes serve it too
+        save_lexical_index(store, collection_name)
     return results, client
 
 
-def find_top_k_semantic(
-    text: str,
-    client: QdrantClient,
-    k: int = 10,
-    collection_name: str = "csv_chunks",
-    prefetch: int = 30,
-) -> List[Dict[str, Any]]:
-    """Semantic search with optional cross-encoder re-ranking.
+_default_processor: Optional[CSVChunkProcessor] = None
+_default_processor_lock = threading.Lock()
 
-    Returns a list of dicts with: file, score, chunk_type, snippet, and metadata.
-    """
-    processor = CSVChunkProcessor()
-    query_vec = processor.embedder.encode([text])[0].tolist()
 
-    prefetch = max(prefetch, k)
-    raw = client.query_points(
-        collection_name=collection_name,
-        query=query_vec,
-        limit=prefetch,
-    ).points
+def get_processor() -> CSVChunkProcessor:
+    """Return the process-wide processor so the models are loaded only once."""
+    global _default_processor
+    with _default_processor_lock:
+        if _default_processor is None:
+            _default_processor = CSVChunkProcessor()
+    return _default_processor
+
 
+# Fetch texts for re-ranking from the DB is not trivial with Qdrant payload-only; we kept
+# the informative formatted text inside the embedding input but not in payload to save space.
+# For re-ranking, we can reconstruct a text representation from payload fields:
+def _payload_to_text(p: Dict[str, Any], tables: Optional[Dict[str, Any]] = None) -> str:
+    if p.get("chunk_type") == "cell":
+        col = p.get("column_name")
+        if "original_value" in p:
+            row_id = p.get("row_id")
+            value = p.get("original_value") or "[valor não disponível]"
+        else:
+            # Compact payloads: the value lives in the row store
+            row_id, value = _cell_from_row_store(p, tables if tables is not None else {})
+        return f"Row ID: {row_id} | Column: {col} | Value: {value}"
+    if p.get("chunk_type") == "row_window":
+        return (
+            f"Rows {p.get('row_start')}–{p.get('row_end')} in file {p.get('csv_file')}"
+        )
+    return f"File: {p.get('csv_file')}"
+
+
+def _cell_from_row_store(p: Dict[str, Any], tables: Dict[str, Any]) -> Tuple[Any, str]:
+    file, row_idx = p.get("csv_file"), int(p.get("row_index", -1))
+    if file not in tables:
+        try:
+            tables[file] = _load_df_for_file(file)
+        except Exception:
+            tables[file] = None
+    df = tables[file]
+    if df is None or not 0 <= row_idx < len(df) or p.get("column_name") not in df.columns:
+        return row_idx + 1, "[valor não disponível]"
+    value = df.iloc[row_idx][p["column_name"]]
+    row_id = df.iloc[row_idx]["id"] if "id" in df.columns else row_idx + 1
+    return row_id, "[valor não disponível]" if pd.isna(value) else str(value)
+
+
+def _to_candidates(points: List[Any]) -> List[Dict[str, Any]]:
     candidates: List[Dict[str, Any]] = []
-    for r in raw:
+    for r in points:
         payload = r.payload or {}
         candidates.append({
             "file": payload.get("csv_file"),
@@ -320,42 +557,156 @@ def find_top_k_semantic(
             "text": None,  # not stored as payload to keep payload small
             "id": r.id,
         })
+    return candidates
 
-    # Fetch texts for re-ranking from the DB is not trivial with Qdrant payload-only; we kept
-    # the informative formatted text inside the embedding input but not in payload to save space.
-    # For re-ranking, we can reconstruct a text representation from payload fields:
-    def payload_to_text(p: Dict[str, Any]) -> str:
-        if p.get("chunk_type") == "cell":
-            header = "(header omitted in payload)"
-            row_id = p.get("row_id")
-            col = p.get("column_name")
-            value = p.get("original_value") or "[valor não disponível]"
-            return f"Row ID: {row_id} | Column: {col} | Value: {value}"
-        if p.get("chunk_type") == "row_window":
-            return (
-                f"Rows {p.get('row_start')}–{p.get('row_end')} in file {p.get('csv_file')}"
-            )
-        return f"File: {p.get('csv_file')}"
 
+def _rerank_batch(
+    texts: Sequence[str],
+    candidate_lists: List[List[Dict[str, Any]]],
+    processor: CSVChunkProcessor,
+    trace: SearchTrace,
+) -> None:
+    """Re-rank the head of each candidate list in place with one cross-encoder call.
+
+    Only the first ``depth`` candidates (as chosen by the trace) are scored; the
+    rest keep their vector order behind them.
+    """
+    if processor.reranker is None:
+        return
+    longest = max((len(c) for c in candidate_lists), default=0)
+    depth = trace.rerank_depth(longest, queries=len(candidate_lists))
+    if depth < 2:
+        return
+    pairs: List[Tuple[str, str]] = []
+    spans: List[Tuple[List[Dict[str, Any]], int]] = []
+    tables: Dict[str, Any] = {}
+    for text, candidates in zip(texts, candidate_lists):
+        if len(candidates) > 1:
+            spans.append((candidates, len(pairs)))
+            pairs.extend((text, _payload_to_text(c["snippet"], tables)) for c in candidates[:depth])
+    if not pairs:
+        return
+    try:
+        with trace.stage("rerank", cost_key="rerank_pair", items=len(pairs)):
+            scores = processor.reranker.predict(pairs).tolist()
+    except Exception:
+        # Fallback: keep original order
+        return
+    for candidates, offset in spans:
+        head = candidates[:depth]
+        for i, c in enumerate(head):
+            c["score"] = float(scores[offset + i])
+        head.sort(key=lambda x: x["score"], reverse=True)
+        candidates[:depth] = head
+
+
+def find_top_k_semantic(
+    text: str,
+    client: StoreLike,
+    k: int = 10,
+    collection_name: str = "csv_chunks",
+    prefetch: Optional[int] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    trace: Optional[SearchTrace] = None,
+) -> List[Dict[str, Any]]:
+    """Semantic search with optional cross-encoder re-ranking.
+
+    ``trace`` selects the search profile (prefetch when not given, HNSW params,
+    re-rank depth), applies its deadline and collects stage timings.
+    Returns a list of dicts with: file, score, chunk_type, snippet, and metadata.
+    """
+    return find_top_k_semantic_batch(
+        texts=[text],
+        client=client,
+        k=k,
+        collection_name=collection_name,
+        prefetch=prefetch,
+        processor=processor,
+        trace=trace,
+    )[0]
+
+
+def find_top_k_semantic_batch(
+    texts: Sequence[str],
+    client: StoreLike,
+    k: int = 10,
+    collection_name: str = "csv_chunks",
+    prefetch: Optional[int] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    trace: Optional[SearchTrace] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Batched find_top_k_semantic: one forward pass and one Qdrant round-trip.
+
+    Returns one candidate list per input text, in input order.
+    """
+    if not texts:
+        return []
+    if processor is None:
+        processor = get_processor()
+    if trace is None:
+        trace = SearchTrace()
+    profile = trace.plan_search()
+    if prefetch is None:
+        prefetch = profile.prefetch
+
+    store = as_vector_store(client)
+    # The version behind the alias, resolved once per search so the query, its
+    # projection and the payload dictionary all come from the same version
+    collection = store.get_alias(collection_name) or collection_name
+    with trace.stage("embed"):
+        query_vecs = processor.embedder.encode(list(texts), show_progress_bar=False)
+        projection = get_projection(store, collection)
+        if projection is not None:
+            query_vecs = projection.apply(query_vecs)
+
+    prefetch = max(prefetch, k)
+    with trace.stage("search", cost_key=f"search:{profile.name}"):
+        hits = store.query_batch(
+            collection, query_vecs, limit=prefetch, profile=profile, shards=trace.shards
+        )
+        hits = decode_hits(get_payload_dictionary(store, collection), hits)
+    if trace.shards:
+        # Sharded stores already skipped the other shards; unsharded ones did not
+        router = get_router()
+        allowed = router.resolve(trace.shards)
+        hits = [
+            [h for h in points if router.key_for((h.payload or {}).get("csv_file", "")) in allowed]
+            for points in hits
+        ]
+
+    candidate_lists = [_to_candidates(h) for h in hits]
     # Re-rank with cross-encoder if available
-    if processor.cross_encoder is not None and len(candidates) > 1:
-        pairs = [(text, payload_to_text(c["snippet"])) for c in candidates]
-        try:
-            scores = processor.cross_encoder.predict(pairs).tolist()  # type: ignore[union-attr]
-            for i, s in enumerate(scores):
-                candidates[i]["score"] = float(s)
-            candidates.sort(key=lambda x: x["score"], reverse=True)
-        except Exception:
-            # Fallback: keep original order
-            pass
+    _rerank_batch(texts, candidate_lists, processor, trace)
+    return [candidates[:k] for candidates in candidate_lists]
+
+
+# Tables served from memory (e.g. restored from a snapshot) instead of the archives
+_tables: Dict[str, pd.DataFrame] = {}
+_table_loaders: Dict[str, Callable[[], pd.DataFrame]] = {}
+
 
-    return candidates[:k]
+def register_table(csv_filename: str, df: pd.DataFrame) -> None:
+    _tables[csv_filename] = df
+
+
+def register_table_loader(csv_filename: str, loader: Callable[[], pd.DataFrame]) -> None:
+    """Serve ``csv_filename`` from ``loader()``, called on its first use (e.g. a table in a snapshot)."""
+    _tables.pop(csv_filename, None)
+    _table_loaders[csv_filename] = loader
 
 
 def _load_df_for_file(csv_filename: str) -> pd.DataFrame:
-    """Load a CSV by filename from the default archives folder."""
-    csv_path = os.path.join(os.path.dirname(__file__), "archives", csv_filename)
-    return pd.read_csv(csv_path)
+    """Load a table by filename from the registered tables or the archives folder."""
+    if csv_filename in _tables:
+        with TABLE_LOAD_SECONDS.time(source="memory"):
+            return _tables[csv_filename]
+    loader = _table_loaders.get(csv_filename)
+    if loader is not None:
+        with TABLE_LOAD_SECONDS.time(source="snapshot"), tracing.span("table_load", file=csv_filename):
+            # Two first uses at once may both parse it; either result is kept
+            return _tables.setdefault(csv_filename, loader())
+    with TABLE_LOAD_SECONDS.time(source="archive"), tracing.span("table_load", file=csv_filename):
+        return read_table(os.path.join(ARCHIVES_DIR, csv_filename))
 
 
 def _format_row_with_header(df: pd.DataFrame, row_idx: int) -> str:
@@ -373,10 +724,12 @@ def _format_row_with_header(df: pd.DataFrame, row_idx: int) -> str:
 
 def find_top_k_rows(
     text: str,
-    client: QdrantClient,
+    client: StoreLike,
     k: int = 10,
     collection_name: str = "csv_chunks",
-    prefetch: int = 50,
+    prefetch: Optional[int] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    trace: Optional[SearchTrace] = None,
 ) -> List[Dict[str, Any]]:
     """Row-level semantic search.
 
@@ -385,15 +738,225 @@ def find_top_k_rows(
     - Re-ranks (optional cross-encoder already applied in candidate selection)
     - Returns the full row with headers as a formatted string plus original file
     """
+    if trace is None:
+        trace = SearchTrace()
+    ordered, df_cache = select_top_k_rows(
+        text=text,
+        client=client,
+        k=k,
+        collection_name=collection_name,
+        prefetch=prefetch,
+        processor=processor,
+        trace=trace,
+    )
+    with trace.stage("format"):
+        return list(hydrate_rows(ordered, df_cache))
+
+
+def select_top_k_rows(
+    text: str,
+    client: StoreLike,
+    k: int = 10,
+    collection_name: str = "csv_chunks",
+    prefetch: Optional[int] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    trace: Optional[SearchTrace] = None,
+) -> Tuple[List[Tuple[Tuple[str, int], float]], Dict[str, Any]]:
+    """Ranking half of find_top_k_rows, without formatting the rows.
+
+    Returns the ordered ((csv_file, row_index), score) pairs, at most k of them,
+    and the DataFrames they refer to, ready for hydrate_rows.
+    """
+    if trace is None:
+        trace = SearchTrace()
+    profile = trace.plan_search()
+    if prefetch is None:
+        prefetch = profile.row_prefetch
+
+    lexical = serving_lexical_index(as_vector_store(client), collection_name) if profile.lexical != "off" else None
+    exact = _exact_rows(text, k, lexical, profile, trace)
+    if exact is not None:
+        return exact
+
     # First, get a broader set of candidates
     candidates = find_top_k_semantic(
         text=text,
         client=client,
         k=max(k, 10),
         collection_name=collection_name,
-        prefetch=max(prefetch, 50),
+        prefetch=prefetch,
+        processor=processor,
+        trace=trace,
+    )
+    df_cache: Dict[str, pd.DataFrame] = {}
+    with trace.stage("rows"):
+        lexical_rankings = _lexical_rankings(text, prefetch, lexical, profile, trace)
+        ordered = _order_rows(text, candidates, k, df_cache, lexical_rankings)
+    return ordered, df_cache
+
+
+def _exact_rows(
+    text: str,
+    k: int,
+    lexical: Optional[BM25Index],
+    profile: SearchProfile,
+    trace: SearchTrace,
+) -> Optional[Tuple[List[Tuple[Tuple[str, int], float]], Dict[str, Any]]]:
+    """Answer exact lookups (names, ids, dates) from the lexical index alone.
+
+    Only rows that also contain the rest of the query qualify, so a question
+    that merely mentions a date or a name still gets the hybrid search; the
+    fast profile (lexical="exact") answers from any row holding the values.
+    Returns (ordered, rows) like select_top_k_rows, with the stored row texts
+    as the row source, or None when the query is not an exact lookup.
+    """
+    if lexical is None:
+        return None
+    with trace.stage("lexical"):
+        hits = lexical.exact_lookup(
+            text, limit=k, files=_routed_files(lexical, trace), complete=profile.lexical != "exact"
+        )
+    if not hits:
+        return None
+    trace.lexical = "exact"
+    files = {file for (file, _), _s in hits}
+    return hits, {file: lexical.rows_for_file(file) for file in files}
+
+
+def _routed_files(lexical: BM25Index, trace: SearchTrace) -> Optional[Set[str]]:
+    """Files of the lexical index that the trace's routing hints allow, or None."""
+    if not trace.shards:
+        return None
+    router = get_router()
+    allowed = router.resolve(trace.shards)
+    return {f for f in lexical.files() if router.key_for(f) in allowed}
+
+
+def _lexical_rankings(
+    text: str,
+    limit: int,
+    lexical: Optional[BM25Index],
+    profile: SearchProfile,
+    trace: SearchTrace,
+) -> List[List[Tuple[Tuple[str, int], float]]]:
+    """BM25 ranking and rows holding the query's identifying values, to fuse with the dense one."""
+    if lexical is None or profile.lexical != "hybrid":
+        return []
+    files = _routed_files(lexical, trace)
+    rankings = [
+        ranking
+        for ranking in (
+            lexical.search(text, limit=limit, files=files),
+            lexical.exact_lookup(text, limit=limit, files=files),
+        )
+        if ranking
+    ]
+    if rankings:
+        trace.lexical = "fused"
+    return rankings
+
+
+def hydrate_rows(
+    ordered: List[Tuple[Tuple[str, int], float]],
+    df_cache: Dict[str, Any],
+) -> Iterator[Dict[str, Any]]:
+    """Yield the formatted result rows one at a time, in ranking order.
+
+    ``df_cache`` maps each file to its DataFrame or, for lexical answers, to
+    the already formatted rows keyed by row index.
+    """
+    for (file, row_idx), agg_score in ordered:
+        df = df_cache.get(file)
+        if isinstance(df, pd.DataFrame):
+            if row_idx < 0 or row_idx >= len(df):
+                continue
+            row_text = _format_row_with_header(df, row_idx)
+        else:
+            row_text = None if df is None else df.get(row_idx)
+            if row_text is None:
+                continue
+        yield {
+            "file": file,
+            "row_index": int(row_idx),
+            "value": row_text,
+            "score": float(agg_score),
+        }
+
+
+def find_top_k_rows_batch(
+    texts: Sequence[str],
+    client: StoreLike,
+    k: int = 10,
+    collection_name: str = "csv_chunks",
+    prefetch: Optional[int] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    trace: Optional[SearchTrace] = None,
+) -> List[Dict[str, Any]]:
+    """Row-level search for many queries at once.
+
+    Candidates for all valid texts are fetched with find_top_k_semantic_batch.
+    Each query ranks its rows over its own table cache, as a single call would
+    (the date expansion of _order_rows scans every table it has loaded), while
+    the tables themselves are loaded once for the batch. Returns one entry per
+    input text, in input order: {"results": [...]} or {"error": "..."}.
+    """
+    if trace is None:
+        trace = SearchTrace()
+    profile = trace.plan_search()
+    if prefetch is None:
+        prefetch = profile.row_prefetch
+    out: List[Dict[str, Any]] = [
+        {"error": "'text' must be a non-empty string"} for _ in texts
+    ]
+    lexical = serving_lexical_index(as_vector_store(client), collection_name) if profile.lexical != "off" else None
+    valid: List[Tuple[int, str]] = []
+    for i, t in enumerate(texts):
+        if not isinstance(t, str) or not t.strip():
+            continue
+        exact = _exact_rows(t, k, lexical, profile, trace)
+        if exact is not None:
+            out[i] = {"results": list(hydrate_rows(*exact))}
+        else:
+            valid.append((i, t))
+    candidate_lists = find_top_k_semantic_batch(
+        texts=[t for _, t in valid],
+        client=client,
+        k=max(k, 10),
+        collection_name=collection_name,
+        prefetch=prefetch,
+        processor=processor,
+        trace=trace,
     )
+    loaded: Dict[str, pd.DataFrame] = {}
+    for (i, text), candidates in zip(valid, candidate_lists):
+        try:
+            df_cache: Dict[str, pd.DataFrame] = {}
+            with trace.stage("rows"):
+                lexical_rankings = _lexical_rankings(text, prefetch, lexical, profile, trace)
+                ordered = _order_rows(text, candidates, k, df_cache, lexical_rankings, loaded)
+            with trace.stage("format"):
+                out[i] = {"results": list(hydrate_rows(ordered, df_cache))}
+        except Exception as e:
+            out[i] = {"error": str(e)}
+    return out
+
+
+def _order_rows(
+    text: str,
+    candidates: List[Dict[str, Any]],
+    k: int,
+    df_cache: Dict[str, pd.DataFrame],
+    lexical_rankings: Sequence[List[Tuple[Tuple[str, int], float]]] = (),
+    loaded: Optional[Dict[str, pd.DataFrame]] = None,
+) -> List[Tuple[Tuple[str, int], float]]:
+    """Turn chunk candidates into the top-k (csv_file, row_index) pairs for ``text``.
 
+    ``df_cache`` maps file name to its loaded DataFrame and is filled on demand
+    with the files this query ranks; ``loaded`` (shared by a batch) supplies
+    tables already read for other queries. ``lexical_rankings`` (BM25, exact
+    value matches) are fused with the dense row ranking through reciprocal
+    rank fusion.
+    """
     # Aggregate per (file, row_index)
     row_scores: Dict[Tuple[str, int], float] = {}
     # Track which files are involved
@@ -422,19 +985,26 @@ def find_top_k_rows(
                 for r in range(start, end + 1):
                     row_scores[(file, r)] = row_scores.get((file, r), 0.0) + per_row
 
+    if lexical_rankings:
+        dense_ranked = sorted(row_scores.items(), key=lambda x: x[1], reverse=True)
+        row_scores = dict(reciprocal_rank_fusion([dense_ranked, *lexical_rankings]))
+
     # Get a broader preliminary ranking to support expansion heuristics
     prelim_ranked: List[Tuple[Tuple[str, int], float]] = sorted(
         row_scores.items(), key=lambda x: x[1], reverse=True
     )[: max(k * 2, 20)]
 
     # Load each file once
-    df_cache: Dict[str, pd.DataFrame] = {}
+    if loaded is None:
+        loaded = df_cache
     for (file, _), _s in prelim_ranked:
         if file not in df_cache:
-            try:
-                df_cache[file] = _load_df_for_file(file)
-            except Exception:
-                pass
+            if file not in loaded:
+                try:
+                    loaded[file] = _load_df_for_file(file)
+                except Exception:
+                    continue
+            df_cache[file] = loaded[file]
 
     # Heuristic: detect a dominant person name and target year from the query,
     # then include all rows for that person (and year, if present) at the top.
@@ -499,10 +1069,8 @@ def find_top_k_rows(
     # Preserve chronological order if competency exists
     if chosen_file and chosen_file in df_cache and "competency" in df_cache[chosen_file].columns:
         df = df_cache[chosen_file]
-        try:
+        with contextlib.suppress(Exception):
             expanded_rows.sort(key=lambda t: str(df.iloc[t[1]]["competency"]))
-        except Exception:
-            pass
 
     # If no chosen_name but we have a specific date, include all rows matching the date in any cached file
     if not chosen_name and query_date:
@@ -528,18 +1096,4 @@ def find_top_k_rows(
             seen.add(item[0])
             ordered.append(item)
 
-    # Format final results up to k
-    results: List[Dict[str, Any]] = []
-    for (file, row_idx), agg_score in ordered[:k]:
-        df = df_cache.get(file)
-        if df is None or row_idx < 0 or row_idx >= len(df):
-            continue
-        row_text = _format_row_with_header(df, row_idx)
-        results.append({
-            "file": file,
-            "row_index": int(row_idx),
-            "value": row_text,
-            "score": float(agg_score),
-        })
-
-    return results
+    return ordered[:k]
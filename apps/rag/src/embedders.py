@@ -0,0 +1,184 @@
+"""Embedders and rerankers behind CSVChunkProcessor.
+
+The processor only relies on the small interfaces below, which
+sentence-transformers' ``SentenceTransformer`` and ``CrossEncoder`` already
+satisfy. Implementations are looked up by name in a registry:
+
+- embedders (RAG_EMBEDDER): ``sentence-transformers`` (default) and
+  ``hashing``, a deterministic bag-of-features embedder that needs no model
+  weights (RAG_HASHING_DIM dimensions, 256 by default);
+- rerankers (RAG_RERANKER): ``cross-encoder`` (default), ``overlap`` (query
+  token overlap, no weights) and ``none``.
+
+``hashing`` and ``overlap`` are meant for tests and benchmarks: they run the
+whole ingestion and search pipeline at large scale in seconds, but they only
+match words, not meaning. An index version must be searched with the
+embedder it was built with; the hashing dimension differs from the default
+model's so a mismatch fails instead of returning noise.
+"""
+
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Tuple, Union
+
+import numpy as np
+
+from lexical_index import tokenize
+from model_backends import BackendConfig, cross_encoder_class, load_model, sentence_transformer_class
+
+DEFAULT_EMBEDDER = "sentence-transformers"
+DEFAULT_RERANKER = "cross-encoder"
+
+logger = logging.getLogger("rag.models")
+
+
+class Embedder(Protocol):
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        ...
+
+    def encode(self, sentences: Union[str, Sequence[str]], **kwargs: Any) -> np.ndarray:
+        """One vector for a string, a (n, dim) matrix for a list of strings."""
+        ...
+
+
+class Reranker(Protocol):
+    def predict(self, pairs: Sequence[Tuple[str, str]], **kwargs: Any) -> np.ndarray:
+        """Relevance score of each (query, passage) pair; higher is better."""
+        ...
+
+
+# ---------------------------
+# Weight-free implementations
+# ---------------------------
+@lru_cache(maxsize=1 << 17)
+def _token_features(token: str, dim: int, ngram: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(buckets, signed weights) of a token: the word itself plus its character n-grams."""
+    features = [token]
+    if ngram and len(token) > ngram:
+        padded = f"<{token}>"
+        features.extend(padded[i:i + ngram] for i in range(len(padded) - ngram + 1))
+    buckets = np.empty(len(features), dtype=np.int64)
+    weights = np.empty(len(features), dtype=np.float32)
+    for i, feature in enumerate(features):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        buckets[i] = h % dim
+        # The word counts as much as all its n-grams together
+        weight = 1.0 if i == 0 else 1.0 / (len(features) - 1)
+        # A hash bit picks the sign so collisions cancel out on average
+        weights[i] = weight if (h >> 63) & 1 else -weight
+    return buckets, weights
+
+
+class HashingEmbedder:
+    """Deterministic embedder: hashed words and character n-grams, L2-normalized."""
+
+    def __init__(self, dim: int = 256, ngram: int = 3) -> None:
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+        self.ngram = ngram
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences: Union[str, Sequence[str]], **kwargs: Any) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts: Sequence[str] = [sentences] if single else list(sentences)  # type: ignore[list-item]
+        buckets: List[np.ndarray] = []
+        weights: List[np.ndarray] = []
+        counts = np.zeros(len(texts), dtype=np.int64)
+        for i, text in enumerate(texts):
+            for token in tokenize(text):
+                b, w = _token_features(token, self.dim, self.ngram)
+                buckets.append(b)
+                weights.append(w)
+                counts[i] += len(b)
+        size = len(texts) * self.dim
+        if buckets:
+            # Flat (row, bucket) index; bincount sums repeated features
+            flat = np.repeat(np.arange(len(texts), dtype=np.int64) * self.dim, counts) + np.concatenate(buckets)
+            out = np.bincount(flat, weights=np.concatenate(weights), minlength=size)
+        else:
+            out = np.zeros(size)
+        out = out.astype(np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        out /= np.where(norms == 0, 1.0, norms)
+        return out[0] if single else out
+
+
+class TokenOverlapReranker:
+    """Scores a pair by the fraction of query tokens found in the passage."""
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], **kwargs: Any) -> np.ndarray:
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        for i, (query, passage) in enumerate(pairs):
+            q = set(tokenize(query))
+            if q:
+                scores[i] = len(q & set(tokenize(passage))) / len(q)
+        return scores
+
+
+# ---------------------------
+# Registry
+# ---------------------------
+# Factories take (model name, BackendConfig) and return an Embedder / Reranker
+EmbedderFactory = Callable[[str, BackendConfig], Embedder]
+RerankerFactory = Callable[[str, BackendConfig], Optional[Reranker]]
+
+
+def _sentence_transformer(model_name: str, backend: BackendConfig) -> Embedder:
+    return load_model(sentence_transformer_class(), model_name, backend)
+
+
+def _hashing(_model_name: str, _backend: BackendConfig) -> Embedder:
+    return HashingEmbedder(dim=int(os.getenv("RAG_HASHING_DIM", "256")))
+
+
+def _cross_encoder(model_name: str, backend: BackendConfig) -> Optional[Reranker]:
+    cls = cross_encoder_class()
+    if cls is None:
+        return None
+    try:
+        return load_model(cls, model_name, backend)
+    except Exception as e:
+        # Searches fall back to vector order
+        logger.error("Cross-encoder não carregado (%s): %s", backend.backend, e,
+                     extra={"model": model_name, "backend": backend.backend})
+        return None
+
+
+EMBEDDERS: Dict[str, EmbedderFactory] = {
+    "sentence-transformers": _sentence_transformer,
+    "hashing": _hashing,
+}
+RERANKERS: Dict[str, RerankerFactory] = {
+    "cross-encoder": _cross_encoder,
+    "overlap": lambda _name, _backend: TokenOverlapReranker(),
+    "none": lambda _name, _backend: None,
+}
+
+
+def register_embedder(name: str, factory: EmbedderFactory) -> None:
+    EMBEDDERS[name] = factory
+
+
+def register_reranker(name: str, factory: RerankerFactory) -> None:
+    RERANKERS[name] = factory
+
+
+def create_embedder(model_name: str, backend: BackendConfig, name: Optional[str] = None) -> Embedder:
+    """Embedder ``name`` (default: RAG_EMBEDDER) for ``model_name``."""
+    name = (name or os.getenv("RAG_EMBEDDER", DEFAULT_EMBEDDER)).strip().lower()
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder '{name}', expected one of {sorted(EMBEDDERS)}")
+    return EMBEDDERS[name](model_name, backend)
+
+
+def create_reranker(model_name: str, backend: BackendConfig, name: Optional[str] = None) -> Optional[Reranker]:
+    """Reranker ``name`` (default: RAG_RERANKER) for ``model_name``; None disables re-ranking."""
+    name = (name or os.getenv("RAG_RERANKER", DEFAULT_RERANKER)).strip().lower()
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{name}', expected one of {sorted(RERANKERS)}")
+    return RERANKERS[name](model_name, backend)
@@ -0,0 +1,402 @@
+"""Zero-downtime rebuilds through versioned collections and an alias.
+
+Every rebuild ingests into a fresh collection named ``<alias>_v<timestamp>``.
+Searches keep using the alias (``csv_chunks``), which is switched over
+atomically only after the new version has been validated. The newest
+versions are kept for rollback and older ones are garbage-collected.
+
+Usage:
+    python src/index_versions.py rebuild
+    python src/index_versions.py rollback
+    python src/index_versions.py list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from csv_chunk_processor import (
+    CSVChunkProcessor,
+    ProgressCallback,
+    StoreLike,
+    archive_csv_paths,
+    get_processor,
+    log_progress,
+    process_csvs_as_chunks,
+)
+from lexical_index import drop_lexical_index, get_lexical_index, save_lexical_index, set_lexical_index
+from logs import configure_logging
+from payload_codec import drop_payload_dictionary, file_selector, get_payload_dictionary, set_payload_dictionary
+from projection import Projection, drop_projection, get_projection, projection_from_env, set_projection
+from table_reader import read_table
+from vector_store import VectorStore, as_vector_store, open_default_store
+
+DEFAULT_ALIAS = "csv_chunks"
+VERSION_MARK = "_v"
+
+
+class IndexBuildError(RuntimeError):
+    """A rebuild failed or did not pass validation; the alias was not touched."""
+
+
+def keep_versions() -> int:
+    return max(1, int(os.getenv("RAG_KEEP_VERSIONS", "2")))
+
+
+def version_name(alias: str = DEFAULT_ALIAS) -> str:
+    """New version name; names sort in creation order."""
+    now = time.time()
+    stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime(now))
+    return f"{alias}{VERSION_MARK}{stamp}{int(now * 1000) % 1000:03d}"
+
+
+def list_versions(store: VectorStore, alias: str = DEFAULT_ALIAS) -> List[str]:
+    prefix = alias + VERSION_MARK
+    return sorted(name for name in store.list_collections() if name.startswith(prefix))
+
+
+def validate_version(store: VectorStore, name: str, expected_chunks: int) -> None:
+    """Check that a built version is complete and searchable before serving it."""
+    count = store.count(name)
+    if count == 0 or count != expected_chunks:
+        raise IndexBuildError(f"{name} has {count} points, expected {expected_chunks}")
+    # A stored vector must find itself (or an identical one): catches broken
+    # vectors or a wrong metric
+    ids, vectors, _ = next(store.scroll(name, batch_size=1))
+    hits = store.query_batch(name, np.asarray(vectors), limit=1)
+    if not hits or not hits[0] or (hits[0][0].id != ids[0] and hits[0][0].score < 0.999):
+        raise IndexBuildError(f"{name} failed the self-retrieval probe")
+
+
+def activate(store: VectorStore, alias: str, version: str) -> None:
+    """Point the alias (and its lexical index) at ``version``.
+
+    The version's saved lexical index, payload dictionary and projection are
+    loaded here, so a rollback or a restart serves them like a fresh build.
+    """
+    if store.get_alias(alias) is None and alias in store.list_collections():
+        # One-time migration from the unversioned collection of the same name
+        store.delete_collection(alias)
+    store.set_alias(alias, version)
+    set_lexical_index(store, alias, get_lexical_index(store, version))
+    set_payload_dictionary(store, alias, get_payload_dictionary(store, version))
+    set_projection(store, alias, get_projection(store, version))
+
+
+def collect_garbage(store: VectorStore, alias: str = DEFAULT_ALIAS, keep: Optional[int] = None) -> List[str]:
+    """Delete all but the newest ``keep`` versions; never the active one."""
+    keep = keep_versions() if keep is None else keep
+    active = store.get_alias(alias)
+    versions = list_versions(store, alias)
+    deleted = []
+    for name in versions[: max(0, len(versions) - keep)]:
+        if name == active:
+            continue
+        store.delete_collection(name)
+        drop_lexical_index(store, name)
+        drop_payload_dictionary(store, name)
+        drop_projection(store, name)
+        deleted.append(name)
+    return deleted
+
+
+# ---------------------------
+# Version manifests
+# ---------------------------
+MANIFEST_FILE = "manifest.json"
+
+
+def file_fingerprint(csv_path: str) -> Dict[str, Any]:
+    """Name, size and SHA-256 of a source table."""
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"csv_file": os.path.basename(csv_path), "size": os.path.getsize(csv_path), "sha256": digest.hexdigest()}
+
+
+def embedder_id(processor: CSVChunkProcessor) -> str:
+    """What the vectors of a version depend on: embedder class, model name and dimension."""
+    return f"{type(processor.embedder).__name__}:{processor.embedding_model_name}:{processor.embedding_dim}"
+
+
+def _file_entry(fingerprint: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    return {**fingerprint, "rows": result["total_rows"], "columns": result["total_columns"],
+            "chunks": result["total_chunks"]}
+
+
+def load_manifest(store: VectorStore, version: str) -> Optional[Dict[str, Any]]:
+    """What ``version`` was built from (embedder, chunking, one entry per file), or None if unknown."""
+    directory = store.artifacts_dir(version)
+    if directory is None or not (directory / MANIFEST_FILE).exists():
+        return None
+    return json.loads((directory / MANIFEST_FILE).read_text(encoding="utf-8"))
+
+
+def save_manifest(store: VectorStore, version: str, manifest: Dict[str, Any]) -> None:
+    """Write the manifest next to the version's vectors; stores without a disk keep none."""
+    directory = store.artifacts_dir(version)
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, directory / MANIFEST_FILE)
+
+
+def version_is_current(
+    csv_paths: List[str],
+    alias: str = DEFAULT_ALIAS,
+    client: Optional[StoreLike] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    **chunk_shape: Any,
+) -> bool:
+    """Whether the version the alias serves was built from exactly these files,
+    unchanged, with the same embedder and chunking, so a rebuild would redo it."""
+    store = as_vector_store(client if client is not None else open_default_store())
+    version = store.get_alias(alias)
+    manifest = load_manifest(store, version) if version is not None else None
+    if manifest is None:
+        return False
+    if processor is None:
+        processor = get_processor()
+    if manifest["embedder"] != embedder_id(processor) or manifest["chunking"] != chunk_shape:
+        return False
+    built = {(f["csv_file"], f["size"], f["sha256"]) for f in manifest["files"]}
+    current = set()
+    for path in csv_paths:
+        if not os.path.isfile(path):
+            return False
+        fingerprint = file_fingerprint(path)
+        current.add((fingerprint["csv_file"], fingerprint["size"], fingerprint["sha256"]))
+    return built == current
+
+
+def sample_chunk_texts(
+    csv_paths: List[str],
+    processor: CSVChunkProcessor,
+    size: int,
+    seed: int = 0,
+    **chunk_options: Any,
+) -> List[str]:
+    """Uniform sample of at most ``size`` chunk texts across ``csv_paths``."""
+    texts: List[str] = []
+    for csv_path in csv_paths:
+        try:
+            df = read_table(csv_path)
+        except Exception:
+            # Reported by the ingestion itself
+            continue
+        chunks = processor.build_chunks(df=df, csv_filename=Path(csv_path).name, **chunk_options)
+        texts.extend(c["text"] for c in chunks)
+    if len(texts) <= size:
+        return texts
+    rng = np.random.default_rng(seed)
+    return [texts[i] for i in sorted(rng.choice(len(texts), size=size, replace=False))]
+
+
+def fit_projection(csv_paths: List[str], processor: Optional[CSVChunkProcessor] = None,
+                   **chunk_options: Any) -> Optional[Projection]:
+    """The projection RAG_PROJECTION asks for; PCA is fitted on a sample of the chunks."""
+    kind = os.getenv("RAG_PROJECTION", "").strip().lower()
+    if not kind:
+        return None
+    if processor is None:
+        processor = get_processor()
+    sample = None
+    if kind == "pca":
+        texts = sample_chunk_texts(
+            csv_paths, processor, int(os.getenv("RAG_PROJECTION_SAMPLE", "4096")), **chunk_options
+        )
+        sample = processor.embedder.encode(texts, show_progress_bar=False) if texts else None
+    return projection_from_env(int(processor.embedding_dim), sample)
+
+
+def rebuild_index(
+    csv_paths: Optional[List[str]] = None,
+    alias: str = DEFAULT_ALIAS,
+    client: Optional[StoreLike] = None,
+    keep: Optional[int] = None,
+    **chunk_options: Any,
+) -> Tuple[Dict[str, Any], StoreLike]:
+    """Ingest into a new version, validate it, swap the alias and clean up.
+
+    Raises IndexBuildError, after dropping the partial version, when any file
+    fails to ingest or validation fails; searches keep using the old version.
+    Returns a summary and the client, like process_csvs_as_chunks.
+    """
+    if client is None:
+        client = open_default_store()
+    store = as_vector_store(client)
+    version = version_name(alias)
+    while store.collection_exists(version):
+        time.sleep(0.001)
+        version = version_name(alias)
+    previous = store.get_alias(alias)
+
+    if csv_paths is None:
+        csv_paths = archive_csv_paths()
+    chunk_shape = {
+        key: chunk_options[key]
+        for key in ("id_column", "rows_per_window", "include_cell_chunks", "include_row_windows")
+        if key in chunk_options
+    }
+    processor = chunk_options.get("processor") or get_processor()
+    # Fingerprinted before ingestion: a file changed meanwhile no longer matches the manifest
+    fingerprints = {p: file_fingerprint(p) for p in csv_paths if os.path.isfile(p)}
+    projection = fit_projection(csv_paths, processor, **chunk_shape)
+    if projection is not None:
+        set_projection(store, version, projection, persist=True)
+
+    results, _ = process_csvs_as_chunks(
+        csv_paths=csv_paths, collection_name=version, client=store, **chunk_options
+    )
+    try:
+        failed = [r for r in results if "error" in r]
+        if failed:
+            raise IndexBuildError(
+                "; ".join(f"{r['csv_path']}: {r['error']}" for r in failed)
+            )
+        validate_version(store, version, sum(r["total_chunks"] for r in results))
+        save_manifest(store, version, {
+            "embedder": embedder_id(processor),
+            "chunking": chunk_shape,
+            "files": sorted((_file_entry(fingerprints[r["csv_path"]], r) for r in results),
+                            key=lambda f: f["csv_file"]),
+        })
+    except Exception:
+        if store.collection_exists(version):
+            store.delete_collection(version)
+        drop_lexical_index(store, version)
+        drop_payload_dictionary(store, version)
+        drop_projection(store, version)
+        raise
+
+    activate(store, alias, version)
+    deleted = collect_garbage(store, alias, keep)
+    summary = {
+        "alias": alias,
+        "version": version,
+        "previous": previous,
+        "deleted": deleted,
+        "projection": None if projection is None else {
+            "kind": projection.kind, "dim": projection.dim, "dtype": projection.dtype,
+        },
+        "files": results,
+    }
+    return summary, client
+
+
+def update_files(
+    changed: List[str],
+    deleted: List[str],
+    alias: str = DEFAULT_ALIAS,
+    client: Optional[StoreLike] = None,
+    processor: Optional[CSVChunkProcessor] = None,
+    progress: Optional[ProgressCallback] = log_progress,
+) -> Dict[str, Any]:
+    """Re-ingest ``changed`` CSV paths and drop ``deleted`` file names in place.
+
+    Only the points (and lexical rows) of those files are touched, in the
+    version the alias currently points to; a file that fails to ingest is
+    reported in ``errors`` and leaves the other files untouched.
+    """
+    if client is None:
+        client = open_default_store()
+    if processor is None:
+        processor = get_processor()
+    store = as_vector_store(client)
+    target = store.get_alias(alias) or alias
+    # Only maintain a lexical index that covers every file; a partial one
+    # would answer exact lookups from the updated files alone
+    lexical = get_lexical_index(store, target)
+    manifest = load_manifest(store, target)
+    entries = {f["csv_file"]: f for f in manifest["files"]} if manifest is not None else {}
+    notify = progress or (lambda event: None)
+    summary: Dict[str, Any] = {"version": target, "updated": [], "deleted": [], "errors": []}
+
+    for csv_filename in deleted:
+        selector = file_selector(store, target, csv_filename)
+        if selector is not None:
+            store.delete_by_field(target, *selector)
+        if lexical is not None:
+            lexical.remove_file(csv_filename)
+        entries.pop(csv_filename, None)
+        summary["deleted"].append(csv_filename)
+    for csv_path in changed:
+        try:
+            notify({"event": "file_started", "csv_path": csv_path})
+            fingerprint = file_fingerprint(csv_path)
+            result = processor.process_csv_to_qdrant(
+                csv_path=csv_path,
+                collection_name=target,
+                client=store,
+                lexical_index=lexical,
+                progress=progress,
+                replace_existing=True,
+            )
+            notify({"event": "file_done", "csv_path": csv_path, "result": result})
+            summary["updated"].append(result)
+            entries[fingerprint["csv_file"]] = _file_entry(fingerprint, result)
+        except Exception as e:
+            notify({"event": "file_failed", "csv_path": csv_path, "error": str(e)})
+            summary["errors"].append({"csv_path": csv_path, "error": str(e)})
+            # Its points may be half replaced: the version no longer matches any copy of it
+            entries.pop(os.path.basename(csv_path), None)
+    if lexical is not None:
+        save_lexical_index(store, target)
+    if manifest is not None:
+        manifest["files"] = sorted(entries.values(), key=lambda f: f["csv_file"])
+        save_manifest(store, target, manifest)
+    return summary
+
+
+def rollback(client: StoreLike, alias: str = DEFAULT_ALIAS) -> str:
+    """Point the alias back at the version built before the active one."""
+    store = as_vector_store(client)
+    active = store.get_alias(alias)
+    older = [v for v in list_versions(store, alias) if active is None or v < active]
+    if not older:
+        raise IndexBuildError(f"No version of '{alias}' older than {active} to roll back to")
+    activate(store, alias, older[-1])
+    return older[-1]
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage versioned RAG index collections")
+    parser.add_argument("command", choices=["rebuild", "rollback", "list"])
+    parser.add_argument("--alias", default=DEFAULT_ALIAS)
+    parser.add_argument("--keep", type=int, default=None)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    client = open_default_store()
+    store = as_vector_store(client)
+    if args.command == "rebuild":
+        try:
+            summary, _ = rebuild_index(alias=args.alias, client=client, keep=args.keep)
+        except IndexBuildError as e:
+            print(f"[ERRO] {e}")
+            return 1
+        print(f"[OK] {args.alias} -> {summary['version']} (removidas: {summary['deleted']})")
+    elif args.command == "rollback":
+        print(f"[OK] {args.alias} -> {rollback(client, args.alias)}")
+    else:
+        active = store.get_alias(args.alias)
+        for name in list_versions(store, args.alias):
+            print(("* " if name == active else "  ") + name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
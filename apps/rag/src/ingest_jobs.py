@@ -0,0 +1,177 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from csv_chunk_processor import CSVChunkProcessor
+from table_reader import table_shape
+
+
+class IngestBusy(Exception):
+    """Raised when an ingestion job is already queued or running."""
+
+    def __init__(self, job: "IngestJob") -> None:
+        super().__init__(f"Ingestion job {job.id} is {job.state}")
+        self.job = job
+
+
+class IngestJob:
+    """State and progress of one ingestion run, updated from ingestion events.
+
+    ``kind`` is "rebuild" (a new index version holding ``csv_paths``) or
+    "update" (re-ingest ``csv_paths`` and drop the ``deleted`` file names in
+    the current version).
+    """
+
+    def __init__(self, csv_paths: List[str], kind: str = "rebuild",
+                 deleted: Optional[List[str]] = None) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.csv_paths = list(csv_paths)
+        self.deleted = list(deleted or [])
+        self.state = "pending"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.current_file: Optional[str] = None
+        self.files_done = 0
+        self.rows_total = 0
+        self.rows_done = 0
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.version: Optional[str] = None
+        self.errors: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def plan(self, id_column: str = "id", rows_per_window: int = 20) -> None:
+        """Count rows and expected chunks up front, so progress has a total."""
+        for path in self.csv_paths:
+            try:
+                # Parquet/Arrow answer from metadata; a CSV parsed here is cached for the ingestion
+                n_rows, columns = table_shape(path)
+            except Exception:
+                # Reported by the ingestion itself
+                continue
+            self.rows_total += n_rows
+            self.chunks_total += CSVChunkProcessor.count_chunks(
+                n_rows, columns, id_column=id_column, rows_per_window=rows_per_window
+            )
+
+    def on_progress(self, event: Dict[str, Any]) -> None:
+        """ProgressCallback for process_csvs_as_chunks."""
+        with self._lock:
+            kind = event["event"]
+            if kind == "file_started":
+                self.current_file = event["csv_path"]
+            elif kind == "chunks_done":
+                self.chunks_done += int(event["chunks"])
+            elif kind == "file_done":
+                self.files_done += 1
+                self.rows_done += int(event["result"]["total_rows"])
+            elif kind == "file_failed":
+                self.files_done += 1
+                self.errors.append({"csv_path": event["csv_path"], "error": event["error"]})
+
+    def embed_rate(self) -> Optional[float]:
+        """Chunks embedded per second so far."""
+        if self.started_at is None or not self.chunks_done:
+            return None
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.chunks_done / elapsed if elapsed > 0 else None
+
+    def eta_s(self) -> Optional[float]:
+        rate = self.embed_rate()
+        if self.state != "running" or not rate:
+            return None
+        return max(0.0, (self.chunks_total - self.chunks_done) / rate)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            rate, eta = self.embed_rate(), self.eta_s()
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "state": self.state,
+                "version": self.version,
+                "current_file": self.current_file,
+                "files": {"done": self.files_done, "total": len(self.csv_paths)},
+                "deleted": list(self.deleted),
+                "rows": {"done": self.rows_done, "total": self.rows_total},
+                "chunks": {"done": self.chunks_done, "total": self.chunks_total},
+                "embed_rate": None if rate is None else round(rate, 1),
+                "eta_s": None if eta is None else round(eta, 1),
+                "errors": list(self.errors),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class IngestJobManager:
+    """Runs ingestion jobs one at a time on a dedicated thread.
+
+    ``runner(job)`` performs the ingestion (typically a versioned rebuild that
+    reports through ``job.on_progress``) and returns a summary with the new
+    ``version``. Searches keep being served from the current index version
+    until the runner swaps it.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[IngestJob], Dict[str, Any]],
+        on_success: Optional[Callable[[IngestJob], None]] = None,
+        history: int = 20,
+    ) -> None:
+        self.runner = runner
+        self.on_success = on_success
+        self.history = history
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-ingest")
+
+    def submit(self, csv_paths: List[str], kind: str = "rebuild",
+               deleted: Optional[List[str]] = None) -> IngestJob:
+        with self._lock:
+            active = self.active()
+            if active is not None:
+                raise IngestBusy(active)
+            job = IngestJob(csv_paths, kind=kind, deleted=deleted)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: IngestJob) -> None:
+        job.started_at = time.time()
+        job.state = "running"
+        try:
+            job.plan()
+            summary = self.runner(job)
+            job.version = summary.get("version")
+            job.state = "succeeded"
+        except Exception as e:
+            job.errors.append({"error": str(e)})
+            job.state = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.current_file = None
+        if job.state == "succeeded" and self.on_success is not None:
+            self.on_success(job)
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        return list(self._jobs.values())
+
+    def active(self) -> Optional[IngestJob]:
+        for job in self._jobs.values():
+            if job.state in ("pending", "running"):
+                return job
+        return None
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,354 @@
+import gzip
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from vector_store import VectorStore
+
+RowKey = Tuple[str, int]
+
+_TOKEN_RE = re.compile(r"\w+(?:[-/.:]\w+)*")
+_WORD_RE = re.compile(r"\w+")
+
+# Words that never identify a row on their own (pt/en question filler)
+STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "di", "e", "em", "no", "na", "nos",
+    "nas", "por", "para", "com", "sem", "sobre", "qual", "quais", "que", "quem", "quando", "onde", "como", "ha",
+    "existe", "algum", "alguma", "dia", "mes", "ano", "the", "of", "and", "in", "on", "for", "to", "is", "are",
+    "what", "which", "who", "when",
+})
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents so 'Bônus' and 'bonus' compare equal."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split into word tokens, keeping dates, ids and decimals whole (2025-06-28, E001, 6.2)."""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _is_identifying(value: str, tokens: List[str]) -> bool:
+    """Whether a cell value is specific enough to answer an exact lookup on its own.
+
+    Ids (E001), dates and long numbers (2025-06-28), e-mails and multi-word
+    proper names (Ana Souza, Smartphone Galaxy S24) are. Single words are not,
+    however long: a category such as "Tecnologia" also appears in generic
+    questions ("artigos sobre tecnologia"), which need the ranked search.
+    """
+    if not tokens or all(t in STOPWORDS for t in tokens):
+        return False
+    if "@" in value:
+        return True
+    if len(tokens) == 1:
+        token = tokens[0]
+        if any(ch.isdigit() for ch in token):
+            # Ids (E001) and dates (2025-06-28); bare small numbers are too common
+            return any(ch.isalpha() for ch in token) or len(token) >= 6
+        return False
+    # A proper name: every significant word is capitalized (not a sentence)
+    words = [w for w in _WORD_RE.findall(value) if w[0].isalpha() and normalize(w) not in STOPWORDS]
+    return bool(words) and all(w[0].isupper() for w in words)
+
+
+class BM25Index:
+    """In-memory BM25 index over table rows, plus an exact cell-value lookup.
+
+    Documents are rows, identified by (csv_file, row_index), and their text is
+    the formatted row ("col: value | ..."), which is also kept so that lexical
+    answers can be returned without reading the source file again.
+    """
+
+    MAX_NGRAM = 6
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[RowKey, int]] = {}
+        self._doc_len: Dict[RowKey, int] = {}
+        self._total_len = 0
+        self._rows: Dict[str, Dict[int, str]] = {}
+        self._values: Dict[str, Set[RowKey]] = {}
+        self._doc_values: Dict[RowKey, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    # ---------------------------
+    # Indexing
+    # ---------------------------
+    def add_row(self, csv_file: str, row_index: int, row_text: str, values: List[Any]) -> None:
+        key = (csv_file, int(row_index))
+        with self._lock:
+            if key in self._doc_len:
+                self._remove_doc(key)
+            counts = Counter(tokenize(row_text))
+            for token, tf in counts.items():
+                self._postings.setdefault(token, {})[key] = tf
+            length = sum(counts.values())
+            self._doc_len[key] = length
+            self._total_len += length
+            self._rows.setdefault(csv_file, {})[key[1]] = row_text
+
+            doc_values: List[str] = []
+            for value in values:
+                tokens = tokenize(value)
+                if len(tokens) <= self.MAX_NGRAM and _is_identifying(str(value), tokens):
+                    norm = " ".join(tokens)
+                    self._values.setdefault(norm, set()).add(key)
+                    doc_values.append(norm)
+            self._doc_values[key] = doc_values
+
+    def replace_file(self, csv_file: str, rows: List[Tuple[str, List[Any]]]) -> None:
+        """Swap the rows of ``csv_file`` for ``rows`` (text, values); searches see old or new, never a mix."""
+        with self._lock:
+            self.remove_file(csv_file)
+            for row_index, (row_text, values) in enumerate(rows):
+                self.add_row(csv_file, row_index, row_text, values)
+
+    def remove_file(self, csv_file: str) -> None:
+        with self._lock:
+            for row_index in list(self._rows.get(csv_file, {})):
+                self._remove_doc((csv_file, row_index))
+            self._rows.pop(csv_file, None)
+
+    def _remove_doc(self, key: RowKey) -> None:
+        length = self._doc_len.pop(key, 0)
+        self._total_len -= length
+        # Only the tokens of this row can reference it
+        for token in set(tokenize(self._rows.get(key[0], {}).get(key[1], ""))):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+        for norm in self._doc_values.pop(key, []):
+            keys = self._values.get(norm)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._values[norm]
+        self._rows.get(key[0], {}).pop(key[1], None)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def row_text(self, csv_file: str, row_index: int) -> Optional[str]:
+        with self._lock:
+            return self._rows.get(csv_file, {}).get(int(row_index))
+
+    def rows_for_file(self, csv_file: str) -> Dict[int, str]:
+        """Row texts of ``csv_file`` by row index (a copy: the file may be re-indexed meanwhile)."""
+        with self._lock:
+            return dict(self._rows.get(csv_file, {}))
+
+    def files(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+    def search(
+        self, text: str, limit: int = 50, files: Optional[Set[str]] = None
+    ) -> List[Tuple[RowKey, float]]:
+        """BM25 ranking of rows for ``text``, optionally only rows of ``files``."""
+        scores = self._bm25(text).items()
+        if files is not None:
+            scores = [(key, s) for key, s in scores if key[0] in files]
+        ranked = sorted(scores, key=lambda x: (-x[1], x[0]))
+        return ranked[:limit]
+
+    def _bm25(self, text: str, only: Optional[Set[RowKey]] = None) -> Dict[RowKey, float]:
+        tokens = [t for t in tokenize(text) if t not in STOPWORDS]
+        scores: Dict[RowKey, float] = {}
+        with self._lock:
+            n = len(self._doc_len)
+            if n == 0 or not tokens:
+                return scores
+            avgdl = self._total_len / n
+            for token in set(tokens):
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                keys = postings if only is None else [key for key in only if key in postings]
+                for key in keys:
+                    tf = postings[key]
+                    norm = tf + self.k1 * (1.0 - self.b + self.b * self._doc_len[key] / avgdl)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        return scores
+
+    def _matched_values(self, tokens: List[str]) -> Tuple[List[str], List[str]]:
+        """Cell values spelled out in the query (longest match first) and its other significant words."""
+        matched: List[str] = []
+        rest: List[str] = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self.MAX_NGRAM, len(tokens) - i), 0, -1):
+                gram = " ".join(tokens[i:i + n])
+                if gram in self._values:
+                    matched.append(gram)
+                    i += n
+                    break
+            else:
+                if tokens[i] not in STOPWORDS:
+                    rest.append(tokens[i])
+                i += 1
+        return matched, rest
+
+    def exact_lookup(
+        self, text: str, limit: int = 10, files: Optional[Set[str]] = None, complete: bool = False
+    ) -> List[Tuple[RowKey, float]]:
+        """Rows that contain every identifying value the query spells out.
+
+        Returns an empty list unless the query names at least one indexed cell
+        value (a name, an id like E001, a date) and some rows of one file match
+        all of the values that file has. Those rows are high-confidence answers
+        and are ranked by BM25. ``files`` restricts the lookup to those files.
+
+        With ``complete`` a row is only returned when it also contains every
+        other significant word of the query, i.e. when the values are
+        essentially the whole question: "bônus do Bruno Lima em 2025-06-28"
+        is answered by the payroll row, "artigos sobre phishing de 2025-06-28"
+        is not answered by a payroll row of that date.
+        """
+        with self._lock:
+            matched, rest = self._matched_values(tokenize(text))
+            if not matched:
+                return []
+            by_file: Dict[str, List[Set[RowKey]]] = {}
+            for norm in matched:
+                per_file: Dict[str, Set[RowKey]] = {}
+                for key in self._values.get(norm, ()):
+                    if files is None or key[0] in files:
+                        per_file.setdefault(key[0], set()).add(key)
+                for csv_file, keys in per_file.items():
+                    by_file.setdefault(csv_file, []).append(keys)
+            if not by_file:
+                return []
+            best = max(len(sets) for sets in by_file.values())
+            hits: Set[RowKey] = set()
+            for sets in by_file.values():
+                if len(sets) == best:
+                    hits |= set.intersection(*sets)
+            if complete:
+                hits = {key for key in hits if all(key in self._postings.get(t, ()) for t in rest)}
+        if not hits:
+            return []
+        bm25 = self._bm25(text, only=hits)
+        ranked = sorted(hits, key=lambda key: (-bm25.get(key, 0.0), key))
+        return [(key, bm25.get(key, 0.0)) for key in ranked[:limit]]
+
+    # ---------------------------
+    # Persistence
+    # ---------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "k1": self.k1,
+                "b": self.b,
+                "rows": [
+                    [csv_file, row_index, text, self._doc_values.get((csv_file, row_index), [])]
+                    for csv_file, rows in self._rows.items()
+                    for row_index, text in rows.items()
+                ],
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BM25Index":
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for csv_file, row_index, text, values in data.get("rows", []):
+            # Stored values are already normalized and filtered
+            index.add_row(csv_file, row_index, text, [])
+            key = (csv_file, int(row_index))
+            index._doc_values[key] = list(values)
+            for norm in values:
+                index._values.setdefault(norm, set()).add(key)
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Tuple[RowKey, float]]],
+    k: int = 60,
+) -> List[Tuple[RowKey, float]]:
+    """Fuse several rankings with RRF: score = sum of 1 / (k + rank)."""
+    fused: Dict[RowKey, float] = {}
+    for ranking in rankings:
+        for rank, (key, _score) in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: (-x[1], x[0]))
+
+
+# ---------------------------
+# Per-store registry; an index is saved as lexical.json.gz in the store's
+# artifacts directory for its collection (VectorStore.artifacts_dir)
+# ---------------------------
+_indexes: Dict[Tuple[str, str], Optional[BM25Index]] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_path(store: VectorStore, collection_name: str) -> Optional[Path]:
+    directory = store.artifacts_dir(collection_name)
+    return directory / "lexical.json.gz" if directory is not None else None
+
+
+def get_lexical_index(store: VectorStore, collection_name: str, create: bool = False) -> Optional[BM25Index]:
+    """Lexical index of a collection of ``store``, loaded from its saved file on first use."""
+    key = (store.location, collection_name)
+    with _indexes_lock:
+        if _indexes.get(key) is None:
+            path = _index_path(store, collection_name)
+            if path is not None and path.exists():
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    _indexes[key] = BM25Index.from_dict(json.load(f))
+            elif create:
+                _indexes[key] = BM25Index()
+        return _indexes.get(key)
+
+
+def set_lexical_index(store: VectorStore, collection_name: str, index: Optional[BM25Index]) -> None:
+    """Register (in memory only) the index of ``collection_name``; None forgets it."""
+    with _indexes_lock:
+        if index is None:
+            _indexes.pop((store.location, collection_name), None)
+        else:
+            _indexes[(store.location, collection_name)] = index
+
+
+def save_lexical_index(store: VectorStore, collection_name: str) -> None:
+    """Write the collection's index next to its vectors, replacing the old file atomically."""
+    with _indexes_lock:
+        index = _indexes.get((store.location, collection_name))
+    path = _index_path(store, collection_name)
+    if index is None or path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def drop_lexical_index(store: VectorStore, collection_name: str) -> None:
+    with _indexes_lock:
+        _indexes.pop((store.location, collection_name), None)
+    path = _index_path(store, collection_name)
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def serving_lexical_index(store: VectorStore, collection_name: str) -> Optional[BM25Index]:
+    """Index for searches on ``collection_name``, resolving its alias on every call.
+
+    Another process (a CLI rebuild or rollback) may have re-pointed the alias,
+    so the version it points to now is looked up each time.
+    """
+    target = store.get_alias(collection_name)
+    return get_lexical_index(store, target if target is not None else collection_name)
@@ -0,0 +1,21 @@
+"""Structured logging for the RAG service and its command-line tools.
+
+Modules log through ``logging.getLogger("rag.<area>")`` and pass context as
+``extra`` fields. ``configure_logging`` attaches one handler to the ``rag``
+logger that writes either ``key=value`` text or one JSON object per line
+(RAG_LOG_FORMAT=json), at RAG_LOG_LEVEL (INFO). The formatters live in the
+shared ``observability.logs`` module.
+"""
+
+import logging
+from typing import Optional
+
+from observability import logs
+
+ROOT_LOGGER = "rag"
+ENV_PREFIX = "RAG"
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.Logger:
+    """Route the ``rag`` loggers to stderr; calling it again only updates the settings."""
+    return logs.configure_logging(ROOT_LOGGER, ENV_PREFIX, level, fmt)
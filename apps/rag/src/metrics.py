@@ -0,0 +1,52 @@
+"""Metrics of the RAG service, rendered by ``GET /metrics``.
+
+The metric types and the Prometheus text format come from the shared
+``observability.metrics`` module; this module only holds the service's
+registry and its metric definitions.
+"""
+
+from observability.metrics import (  # noqa: F401 (re-exported)
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# ---------------------------
+# RAG service metrics
+# ---------------------------
+SEARCH_STAGE_SECONDS = histogram(
+    "rag_search_stage_seconds",
+    "Time spent in each search stage (queue, embed, search, rerank, lexical, rows, format)",
+    ["stage"],
+)
+TABLE_LOAD_SECONDS = histogram(
+    "rag_table_load_seconds",
+    "Time to load a table for row expansion, by source (memory, snapshot or archive)",
+    ["source"],
+)
+TABLE_CACHE = counter(
+    "rag_table_cache_total",
+    "Lookups of the Parquet copy of a CSV, by result (hit or miss)",
+    ["result"],
+)
+HTTP_REQUESTS = counter(
+    "rag_http_requests_total",
+    "HTTP requests served, by method, route and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "rag_http_request_seconds",
+    "HTTP request latency, by method and route",
+    ["method", "route"],
+)
+HTTP_IN_FLIGHT = gauge("rag_http_requests_in_flight", "HTTP requests being served")
+EXECUTOR_IN_FLIGHT = gauge("rag_executor_in_flight", "Jobs running or queued on the search executor")
+EXECUTOR_QUEUED = gauge("rag_executor_queue_depth", "Jobs waiting for a search executor thread")
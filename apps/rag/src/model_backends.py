@@ -0,0 +1,159 @@
+"""Inference backends for the embedding model and the cross-encoder.
+
+Each model is loaded with one of:
+
+- ``torch``: the PyTorch weights (default);
+- ``onnx``: ONNX Runtime on CPU (sentence-transformers exports the model on
+  first load if the repository has no ``onnx/model.onnx``);
+- ``onnx-int8``: ONNX Runtime with dynamically int8-quantized weights. The
+  quantized file is exported once per model and CPU instruction set into
+  RAG_ONNX_DIR and loaded from there afterwards.
+
+The backend is chosen per model with RAG_EMBEDDING_BACKEND and
+RAG_CROSS_ENCODER_BACKEND, and the intra-op thread count with
+RAG_EMBEDDING_THREADS and RAG_CROSS_ENCODER_THREADS (0 keeps the library
+default). ONNX Runtime threads are per session; PyTorch has a single
+process-wide intra-op pool, so a thread count given to a ``torch`` model
+applies to every PyTorch model in the process.
+
+The ONNX backends need ``onnxruntime`` and ``optimum``
+(``uv add -C apps/rag "sentence-transformers[onnx]"``).
+"""
+
+import importlib.util
+import os
+import platform
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+QUANTIZATION_ARCHS = ("arm64", "avx2", "avx512", "avx512_vnni")
+ONNX_DIR = os.getenv("RAG_ONNX_DIR", os.path.join(os.path.dirname(__file__), "onnx_models"))
+
+_export_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    """How one model runs: backend name and intra-op threads (0 = default)."""
+
+    backend: str = "torch"
+    threads: int = 0
+
+    def __post_init__(self) -> None:
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend '{self.backend}', expected one of {BACKENDS}")
+        if self.threads < 0:
+            raise ValueError("threads must be >= 0")
+
+    @classmethod
+    def from_env(cls, model: str) -> "BackendConfig":
+        """Config of ``model`` ("EMBEDDING" or "CROSS_ENCODER") from RAG_<model>_BACKEND/_THREADS."""
+        return cls(
+            backend=os.getenv(f"RAG_{model}_BACKEND", "torch").strip().lower() or "torch",
+            threads=int(os.getenv(f"RAG_{model}_THREADS", "0") or 0),
+        )
+
+
+def onnx_available() -> bool:
+    try:
+        return all(importlib.util.find_spec(m) is not None for m in ("onnxruntime", "optimum.onnxruntime"))
+    except ImportError:
+        return False
+
+
+def _require_onnx(backend: str) -> None:
+    if not onnx_available():
+        raise RuntimeError(
+            f"Model backend '{backend}' requires onnxruntime and optimum "
+            '(uv add -C apps/rag "sentence-transformers[onnx]")'
+        )
+
+
+def quantization_arch() -> str:
+    """Instruction set the int8 weights are quantized for (RAG_ONNX_QUANT_ARCH overrides)."""
+    arch = os.getenv("RAG_ONNX_QUANT_ARCH", "").strip().lower()
+    if arch:
+        if arch not in QUANTIZATION_ARCHS:
+            raise ValueError(f"Unknown RAG_ONNX_QUANT_ARCH '{arch}', expected one of {QUANTIZATION_ARCHS}")
+        return arch
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = next((line.split(":", 1)[1].split() for line in f if line.startswith("flags")), [])
+    except OSError:
+        flags = []
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def sentence_transformer_class() -> Any:
+    """``SentenceTransformer``, imported on first use (it pulls in torch and transformers)."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer
+
+
+def cross_encoder_class() -> Optional[Any]:
+    """``CrossEncoder``, or None when this sentence-transformers build lacks it."""
+    try:
+        from sentence_transformers import CrossEncoder
+    except Exception:
+        return None
+    return CrossEncoder
+
+
+def _set_torch_threads(threads: int) -> None:
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def _onnx_kwargs(threads: int) -> Dict[str, Any]:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        # Models run one request at a time per session; parallelism is intra-op
+        options.inter_op_num_threads = 1
+    return {"provider": "CPUExecutionProvider", "session_options": options}
+
+
+def quantized_model_path(model_cls: Any, model_name: str, onnx_dir: Optional[str] = None) -> Tuple[str, str]:
+    """(model directory, file name) of the int8 ONNX export of ``model_name``, exporting it if missing."""
+    arch = quantization_arch()
+    # AutoQuantizationConfig.avx2 quantizes weights to unsigned int8
+    suffix = f"{'quint8' if arch == 'avx2' else 'qint8'}_{arch}"
+    target = Path(onnx_dir or ONNX_DIR) / model_name.replace("/", "__")
+    file_name = f"onnx/model_{suffix}.onnx"
+    with _export_lock:
+        if not (target / file_name).exists():
+            from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+            model = model_cls(model_name, backend="onnx", model_kwargs={"provider": "CPUExecutionProvider"})
+            model.save(str(target))
+            export_dynamic_quantized_onnx_model(model, arch, str(target), file_suffix=suffix)
+    return str(target), file_name
+
+
+def load_model(model_cls: Any, model_name: str, config: Optional[BackendConfig] = None) -> Any:
+    """Instantiate ``model_cls`` (SentenceTransformer or CrossEncoder) on the configured backend."""
+    config = config or BackendConfig()
+    if config.backend == "torch":
+        if config.threads:
+            _set_torch_threads(config.threads)
+        return model_cls(model_name)
+
+    _require_onnx(config.backend)
+    model_kwargs = _onnx_kwargs(config.threads)
+    if config.backend == "onnx":
+        return model_cls(model_name, backend="onnx", model_kwargs=model_kwargs)
+    path, file_name = quantized_model_path(model_cls, model_name)
+    return model_cls(path, backend="onnx", model_kwargs={**model_kwargs, "file_name": file_name})
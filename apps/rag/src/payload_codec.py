@@ -0,0 +1,183 @@
+"""Dictionary-encoded compact payloads.
+
+A full cell payload repeats the file name, column name and chunk type on
+every point, plus the cell value. In compact mode (RAG_COMPACT_PAYLOADS=1)
+points only carry small integers::
+
+    cell:       {"f": file, "t": 0, "c": column, "r": row_index}
+    row window: {"f": file, "t": 1, "r": row_start, "e": row_end}
+
+File and column codes are resolved through a PayloadDictionary stored once
+per index version (a JSON file next to the version's vectors, and inside
+snapshots). Cell values are read from the row store (the source table)
+instead of the payload. Payloads are decoded right after each search, so
+the rest of the pipeline sees the usual field names.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from vector_store import ScoredHit, VectorStore
+
+CHUNK_TYPES = ["cell", "row_window"]
+
+
+def compact_payloads_enabled() -> bool:
+    return os.getenv("RAG_COMPACT_PAYLOADS", "0") == "1"
+
+
+def is_compact(payload: Dict[str, Any]) -> bool:
+    return "t" in payload and "chunk_type" not in payload
+
+
+class PayloadDictionary:
+    """Codes of the file and column names of one index version."""
+
+    def __init__(self, files: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> None:
+        self.files: List[str] = list(files or [])
+        self.columns: List[str] = list(columns or [])
+        self._file_codes = {name: i for i, name in enumerate(self.files)}
+        self._column_codes = {name: i for i, name in enumerate(self.columns)}
+        self._lock = threading.Lock()
+
+    def _code(self, names: List[str], codes: Dict[str, int], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            with self._lock:
+                code = codes.get(name)
+                if code is None:
+                    code = codes[name] = len(names)
+                    names.append(name)
+        return code
+
+    def file_code(self, csv_file: str) -> int:
+        return self._code(self.files, self._file_codes, csv_file)
+
+    def find_file(self, csv_file: str) -> Optional[int]:
+        return self._file_codes.get(csv_file)
+
+    def encode(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        f = self.file_code(payload["csv_file"])
+        if payload["chunk_type"] == "cell":
+            c = self._code(self.columns, self._column_codes, str(payload["column_name"]))
+            return {"f": f, "t": 0, "c": c, "r": int(payload["row_index"])}
+        return {"f": f, "t": 1, "r": int(payload["row_start"]), "e": int(payload["row_end"])}
+
+    def decode(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        t = payload.get("t")
+        if t is None or "chunk_type" in payload:
+            return payload
+        if t == 0:
+            return {
+                "csv_file": self.files[payload["f"]],
+                "column_name": self.columns[payload["c"]],
+                "row_index": payload["r"],
+                "chunk_type": "cell",
+            }
+        return {
+            "csv_file": self.files[payload["f"]],
+            "row_start": payload["r"],
+            "row_end": payload["e"],
+            "chunk_type": "row_window",
+        }
+
+    def csv_file_of(self, payload: Dict[str, Any]) -> str:
+        return self.files[payload["f"]] if is_compact(payload) else payload.get("csv_file", "")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"files": list(self.files), "columns": list(self.columns)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PayloadDictionary":
+        return cls(data.get("files"), data.get("columns"))
+
+
+# ---------------------------
+# Per-store registry; a dictionary is saved as payload_dictionary.json in the
+# store's artifacts directory for its collection (VectorStore.artifacts_dir)
+# ---------------------------
+_dictionaries: Dict[Tuple[str, str], Optional[PayloadDictionary]] = {}
+_dictionaries_lock = threading.Lock()
+
+
+def _dict_path(store: VectorStore, collection_name: str) -> Optional[Path]:
+    directory = store.artifacts_dir(collection_name)
+    return directory / "payload_dictionary.json" if directory is not None else None
+
+
+def get_payload_dictionary(
+    store: VectorStore, collection_name: str, create: bool = False
+) -> Optional[PayloadDictionary]:
+    """Dictionary of a collection of ``store`` (None for collections with full payloads)."""
+    key = (store.location, collection_name)
+    with _dictionaries_lock:
+        if key not in _dictionaries:
+            path = _dict_path(store, collection_name)
+            _dictionaries[key] = (
+                PayloadDictionary.from_dict(json.loads(path.read_text(encoding="utf-8")))
+                if path is not None and path.exists() else None
+            )
+        dictionary = _dictionaries[key]
+        if dictionary is None and create:
+            dictionary = _dictionaries[key] = PayloadDictionary()
+        return dictionary
+
+
+def set_payload_dictionary(
+    store: VectorStore, collection_name: str, dictionary: Optional[PayloadDictionary]
+) -> None:
+    """Register (in memory only) the dictionary serving ``collection_name``, e.g. an alias."""
+    with _dictionaries_lock:
+        _dictionaries[(store.location, collection_name)] = dictionary
+
+
+def save_payload_dictionary(store: VectorStore, collection_name: str) -> None:
+    """Write the collection's dictionary next to its vectors; stores without a disk keep it in memory."""
+    dictionary = get_payload_dictionary(store, collection_name)
+    path = _dict_path(store, collection_name)
+    if dictionary is None or path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(dictionary.to_dict(), ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def drop_payload_dictionary(store: VectorStore, collection_name: str) -> None:
+    with _dictionaries_lock:
+        _dictionaries.pop((store.location, collection_name), None)
+    path = _dict_path(store, collection_name)
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def serving_dictionary(store: VectorStore, collection_name: str) -> Optional[PayloadDictionary]:
+    """Dictionary for searches on ``collection_name``, resolving its alias on every call.
+
+    The alias may have been re-pointed by another process since the last
+    search, so the dictionary is the one of the version it points to now.
+    """
+    target = store.get_alias(collection_name)
+    return get_payload_dictionary(store, target if target is not None else collection_name)
+
+
+def file_selector(store: VectorStore, collection_name: str, csv_file: str) -> Optional[Tuple[str, Any]]:
+    """(payload field, value) matching the points of ``csv_file``; None if it has none."""
+    dictionary = get_payload_dictionary(store, collection_name)
+    if dictionary is None:
+        return "csv_file", csv_file
+    code = dictionary.find_file(csv_file)
+    return None if code is None else ("f", code)
+
+
+def decode_hits(dictionary: Optional[PayloadDictionary], hits: List[List[ScoredHit]]) -> List[List[ScoredHit]]:
+    """Decode the payloads of search hits in place (hits are per-query objects)."""
+    if dictionary is not None:
+        decode = dictionary.decode
+        for points in hits:
+            for h in points:
+                h.payload = decode(h.payload)
+    return hits
@@ -0,0 +1,154 @@
+"""Dimensionality reduction of stored embeddings (PCA or random projection).
+
+With RAG_PROJECTION set to ``pca`` or ``random``, a rebuild fits a linear
+projection to RAG_PROJECTION_DIM dimensions (PCA on a sample of the new
+version's chunk embeddings; a seeded Gaussian matrix for ``random``) and
+stores the reduced vectors, optionally as float16 (RAG_PROJECTION_DTYPE).
+Query vectors go through the same projection. The projection is persisted
+with the index version (projection.npz next to its vectors, and inside
+snapshots), so a version is always searched with the matrix it was built with.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from vector_store import VectorStore
+
+PROJECTION_KINDS = ("pca", "random")
+
+
+class Projection:
+    """x -> (x - mean) @ components, from ``input_dim`` to ``dim`` dimensions."""
+
+    def __init__(self, kind: str, mean: np.ndarray, components: np.ndarray, dtype: str = "float32") -> None:
+        if kind not in PROJECTION_KINDS:
+            raise ValueError(f"Unknown projection '{kind}', expected one of {PROJECTION_KINDS}")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported vector dtype '{dtype}'")
+        self.kind = kind
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.dtype = dtype
+
+    @property
+    def input_dim(self) -> int:
+        return int(self.components.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.components.shape[1])
+
+    @classmethod
+    def fit_pca(cls, sample: np.ndarray, dim: int, dtype: str = "float32") -> "Projection":
+        """Top principal components of ``sample`` (rows are embeddings)."""
+        sample = np.asarray(sample, dtype=np.float32)
+        dim = min(dim, sample.shape[0], sample.shape[1])
+        mean = sample.mean(axis=0)
+        # Right singular vectors of the centred sample are the principal axes
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        return cls("pca", mean, vt[:dim].T, dtype)
+
+    @classmethod
+    def random(cls, input_dim: int, dim: int, seed: int = 0, dtype: str = "float32") -> "Projection":
+        """Gaussian random projection (Johnson-Lindenstrauss); needs no sample."""
+        rng = np.random.default_rng(seed)
+        components = rng.standard_normal((input_dim, dim)).astype(np.float32) / np.sqrt(dim)
+        return cls("random", np.zeros(input_dim, dtype=np.float32), components, dtype)
+
+    def apply(self, vectors: Any) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return (vectors - self.mean) @ self.components
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "dtype": self.dtype,
+            "mean": self.mean.tolist(),
+            "components": self.components.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Projection":
+        return cls(data["kind"], np.asarray(data["mean"]), np.asarray(data["components"]), data.get("dtype", "float32"))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, kind=self.kind, dtype=self.dtype, mean=self.mean, components=self.components)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        with np.load(path) as data:
+            return cls(str(data["kind"]), data["mean"], data["components"], str(data["dtype"]))
+
+
+def projection_from_env(input_dim: int, sample: Optional[np.ndarray] = None) -> Optional[Projection]:
+    """The projection RAG_PROJECTION asks for, or None when it is unset."""
+    kind = os.getenv("RAG_PROJECTION", "").strip().lower()
+    if not kind:
+        return None
+    dim = int(os.getenv("RAG_PROJECTION_DIM", "128"))
+    dtype = os.getenv("RAG_PROJECTION_DTYPE", "float32")
+    if kind == "random":
+        return Projection.random(input_dim, dim, seed=int(os.getenv("RAG_PROJECTION_SEED", "0")), dtype=dtype)
+    if kind == "pca":
+        if sample is None or len(sample) == 0:
+            raise ValueError("PCA projection needs a sample of embeddings")
+        return Projection.fit_pca(sample, dim, dtype=dtype)
+    raise ValueError(f"Unknown RAG_PROJECTION '{kind}', expected one of {PROJECTION_KINDS}")
+
+
+# ---------------------------
+# Per-store registry; a projection is saved as projection.npz in the store's
+# artifacts directory for its collection (VectorStore.artifacts_dir)
+# ---------------------------
+_projections: Dict[Tuple[str, str], Optional[Projection]] = {}
+_projections_lock = threading.Lock()
+
+
+def _projection_path(store: VectorStore, collection_name: str) -> Optional[Path]:
+    directory = store.artifacts_dir(collection_name)
+    return directory / "projection.npz" if directory is not None else None
+
+
+def get_projection(store: VectorStore, collection_name: str) -> Optional[Projection]:
+    """Projection of a collection of ``store`` (None for full-dimension collections)."""
+    key = (store.location, collection_name)
+    with _projections_lock:
+        if key not in _projections:
+            path = _projection_path(store, collection_name)
+            _projections[key] = Projection.load(path) if path is not None and path.exists() else None
+        return _projections[key]
+
+
+def set_projection(
+    store: VectorStore, collection_name: str, projection: Optional[Projection], persist: bool = False
+) -> None:
+    """Register the projection of ``collection_name``; ``persist`` also writes it next to its vectors."""
+    with _projections_lock:
+        _projections[(store.location, collection_name)] = projection
+    path = _projection_path(store, collection_name)
+    if persist and projection is not None and path is not None:
+        projection.save(path)
+
+
+def drop_projection(store: VectorStore, collection_name: str) -> None:
+    with _projections_lock:
+        _projections.pop((store.location, collection_name), None)
+    path = _projection_path(store, collection_name)
+    if path is not None:
+        path.unlink(missing_ok=True)
+
+
+def serving_projection(store: VectorStore, collection_name: str) -> Optional[Projection]:
+    """Projection for searches on ``collection_name``, resolving its alias on every call.
+
+    Like serving_dictionary: the version behind the alias may have changed.
+    """
+    target = store.get_alias(collection_name)
+    return get_projection(store, target if target is not None else collection_name)
@@ -0,0 +1,192 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Union
+
+import tracing
+from metrics import SEARCH_STAGE_SECONDS
+
+if TYPE_CHECKING:
+    from qdrant_client.models import SearchParams
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    """Knobs that trade retrieval quality for latency.
+
+    - prefetch / row_prefetch: candidates fetched for chunk and row searches.
+    - hnsw_ef: HNSW beam width (None keeps the collection default).
+    - exact: bypass the HNSW index and scan all vectors.
+    - rescore: re-score quantized candidates with the original vectors.
+    - rerank_depth: candidates scored by the cross-encoder (0 disables it).
+    - lexical: "exact" answers any query naming an indexed value (a name, an
+      id, a date) from the BM25 index without the embedder; "hybrid" does so
+      only when the values are essentially the whole query and otherwise
+      fuses the BM25 and exact-match rankings with the dense one; "off" skips it.
+    """
+
+    name: str
+    prefetch: int
+    row_prefetch: int
+    hnsw_ef: Optional[int]
+    exact: bool
+    rescore: Optional[bool]
+    rerank_depth: int
+    lexical: str = "hybrid"
+
+    def search_params(self) -> "SearchParams":
+        from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+        quantization = None
+        if self.rescore is not None:
+            quantization = QuantizationSearchParams(rescore=self.rescore)
+        return SearchParams(hnsw_ef=self.hnsw_ef, exact=self.exact, quantization=quantization)
+
+
+# Ordered from cheapest to most expensive; "balanced" matches the historical
+# behaviour (30/50 candidates, all of them re-ranked).
+PROFILES: Dict[str, SearchProfile] = {
+    "fast": SearchProfile(
+        name="fast", prefetch=10, row_prefetch=20, hnsw_ef=32,
+        exact=False, rescore=False, rerank_depth=0, lexical="exact",
+    ),
+    "balanced": SearchProfile(
+        name="balanced", prefetch=30, row_prefetch=50, hnsw_ef=128,
+        exact=False, rescore=True, rerank_depth=50,
+    ),
+    "accurate": SearchProfile(
+        name="accurate", prefetch=60, row_prefetch=100, hnsw_ef=512,
+        exact=True, rescore=True, rerank_depth=100,
+    ),
+}
+DEFAULT_PROFILE = "balanced"
+
+
+def get_profile(profile: Union[str, SearchProfile, None] = None) -> SearchProfile:
+    """Resolve a profile by name; raises ValueError for unknown names."""
+    if isinstance(profile, SearchProfile):
+        return profile
+    name = profile or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown search profile '{name}', expected one of {list(PROFILES)}")
+    return PROFILES[name]
+
+
+def _cheaper(profile: SearchProfile) -> Optional[SearchProfile]:
+    names = list(PROFILES)
+    if profile.name not in names:
+        return None
+    idx = names.index(profile.name)
+    return PROFILES[names[idx - 1]] if idx > 0 else None
+
+
+class _StageCosts:
+    """Exponentially weighted moving averages of stage latencies (ms)."""
+
+    def __init__(self, alpha: float = 0.2) -> None:
+        self.alpha = alpha
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, value_ms: float) -> None:
+        with self._lock:
+            prev = self._values.get(key)
+            self._values[key] = value_ms if prev is None else prev + self.alpha * (value_ms - prev)
+
+    def get(self, key: str) -> Optional[float]:
+        return self._values.get(key)
+
+
+stage_costs = _StageCosts()
+
+
+class SearchTrace:
+    """Profile, deadline, routing and per-stage timings of a single search.
+
+    The trace starts when the request arrives, so time spent queued for the
+    executor counts against the deadline. Before the expensive stages it
+    steps down to a cheaper profile, or trims the re-rank depth, when the
+    observed cost of that stage would not fit in the remaining budget.
+    """
+
+    def __init__(
+        self,
+        profile: Union[str, SearchProfile, None] = None,
+        deadline_ms: Optional[float] = None,
+        shards: Optional[List[str]] = None,
+    ) -> None:
+        self.profile = get_profile(profile)
+        self.requested_profile = self.profile.name
+        self.started = time.perf_counter()
+        self.deadline = None if not deadline_ms else self.started + deadline_ms / 1000.0
+        self.timings: Dict[str, float] = {}
+        self.downgrades: List[str] = []
+        # How the lexical index contributed: "exact", "fused" or None
+        self.lexical: Optional[str] = None
+        # Routing hints: only these shards (keys, groups or files) are searched
+        self.shards = list(shards) if shards else None
+
+    def remaining_ms(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return (self.deadline - time.perf_counter()) * 1000.0
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed_ms
+        SEARCH_STAGE_SECONDS.observe(elapsed_ms / 1000.0, stage=name)
+
+    def mark_started(self) -> None:
+        """Record the time spent waiting before the work started."""
+        waited_ms = (time.perf_counter() - self.started) * 1000.0
+        self.record("queue", waited_ms)
+        tracing.add_span("queue", waited_ms)
+
+    @contextmanager
+    def stage(self, name: str, cost_key: Optional[str] = None, items: int = 0) -> Iterator[None]:
+        """Time a stage; with ``items`` the learned cost is per item."""
+        t0 = time.perf_counter()
+        try:
+            with tracing.span(name, profile=self.profile.name):
+                yield
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            self.record(name, elapsed)
+            stage_costs.observe(cost_key or name, elapsed / items if items else elapsed)
+
+    def plan_search(self) -> SearchProfile:
+        """Pick the most accurate profile whose embed+search cost fits the budget."""
+        remaining = self.remaining_ms()
+        if remaining is None:
+            return self.profile
+        while True:
+            embed = stage_costs.get("embed") or 0.0
+            search = stage_costs.get(f"search:{self.profile.name}") or 0.0
+            cheaper = _cheaper(self.profile)
+            if embed + search <= remaining or cheaper is None:
+                return self.profile
+            self.downgrades.append(f"{self.profile.name}->{cheaper.name}")
+            self.profile = cheaper
+
+    def rerank_depth(self, candidates: int, queries: int = 1) -> int:
+        """Candidates per query to re-rank within the remaining budget."""
+        depth = min(candidates, self.profile.rerank_depth)
+        remaining = self.remaining_ms()
+        per_pair = stage_costs.get("rerank_pair")
+        if remaining is None or per_pair is None or depth == 0:
+            return depth
+        fits = int(max(remaining, 0.0) / (max(per_pair, 1e-6) * max(queries, 1)))
+        if fits < depth:
+            self.downgrades.append(f"rerank {depth}->{fits}")
+            depth = fits
+        return depth
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile.name,
+            "requested_profile": self.requested_profile,
+            "downgrades": list(self.downgrades),
+            "lexical": self.lexical,
+            "shards": self.shards,
+            "timings_ms": {k: round(v, 3) for k, v in self.timings.items()},
+        }
@@ -0,0 +1,223 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+# How often a producer blocked on a full stream buffer checks whether to give up
+_PUT_POLL_S = 0.1
+
+
+@dataclass(frozen=True)
+class ServingSettings:
+    """Limits applied to model work executed on behalf of HTTP requests.
+
+    - executor_workers: threads dedicated to encoding, re-ranking and CSV loading.
+    - max_in_flight: jobs allowed to be running or queued on the executor.
+    - request_timeout_s: default (and maximum) time a request may wait for its job.
+    - retry_after_s: value of the Retry-After header sent when saturated.
+    - max_batch_size: largest number of queries accepted by one batch request.
+    - max_k / max_prefetch: upper bounds for the per-request ``k`` and ``prefetch``.
+    - default_profile: search profile used when a request does not name one.
+    """
+
+    executor_workers: int = 4
+    max_in_flight: int = 16
+    request_timeout_s: float = 30.0
+    retry_after_s: int = 1
+    max_batch_size: int = 256
+    max_k: int = 1000
+    max_prefetch: int = 5000
+    default_profile: str = "balanced"
+
+    @classmethod
+    def from_env(cls) -> "ServingSettings":
+        workers = int(os.getenv("RAG_EXECUTOR_WORKERS", min(4, os.cpu_count() or 1)))
+        workers = max(1, workers)
+        return cls(
+            executor_workers=workers,
+            max_in_flight=max(1, int(os.getenv("RAG_MAX_IN_FLIGHT", workers * 4))),
+            request_timeout_s=float(os.getenv("RAG_REQUEST_TIMEOUT", "30")),
+            retry_after_s=max(1, int(os.getenv("RAG_RETRY_AFTER", "1"))),
+            max_batch_size=max(1, int(os.getenv("RAG_MAX_BATCH", "256"))),
+            max_k=max(1, int(os.getenv("RAG_MAX_K", "1000"))),
+            max_prefetch=max(1, int(os.getenv("RAG_MAX_PREFETCH", "5000"))),
+            default_profile=os.getenv("RAG_SEARCH_PROFILE", "balanced"),
+        )
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already holds ``max_in_flight`` jobs."""
+
+    def __init__(self, retry_after_s: int) -> None:
+        super().__init__("RAG executor is saturated")
+        self.retry_after_s = retry_after_s
+
+
+class BoundedExecutor:
+    """Dedicated thread pool with an in-flight cap and per-call timeouts.
+
+    A slot is held until the job really finishes, not until the caller stops
+    waiting: a timed-out job still occupies its thread, so it must keep counting
+    against the limit or the queue would grow without bound under overload.
+    """
+
+    def __init__(self, settings: ServingSettings, thread_name_prefix: str = "rag") -> None:
+        self.settings = settings
+        self._pool = ThreadPoolExecutor(
+            max_workers=settings.executor_workers,
+            thread_name_prefix=thread_name_prefix,
+        )
+        self._slots = threading.BoundedSemaphore(settings.max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Jobs accepted but still waiting for a thread."""
+        return max(0, self._in_flight - self._running)
+
+    def _tracked(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _release(self, _fut: Optional[Future] = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Schedule ``fn`` or raise ExecutorSaturated without blocking."""
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(self.settings.retry_after_s)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            # The job sees the caller's context (e.g. the request's trace)
+            fut = self._pool.submit(contextvars.copy_context().run, self._tracked, fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        fut.add_done_callback(self._release)
+        return fut
+
+    def resolve_timeout(self, timeout_ms: Optional[int] = None) -> float:
+        """Per-request timeout in seconds, capped by the configured maximum."""
+        limit = self.settings.request_timeout_s
+        if timeout_ms is None or timeout_ms <= 0:
+            return limit
+        return min(limit, timeout_ms / 1000.0)
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run ``fn`` on the pool and await it.
+
+        Raises ExecutorSaturated when full and asyncio.TimeoutError when the job
+        does not finish within ``timeout`` seconds (None waits indefinitely).
+        A job that has not started yet is cancelled on timeout.
+        """
+        fut = self.submit(fn, *args, **kwargs)
+        return await asyncio.wait_for(asyncio.wrap_future(fut), timeout)
+
+    def stream(
+        self,
+        fn: Callable[..., Iterable[Any]],
+        *args: Any,
+        max_buffer: int = 64,
+        stall_timeout_s: Optional[float] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Iterate ``fn(*args, **kwargs)`` on the pool, yielding items as produced.
+
+        The slot is taken immediately (ExecutorSaturated is raised here, before
+        any item is sent) and held until the producer stops. At most
+        ``max_buffer`` items are buffered, so a slow consumer pauses the producer;
+        closing the returned iterator early stops it. So does a consumer that
+        never starts or stops reading: a full buffer that gets no room for
+        ``stall_timeout_s`` (the request timeout by default), an iterator that is
+        dropped without being closed, or a closed event loop.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        stop = threading.Event()
+        done = object()
+        stall_s = self.settings.request_timeout_s if stall_timeout_s is None else stall_timeout_s
+
+        def put(item: Any, error: Optional[BaseException] = None) -> bool:
+            """Hand an item to the consumer; False when it is gone and the producer must stop."""
+            if stop.is_set() or loop.is_closed():
+                return False
+            fut = asyncio.run_coroutine_threadsafe(queue.put((item, error)), loop)
+            deadline = time.monotonic() + stall_s
+            while True:
+                try:
+                    fut.result(timeout=_PUT_POLL_S)
+                    return True
+                except FutureTimeout:
+                    if stop.is_set() or loop.is_closed() or time.monotonic() >= deadline:
+                        stop.set()
+                        fut.cancel()
+                        if not loop.is_closed():
+                            loop.call_soon_threadsafe(abandon)
+                        return False
+
+        def abandon() -> None:
+            # Runs on the loop: a consumer that comes back ends with an error, not a hang
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait((done, asyncio.TimeoutError("stream consumer stalled")))
+
+        def produce() -> None:
+            try:
+                for item in fn(*args, **kwargs):
+                    if not put(item):
+                        return
+            except BaseException as e:
+                put(done, e)
+                return
+            put(done)
+
+        self.submit(produce)
+
+        async def consume() -> AsyncIterator[Any]:
+            try:
+                while True:
+                    item, error = await queue.get()
+                    if item is done:
+                        if error is not None:
+                            raise error
+                        return
+                    yield item
+            finally:
+                stop.set()
+                # Unblock a producer waiting for room so it can see ``stop``
+                while not queue.empty():
+                    queue.get_nowait()
+
+        items = consume()
+        # A generator that never started does not run its ``finally`` when dropped
+        weakref.finalize(items, stop.set)
+        return items
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,207 @@
+import heapq
+import itertools
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from payload_codec import get_payload_dictionary
+from search_profiles import SearchProfile
+from vector_store import ScoredHit, VectorStore
+
+SHARD_SEP = "__"
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"_+", "_", re.sub(r"[^a-z0-9]+", "_", name.lower())).strip("_") or "default"
+
+
+class ShardRouter:
+    """Maps a CSV file to its shard key: a configured group, or the file stem.
+
+    Routing hints may name a shard key ("payroll"), a group ("hr") or a file
+    ("payroll.csv"); all of them resolve to shard keys.
+    """
+
+    def __init__(self, groups: Optional[Dict[str, Sequence[str]]] = None) -> None:
+        self.groups = {_slug(g): list(files) for g, files in (groups or {}).items()}
+        self._group_of = {f: g for g, files in self.groups.items() for f in files}
+
+    @classmethod
+    def from_env(cls) -> "ShardRouter":
+        """Groups from RAG_SHARD_GROUPS, e.g. "hr=payroll.csv;content=articles.csv,documents.csv"."""
+        groups: Dict[str, List[str]] = {}
+        for part in os.getenv("RAG_SHARD_GROUPS", "").split(";"):
+            if "=" in part:
+                group, files = part.split("=", 1)
+                groups[group.strip()] = [f.strip() for f in files.split(",") if f.strip()]
+        return cls(groups)
+
+    def key_for(self, csv_file: str) -> str:
+        return self._group_of.get(csv_file) or _slug(Path(csv_file).stem)
+
+    def resolve(self, hints: Iterable[str]) -> Set[str]:
+        return {_slug(h) if _slug(h) in self.groups else self.key_for(h) for h in hints}
+
+
+_router: Optional[ShardRouter] = None
+
+
+def get_router() -> ShardRouter:
+    global _router
+    if _router is None:
+        _router = ShardRouter.from_env()
+    return _router
+
+
+class ShardedVectorStore(VectorStore):
+    """Splits each logical collection into one inner collection per shard key.
+
+    Shard ``k`` of collection ``c`` is stored as ``c__k``. Queries fan out to
+    the shards in parallel and the per-shard top-k lists are merged with a
+    heap; routing hints skip the other shards entirely, and deleting or
+    re-ingesting a file only touches its own shard. Aliases are kept per
+    shard (``alias__k`` -> ``version__k``) and swapped in one atomic update.
+    """
+
+    def __init__(self, inner: VectorStore, router: Optional[ShardRouter] = None,
+                 max_workers: Optional[int] = None) -> None:
+        self.inner = inner
+        self.location = inner.location
+        self.router = router or ShardRouter()
+        workers = max_workers or int(os.getenv("RAG_SHARD_THREADS", min(8, (os.cpu_count() or 1) * 2)))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-shard")
+        self._dims: Dict[str, int] = {}
+        self._dtypes: Dict[str, str] = {}
+        # Shard maps are cached per logical name and dropped on every write
+        self._shard_cache: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.RLock()
+
+    def artifacts_dir(self, name: str) -> Optional[Path]:
+        # Kept per logical collection, not per shard
+        return self.inner.artifacts_dir(name)
+
+    def _physical(self, name: str, key: str) -> str:
+        return f"{name}{SHARD_SEP}{key}"
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._shard_cache.clear()
+
+    def shards(self, name: str) -> Dict[str, str]:
+        """Shard key -> inner collection (or shard alias) of a logical collection."""
+        with self._lock:
+            cached = self._shard_cache.get(name)
+            if cached is None:
+                prefix = name + SHARD_SEP
+                names = set(self.inner.list_collections()) | set(self.inner.list_aliases())
+                cached = {n[len(prefix):]: n for n in sorted(names) if n.startswith(prefix)}
+                self._shard_cache[name] = cached
+            return cached
+
+    def ensure_collection(self, name: str, dim: int, dtype: str = "float32") -> None:
+        # Shards are created on first upsert
+        self._dims[name] = int(dim)
+        self._dtypes[name] = dtype
+
+    def collection_exists(self, name: str) -> bool:
+        return name in self._dims or bool(self.shards(name))
+
+    def upsert(self, name, ids, vectors, payloads) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dictionary = get_payload_dictionary(self, name)
+        by_shard: Dict[str, List[int]] = {}
+        for i, payload in enumerate(payloads):
+            csv_file = dictionary.csv_file_of(payload) if dictionary else payload.get("csv_file", "")
+            by_shard.setdefault(self.router.key_for(csv_file), []).append(i)
+        ids, payloads = list(ids), list(payloads)
+        for key, rows in by_shard.items():
+            physical = self._physical(name, key)
+            self.inner.ensure_collection(physical, vectors.shape[1], self._dtypes.get(name, "float32"))
+            self.inner.upsert(physical, [ids[i] for i in rows], vectors[rows], [payloads[i] for i in rows])
+        self._invalidate()
+
+    def query_batch(self, name, vectors, limit, profile: Optional[SearchProfile] = None,
+                    shards: Optional[Sequence[str]] = None) -> List[List[ScoredHit]]:
+        targets = self.shards(name)
+        if shards is not None:
+            wanted = self.router.resolve(shards)
+            targets = {k: v for k, v in targets.items() if k in wanted}
+        n = len(vectors)
+        if not targets:
+            return [[] for _ in range(n)]
+        if len(targets) == 1:
+            return self.inner.query_batch(next(iter(targets.values())), vectors, limit, profile)
+        futures = [
+            self._pool.submit(self.inner.query_batch, physical, vectors, limit, profile)
+            for physical in targets.values()
+        ]
+        per_shard = [f.result() for f in futures]
+        return [
+            heapq.nlargest(limit, itertools.chain.from_iterable(r[i] for r in per_shard), key=lambda h: h.score)
+            for i in range(n)
+        ]
+
+    def delete_by_field(self, name: str, field: str, value: Any, keep_ids=None) -> None:
+        targets = self.shards(name)
+        dictionary = get_payload_dictionary(self, name)
+        csv_file = value if field == "csv_file" else None
+        if field == "f" and dictionary is not None:
+            # Compact payloads select a file by its dictionary code
+            csv_file = dictionary.files[value]
+        if csv_file is not None:
+            key = self.router.key_for(csv_file)
+            targets = {key: targets[key]} if key in targets else {}
+        for physical in targets.values():
+            self.inner.delete_by_field(physical, field, value, keep_ids)
+
+    def count(self, name: str) -> int:
+        return sum(self.inner.count(physical) for physical in self.shards(name).values())
+
+    def scroll(self, name, batch_size=1024):
+        for physical in self.shards(name).values():
+            yield from self.inner.scroll(physical, batch_size)
+
+    def delete_collection(self, name: str) -> None:
+        collections = set(self.inner.list_collections())
+        for physical in self.shards(name).values():
+            if physical in collections:
+                self.inner.delete_collection(physical)
+        if name in collections:
+            # An unsharded collection of the same name (e.g. before sharding was enabled)
+            self.inner.delete_collection(name)
+        else:
+            artifacts = self.inner.artifacts_dir(name)
+            if artifacts is not None:
+                shutil.rmtree(artifacts, ignore_errors=True)
+        self._dims.pop(name, None)
+        self._dtypes.pop(name, None)
+        self._invalidate()
+
+    def list_collections(self) -> List[str]:
+        return sorted({n.rpartition(SHARD_SEP)[0] or n for n in self.inner.list_collections()})
+
+    def list_aliases(self) -> Dict[str, str]:
+        return {
+            alias.rpartition(SHARD_SEP)[0]: target.rpartition(SHARD_SEP)[0]
+            for alias, target in self.inner.list_aliases().items()
+            if SHARD_SEP in alias
+        }
+
+    def set_aliases(self, changes: Dict[str, Optional[str]]) -> None:
+        existing = self.inner.list_aliases()
+        mapping: Dict[str, Optional[str]] = {}
+        for alias, collection in changes.items():
+            prefix = alias + SHARD_SEP
+            # Shards missing from the new version stop being served
+            mapping.update({a: None for a in existing if a.startswith(prefix)})
+            if collection is not None:
+                for key, physical in self.shards(collection).items():
+                    mapping[self._physical(alias, key)] = physical
+        self.inner.set_aliases(mapping)
+        self._invalidate()
@@ -0,0 +1,412 @@
+"""Single-file snapshots of a built index, for instant cold starts.
+
+Layout of a snapshot file:
+- prefix: magic (8 bytes), format version (uint32), header length (uint64)
+- header: small UTF-8 JSON with the collection, shape, manifest, payload
+  dictionary, projection and the offset and length of every section
+- sections, each starting on a 64-byte boundary:
+  - vectors: row-major float32 matrix (count x dim) of L2-normalized vectors
+  - ids: int64 array (or JSON records, for non-integer ids)
+  - payloads, texts: JSON records, with a uint64 array of their offsets
+  - lexical: the version's lexical index as JSON
+  - tables/<file>: each source table as CSV
+
+Importing only parses the header: the file is memory-mapped, so several
+processes serving the same snapshot share one copy in the page cache, and
+payloads, texts and tables are decoded when a search first needs them.
+The snapshot is taken from the version the alias points to: its vectors,
+its lexical index and its manifest, which the source tables must match.
+
+Usage:
+    python src/snapshot.py export --out index.ragsnap [--ingest]
+    python src/snapshot.py inspect index.ragsnap
+"""
+
+import argparse
+import functools
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from csv_chunk_processor import ARCHIVES_DIR, CSVChunkProcessor, StoreLike, register_table_loader
+from index_versions import IndexBuildError, load_manifest, rebuild_index
+from lexical_index import BM25Index, serving_lexical_index, set_lexical_index
+from logs import configure_logging
+from payload_codec import PayloadDictionary, serving_dictionary, set_payload_dictionary
+from projection import Projection, serving_projection, set_projection
+from table_reader import read_table
+from vector_store import NumpyVectorStore, as_vector_store, l2_normalize, open_default_store
+
+MAGIC = b"RAGSNAP\x00"
+FORMAT_VERSION = 2
+_PREFIX = struct.Struct("<8sIQ")
+_ALIGN = 64
+
+
+class SnapshotError(ValueError):
+    """The file is not a snapshot, or was written by an unsupported version."""
+
+
+class _Records(Sequence):
+    """JSON records stored back to back, decoded one at a time on access."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray) -> None:
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return json.loads(self._data[start:end].tobytes())
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self[i] for i in range(len(self)))
+
+
+@dataclass
+class Snapshot:
+    """A loaded snapshot; ``vectors`` and ``data`` are read-only memory maps of the file."""
+
+    path: Path
+    header: Dict[str, Any]
+    vectors: np.ndarray
+    data: np.ndarray
+    base: int
+
+    @property
+    def collection(self) -> str:
+        return self.header["collection"]
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        return self.header["manifest"]
+
+    def section(self, name: str) -> np.ndarray:
+        offset, length = self.header["sections"][name]
+        start = self.base + offset
+        return self.data[start:start + length]
+
+    @functools.cached_property
+    def ids(self) -> List[Any]:
+        if self.header["ids_format"] == "int64":
+            return self.section("ids").view(np.int64).tolist()
+        return list(self._records("ids"))
+
+    @functools.cached_property
+    def payloads(self) -> Sequence[Dict[str, Any]]:
+        return self._records("payloads")
+
+    @functools.cached_property
+    def texts(self) -> Sequence[str]:
+        return self._records("texts")
+
+    def _records(self, name: str) -> _Records:
+        return _Records(self.section(name), self.section(f"{name}.offsets").view(np.uint64))
+
+    def lexical_index(self) -> Optional[BM25Index]:
+        if "lexical" not in self.header["sections"]:
+            return None
+        return BM25Index.from_dict(json.loads(self.section("lexical").tobytes()))
+
+    @property
+    def table_names(self) -> List[str]:
+        return list(self.header.get("tables", []))
+
+    def table(self, name: str) -> pd.DataFrame:
+        return pd.read_csv(io.BytesIO(self.section(f"tables/{name}").tobytes()))
+
+    def tables(self) -> Dict[str, pd.DataFrame]:
+        return {name: self.table(name) for name in self.table_names}
+
+
+def _data_offset(header_len: int) -> int:
+    end = _PREFIX.size + header_len
+    return (end + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _records(values: Sequence[Any]) -> Tuple[bytes, np.ndarray]:
+    """JSON records back to back, and their count + 1 offsets."""
+    encoded = [json.dumps(v, ensure_ascii=False).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return b"".join(encoded), offsets
+
+
+def _chunk_text(df: pd.DataFrame, payload: Dict[str, Any], id_column: str) -> str:
+    """Rebuild the embedded text of a chunk from its payload and source table."""
+    if payload.get("chunk_type") == "cell":
+        text, _ = CSVChunkProcessor._cell_chunk_text(
+            df=df,
+            row_idx=int(payload["row_index"]),
+            col_name=payload["column_name"],
+            csv_filename=payload["csv_file"],
+            id_column=id_column,
+        )
+    else:
+        text, _ = CSVChunkProcessor._row_window_chunk_text(
+            df=df,
+            start_row=int(payload["row_start"]),
+            end_row=int(payload["row_end"]) + 1,
+            csv_filename=payload["csv_file"],
+        )
+    return text
+
+
+def export_snapshot(
+    out_path: Union[str, Path],
+    client: Optional[StoreLike] = None,
+    collection_name: str = "csv_chunks",
+    csv_dir: Union[str, Path, None] = None,
+    id_column: str = "id",
+    embedding_model: str = "all-MiniLM-L6-v2",
+) -> Dict[str, Any]:
+    """Write the version ``collection_name`` serves to ``out_path`` and return its manifest.
+
+    Vectors, payloads and the lexical index are those of the version. The
+    source tables are embedded too and must be the ones the version was
+    built from (per its manifest); a ValueError asks for a rebuild when they
+    changed since. No embedding model is needed.
+    """
+    if client is None:
+        client = open_default_store()
+    store = as_vector_store(client)
+    if not store.collection_exists(collection_name):
+        raise ValueError(f"Collection '{collection_name}' does not exist; ingest first")
+    version = store.get_alias(collection_name) or collection_name
+    built_from = load_manifest(store, version)
+
+    ids: List[Any] = []
+    batches: List[np.ndarray] = []
+    payloads: List[Dict[str, Any]] = []
+    for batch_ids, batch_vectors, batch_payloads in store.scroll(version):
+        ids.extend(batch_ids)
+        batches.append(l2_normalize(batch_vectors))
+        payloads.extend(batch_payloads)
+    if not ids:
+        raise ValueError(f"Collection '{collection_name}' is empty")
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    ids = [ids[i] for i in order]
+    payloads = [payloads[i] for i in order]
+    vectors = np.ascontiguousarray(np.concatenate(batches)[order], dtype=np.float32)
+    # Compact payloads are kept compact in the snapshot, with their dictionary
+    dictionary = serving_dictionary(store, collection_name)
+    decoded = [dictionary.decode(p) for p in payloads] if dictionary is not None else payloads
+
+    csv_dir = Path(csv_dir if csv_dir is not None else ARCHIVES_DIR)
+    entries = {f["csv_file"]: f for f in built_from["files"]} if built_from is not None else {}
+    tables: Dict[str, bytes] = {}
+    frames: Dict[str, pd.DataFrame] = {}
+    files: List[Dict[str, Any]] = []
+    for csv_file in sorted({p["csv_file"] for p in decoded}):
+        raw = (csv_dir / csv_file).read_bytes()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if built_from is not None and entries.get(csv_file, {}).get("sha256") != sha256:
+            raise ValueError(
+                f"{csv_file} changed since {version} was built; rebuild the index (or export with --ingest)"
+            )
+        if csv_file.lower().endswith(".csv"):
+            tables[csv_file] = raw
+            df = frames[csv_file] = pd.read_csv(io.BytesIO(raw))
+        else:
+            # Parquet/Arrow sources are embedded as CSV text like the others
+            df = frames[csv_file] = read_table(str(csv_dir / csv_file))
+            tables[csv_file] = df.to_csv(index=False).encode("utf-8")
+        files.append(entries.get(csv_file) or {
+            "csv_file": csv_file,
+            "sha256": sha256,
+            "size": len(raw),
+            "rows": int(len(df)),
+            "columns": int(len(df.columns)),
+            "chunks": sum(1 for p in decoded if p["csv_file"] == csv_file),
+        })
+    texts = [_chunk_text(frames[p["csv_file"]], p, id_column) for p in decoded]
+    lexical = serving_lexical_index(store, collection_name)
+    if lexical is None:
+        # Collections ingested without one (or before indexes were saved)
+        lexical = BM25Index()
+        for csv_file, df in frames.items():
+            CSVChunkProcessor.index_rows_lexically(df, csv_file, lexical)
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        # Versioned collection behind the alias, if the index was built by rebuild_index
+        "version": store.get_alias(collection_name),
+        "embedding_model": embedding_model,
+        "id_column": id_column,
+        "files": files,
+    }
+    if built_from is not None:
+        manifest["embedder"] = built_from.get("embedder")
+    int_ids = all(isinstance(i, int) for i in ids)
+    sections: List[Tuple[str, Union[bytes, np.ndarray]]] = [
+        ("vectors", vectors),
+        ("ids", np.asarray(ids, dtype=np.int64) if int_ids else b""),
+    ]
+    if not int_ids:
+        sections[-1:] = list(zip(("ids", "ids.offsets"), _records(ids)))
+    sections += list(zip(("payloads", "payloads.offsets"), _records(payloads)))
+    sections += list(zip(("texts", "texts.offsets"), _records(texts)))
+    sections.append(("lexical", json.dumps(lexical.to_dict(), ensure_ascii=False).encode("utf-8")))
+    sections += [(f"tables/{name}", raw) for name, raw in tables.items()]
+
+    layout: Dict[str, List[int]] = {}
+    offset = 0
+    for name, data in sections:
+        size = data.nbytes if isinstance(data, np.ndarray) else len(data)
+        layout[name] = [offset, size]
+        offset = (offset + size + _ALIGN - 1) // _ALIGN * _ALIGN
+    header = {
+        "collection": collection_name,
+        "dim": int(vectors.shape[1]),
+        "count": int(vectors.shape[0]),
+        "dtype": "float32",
+        "ids_format": "int64" if int_ids else "json",
+        "manifest": manifest,
+        "tables": list(tables),
+        "sections": layout,
+    }
+    if dictionary is not None:
+        header["payload_dictionary"] = dictionary.to_dict()
+    projection = serving_projection(store, collection_name)
+    if projection is not None:
+        # Reduced vectors are stored as float32 here; queries need the same projection
+        header["projection"] = projection.to_dict()
+    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    base = _data_offset(len(blob))
+
+    out_path = Path(out_path)
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        for name, data in sections:
+            f.write(b"\0" * (base + layout[name][0] - f.tell()))
+            if isinstance(data, np.ndarray):
+                data.tofile(f)
+            else:
+                f.write(data)
+    # Readers never see a half-written snapshot
+    os.replace(tmp_path, out_path)
+    return manifest
+
+
+def load_snapshot(path: Union[str, Path]) -> Snapshot:
+    """Parse the header of a snapshot and memory-map the rest of the file."""
+    path = Path(path)
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise SnapshotError(f"{path} is not a RAG snapshot")
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a RAG snapshot")
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    base = _data_offset(header_len)
+    count, dim = int(header["count"]), int(header["dim"])
+    vectors = np.memmap(
+        path, dtype=np.float32, mode="r", offset=base + header["sections"]["vectors"][0], shape=(count, dim)
+    )
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    return Snapshot(path=path, header=header, vectors=vectors, data=data, base=base)
+
+
+def install_snapshot(
+    path: Union[str, Path],
+    store: Optional[NumpyVectorStore] = None,
+) -> NumpyVectorStore:
+    """Load a snapshot and make it the serving index of this process.
+
+    The vectors are attached read-only to ``store`` (a new in-memory store by
+    default), and the lexical index and source tables are registered so that
+    searches need neither the archives folder nor a re-ingestion. Payloads
+    and tables stay in the file until a search reads them.
+    """
+    snap = load_snapshot(path)
+    if store is None:
+        store = NumpyVectorStore(readonly=True)
+    store.attach(snap.collection, snap.vectors, snap.ids, snap.payloads)
+    set_lexical_index(store, snap.collection, snap.lexical_index())
+    data = snap.header.get("payload_dictionary")
+    set_payload_dictionary(store, snap.collection, PayloadDictionary.from_dict(data) if data is not None else None)
+    data = snap.header.get("projection")
+    set_projection(store, snap.collection, Projection.from_dict(data) if data is not None else None)
+    for name in snap.table_names:
+        register_table_loader(name, functools.partial(snap.table, name))
+    return store
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def _cmd_export(args: argparse.Namespace) -> int:
+    client = None
+    if args.ingest:
+        try:
+            _, client = rebuild_index(alias=args.collection)
+        except IndexBuildError as e:
+            print(f"[ERRO] {e}; snapshot not written")
+            return 1
+    try:
+        manifest = export_snapshot(
+            args.out, client=client, collection_name=args.collection, csv_dir=args.csv_dir
+        )
+    except ValueError as e:
+        print(f"[ERRO] {e}; snapshot not written")
+        return 1
+    chunks = sum(f["chunks"] for f in manifest["files"])
+    print(f"[OK] {args.out}: {chunks} chunks from {len(manifest['files'])} files")
+    return 0
+
+
+def _cmd_inspect(args: argparse.Namespace) -> int:
+    snap = load_snapshot(args.path)
+    info = {
+        "collection": snap.collection,
+        "count": snap.header["count"],
+        "dim": snap.header["dim"],
+        "manifest": snap.manifest,
+    }
+    print(json.dumps(info, indent=2, ensure_ascii=False))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export or inspect RAG index snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="write the built index to a snapshot file")
+    export.add_argument("--out", required=True)
+    export.add_argument("--collection", default="csv_chunks")
+    export.add_argument("--csv-dir", default=None, help="source CSVs (default: src/archives)")
+    export.add_argument("--ingest", action="store_true", help="ingest the archives before exporting")
+    export.set_defaults(func=_cmd_export)
+
+    inspect = sub.add_parser("inspect", help="print the manifest of a snapshot")
+    inspect.add_argument("path")
+    inspect.set_defaults(func=_cmd_inspect)
+
+    args = parser.parse_args(argv)
+    configure_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
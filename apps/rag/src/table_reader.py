@@ -0,0 +1,236 @@
+"""Reading the tabular files the RAG service ingests: CSV, Parquet and Arrow IPC.
+
+Parquet (``.parquet``) and Arrow IPC (``.arrow``, ``.feather``, ``.ipc``)
+files are read through memory-mapped Arrow, in record batches and with
+optional column projection, so no text has to be parsed. A CSV is parsed
+once and cached as Parquet (keyed by its path, size and mtime) under
+RAG_TABLE_CACHE_DIR (``<RAG_DATA_DIR>/table_cache``); later reads of the
+unchanged file come from the cache.
+
+The Arrow formats need ``pyarrow``. Without it CSVs are read with pandas as
+before (and not cached), and Arrow files raise a clear error.
+
+Usage:
+    python src/table_reader.py convert src/archives/*.csv
+    python src/table_reader.py convert payroll.csv --out-dir src/archives
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import TABLE_CACHE
+from vector_store import data_dir
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except Exception:
+    pa = None  # type: ignore
+    pq = None  # type: ignore
+    ARROW_AVAILABLE = False
+
+PARQUET_EXTENSIONS = (".parquet",)
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+TABLE_EXTENSIONS = (".csv",) + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+DEFAULT_BATCH_ROWS = 65536
+# None: a table_cache folder in the data dir
+CACHE_DIR: Optional[str] = os.getenv("RAG_TABLE_CACHE_DIR") or None
+
+
+def is_table_file(path: str) -> bool:
+    return path.lower().endswith(TABLE_EXTENSIONS)
+
+
+def _require_arrow(path: str) -> None:
+    if not ARROW_AVAILABLE:
+        raise RuntimeError(f"Reading {Path(path).name} requires pyarrow (uv sync -C apps/rag --extra arrow)")
+
+
+def _cache_enabled() -> bool:
+    return ARROW_AVAILABLE and os.getenv("RAG_PARQUET_CACHE", "1") != "0"
+
+
+# ---------------------------
+# Arrow formats
+# ---------------------------
+def _arrow_batches(path: str, columns: Optional[Sequence[str]], batch_rows: int):
+    """(schema, record batch iterator) of a memory-mapped Parquet or Arrow IPC file."""
+    _require_arrow(path)
+    if path.lower().endswith(PARQUET_EXTENSIONS):
+        parquet = pq.ParquetFile(path, memory_map=True)
+        schema = parquet.schema_arrow
+        if columns is not None:
+            schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+        return schema, parquet.iter_batches(batch_size=batch_rows, columns=columns)
+
+    source = pa.memory_map(path)
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        # Streaming IPC format (no footer)
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+    schema = reader.schema
+    if columns is not None:
+        schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+
+    def projected():
+        for batch in batches:
+            if columns is not None:
+                batch = batch.select(list(columns))
+            # Slices of a memory-mapped batch are zero-copy
+            for offset in range(0, batch.num_rows, batch_rows):
+                yield batch.slice(offset, batch_rows)
+
+    return schema, projected()
+
+
+def _arrow_source(path: str) -> Optional[str]:
+    """The Arrow file to read ``path`` from, or None to parse it with pandas."""
+    if not path.lower().endswith(".csv"):
+        return path
+    if not _cache_enabled():
+        return None
+    cached = cached_parquet(path)
+    return None if cached == path else cached
+
+
+def _csv_dtypes(path: str, columns: Optional[Sequence[str]], batch_rows: int) -> Dict[str, Any]:
+    """Column dtypes of the whole CSV, from a first pass over its chunks.
+
+    Chunks parsed separately can disagree on a column (an int column turns
+    float in the chunk holding a missing value); reading every chunk with
+    the dtypes of the whole file formats values as one read_csv would.
+    """
+    dtypes: Dict[str, Any] = {}
+    for chunk in pd.read_csv(path, usecols=columns, chunksize=batch_rows):
+        for name, dtype in chunk.dtypes.items():
+            seen = dtypes.setdefault(name, dtype)
+            if seen == dtype:
+                continue
+            numeric = all(
+                pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in (seen, dtype)
+            )
+            dtypes[name] = np.dtype("float64") if numeric else np.dtype(object)
+    return dtypes
+
+
+def iter_batches(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Yield a table file as DataFrames of at most ``batch_rows`` rows."""
+    source = _arrow_source(path)
+    if source is None:
+        dtypes = _csv_dtypes(path, columns, batch_rows)
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_rows, dtype=dtypes)
+        return
+    _, batches = _arrow_batches(source, columns, batch_rows)
+    for batch in batches:
+        yield batch.to_pandas()
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read a whole table file (optionally only ``columns``) into a DataFrame."""
+    source = _arrow_source(path)
+    if source is None:
+        return pd.read_csv(path, usecols=columns)
+    schema, batches = _arrow_batches(source, columns, DEFAULT_BATCH_ROWS)
+    return pa.Table.from_batches(list(batches), schema=schema).to_pandas()
+
+
+def table_shape(path: str) -> Tuple[int, List[str]]:
+    """(rows, columns) of a table file; Arrow formats answer from metadata alone."""
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        _require_arrow(path)
+        metadata = pq.ParquetFile(path, memory_map=True).metadata
+        return metadata.num_rows, list(metadata.schema.to_arrow_schema().names)
+    if lower.endswith(ARROW_EXTENSIONS):
+        schema, batches = _arrow_batches(path, None, DEFAULT_BATCH_ROWS)
+        return sum(b.num_rows for b in batches), list(schema.names)
+    df = read_table(path)
+    return len(df), list(df.columns)
+
+
+# ---------------------------
+# CSV -> Parquet cache
+# ---------------------------
+def _cache_prefix(csv_path: str) -> str:
+    """File name prefix of the cached copies of one CSV; same-named CSVs in other folders get their own."""
+    source = hashlib.sha256(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+    return f"{Path(csv_path).name}.{source}"
+
+
+def _cache_path(csv_path: str, cache_dir: str) -> Path:
+    st = os.stat(csv_path)
+    return Path(cache_dir) / f"{_cache_prefix(csv_path)}.{st.st_size}-{st.st_mtime_ns}.parquet"
+
+
+def convert_csv_to_parquet(csv_path: str, out_path: str, row_group_rows: int = DEFAULT_BATCH_ROWS) -> str:
+    """Parse a CSV with pandas (the dtypes ingestion has always seen) and write it as Parquet."""
+    _require_arrow(out_path)
+    df = pd.read_csv(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    out = Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_rows)
+    os.replace(tmp, out)
+    return str(out)
+
+
+def cached_parquet(csv_path: str, cache_dir: Optional[str] = None) -> str:
+    """Path of the Parquet copy of ``csv_path``, converting it on first use.
+
+    Copies of older versions of the same CSV are removed. If the CSV cannot
+    be represented in Arrow (e.g. mixed-type columns), the CSV path itself is
+    returned and read with pandas.
+    """
+    cache_dir = cache_dir or CACHE_DIR or str(data_dir() / "table_cache")
+    target = _cache_path(csv_path, cache_dir)
+    if target.exists():
+        TABLE_CACHE.inc(result="hit")
+        return str(target)
+    TABLE_CACHE.inc(result="miss")
+    try:
+        convert_csv_to_parquet(csv_path, str(target))
+    except (pa.ArrowException, ValueError, TypeError):
+        return csv_path
+    for stale in Path(cache_dir).glob(f"{_cache_prefix(csv_path)}.*.parquet"):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+    return str(target)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert CSV files to Parquet")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="fill the Parquet cache, or write <stem>.parquet into --out-dir")
+    convert.add_argument("csv_paths", nargs="+")
+    convert.add_argument("--out-dir", default=None)
+    args = parser.parse_args()
+
+    for csv_path in args.csv_paths:
+        if args.out_dir:
+            out = convert_csv_to_parquet(csv_path, os.path.join(args.out_dir, Path(csv_path).stem + ".parquet"))
+        else:
+            _require_arrow(csv_path)
+            out = cached_parquet(csv_path)
+        print(f"[OK] {csv_path} -> {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Request-scoped spans of the RAG service (see ``observability.tracing``).
+
+Finished spans are appended as JSON lines to RAG_TRACE_FILE (nothing is
+written when unset), with ``"service": "rag"``. RAG_DEBUG_HEADER limits what
+an ``X-Debug`` header may ask for: "timing" (default), "profile" or "off".
+"""
+
+from observability.tracing import (  # noqa: F401 (re-exported)
+    DEBUG_HEADER,
+    PARENT_SPAN_HEADER,
+    PROFILERS,
+    REQUEST_ID_HEADER,
+    JsonLinesExporter,
+    Span,
+    Trace,
+    Tracer,
+    clean_id,
+    new_id,
+    run_profiled,
+)
+
+SERVICE = "rag"
+TRACE_FILE_ENV = "RAG_TRACE_FILE"
+DEBUG_HEADER_ENV = "RAG_DEBUG_HEADER"
+
+TRACER = Tracer(SERVICE, TRACE_FILE_ENV, DEBUG_HEADER_ENV)
+
+get_exporter = TRACER.get_exporter
+current_trace = TRACER.current_trace
+parse_debug = TRACER.parse_debug
+start_trace = TRACER.start_trace
+span = TRACER.span
+add_span = TRACER.add_span
+propagation_headers = TRACER.propagation_headers
+call = TRACER.call
@@ -0,0 +1,663 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from search_profiles import SearchProfile
+
+if TYPE_CHECKING:
+    # qdrant_client is the largest import of the service; the Qdrant code paths
+    # import it when they first run
+    from qdrant_client import QdrantClient
+
+# Locations of stores that keep nothing on local disk
+_store_ids = itertools.count(1)
+
+
+@dataclass
+class ScoredHit:
+    """One search hit; mirrors the fields of Qdrant's ScoredPoint that we use."""
+
+    id: Any
+    score: float
+    payload: Dict[str, Any]
+
+
+class VectorStore:
+    """Storage and top-k search of chunk embeddings, one collection per index.
+
+    Scores are cosine similarities. Implementations must be safe to query from
+    several threads while a single writer upserts.
+
+    ``location`` keys the store in the per-collection registries of other
+    modules (lexical indexes, payload dictionaries, projections): its directory,
+    or an id unique in the process for stores without one.
+    """
+
+    location: str
+
+    def artifacts_dir(self, name: str) -> Optional[Path]:
+        """Directory for the files kept with collection ``name``, or None when the store has no local disk.
+
+        The lexical index, payload dictionary and projection of a collection
+        are saved there, and deleted with it.
+        """
+        return None
+
+    def ensure_collection(self, name: str, dim: int, dtype: str = "float32") -> None:
+        """Create the collection if missing; ``dtype`` (float32 | float16) is the stored vector type."""
+        raise NotImplementedError
+
+    def collection_exists(self, name: str) -> bool:
+        raise NotImplementedError
+
+    def upsert(
+        self,
+        name: str,
+        ids: Sequence[Any],
+        vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        payloads: Sequence[Dict[str, Any]],
+    ) -> None:
+        raise NotImplementedError
+
+    def query_batch(
+        self,
+        name: str,
+        vectors: np.ndarray,
+        limit: int,
+        profile: Optional[SearchProfile] = None,
+        shards: Optional[Sequence[str]] = None,
+    ) -> List[List[ScoredHit]]:
+        """Top-``limit`` hits per query vector.
+
+        ``shards`` restricts a sharded store to those shard keys; unsharded
+        stores ignore it and callers filter the hits by file instead.
+        """
+        raise NotImplementedError
+
+    def delete_by_field(
+        self, name: str, field: str, value: Any, keep_ids: Optional[Collection[Any]] = None
+    ) -> None:
+        """Delete every point whose payload ``field`` equals ``value``, except ``keep_ids``."""
+        raise NotImplementedError
+
+    def count(self, name: str) -> int:
+        raise NotImplementedError
+
+    def scroll(
+        self, name: str, batch_size: int = 1024
+    ) -> Iterator[Tuple[List[Any], np.ndarray, List[Dict[str, Any]]]]:
+        """Iterate over all points as (ids, vectors, payloads) batches."""
+        raise NotImplementedError
+
+    def delete_collection(self, name: str) -> None:
+        raise NotImplementedError
+
+    def list_collections(self) -> List[str]:
+        raise NotImplementedError
+
+    def list_aliases(self) -> Dict[str, str]:
+        """Mapping of alias name to the collection it points to."""
+        raise NotImplementedError
+
+    def set_aliases(self, changes: Dict[str, Optional[str]]) -> None:
+        """Atomically re-point (or, with None, remove) several aliases at once."""
+        raise NotImplementedError
+
+    def get_alias(self, alias: str) -> Optional[str]:
+        """Collection that ``alias`` points to, or None."""
+        return self.list_aliases().get(alias)
+
+    def set_alias(self, alias: str, collection: str) -> None:
+        """Atomically point ``alias`` at ``collection``; searches by alias follow it."""
+        self.set_aliases({alias: collection})
+
+
+class QdrantVectorStore(VectorStore):
+    """VectorStore over a QdrantClient (embedded local mode or a server)."""
+
+    def __init__(self, client: "QdrantClient") -> None:
+        self.client = client
+        # Local mode always scans exhaustively and warns on every call with params
+        self._local = type(getattr(client, "_client", None)).__name__ == "QdrantLocal"
+        local_path = getattr(client._client, "location", None) if self._local else None
+        self.path = Path(local_path) if local_path and local_path != ":memory:" else None
+        if self.path is not None:
+            self.location = str(self.path.resolve())
+        else:
+            # Wrappers are made per call (as_vector_store), so the id lives on the client
+            self.location = client.__dict__.setdefault("_rag_store_location", f"qdrant:{next(_store_ids)}")
+
+    def artifacts_dir(self, name: str) -> Optional[Path]:
+        return self.path / "artifacts" / name if self.path is not None else None
+
+    def ensure_collection(self, name: str, dim: int, dtype: str = "float32") -> None:
+        from qdrant_client.models import Datatype, Distance, VectorParams
+
+        if not self.client.collection_exists(name):
+            datatype = Datatype.FLOAT16 if dtype == "float16" else None
+            self.client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE, datatype=datatype),
+            )
+
+    def collection_exists(self, name: str) -> bool:
+        return self.client.collection_exists(name)
+
+    def upsert(self, name, ids, vectors, payloads) -> None:
+        from qdrant_client.models import PointStruct
+
+        points = [
+            PointStruct(id=i, vector=np.asarray(v, dtype=np.float32).tolist(), payload=p)
+            for i, v, p in zip(ids, vectors, payloads)
+        ]
+        self.client.upsert(collection_name=name, points=points)
+
+    def query_batch(self, name, vectors, limit, profile=None, shards=None) -> List[List[ScoredHit]]:
+        from qdrant_client.models import QueryRequest
+
+        params = None if (profile is None or self._local) else profile.search_params()
+        responses = self.client.query_batch_points(
+            collection_name=name,
+            requests=[
+                QueryRequest(query=np.asarray(v).tolist(), limit=limit, params=params, with_payload=True)
+                for v in vectors
+            ],
+        )
+        return [
+            [ScoredHit(id=p.id, score=float(p.score), payload=p.payload or {}) for p in r.points]
+            for r in responses
+        ]
+
+    def delete_by_field(self, name: str, field: str, value: Any, keep_ids=None) -> None:
+        from qdrant_client.models import FieldCondition, Filter, FilterSelector, HasIdCondition, MatchValue
+
+        must_not = [HasIdCondition(has_id=list(keep_ids))] if keep_ids else None
+        self.client.delete(
+            collection_name=name,
+            points_selector=FilterSelector(
+                filter=Filter(must=[FieldCondition(key=field, match=MatchValue(value=value))], must_not=must_not)
+            ),
+        )
+
+    def count(self, name: str) -> int:
+        return int(self.client.count(collection_name=name, exact=True).count)
+
+    def scroll(self, name, batch_size=1024):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                yield (
+                    [p.id for p in points],
+                    np.asarray([p.vector for p in points], dtype=np.float32),
+                    [p.payload or {} for p in points],
+                )
+            if offset is None:
+                return
+
+    def delete_collection(self, name: str) -> None:
+        self.client.delete_collection(collection_name=name)
+        if self.path is not None:
+            shutil.rmtree(self.path / "artifacts" / name, ignore_errors=True)
+
+    def list_collections(self) -> List[str]:
+        return [c.name for c in self.client.get_collections().collections]
+
+    def list_aliases(self) -> Dict[str, str]:
+        return {a.alias_name: a.collection_name for a in self.client.get_aliases().aliases}
+
+    def set_aliases(self, changes: Dict[str, Optional[str]]) -> None:
+        from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+        existing = self.list_aliases()
+        operations: List[Any] = []
+        for alias, collection in changes.items():
+            if alias in existing:
+                operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+            if collection is not None:
+                operations.append(
+                    CreateAliasOperation(create_alias=CreateAlias(collection_name=collection, alias_name=alias))
+                )
+        if operations:
+            # Applied in one request, so readers never see a missing or mixed alias
+            self.client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class _NumpyCollection:
+    """A float32 (or float16) matrix in a memory-mapped file plus ids and payloads.
+
+    Layout of the collection directory:
+    - meta.json: dim, count (rows written, deleted ones included), capacity
+      (rows allocated in the matrix file), dtype and points_bytes (valid
+      length of points.jsonl); replaced atomically
+    - vectors.f32 (or vectors.f16): row-major matrix of L2-normalized vectors
+    - points.jsonl: append-only log of ``[row, id, payload]`` lines and of
+      ``[row]`` tombstones for deleted rows
+
+    A row is never changed once written: upserting an existing id appends a
+    new row and tombstones the old one, and deletes only add tombstones. Each
+    write is published at once under a lock, so a search running next to a
+    writer scores the rows of one consistent state. Deleted rows keep their
+    space until the index is rebuilt into a new version (scroll skips them).
+
+    meta.json is written last, so bytes appended after points_bytes by an
+    interrupted write are ignored on load. Collections written with the
+    former points.json layout are read and converted on their next write.
+    """
+
+    def __init__(self, path: Optional[Path], dim: Optional[int] = None, readonly: bool = False,
+                 dtype: str = "float32") -> None:
+        self.path = path
+        self.readonly = readonly
+        self.dtype = np.dtype(dtype)
+        self.points_bytes = 0
+        # Held only to publish a write or to take a view of the published state
+        self._lock = threading.Lock()
+        dead: Set[int] = set()
+        if path is None:
+            # Attached collection: the caller fills in the arrays
+            self.dim, self.count, self.capacity = int(dim or 0), 0, 0
+            self.ids, self.payloads, self.matrix, self.row_of = [], [], None, {}
+            self.alive, self.live = np.zeros(0, dtype=bool), 0
+            return
+        meta_path = path / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self.dim = int(meta["dim"])
+            self.count = int(meta["count"])
+            self.capacity = int(meta["capacity"])
+            self.dtype = np.dtype(meta.get("dtype", "float32"))
+            self.ids: List[Any] = []
+            self.payloads: List[Dict[str, Any]] = []
+            dead = self._load_points(meta)
+        else:
+            if dim is None:
+                raise ValueError(f"Collection at {path} does not exist")
+            path.mkdir(parents=True, exist_ok=True)
+            self.dim, self.count, self.capacity = int(dim), 0, 0
+            self.ids, self.payloads = [], []
+            self._rewrite_points()
+            self._flush_meta()
+        self.matrix = self._open_matrix(self.capacity)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.alive[: self.count] = True
+        self.alive[sorted(dead)] = False
+        self.live = self.count - len(dead)
+        self.row_of: Dict[Any, int] = {pid: i for i, pid in enumerate(self.ids) if self.alive[i]}
+
+    def _load_points(self, meta: Dict[str, Any]) -> Set[int]:
+        """Read ids and payloads from the log; returns the tombstoned rows."""
+        legacy = self.path / "points.json"
+        if "points_bytes" not in meta and legacy.exists():
+            points = json.loads(legacy.read_text(encoding="utf-8"))
+            self.ids, self.payloads = points["ids"], points["payloads"]
+            if not self.readonly:
+                self._rewrite_points()
+                self._flush_meta()
+                legacy.unlink()
+            return set()
+        self.points_bytes = int(meta.get("points_bytes", 0))
+        with open(self.path / "points.jsonl", "rb") as fh:
+            data = fh.read(self.points_bytes)
+        dead: Set[int] = set()
+        for line in data.splitlines():
+            entry = json.loads(line)
+            if len(entry) == 1:
+                dead.add(entry[0])
+                continue
+            row, pid, payload = entry
+            if row == len(self.ids):
+                self.ids.append(pid)
+                self.payloads.append(payload)
+            else:
+                # Logs written before tombstones rewrote rows in place
+                self.ids[row], self.payloads[row] = pid, payload
+        del self.ids[self.count:], self.payloads[self.count:]
+        return {row for row in dead if row < self.count}
+
+    @classmethod
+    def attached(
+        cls, matrix: np.ndarray, ids: Sequence[Any], payloads: Sequence[Dict[str, Any]]
+    ) -> "_NumpyCollection":
+        """Read-only collection over an existing (typically memory-mapped) matrix.
+
+        ``payloads`` is used as given, so it may decode its items on access.
+        """
+        coll = cls(None, dim=matrix.shape[1], readonly=True, dtype=str(matrix.dtype))
+        coll.matrix = matrix  # type: ignore[assignment]
+        coll.count = coll.capacity = coll.live = int(matrix.shape[0])
+        coll.ids, coll.payloads = list(ids), payloads  # type: ignore[assignment]
+        coll.alive = np.ones(coll.count, dtype=bool)
+        coll.row_of = {pid: i for i, pid in enumerate(coll.ids)}
+        return coll
+
+    @property
+    def _matrix_file(self) -> Path:
+        return self.path / ("vectors.f16" if self.dtype == np.float16 else "vectors.f32")
+
+    def _open_matrix(self, capacity: int) -> Optional[np.memmap]:
+        if capacity == 0:
+            return None
+        mode = "r" if self.readonly else "r+"
+        return np.memmap(self._matrix_file, dtype=self.dtype, mode=mode, shape=(capacity, self.dim))
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2, 1024)
+        if self.matrix is not None:
+            self.matrix.flush()
+        with open(self._matrix_file, "ab") as fh:
+            fh.truncate(capacity * self.dim * self.dtype.itemsize)
+        # Searches holding the old map keep reading the published rows through it
+        matrix = self._open_matrix(capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self.capacity] = self.alive
+        with self._lock:
+            self.capacity, self.matrix, self.alive = capacity, matrix, alive
+
+    def _flush_meta(self) -> None:
+        meta = {"dim": self.dim, "count": self.count, "capacity": self.capacity, "dtype": self.dtype.name,
+                "points_bytes": self.points_bytes}
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.path / "meta.json")
+
+    @staticmethod
+    def _point_lines(entries: Iterable[Tuple[int, Any, Dict[str, Any]]]) -> bytes:
+        return b"".join(
+            json.dumps([row, pid, payload], ensure_ascii=False).encode("utf-8") + b"\n"
+            for row, pid, payload in entries
+        )
+
+    @staticmethod
+    def _tombstone_lines(rows: Iterable[int]) -> bytes:
+        return b"".join(f"[{int(row)}]\n".encode("ascii") for row in rows)
+
+    def _append_points(self, data: bytes) -> None:
+        with open(self.path / "points.jsonl", "r+b") as fh:
+            # Drop the tail of an interrupted write before appending
+            fh.truncate(self.points_bytes)
+            fh.seek(self.points_bytes)
+            fh.write(data)
+        self.points_bytes += len(data)
+
+    def _rewrite_points(self) -> None:
+        """Write the log compacted (one line per row) and switch to it atomically."""
+        data = self._point_lines((row, pid, payload) for row, (pid, payload) in enumerate(zip(self.ids, self.payloads)))
+        tmp = self.path / "points.jsonl.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.path / "points.jsonl")
+        self.points_bytes = len(data)
+
+    def _publish(self, count: int, deleted: Sequence[int]) -> None:
+        """Make rows up to ``count`` visible and hide ``deleted``, in one step for searches."""
+        with self._lock:
+            self.alive[self.count:count] = True
+            self.alive[list(deleted)] = False
+            self.live += (count - self.count) - len(deleted)
+            self.count = count
+
+    def upsert(self, ids: Sequence[Any], vectors: np.ndarray, payloads: Sequence[Dict[str, Any]]) -> None:
+        if self.readonly:
+            raise PermissionError("Collection is read-only")
+        vectors = l2_normalize(vectors)
+        self._grow(self.count + len(ids))
+        assert self.matrix is not None
+        # New rows go after the published ones, where no search reads yet
+        rows: Dict[Any, int] = {}
+        for pid, vec, payload in zip(ids, vectors, payloads):
+            row = rows.get(pid)
+            if row is None:
+                row = rows[pid] = len(self.ids)
+                self.ids.append(pid)
+                self.payloads.append(payload)
+            else:
+                self.payloads[row] = payload
+            self.matrix[row] = vec
+        self.matrix.flush()
+        replaced = [self.row_of[pid] for pid in rows if pid in self.row_of]
+        self._append_points(
+            self._point_lines((row, pid, self.payloads[row]) for pid, row in rows.items())
+            + self._tombstone_lines(replaced)
+        )
+        self._publish(len(self.ids), replaced)
+        self.row_of.update(rows)
+        self._flush_meta()
+
+    def delete_rows(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        if self.readonly:
+            raise PermissionError("Collection is read-only")
+        self._append_points(self._tombstone_lines(rows))
+        self._publish(self.count, rows)
+        for row in rows:
+            self.row_of.pop(self.ids[row], None)
+        self._flush_meta()
+
+    def view(self) -> Tuple[int, Optional[np.ndarray], List[Any], List[Dict[str, Any]], np.ndarray, int]:
+        """(count, matrix, ids, payloads, alive mask, live rows) of the published state.
+
+        Rows below ``count`` never change, so the view stays valid while
+        later writes append rows or tombstone them.
+        """
+        with self._lock:
+            return self.count, self.matrix, self.ids, self.payloads, self.alive[: self.count].copy(), self.live
+
+    def search(self, queries: np.ndarray, limit: int) -> List[List[ScoredHit]]:
+        count, matrix, ids, payloads, alive, live = self.view()
+        if live == 0 or matrix is None:
+            return [[] for _ in range(len(queries))]
+        # One matrix product for the whole batch: (count x dim) @ (dim x q);
+        # float16 matrices are widened to float32 for the product
+        scores = np.asarray(matrix[:count], dtype=np.float32) @ l2_normalize(queries).T
+        if live < count:
+            scores[~alive] = -np.inf
+        limit = min(limit, live)
+        results: List[List[ScoredHit]] = []
+        for col in range(scores.shape[1]):
+            column = scores[:, col]
+            if limit < count:
+                top = np.argpartition(-column, limit - 1)[:limit]
+            else:
+                top = np.arange(count)
+            top = top[np.argsort(-column[top], kind="stable")]
+            results.append([
+                ScoredHit(id=ids[i], score=float(column[i]), payload=payloads[i])
+                for i in top
+            ])
+        return results
+
+
+class NumpyVectorStore(VectorStore):
+    """Embedded brute-force VectorStore on memory-mapped NumPy matrices.
+
+    Top-k is a single matrix-vector (or matrix-matrix, for batches) product
+    followed by ``argpartition``; for the collection sizes we serve this is
+    exact and faster than an ANN index, with no lock file: any number of
+    processes can open the same directory with ``readonly=True``.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, readonly: bool = False) -> None:
+        # Without a path the store only serves collections added with attach()
+        self.path = Path(path) if path is not None else None
+        self.location = str(self.path.resolve()) if self.path is not None else f"numpy:{next(_store_ids)}"
+        self.readonly = readonly
+        self._collections: Dict[str, _NumpyCollection] = {}
+        self._lock = threading.RLock()
+        self._alias_map: Dict[str, str] = {}
+        self._alias_stamp: Optional[Tuple[int, int]] = None
+
+    def _aliases(self) -> Dict[str, str]:
+        """Alias map, re-read when another process has replaced aliases.json."""
+        if self.path is None:
+            return self._alias_map
+        try:
+            st = (self.path / "aliases.json").stat()
+        except FileNotFoundError:
+            return {}
+        stamp = (st.st_ino, st.st_mtime_ns)
+        if stamp != self._alias_stamp:
+            self._alias_map = json.loads((self.path / "aliases.json").read_text(encoding="utf-8"))
+            self._alias_stamp = stamp
+        return self._alias_map
+
+    def _get(self, name: str) -> _NumpyCollection:
+        with self._lock:
+            name = self._aliases().get(name, name)
+            coll = self._collections.get(name)
+            if coll is None:
+                if self.path is None or not (self.path / name / "meta.json").exists():
+                    raise ValueError(f"Collection '{name}' not found")
+                coll = _NumpyCollection(self.path / name, readonly=self.readonly)
+                self._collections[name] = coll
+            return coll
+
+    def artifacts_dir(self, name: str) -> Optional[Path]:
+        # Inside the collection's own directory, so delete_collection removes them too
+        return self.path / name if self.path is not None else None
+
+    def attach(
+        self, name: str, matrix: np.ndarray, ids: Sequence[Any], payloads: Sequence[Dict[str, Any]]
+    ) -> None:
+        """Serve ``matrix`` (already L2-normalized) as a read-only collection."""
+        with self._lock:
+            self._collections[name] = _NumpyCollection.attached(matrix, ids, payloads)
+
+    def ensure_collection(self, name: str, dim: int, dtype: str = "float32") -> None:
+        with self._lock:
+            if name not in self._collections:
+                if self.path is None:
+                    raise ValueError("Store has no path; only attached collections are available")
+                self._collections[name] = _NumpyCollection(
+                    self.path / name, dim=dim, readonly=self.readonly, dtype=dtype
+                )
+
+    def collection_exists(self, name: str) -> bool:
+        name = self._aliases().get(name, name)
+        if name in self._collections:
+            return True
+        return self.path is not None and (self.path / name / "meta.json").exists()
+
+    def upsert(self, name, ids, vectors, payloads) -> None:
+        with self._lock:
+            self._get(name).upsert(list(ids), np.asarray(vectors, dtype=np.float32), list(payloads))
+
+    def query_batch(self, name, vectors, limit, profile=None, shards=None) -> List[List[ScoredHit]]:
+        # Brute force is always exact, so profile search params do not apply
+        return self._get(name).search(np.asarray(vectors, dtype=np.float32), limit)
+
+    def delete_by_field(self, name: str, field: str, value: Any, keep_ids=None) -> None:
+        keep = set(keep_ids or ())
+        with self._lock:
+            coll = self._get(name)
+            rows = [
+                row for pid, row in coll.row_of.items()
+                if pid not in keep and coll.payloads[row].get(field) == value
+            ]
+            coll.delete_rows(sorted(rows))
+
+    def count(self, name: str) -> int:
+        return self._get(name).live
+
+    def scroll(self, name, batch_size=1024):
+        # Live rows only: a version built from this scroll leaves the tombstones behind
+        _, matrix, ids, payloads, alive, _ = self._get(name).view()
+        rows = np.flatnonzero(alive)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            yield (
+                [ids[i] for i in batch],
+                np.array(matrix[batch], dtype=np.float32),
+                [payloads[i] for i in batch],
+            )
+
+    def delete_collection(self, name: str) -> None:
+        with self._lock:
+            self._collections.pop(name, None)
+            if self.path is not None:
+                shutil.rmtree(self.path / name, ignore_errors=True)
+
+    def list_collections(self) -> List[str]:
+        names = set(self._collections)
+        if self.path is not None and self.path.exists():
+            names.update(p.name for p in self.path.iterdir() if (p / "meta.json").exists())
+        return sorted(names)
+
+    def list_aliases(self) -> Dict[str, str]:
+        return dict(self._aliases())
+
+    def set_aliases(self, changes: Dict[str, Optional[str]]) -> None:
+        with self._lock:
+            aliases = dict(self._aliases())
+            for alias, collection in changes.items():
+                if collection is None:
+                    aliases.pop(alias, None)
+                else:
+                    aliases[alias] = collection
+            if self.path is None:
+                self._alias_map = aliases
+                return
+            tmp = self.path / "aliases.json.tmp"
+            tmp.write_text(json.dumps(aliases), encoding="utf-8")
+            os.replace(tmp, self.path / "aliases.json")
+
+
+def as_vector_store(client: Union["QdrantClient", VectorStore]) -> VectorStore:
+    """Accept either a VectorStore or a bare QdrantClient (historical API)."""
+    if isinstance(client, VectorStore):
+        return client
+    return QdrantVectorStore(client)
+
+
+def data_dir() -> Path:
+    """Directory of the service's runtime data: RAG_DATA_DIR, by default the src folder."""
+    return Path(os.getenv("RAG_DATA_DIR") or Path(__file__).parent)
+
+
+def open_default_store(base_dir: Union[str, Path, None] = None) -> Union["QdrantClient", VectorStore]:
+    """Open the store selected by RAG_VECTOR_BACKEND ("qdrant" or "numpy") under ``base_dir``.
+
+    ``base_dir`` defaults to data_dir(). With RAG_SHARD_BY=file the store is
+    wrapped in a ShardedVectorStore.
+    """
+    if base_dir is None:
+        base_dir = data_dir()
+    backend = os.getenv("RAG_VECTOR_BACKEND", "qdrant").lower()
+    store: Union["QdrantClient", VectorStore]
+    if backend == "numpy":
+        store = NumpyVectorStore(Path(base_dir) / "numpy_db")
+    elif backend == "qdrant":
+        from qdrant_client import QdrantClient
+
+        store = QdrantClient(path=Path(base_dir) / "db")
+    else:
+        raise ValueError(f"Unknown RAG_VECTOR_BACKEND '{backend}'")
+    if os.getenv("RAG_SHARD_BY", "").lower() == "file":
+        # Imported here: sharding builds on this module
+        from sharding import ShardedVectorStore, get_router
+
+        return ShardedVectorStore(as_vector_store(store), get_router())
+    return store
@@ -1,13 +1,68 @@
 import pytest
+import shutil
 import sys
 import os
-from pathlib import Path
+import tempfile
 
 # Adicionar o diretório src ao path
 src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
 if src_path not in sys.path:
     sys.path.insert(0, src_path)
 
+# Índices, caches e modelos exportados pelos testes vão para um diretório temporário,
+# nunca para apps/rag/src; definido antes de importar os módulos, que leem estas variáveis
+DATA_DIR = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ["RAG_DATA_DIR"] = DATA_DIR
+os.environ["RAG_TABLE_CACHE_DIR"] = os.path.join(DATA_DIR, "table_cache")
+os.environ["RAG_ONNX_DIR"] = os.path.join(DATA_DIR, "onnx_models")
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "hashing_models: os modelos padrão do processo são o embedder hashing e o reranker overlap"
+    )
+    config.addinivalue_line("markers", "models: usa os modelos reais; pulado quando os pesos não estão no cache")
+
+
+def _model_weights_cached() -> bool:
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return False
+    return all(
+        isinstance(try_to_load_from_cache(repo, "config.json"), str)
+        for repo in (EMBEDDING_MODEL, CROSS_ENCODER_MODEL)
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    marked = [item for item in items if item.get_closest_marker("models")]
+    if marked and not _model_weights_cached():
+        skip = pytest.mark.skip(reason="pesos dos modelos não estão no cache do Hugging Face")
+        for item in marked:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _data_dir():
+    yield DATA_DIR
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def _hashing_models(request, monkeypatch):
+    """Com a marca hashing_models, get_processor() usa modelos sem pesos: roda em segundos e offline."""
+    if request.node.get_closest_marker("hashing_models") is not None:
+        import csv_chunk_processor
+
+        monkeypatch.setenv("RAG_EMBEDDER", "hashing")
+        monkeypatch.setenv("RAG_RERANKER", "overlap")
+        # Restaurado ao fim do teste: o próximo não herda estes modelos
+        monkeypatch.setattr(csv_chunk_processor, "_default_processor", None)
+
 
 @pytest.fixture(scope="session")
 def rag_client():
@@ -0,0 +1,334 @@
+"""
+Testes da API do serviço RAG (main.py) com a busca substituída por stubs.
+"""
+
+import asyncio
+import gc
+import importlib.util
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from serving import BoundedExecutor, ServingSettings
+
+
+def load_main_module():
+    """Carrega apps/rag/main.py pelo caminho absoluto."""
+    main_path = Path(__file__).resolve().parents[1] / "main.py"
+    spec = importlib.util.spec_from_file_location("rag_main", str(main_path))
+    assert spec and spec.loader, "Cannot load main.py spec"
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)  # type: ignore[arg-type]
+    return module
+
+
+@pytest.fixture
+def rag_main(monkeypatch):
+    module = load_main_module()
+    # Evita a ingestão real: qualquer objeto não-nulo serve como cliente
+    monkeypatch.setattr(module, "_rag_client", object())
+    module._executor = BoundedExecutor(
+        ServingSettings(executor_workers=1, max_in_flight=1, request_timeout_s=5.0, retry_after_s=2)
+    )
+    yield module
+    module._executor.shutdown()
+    if module._jobs is not None:
+        module._jobs.shutdown()
+
+
+def test_health_endpoint(rag_main):
+    client = TestClient(rag_main.app)
+    r = client.get("/rag/health/")
+    assert r.status_code == 200
+    assert r.json().get("status") == 201
+
+
+def test_similar_returns_results(rag_main, monkeypatch):
+    monkeypatch.setattr(
+        rag_main, "_search", lambda text, k, prefetch, trace: [{"value": text, "file": "x.csv", "score": 1.0}]
+    )
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": "ping"})
+    assert r.status_code == 200
+    assert r.json()["results"][0]["value"] == "ping"
+
+
+def test_metrics_endpoint_exposes_request_and_stage_metrics(rag_main, monkeypatch):
+    def fake_search(text, k, prefetch, trace):
+        trace.mark_started()
+        with trace.stage("embed"):
+            pass
+        return []
+
+    monkeypatch.setattr(rag_main, "_search", fake_search)
+    client = TestClient(rag_main.app)
+    assert client.post("/rag/similar", json={"text": "ping"}).status_code == 200
+    r = client.get("/rag/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+    assert 'rag_http_requests_total{method="POST",route="/rag/similar",status="200"}' in body
+    assert 'rag_search_stage_seconds_count{stage="embed"}' in body
+    assert "rag_executor_in_flight 0" in body
+    assert "rag_executor_queue_depth 0" in body
+
+
+def test_request_id_and_debug_timing_are_returned(rag_main, monkeypatch):
+    def fake_search(text, k, prefetch, trace):
+        trace.mark_started()
+        with trace.stage("embed"):
+            pass
+        return []
+
+    monkeypatch.setattr(rag_main, "_search", fake_search)
+    client = TestClient(rag_main.app)
+    r = client.post(
+        "/rag/similar",
+        json={"text": "ping"},
+        headers={"X-Request-ID": "turn-42", "X-Parent-Span-ID": "ai-span", "X-Debug": "timing"},
+    )
+    assert r.status_code == 200
+    assert r.headers["x-request-id"] == "turn-42"
+    assert "embed;dur=" in r.headers["server-timing"]
+    debug = r.json()["debug"]
+    assert debug["request_id"] == "turn-42"
+    names = [s["name"] for s in debug["spans"]]
+    assert "queue" in names and "embed" in names
+    # Sem X-Debug a resposta não muda
+    assert "debug" not in client.post("/rag/similar", json={"text": "ping"}).json()
+
+
+def test_empty_text_returns_400(rag_main):
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": ""})
+    assert r.status_code == 400
+
+
+def test_saturated_executor_returns_503_with_retry_after(rag_main):
+    release = threading.Event()
+    rag_main.get_executor().submit(release.wait)
+    try:
+        client = TestClient(rag_main.app)
+        r = client.post("/rag/similar", json={"text": "ping"})
+        assert r.status_code == 503
+        assert r.headers.get("retry-after") == "2"
+    finally:
+        release.set()
+
+
+def test_slow_search_returns_504(rag_main, monkeypatch):
+    def slow_search(text, k, prefetch, trace):
+        time.sleep(0.5)
+        return []
+
+    monkeypatch.setattr(rag_main, "_search", slow_search)
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": "ping", "timeout_ms": 50})
+    assert r.status_code == 504
+
+
+def test_batch_keeps_input_order_and_per_query_errors(rag_main, monkeypatch):
+    def fake_batch(texts, client, k=10, prefetch=None, trace=None):
+        return [
+            {"results": [{"value": t, "file": "x.csv", "score": 1.0}]} if t else {"error": "empty"}
+            for t in texts
+        ]
+
+    monkeypatch.setattr(rag_main, "find_top_k_rows_batch", fake_batch)
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar/batch", json={"texts": ["a", "", "c"]})
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert [i.get("results", [{}])[0].get("value") for i in items] == ["a", None, "c"]
+    assert items[1] == {"error": "empty"}
+
+
+def test_batch_too_large_returns_413(rag_main):
+    client = TestClient(rag_main.app)
+    limit = rag_main.get_executor().settings.max_batch_size
+    r = client.post("/rag/similar/batch", json={"texts": ["q"] * (limit + 1)})
+    assert r.status_code == 413
+
+
+def test_k_is_honoured_and_clamped(rag_main, monkeypatch):
+    seen = {}
+
+    def fake_rows(text, client, k=10, prefetch=None, trace=None):
+        seen.update(k=k, prefetch=prefetch)
+        return []
+
+    monkeypatch.setattr(rag_main, "find_top_k_rows", fake_rows)
+    client = TestClient(rag_main.app)
+    settings = rag_main.get_executor().settings
+    r = client.post("/rag/similar", json={"text": "ping", "k": 3})
+    assert r.status_code == 200
+    assert seen["k"] == 3
+    client.post("/rag/similar", json={"text": "ping", "k": settings.max_k + 10, "prefetch": 10**9})
+    assert seen == {"k": settings.max_k, "prefetch": settings.max_prefetch}
+    assert client.post("/rag/similar", json={"text": "ping", "k": 0}).status_code == 400
+
+
+def test_stream_returns_ndjson_rows(rag_main, monkeypatch):
+    ordered = [(("a.csv", i), float(10 - i)) for i in range(5)]
+    monkeypatch.setattr(rag_main, "select_top_k_rows", lambda text, client, k, prefetch, trace: (ordered[:k], {}))
+    monkeypatch.setattr(
+        rag_main,
+        "hydrate_rows",
+        lambda rows, dfs: ({"file": f, "value": f"row {i}", "score": s} for (f, i), s in rows),
+    )
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": "ping", "k": 4, "stream": True})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["value"] for line in lines] == ["row 0", "row 1", "row 2", "row 3"]
+
+
+async def _wait_released(executor, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while executor.in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+    return executor.in_flight == 0
+
+
+def test_stream_never_read_releases_the_slot():
+    """Cliente que desconecta antes da leitura: o produtor não pode ficar preso com o buffer cheio."""
+    executor = BoundedExecutor(ServingSettings(executor_workers=1, max_in_flight=1))
+
+    async def scenario():
+        items = executor.stream(lambda: iter(range(100)), max_buffer=2)
+        await asyncio.sleep(0.05)
+        del items
+        gc.collect()
+        return await _wait_released(executor)
+
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_stalled_stream_gives_up_and_ends_with_an_error():
+    executor = BoundedExecutor(ServingSettings(executor_workers=1, max_in_flight=1))
+
+    async def scenario():
+        items = executor.stream(lambda: iter(range(100)), max_buffer=2, stall_timeout_s=0.2)
+        released = await _wait_released(executor)
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in items:
+                pass
+        return released
+
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_response_reports_profile_and_stage_timings(rag_main, monkeypatch):
+    def fake_rows(text, client, k=10, prefetch=None, trace=None):
+        with trace.stage("search"):
+            pass
+        return []
+
+    monkeypatch.setattr(rag_main, "find_top_k_rows", fake_rows)
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": "ping", "profile": "fast", "deadline_ms": 200})
+    assert r.status_code == 200
+    search = r.json()["search"]
+    assert search["profile"] == "fast"
+    assert {"queue", "search"} <= set(search["timings_ms"])
+
+
+def test_unknown_profile_returns_400(rag_main):
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/similar", json={"text": "ping", "profile": "turbo"})
+    assert r.status_code == 400
+
+
+def _fake_ingest(release: threading.Event):
+    def runner(job):
+        for path in job.csv_paths:
+            job.on_progress({"event": "file_started", "csv_path": path})
+            job.on_progress({"event": "chunks_done", "csv_path": path, "chunks": 40})
+            release.wait(5)
+            job.on_progress({
+                "event": "file_done",
+                "csv_path": path,
+                "result": {"total_chunks": 40, "total_rows": 12, "total_columns": 12},
+            })
+        return {"version": "csv_chunks_vtest"}
+
+    return runner
+
+
+def test_ingest_job_reports_progress_and_rejects_concurrent_jobs(rag_main):
+    release = threading.Event()
+    rag_main._jobs = rag_main.IngestJobManager(_fake_ingest(release))
+    client = TestClient(rag_main.app)
+
+    r = client.post("/rag/ingest", json={"files": ["payroll.csv"]})
+    assert r.status_code == 202
+    # Só o arquivo pedido é reingerido na versão em uso; os demais seguem indexados
+    assert r.json()["job"]["kind"] == "update"
+    job_id = r.json()["job"]["id"]
+    assert client.post("/rag/ingest", json={}).status_code == 409
+
+    release.set()
+    for _ in range(100):
+        job = client.get(f"/rag/ingest/{job_id}").json()["job"]
+        if job["state"] not in ("pending", "running"):
+            break
+        time.sleep(0.02)
+    assert job["state"] == "succeeded"
+    assert job["version"] == "csv_chunks_vtest"
+    assert job["rows"] == {"done": 12, "total": 12}
+    assert job["chunks"]["done"] == 40
+    assert job["embed_rate"] > 0
+    assert client.get("/rag/ingest/unknown").status_code == 404
+
+
+def test_ingest_rejects_paths_outside_archives(rag_main):
+    client = TestClient(rag_main.app)
+    assert client.post("/rag/ingest", json={"files": ["../main.py"]}).status_code == 400
+    assert client.post("/rag/ingest", json={"files": ["nope.csv"]}).status_code == 404
+
+
+def test_ingest_of_some_files_needs_a_live_version(rag_main, monkeypatch):
+    monkeypatch.setattr(rag_main, "_get_client", lambda: None)
+    client = TestClient(rag_main.app)
+    r = client.post("/rag/ingest", json={"files": ["payroll.csv"]})
+    assert r.status_code == 409
+    assert rag_main.get_jobs().active() is None
+
+
+def test_startup_skips_ingestion_when_the_index_is_current(rag_main, monkeypatch):
+    monkeypatch.setattr(rag_main, "_open_store", lambda: object())
+    submitted = []
+    monkeypatch.setattr(rag_main, "_start_ingest", submitted.append)
+    monkeypatch.setattr(rag_main, "version_is_current", lambda paths, client: True)
+    assert rag_main._ingest_if_stale() is None
+    assert submitted == []
+
+    monkeypatch.setattr(rag_main, "version_is_current", lambda paths, client: False)
+    rag_main._ingest_if_stale()
+    assert submitted == [rag_main.archive_csv_paths()]
+
+
+def test_search_returns_503_while_first_index_is_built(rag_main, monkeypatch):
+    release = threading.Event()
+    rag_main._jobs = rag_main.IngestJobManager(_fake_ingest(release))
+    monkeypatch.setattr(rag_main, "_rag_client", None)
+    monkeypatch.setattr(rag_main, "_get_client", lambda: None)
+    try:
+        client = TestClient(rag_main.app)
+        r = client.post("/rag/similar", json={"text": "ping"})
+        assert r.status_code == 503
+        assert "retry-after" in r.headers
+        assert rag_main.get_jobs().active() is not None
+    finally:
+        release.set()
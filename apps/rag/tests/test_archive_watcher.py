@@ -0,0 +1,82 @@
+"""
+Testes da observação da pasta de arquivos e da reingestão só dos CSVs alterados.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from archive_watcher import ArchiveWatcher
+from index_versions import rebuild_index, update_files
+from lexical_index import get_lexical_index
+from vector_store import NumpyVectorStore
+
+# Ingestão e busca com get_processor(): modelos sem pesos
+pytestmark = pytest.mark.hashing_models
+
+
+def _write(path, names):
+    pd.DataFrame({"id": range(1, len(names) + 1), "name": names}).to_csv(path, index=False)
+
+
+def test_watcher_debounces_changes_and_reports_deletions(tmp_path):
+    _write(tmp_path / "a.csv", ["Ana"])
+    _write(tmp_path / "b.csv", ["Bruno"])
+    (tmp_path / "notes.txt").write_text("ignorado")
+    watcher = ArchiveWatcher(str(tmp_path), on_change=lambda changed, deleted: True, debounce_s=3.0)
+
+    assert watcher.poll(now=0.0) is None
+    _write(tmp_path / "a.csv", ["Ana", "Carla"])
+    os.remove(tmp_path / "b.csv")
+    _write(tmp_path / "c.csv", ["Davi"])
+    # Ainda dentro da janela de debounce
+    assert watcher.poll(now=1.0) is None
+    assert watcher.poll(now=3.5) is None
+    changed, deleted = watcher.poll(now=4.5)
+    assert changed == [str(tmp_path / "a.csv"), str(tmp_path / "c.csv")]
+    assert deleted == ["b.csv"]
+
+
+def test_update_files_replaces_only_the_changed_file(tmp_path):
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    _write(a, ["Ana Souza", "Bruno Lima"])
+    _write(b, ["Carla Dias"])
+    store = NumpyVectorStore(tmp_path / "db")
+    summary, _ = rebuild_index([str(a), str(b)], alias="watched", client=store)
+    version = summary["version"]
+    b_chunks = summary["files"][1]["total_chunks"]
+
+    _write(a, ["Ana Souza", "Bruno Lima", "Davi Rocha"])
+    result = update_files([str(a)], [], alias="watched", client=store, progress=None)
+    assert result["version"] == version
+    assert store.count("watched") == result["updated"][0]["total_chunks"] + b_chunks
+    assert get_lexical_index(store, version).exact_lookup("Davi Rocha", 1)
+
+    update_files([], ["b.csv"], alias="watched", client=store, progress=None)
+    assert store.count("watched") == result["updated"][0]["total_chunks"]
+    assert "b.csv" not in get_lexical_index(store, version).files()
+
+
+def test_update_files_never_serves_a_partial_file(tmp_path):
+    """Reingestão no lugar: os pontos novos sobrescrevem os antigos e só depois os que sobraram saem."""
+    a = tmp_path / "a.csv"
+    _write(a, ["Ana Souza", "Bruno Lima", "Carla Dias"])
+    store = NumpyVectorStore(tmp_path / "db")
+    summary, _ = rebuild_index([str(a)], alias="watched", client=store)
+    old_chunks = summary["files"][0]["total_chunks"]
+    seen = []
+    upsert = store.upsert
+
+    def watching_upsert(name, ids, vectors, payloads):
+        seen.append(store.count(name))
+        upsert(name, ids, vectors, payloads)
+
+    store.upsert = watching_upsert
+    _write(a, ["Ana Souza", "Bruno Lima"])
+    result = update_files([str(a)], [], alias="watched", client=store, progress=None)
+    new_chunks = result["updated"][0]["total_chunks"]
+    assert new_chunks < old_chunks
+    # Antes de cada lote, o arquivo continuava inteiro no índice
+    assert seen and min(seen) == old_chunks
+    assert store.count("watched") == new_chunks
@@ -0,0 +1,51 @@
+"""
+Testes do embedder por hashing e do reranker por sobreposição (sem pesos de modelo).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from csv_chunk_processor import CSVChunkProcessor, find_top_k_semantic
+from embedders import HashingEmbedder, TokenOverlapReranker, create_embedder, create_reranker
+from model_backends import BackendConfig
+from vector_store import NumpyVectorStore
+
+
+def test_hashing_embedder_is_deterministic_and_lexical(monkeypatch):
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.encode(["Relatório de vendas", "relatorio vendas", "folha de pagamento", ""])
+    assert vectors.shape == (4, 64) and vectors.dtype == np.float32
+    assert np.allclose(vectors, HashingEmbedder(dim=64).encode(["Relatório de vendas", "relatorio vendas",
+                                                                "folha de pagamento", ""]))
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0) and not vectors[3].any()
+    # Acentos e caixa não importam; textos sem palavras em comum ficam distantes
+    assert vectors[0] @ vectors[1] > 0.8 > vectors[0] @ vectors[2]
+    assert embedder.encode("vendas").shape == (64,)
+
+    scores = TokenOverlapReranker().predict([("bônus Ana", "Ana Souza, bonus 300"), ("bônus Ana", "Bruno")])
+    assert scores.tolist() == [1.0, 0.0]
+
+    monkeypatch.setenv("RAG_HASHING_DIM", "32")
+    assert create_embedder("ignored", BackendConfig(), name="hashing").get_sentence_embedding_dimension() == 32
+    assert create_reranker("ignored", BackendConfig(), name="none") is None
+    with pytest.raises(ValueError):
+        create_embedder("ignored", BackendConfig(), name="word2vec")
+
+
+def test_processor_uses_the_injected_embedder(tmp_path):
+    path = tmp_path / "people.csv"
+    pd.DataFrame({
+        "id": [1, 2, 3],
+        "name": ["Ana Souza", "Bruno Lima", "Carla Dias"],
+        "city": ["Recife", "Natal", "Salvador"],
+    }).to_csv(path, index=False)
+    processor = CSVChunkProcessor(embedder=HashingEmbedder(dim=48), reranker=TokenOverlapReranker())
+    assert processor.embedding_dim == 48 and processor.cross_encoder is processor.reranker
+
+    store = NumpyVectorStore(tmp_path / "db")
+    result = processor.process_csv_to_qdrant(str(path), "people", client=store)
+    assert store.count("people") == result["total_chunks"]
+    hits = find_top_k_semantic("Bruno Lima", store, k=3, collection_name="people", processor=processor)
+    assert hits[0]["file"] == "people.csv"
+    assert "Bruno" in str(hits[0]["snippet"])
@@ -0,0 +1,126 @@
+"""
+Testes de reindexação com coleções versionadas e troca atômica de alias.
+"""
+
+import pandas as pd
+import pytest
+
+from index_versions import (
+    IndexBuildError,
+    list_versions,
+    rebuild_index,
+    rollback,
+    update_files,
+    version_is_current,
+)
+from lexical_index import get_lexical_index, serving_lexical_index, set_lexical_index
+from vector_store import NumpyVectorStore
+
+# Ingestão e busca com get_processor(): modelos sem pesos
+pytestmark = pytest.mark.hashing_models
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "people.csv"
+    pd.DataFrame({"id": [1, 2], "name": ["Ana Souza", "Bruno Lima"], "city": ["Recife", "Natal"]}).to_csv(
+        path, index=False
+    )
+    return str(path)
+
+
+def test_rebuild_swaps_alias_and_collects_old_versions(tmp_path, csv_path):
+    store = NumpyVectorStore(tmp_path / "db")
+    first, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=2)
+    assert store.get_alias("versioned") == first["version"]
+    assert store.count("versioned") == first["files"][0]["total_chunks"]
+
+    second, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=2)
+    assert second["previous"] == first["version"]
+    assert store.get_alias("versioned") == second["version"]
+    assert get_lexical_index(store, "versioned") is get_lexical_index(store, second["version"])
+
+    # Outro processo (somente leitura) enxerga a troca de alias
+    reader = NumpyVectorStore(tmp_path / "db", readonly=True)
+    assert reader.get_alias("versioned") == second["version"]
+
+    assert rollback(store, alias="versioned") == first["version"]
+    assert store.get_alias("versioned") == first["version"]
+
+    third, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=1)
+    assert list_versions(store, "versioned") == [third["version"]]
+    assert sorted(third["deleted"]) == [first["version"], second["version"]]
+
+
+def test_failed_rebuild_keeps_serving_the_old_version(tmp_path, csv_path):
+    store = NumpyVectorStore(tmp_path / "db")
+    good, _ = rebuild_index([csv_path], alias="versioned", client=store)
+    with pytest.raises(IndexBuildError):
+        rebuild_index([csv_path, str(tmp_path / "missing.csv")], alias="versioned", client=store)
+    assert store.get_alias("versioned") == good["version"]
+    assert list_versions(store, "versioned") == [good["version"]]
+
+
+def test_lexical_index_is_saved_with_the_version(tmp_path, csv_path):
+    """Reinício, rollback e update_files usam o índice lexical salvo da versão, não só o da memória."""
+    store = NumpyVectorStore(tmp_path / "db")
+    first, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=2)
+    second, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=2)
+
+    def restart():
+        for name in ["versioned", first["version"], second["version"]]:
+            set_lexical_index(store, name, None)
+
+    restart()
+    reader = NumpyVectorStore(tmp_path / "db", readonly=True)
+    served = serving_lexical_index(reader, "versioned")
+    assert served is get_lexical_index(store, second["version"])
+    assert served.exact_lookup("Bruno Lima")
+
+    restart()
+    rollback(store, alias="versioned")
+    # O leitor segue a troca feita por outro processo
+    assert serving_lexical_index(reader, "versioned") is get_lexical_index(store, first["version"])
+
+    restart()
+    pd.DataFrame({"id": [1], "name": ["Carla Dias"], "city": ["Olinda"]}).to_csv(tmp_path / "new.csv", index=False)
+    update_files([str(tmp_path / "new.csv")], [], alias="versioned", client=store, progress=None)
+    restart()
+    assert serving_lexical_index(reader, "versioned").exact_lookup("Carla Dias")
+
+    third, _ = rebuild_index([csv_path], alias="versioned", client=store, keep=1)
+    saved = sorted(p.parent.name for p in (tmp_path / "db").glob("*/lexical.json.gz"))
+    assert saved == [third["version"]]
+
+
+def test_lexical_indexes_belong_to_their_store(tmp_path, csv_path):
+    """Duas stores com o mesmo alias não compartilham o índice lexical, salvo dentro de cada uma."""
+    other = tmp_path / "other.csv"
+    pd.DataFrame({"id": [1], "name": ["Carla Dias"], "city": ["Olinda"]}).to_csv(other, index=False)
+    first = NumpyVectorStore(tmp_path / "first")
+    second = NumpyVectorStore(tmp_path / "second")
+    built, _ = rebuild_index([csv_path], alias="versioned", client=first)
+    rebuild_index([str(other)], alias="versioned", client=second)
+
+    assert serving_lexical_index(first, "versioned").exact_lookup("Bruno Lima")
+    assert not serving_lexical_index(first, "versioned").exact_lookup("Carla Dias")
+    assert serving_lexical_index(second, "versioned").exact_lookup("Carla Dias")
+    assert (tmp_path / "first" / built["version"] / "lexical.json.gz").exists()
+
+
+def test_version_is_current_until_the_archives_change(tmp_path, csv_path):
+    """Reiniciar com os mesmos arquivos não reconstrói: o manifesto da versão servida ainda bate."""
+    store = NumpyVectorStore(tmp_path / "db")
+    assert not version_is_current([csv_path], alias="versioned", client=store)
+    rebuild_index([csv_path], alias="versioned", client=store)
+    assert version_is_current([csv_path], alias="versioned", client=store)
+    assert not version_is_current([csv_path], alias="versioned", client=store, rows_per_window=5)
+
+    other = tmp_path / "other.csv"
+    pd.DataFrame({"id": [1], "name": ["Carla Dias"]}).to_csv(other, index=False)
+    assert not version_is_current([csv_path, str(other)], alias="versioned", client=store)
+
+    pd.DataFrame({"id": [1], "name": ["Ana Souza"], "city": ["Olinda"]}).to_csv(csv_path, index=False)
+    assert not version_is_current([csv_path], alias="versioned", client=store)
+    update_files([csv_path], [], alias="versioned", client=store, progress=None)
+    assert version_is_current([csv_path], alias="versioned", client=store)
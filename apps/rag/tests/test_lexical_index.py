@@ -0,0 +1,133 @@
+"""
+Testes do índice lexical BM25 e da fusão por rank recíproco.
+"""
+
+import os
+
+import pandas as pd
+
+from csv_chunk_processor import ARCHIVES_DIR, CSVChunkProcessor
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _payroll_index():
+    index = BM25Index()
+    rows = [
+        ("E001", "Ana Souza", "2025-06", "2025-06-28"),
+        ("E002", "Bruno Lima", "2025-05", "2025-05-28"),
+        ("E002", "Bruno Lima", "2025-06", "2025-06-28"),
+    ]
+    for i, values in enumerate(rows):
+        text = " | ".join(f"{c}: {v}" for c, v in zip(["employee_id", "name", "competency", "payment_date"], values))
+        index.add_row("payroll.csv", i, text, list(values))
+    return index
+
+
+def test_tokenize_keeps_dates_and_ids_and_strips_accents():
+    assert tokenize("Bônus do E002 em 2025-06-28") == ["bonus", "do", "e002", "em", "2025-06-28"]
+
+
+def test_exact_lookup_intersects_spelled_out_values():
+    index = _payroll_index()
+    hits = index.exact_lookup("bônus do Bruno Lima no dia 2025-06-28")
+    assert [key for key, _ in hits] == [("payroll.csv", 2)]
+    assert index.row_text("payroll.csv", 2).startswith("employee_id: E002")
+
+
+def test_exact_lookup_ignores_questions_without_values():
+    assert _payroll_index().exact_lookup("Qual é o produto mais caro?") == []
+
+
+def test_remove_file_drops_rows_and_values():
+    index = _payroll_index()
+    index.remove_file("payroll.csv")
+    assert len(index) == 0
+    assert index.exact_lookup("E001") == []
+    assert index.search("Ana Souza") == []
+
+
+def test_round_trip_preserves_lookups():
+    restored = BM25Index.from_dict(_payroll_index().to_dict())
+    assert [key for key, _ in restored.exact_lookup("E001")] == [("payroll.csv", 0)]
+    assert restored.search("Bruno")[0][0][1] in (1, 2)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a = [(("f", 1), 0.9), (("f", 2), 0.8)]
+    b = [(("f", 2), 5.0), (("f", 3), 4.0)]
+    assert reciprocal_rank_fusion([a, b])[0][0] == ("f", 2)
+
+
+def test_single_category_words_do_not_short_circuit_the_search():
+    """Uma categoria ("Tecnologia") aparece em perguntas genéricas: a busca densa/fusão deve responder."""
+    index = BM25Index()
+    df = pd.read_csv(os.path.join(ARCHIVES_DIR, "documents.csv"))
+    CSVChunkProcessor.index_rows_lexically(df, "documents.csv", index)
+    assert index.exact_lookup("Quais são os artigos sobre tecnologia?") == []
+    # O BM25 ainda vê a palavra, para a fusão por rank recíproco
+    assert index.search("Quais são os artigos sobre tecnologia?")
+
+
+def test_names_ids_and_emails_are_identifying():
+    index = BM25Index()
+    index.add_row("people.csv", 0, "name: Ana Souza | email: ana@empresa.com | team: Tecnologia",
+                  ["Ana Souza", "ana@empresa.com", "Tecnologia"])
+    index.add_row("people.csv", 1, "name: Bruno Lima | email: bruno@empresa.com | team: Tecnologia",
+                  ["Bruno Lima", "bruno@empresa.com", "Tecnologia"])
+    assert [key for key, _ in index.exact_lookup("dados da Ana Souza")] == [("people.csv", 0)]
+    assert [key for key, _ in index.exact_lookup("quem usa bruno@empresa.com")] == [("people.csv", 1)]
+    assert index.exact_lookup("pessoas de tecnologia") == []
+
+
+def _people_and_articles(tmp_path):
+    pd.DataFrame({
+        "employee_id": ["E001", "E002"],
+        "name": ["Ana Souza", "Bruno Lima"],
+        "bonus": [300, 500],
+        "payment_date": ["2025-06-28", "2025-06-28"],
+    }).to_csv(tmp_path / "folha.csv", index=False)
+    pd.DataFrame({
+        "title": ["Cibersegurança em 2025", "Receitas de verão"],
+        "tags": ["ransomware, phishing, IoT", "culinária"],
+    }).to_csv(tmp_path / "artigos.csv", index=False)
+    return [str(tmp_path / "folha.csv"), str(tmp_path / "artigos.csv")]
+
+
+def test_complete_lookup_needs_the_rest_of_the_query_in_the_row(tmp_path):
+    index = BM25Index()
+    for path in _people_and_articles(tmp_path):
+        CSVChunkProcessor.index_rows_lexically(pd.read_csv(path), os.path.basename(path), index)
+    question = "bônus do Bruno Lima no dia 2025-06-28"
+    assert [key for key, _ in index.exact_lookup(question, complete=True)] == [("folha.csv", 1)]
+    # A data casa com as linhas da folha, mas o resto da pergunta não está nelas
+    question = "Cibersegurança ransomware phishing IoT artigo 2025-06-28"
+    assert index.exact_lookup(question)
+    assert index.exact_lookup(question, complete=True) == []
+
+
+def test_a_date_inside_a_broader_question_does_not_skip_the_semantic_search(tmp_path, monkeypatch):
+    """Só o perfil fast responde pela busca exata quando a pergunta vai além dos valores citados."""
+    import csv_chunk_processor
+    from csv_chunk_processor import find_top_k_rows, process_csvs_as_chunks
+    from embedders import HashingEmbedder, TokenOverlapReranker
+    from search_profiles import SearchTrace
+    from vector_store import NumpyVectorStore
+
+    monkeypatch.setattr(csv_chunk_processor, "ARCHIVES_DIR", str(tmp_path))
+    processor = CSVChunkProcessor(embedder=HashingEmbedder(dim=64), reranker=TokenOverlapReranker())
+    store = NumpyVectorStore(tmp_path / "db")
+    process_csvs_as_chunks(_people_and_articles(tmp_path), collection_name="exact_gate", client=store,
+                           progress=None, processor=processor)
+
+    def search(text, profile):
+        trace = SearchTrace(profile)
+        rows = find_top_k_rows(text, store, k=3, collection_name="exact_gate", processor=processor,
+                               trace=trace)
+        return [(r["file"], r["row_index"]) for r in rows], trace.lexical
+
+    question = "Cibersegurança ransomware phishing IoT artigo 2025-06-28"
+    rows, how = search(question, "balanced")
+    assert how == "fused" and ("artigos.csv", 0) in rows
+    rows, how = search(question, "fast")
+    assert how == "exact" and all(file == "folha.csv" for file, _ in rows)
+    assert search("bônus do Bruno Lima no dia 2025-06-28", "balanced") == ([("folha.csv", 1)], "exact")
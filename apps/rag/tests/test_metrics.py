@@ -0,0 +1,55 @@
+"""
+Testes do formato de exposição das métricas (src/metrics.py).
+"""
+
+import pytest
+
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_renders_labelled_samples():
+    registry = Registry()
+    hits = registry.register(Counter("cache_total", "Cache lookups", ["result"]))
+    hits.inc(result="hit")
+    hits.inc(2, result="hit")
+    hits.inc(result="miss")
+    text = registry.render()
+    assert "# TYPE cache_total counter" in text
+    assert 'cache_total{result="hit"} 3' in text
+    assert 'cache_total{result="miss"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        h.observe(value, stage="embed")
+    lines = h.samples()
+    assert 'latency_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="embed",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="embed"} 3' in lines
+    assert h.count(stage="embed") == 3
+
+
+def test_gauge_function_is_read_at_scrape_time():
+    depth = [0]
+    g = Gauge("queue_depth", "Queued jobs")
+    g.set_function(lambda: depth[0])
+    depth[0] = 4
+    assert g.samples() == ["queue_depth 4"]
+
+
+def test_labels_must_match_and_values_are_escaped():
+    c = Counter("requests_total", "Requests", ["route"])
+    with pytest.raises(ValueError):
+        c.inc(path="/x")
+    c.inc(route='a"b')
+    assert c.samples() == ['requests_total{route="a\\"b"} 1']
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = Registry()
+    first = registry.register(Counter("x_total", "X"))
+    assert registry.register(Counter("x_total", "X")) is first
+    with pytest.raises(ValueError):
+        registry.register(Gauge("x_total", "X"))
@@ -0,0 +1,55 @@
+"""
+Testes da seleção do backend de inferência (PyTorch / ONNX / ONNX int8) por modelo.
+"""
+
+import pytest
+
+import model_backends
+from model_backends import BackendConfig, load_model
+
+
+class RecordingModel:
+    def __init__(self, name, **kwargs):
+        self.name = name
+        self.kwargs = kwargs
+
+
+def test_backend_config_is_read_per_model(monkeypatch):
+    monkeypatch.setenv("RAG_EMBEDDING_BACKEND", "onnx-int8")
+    monkeypatch.setenv("RAG_EMBEDDING_THREADS", "2")
+    monkeypatch.delenv("RAG_CROSS_ENCODER_BACKEND", raising=False)
+    monkeypatch.delenv("RAG_CROSS_ENCODER_THREADS", raising=False)
+    assert BackendConfig.from_env("EMBEDDING") == BackendConfig("onnx-int8", 2)
+    assert BackendConfig.from_env("CROSS_ENCODER") == BackendConfig("torch", 0)
+    with pytest.raises(ValueError):
+        BackendConfig("tensorrt")
+
+    monkeypatch.setenv("RAG_ONNX_QUANT_ARCH", "arm64")
+    assert model_backends.quantization_arch() == "arm64"
+    monkeypatch.setenv("RAG_ONNX_QUANT_ARCH", "sse")
+    with pytest.raises(ValueError):
+        model_backends.quantization_arch()
+
+
+def test_load_model_passes_onnx_options(monkeypatch, tmp_path):
+    # PyTorch: construção de sempre, sem argumentos extras
+    assert load_model(RecordingModel, "m").kwargs == {}
+
+    monkeypatch.setattr(model_backends, "onnx_available", lambda: False)
+    with pytest.raises(RuntimeError, match="onnxruntime"):
+        load_model(RecordingModel, "m", BackendConfig("onnx"))
+
+    monkeypatch.setattr(model_backends, "onnx_available", lambda: True)
+    monkeypatch.setattr(model_backends, "_onnx_kwargs", lambda threads: {"provider": "CPUExecutionProvider"})
+    onnx = load_model(RecordingModel, "org/m", BackendConfig("onnx", 2))
+    assert onnx.name == "org/m" and onnx.kwargs["backend"] == "onnx"
+
+    # int8: carrega o arquivo quantizado já exportado em RAG_ONNX_DIR
+    monkeypatch.setenv("RAG_ONNX_QUANT_ARCH", "avx2")
+    monkeypatch.setattr(model_backends, "ONNX_DIR", str(tmp_path))
+    exported = tmp_path / "org__m" / "onnx" / "model_quint8_avx2.onnx"
+    exported.parent.mkdir(parents=True)
+    exported.write_bytes(b"")
+    int8 = load_model(RecordingModel, "org/m", BackendConfig("onnx-int8"))
+    assert int8.name == str(tmp_path / "org__m")
+    assert int8.kwargs["model_kwargs"]["file_name"] == "onnx/model_quint8_avx2.onnx"
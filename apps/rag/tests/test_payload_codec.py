@@ -0,0 +1,101 @@
+"""
+Testes dos payloads compactos (códigos de dicionário por versão do índice).
+"""
+
+import json
+
+import pytest
+
+import payload_codec
+from csv_chunk_processor import archive_csv_paths, find_top_k_rows
+from index_versions import rebuild_index, update_files
+from payload_codec import PayloadDictionary, get_payload_dictionary, serving_dictionary, set_payload_dictionary
+from vector_store import NumpyVectorStore
+
+# Ingestão e busca com get_processor(): modelos sem pesos
+pytestmark = pytest.mark.hashing_models
+
+
+def test_dictionary_round_trip():
+    dictionary = PayloadDictionary()
+    cell = {"csv_file": "payroll.csv", "column_name": "salary", "row_index": 3, "chunk_type": "cell"}
+    window = {"csv_file": "payroll.csv", "row_start": 0, "row_end": 19, "chunk_type": "row_window"}
+    assert dictionary.encode(cell) == {"f": 0, "t": 0, "c": 0, "r": 3}
+    assert dictionary.decode(dictionary.encode(cell)) == cell
+    assert dictionary.decode(dictionary.encode(window)) == window
+    # Payloads completos passam sem alteração
+    assert dictionary.decode(window) == window
+    restored = PayloadDictionary.from_dict(json.loads(json.dumps(dictionary.to_dict())))
+    assert restored.decode({"f": 0, "t": 0, "c": 0, "r": 3}) == cell
+
+
+@pytest.fixture
+def stores(tmp_path):
+    return NumpyVectorStore(tmp_path / "full"), NumpyVectorStore(tmp_path / "compact")
+
+
+def test_compact_index_returns_the_same_rows(stores, monkeypatch):
+    full, compact = stores
+    paths = archive_csv_paths()
+    rebuild_index(paths, alias="full", client=full)
+    monkeypatch.setenv("RAG_COMPACT_PAYLOADS", "1")
+    summary, _ = rebuild_index(paths, alias="compact", client=compact)
+
+    _, _, payloads = next(compact.scroll("compact", batch_size=4))
+    assert all(set(p) <= {"f", "t", "c", "r", "e"} for p in payloads)
+    assert len(json.dumps(payloads[0])) < 40
+
+    for query in ("Ana Souza", "produtos eletrônicos", "salário de junho"):
+        assert find_top_k_rows(query, compact, k=5, collection_name="compact") == find_top_k_rows(
+            query, full, k=5, collection_name="full"
+        )
+
+    # Sem o dicionário em memória (novo processo), ele é lido do disco, ao lado dos vetores
+    payload_codec._dictionaries.clear()
+    assert get_payload_dictionary(compact, summary["version"]).files
+    assert (compact.path / summary["version"] / "payload_dictionary.json").exists()
+    assert get_payload_dictionary(full, "full") is None
+
+    removed = summary["files"][0]["csv_filename"]
+    update_files([], [removed], alias="compact", client=compact, progress=None)
+    assert compact.count("compact") == sum(r["total_chunks"] for r in summary["files"][1:])
+
+
+def test_serving_dictionary_follows_an_alias_moved_by_another_process(stores, monkeypatch):
+    """A cada busca o dicionário é o da versão apontada agora pelo alias, não o da primeira busca."""
+    _, compact = stores
+    monkeypatch.setenv("RAG_COMPACT_PAYLOADS", "1")
+    paths = sorted(archive_csv_paths())
+    first, _ = rebuild_index(paths, alias="compact", client=compact, keep=2)
+    reader = NumpyVectorStore(compact.path, readonly=True)
+    assert serving_dictionary(reader, "compact") is get_payload_dictionary(compact, first["version"])
+    expected = find_top_k_rows("Ana Souza", reader, k=3, collection_name="compact")
+
+    # Outra ordem de arquivos: a nova versão usa outros códigos
+    second, _ = rebuild_index(paths[::-1], alias="compact", client=compact, keep=2)
+    # O leitor é outro processo: a troca feita aqui não passou pelo seu registro
+    set_payload_dictionary(reader, "compact", get_payload_dictionary(compact, first["version"]))
+    assert (get_payload_dictionary(compact, second["version"]).files
+            != get_payload_dictionary(compact, first["version"]).files)
+    assert serving_dictionary(reader, "compact") is get_payload_dictionary(compact, second["version"])
+    assert find_top_k_rows("Ana Souza", reader, k=3, collection_name="compact") == expected
+
+
+def test_compact_mode_follows_each_store(tmp_path, monkeypatch):
+    """O modo compacto de uma coleção vem do dicionário salvo na própria store, não de outra com o mesmo nome."""
+    paths = sorted(archive_csv_paths())[:1]
+    monkeypatch.setenv("RAG_COMPACT_PAYLOADS", "1")
+    compact = NumpyVectorStore(tmp_path / "compact")
+    rebuild_index(paths, alias="people", client=compact)
+    monkeypatch.setenv("RAG_COMPACT_PAYLOADS", "0")
+    full = NumpyVectorStore(tmp_path / "full")
+    rebuild_index(paths, alias="people", client=full)
+
+    _, _, payloads = next(full.scroll("people", batch_size=1))
+    assert "chunk_type" in payloads[0]
+    assert serving_dictionary(full, "people") is None
+    assert serving_dictionary(compact, "people") is not None
+    # Reingerir na store compacta segue compacto mesmo com a variável desligada
+    update_files(paths, [], alias="people", client=compact, progress=None)
+    _, _, payloads = next(compact.scroll("people", batch_size=1))
+    assert set(payloads[0]) <= {"f", "t", "c", "r", "e"}
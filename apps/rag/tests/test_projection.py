@@ -0,0 +1,96 @@
+"""
+Testes da redução de dimensionalidade (PCA / projeção aleatória) dos embeddings.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import csv_chunk_processor
+import projection as projection_module
+from csv_chunk_processor import archive_csv_paths, find_top_k_rows
+from index_versions import rebuild_index
+from projection import Projection, get_projection, serving_projection, set_projection
+from snapshot import export_snapshot, install_snapshot
+from vector_store import NumpyVectorStore
+
+# Ingestão e busca com get_processor(): modelos sem pesos
+pytestmark = pytest.mark.hashing_models
+
+
+def test_pca_keeps_the_structure_of_low_rank_data(tmp_path):
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((200, 6)) @ rng.standard_normal((6, 32))
+    pca = Projection.fit_pca(data, dim=6)
+    reduced = pca.apply(data)
+    assert reduced.shape == (200, 6)
+    # Distâncias preservadas quando o posto cabe na dimensão reduzida
+    assert np.allclose(
+        np.linalg.norm(reduced[:10] - reduced[10:20], axis=1),
+        np.linalg.norm(data[:10] - data[10:20], axis=1),
+        rtol=1e-3,
+    )
+
+    rp = Projection.random(32, 8, seed=1, dtype="float16")
+    pca.save(tmp_path / "p.npz")
+    restored = Projection.load(tmp_path / "p.npz")
+    assert np.allclose(restored.apply(data), reduced)
+    assert Projection.from_dict(rp.to_dict()).dtype == "float16"
+    with pytest.raises(ValueError):
+        Projection("svd", np.zeros(2), np.eye(2))
+
+
+@pytest.fixture
+def projected_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_PROJECTION", "pca")
+    monkeypatch.setenv("RAG_PROJECTION_DIM", "16")
+    monkeypatch.setenv("RAG_PROJECTION_DTYPE", "float16")
+    yield tmp_path
+    # Tabelas registradas pelo install_snapshot
+    for path in archive_csv_paths():
+        csv_chunk_processor._tables.pop(os.path.basename(path), None)
+        csv_chunk_processor._table_loaders.pop(os.path.basename(path), None)
+
+
+def test_projected_version_is_searched_with_its_projection(projected_env):
+    store = NumpyVectorStore(projected_env / "db")
+    summary, _ = rebuild_index(archive_csv_paths(), alias="projected", client=store)
+    version = summary["version"]
+    assert summary["projection"] == {"kind": "pca", "dim": 16, "dtype": "float16"}
+    assert (projected_env / "db" / version / "vectors.f16").exists()
+    _, vectors, _ = next(store.scroll("projected", batch_size=2))
+    assert vectors.shape[1] == 16
+
+    rows = find_top_k_rows("Ana Souza", store, k=3, collection_name="projected")
+    assert rows
+
+    # Um novo processo relê a projeção salva com a versão
+    projection_module._projections.clear()
+    assert get_projection(store, version).dim == 16
+    assert (projected_env / "db" / version / "projection.npz").exists()
+    assert find_top_k_rows("Ana Souza", store, k=3, collection_name="projected") == rows
+
+    path = projected_env / "index.ragsnap"
+    export_snapshot(path, client=store, collection_name="projected")
+    served = install_snapshot(path)
+    assert get_projection(served, "projected").dim == 16
+    assert [r["file"] for r in find_top_k_rows("Ana Souza", served, k=3, collection_name="projected")] == [
+        r["file"] for r in rows
+    ]
+
+
+def test_serving_projection_follows_an_alias_moved_by_another_process(projected_env, monkeypatch):
+    """Um processo que só lê passa a usar a projeção da nova versão assim que o alias muda."""
+    store = NumpyVectorStore(projected_env / "db")
+    first, _ = rebuild_index(archive_csv_paths(), alias="projected", client=store, keep=2)
+    reader = NumpyVectorStore(projected_env / "db", readonly=True)
+    assert serving_projection(reader, "projected").dim == 16
+    assert find_top_k_rows("Ana Souza", reader, k=3, collection_name="projected")
+
+    monkeypatch.setenv("RAG_PROJECTION_DIM", "8")
+    rebuild_index(archive_csv_paths(), alias="projected", client=store, keep=2)
+    # O leitor é outro processo: a troca feita aqui não passou pelo seu registro
+    set_projection(reader, "projected", get_projection(store, first["version"]))
+    assert serving_projection(reader, "projected").dim == 8
+    assert find_top_k_rows("Ana Souza", reader, k=3, collection_name="projected")
@@ -9,6 +9,7 @@ import sys
 import os
 from pathlib import Path
 import pandas as pd
+import pytest
 
 # Adicionar o diretório src ao path para importar os módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -17,6 +18,9 @@ from csv_chunk_processor import CSVChunkProcessor, process_csvs_as_chunks
 from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 
+# Usa os modelos reais
+pytestmark = pytest.mark.models
+
 
 class TestRAGClient(unittest.TestCase):
     """Classe de testes para o cliente RAG."""
@@ -7,7 +7,10 @@ import pytest
 import pandas as pd
 from pathlib import Path
 from qdrant_client.models import Filter, FieldCondition, MatchValue
-from csv_chunk_processor import find_top_k_rows, process_csvs_as_chunks
+from csv_chunk_processor import find_top_k_rows, find_top_k_rows_batch, process_csvs_as_chunks
+
+# Usa os modelos reais (fixture rag_client)
+pytestmark = pytest.mark.models
 
 
 class TestRAGPytest:
@@ -349,3 +352,57 @@ class TestRAGPytest:
         assert kv.get('payment_date') == '2025-06-28', "Data incorreta na linha retornada"
         assert kv.get('name') == 'Bruno Lima', "Nome incorreto na linha retornada"
         assert kv.get('bonus') == '300', f"Bônus incorreto; esperado 300, obtido {kv.get('bonus')}"
+
+    def test_batch_matches_single_query_order(self, rag_client):
+        """Testa se a busca em lote devolve um item por pergunta, na ordem de entrada."""
+        client = rag_client['client']
+        texts = [
+            "bônus do Bruno Lima no dia 2025-06-28",
+            "",
+            "smartphone",
+            "pagamentos feitos em 2025-06-28",
+            "artigos sobre tecnologia",
+        ]
+        items = find_top_k_rows_batch(texts=texts, client=client, k=5)
+        assert len(items) == len(texts), "Quantidade de itens difere da quantidade de perguntas"
+        assert 'error' in items[1], "Pergunta vazia deveria gerar erro individual"
+        for text, item in zip(texts, items):
+            if not text:
+                continue
+            single = find_top_k_rows(text=text, client=client, k=5)
+            assert [r['value'] for r in item['results']] == [r['value'] for r in single], \
+                f"Resultado em lote difere da busca individual para: {text}"
+
+
+def test_batch_rows_do_not_depend_on_other_queries_tables(tmp_path, monkeypatch):
+    """A expansão por data de uma pergunta só olha as tabelas que ela mesma carregou, como na busca individual."""
+    import csv_chunk_processor
+    from vector_store import NumpyVectorStore
+
+    tables = {
+        "payroll.csv": pd.DataFrame({
+            "name": ["Ana Souza", "Bruno Lima"],
+            "competency": ["2025-06", "2025-06"],
+            "payment_date": ["2025-06-28", "2025-06-28"],
+        }),
+        "notes.csv": pd.DataFrame({"title": ["Reunião", "Planejamento"], "payment_date": ["2025-06-28", "2025-07-01"]}),
+    }
+    candidates = {
+        "salário do Bruno Lima": [{"snippet": {"csv_file": "payroll.csv", "chunk_type": "cell", "row_index": 1},
+                                   "score": 1.0}],
+        "notas de 2025-06-28": [{"snippet": {"csv_file": "notes.csv", "chunk_type": "cell", "row_index": 0},
+                                 "score": 1.0}],
+    }
+    monkeypatch.setattr(csv_chunk_processor, "_load_df_for_file", tables.__getitem__)
+    monkeypatch.setattr(csv_chunk_processor, "find_top_k_semantic",
+                        lambda text, **kwargs: candidates[text])
+    monkeypatch.setattr(csv_chunk_processor, "find_top_k_semantic_batch",
+                        lambda texts, **kwargs: [candidates[t] for t in texts])
+    store = NumpyVectorStore(tmp_path / "db")
+
+    texts = list(candidates)
+    items = find_top_k_rows_batch(texts=texts, client=store, k=5, collection_name="batch_rows")
+    for text, item in zip(texts, items):
+        single = find_top_k_rows(text=text, client=store, k=5, collection_name="batch_rows")
+        assert [(r['file'], r['row_index']) for r in item['results']] == \
+            [(r['file'], r['row_index']) for r in single], text
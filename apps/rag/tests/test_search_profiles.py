@@ -0,0 +1,45 @@
+"""
+Testes dos perfis de busca e do rebaixamento por prazo (deadline).
+"""
+
+import pytest
+
+import search_profiles
+from search_profiles import PROFILES, SearchTrace, get_profile
+
+
+@pytest.fixture(autouse=True)
+def fresh_costs(monkeypatch):
+    monkeypatch.setattr(search_profiles, "stage_costs", search_profiles._StageCosts())
+    return search_profiles.stage_costs
+
+
+def test_get_profile_rejects_unknown_name():
+    assert get_profile(None).name == "balanced"
+    with pytest.raises(ValueError):
+        get_profile("turbo")
+
+
+def test_no_deadline_keeps_requested_profile(fresh_costs):
+    fresh_costs.observe("search:accurate", 10_000)
+    trace = SearchTrace("accurate")
+    assert trace.plan_search().name == "accurate"
+    assert trace.rerank_depth(500) == PROFILES["accurate"].rerank_depth
+
+
+def test_tight_deadline_downgrades_profile(fresh_costs):
+    fresh_costs.observe("embed", 5)
+    fresh_costs.observe("search:accurate", 400)
+    fresh_costs.observe("search:balanced", 300)
+    fresh_costs.observe("search:fast", 20)
+    trace = SearchTrace("accurate", deadline_ms=100)
+    assert trace.plan_search().name == "fast"
+    assert trace.as_dict()["downgrades"] == ["accurate->balanced", "balanced->fast"]
+
+
+def test_rerank_depth_trimmed_to_remaining_budget(fresh_costs):
+    fresh_costs.observe("rerank_pair", 10)
+    trace = SearchTrace("balanced", deadline_ms=100)
+    depth = trace.rerank_depth(50)
+    assert depth < 10
+    assert trace.downgrades
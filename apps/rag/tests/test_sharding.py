@@ -0,0 +1,55 @@
+"""
+Testes do armazenamento particionado por arquivo (shards) com busca em paralelo.
+"""
+
+import numpy as np
+
+from sharding import ShardedVectorStore, ShardRouter
+from vector_store import NumpyVectorStore
+
+FILES = ["payroll.csv", "articles.csv", "documents.csv"]
+
+
+def _fill(store, n=90, dim=12):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    payloads = [{"csv_file": FILES[i % 3], "row_index": i} for i in range(n)]
+    store.ensure_collection("c", dim)
+    store.upsert("c", list(range(1, n + 1)), vectors, payloads)
+    return rng.standard_normal((4, dim)).astype(np.float32)
+
+
+def test_router_groups_and_hints():
+    router = ShardRouter({"content": ["articles.csv", "documents.csv"]})
+    assert router.key_for("payroll.csv") == "payroll"
+    assert router.key_for("documents.csv") == "content"
+    assert router.resolve(["Payroll", "documents.csv"]) == {"payroll", "content"}
+
+
+def test_fan_out_matches_unsharded_search(tmp_path):
+    plain = NumpyVectorStore(tmp_path / "plain")
+    sharded = ShardedVectorStore(NumpyVectorStore(tmp_path / "sharded"))
+    queries = _fill(plain)
+    _fill(sharded)
+
+    assert sorted(sharded.shards("c")) == ["articles", "documents", "payroll"]
+    assert sharded.count("c") == plain.count("c")
+    for a, b in zip(sharded.query_batch("c", queries, 7), plain.query_batch("c", queries, 7)):
+        assert [h.id for h in a] == [h.id for h in b]
+
+    routed = sharded.query_batch("c", queries, 7, shards=["payroll"])
+    assert all(h.payload["csv_file"] == "payroll.csv" for hits in routed for h in hits)
+
+
+def test_delete_touches_only_its_shard_and_aliases_swap(tmp_path):
+    inner = NumpyVectorStore(tmp_path)
+    store = ShardedVectorStore(inner, ShardRouter({"content": ["articles.csv", "documents.csv"]}))
+    _fill(store)
+    store.delete_by_field("c", "csv_file", "articles.csv")
+    assert inner.count("c__payroll") == 30
+    assert inner.count("c__content") == 30
+
+    store.set_alias("live", "c")
+    assert store.get_alias("live") == "c"
+    assert store.count("live") == 60
+    assert "c" in store.list_collections()
@@ -0,0 +1,92 @@
+"""
+Testes de exportação/importação de snapshots do índice.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from qdrant_client import QdrantClient
+
+import csv_chunk_processor
+from csv_chunk_processor import CSVChunkProcessor, _load_df_for_file
+from embedders import HashingEmbedder, TokenOverlapReranker
+from index_versions import rebuild_index
+from lexical_index import get_lexical_index
+from snapshot import SnapshotError, export_snapshot, install_snapshot, load_snapshot
+from vector_store import NumpyVectorStore, QdrantVectorStore
+
+
+@pytest.fixture
+def built_store(tmp_path):
+    """Coleção Qdrant em memória com chunks de célula e de janela de uma tabela pequena."""
+    df = pd.DataFrame({"id": [1, 2, 3], "name": ["Ana Souza", "Bruno Lima", "Carla Dias"], "bonus": [10, 20, 30]})
+    df.to_csv(tmp_path / "snap.csv", index=False)
+    payloads = []
+    for row in range(len(df)):
+        for col in ("name", "bonus"):
+            payloads.append(CSVChunkProcessor._cell_chunk_text(df, row, col, "snap.csv", "id")[1])
+    payloads.append(CSVChunkProcessor._row_window_chunk_text(df, 0, 3, "snap.csv")[1])
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(payloads), 8)).astype(np.float32)
+    store = QdrantVectorStore(QdrantClient(":memory:"))
+    store.ensure_collection("snap_test", 8)
+    store.upsert("snap_test", list(range(1, len(payloads) + 1)), vectors, payloads)
+    yield store, vectors
+    csv_chunk_processor._tables.pop("snap.csv", None)
+    csv_chunk_processor._table_loaders.pop("snap.csv", None)
+
+
+def test_snapshot_roundtrip_serves_same_results(built_store, tmp_path):
+    store, vectors = built_store
+    path = tmp_path / "index.ragsnap"
+    manifest = export_snapshot(path, client=store, collection_name="snap_test", csv_dir=tmp_path)
+    assert manifest["files"][0]["chunks"] == 7
+
+    snap = load_snapshot(path)
+    assert isinstance(snap.vectors, np.memmap)
+    assert snap.texts[0].startswith("CSV: snap.csv")
+    assert "Rows 1-3" in snap.texts[-1]
+
+    # Só o cabeçalho é lido na importação; payloads e tabelas ficam no arquivo até serem usados
+    assert not {"ids", "payloads", "texts", "lexical"} & set(snap.header)
+    assert snap.payloads[2] == next(store.scroll("snap_test"))[2][2]
+    served = install_snapshot(path)
+    assert "snap.csv" not in csv_chunk_processor._tables
+    queries = vectors[:3]
+    for a, b in zip(served.query_batch("snap_test", queries, 5), store.query_batch("snap_test", queries, 5)):
+        assert [h.id for h in a] == [h.id for h in b]
+        assert a[0].payload == b[0].payload
+    hits = get_lexical_index(served, "snap_test").exact_lookup("bônus de Bruno Lima")
+    assert [key for key, _score in hits] == [("snap.csv", 1)]
+    assert list(_load_df_for_file("snap.csv")["name"]) == ["Ana Souza", "Bruno Lima", "Carla Dias"]
+    with pytest.raises(PermissionError):
+        served.upsert("snap_test", [99], vectors[:1], [{}])
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_snapshot.bin"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(SnapshotError):
+        load_snapshot(path)
+
+
+def test_export_takes_the_version_the_alias_serves(tmp_path):
+    """O snapshot sai da versão ativa (vetores, índice lexical, manifesto), não de uma releitura dos arquivos."""
+    csv_path = tmp_path / "snap.csv"
+    pd.DataFrame({"id": [1, 2], "name": ["Ana Souza", "Bruno Lima"]}).to_csv(csv_path, index=False)
+    store = NumpyVectorStore(tmp_path / "db")
+    processor = CSVChunkProcessor(embedder=HashingEmbedder(dim=32), reranker=TokenOverlapReranker())
+    summary, _ = rebuild_index([str(csv_path)], alias="snap_test", client=store, processor=processor)
+
+    manifest = export_snapshot(tmp_path / "a.ragsnap", client=store, collection_name="snap_test", csv_dir=tmp_path)
+    assert manifest["version"] == summary["version"]
+    assert manifest["files"][0]["chunks"] == summary["files"][0]["total_chunks"]
+    snap = load_snapshot(tmp_path / "a.ragsnap")
+    assert snap.lexical_index().to_dict() == get_lexical_index(store, summary["version"]).to_dict()
+
+    # A tabela mudou depois da versão: o snapshot não mistura as duas
+    pd.DataFrame({"id": [1], "name": ["Carla Dias"]}).to_csv(csv_path, index=False)
+    with pytest.raises(ValueError, match="rebuild"):
+        export_snapshot(tmp_path / "b.ragsnap", client=store, collection_name="snap_test", csv_dir=tmp_path)
+    assert not (tmp_path / "b.ragsnap").exists()
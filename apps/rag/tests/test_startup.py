@@ -0,0 +1,38 @@
+"""
+Testes do tempo de inicialização: importar main.py não carrega torch, os modelos nem o Qdrant.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+RAG_DIR = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "qdrant_client"]
+
+
+def test_importing_main_defers_heavy_modules():
+    probe = (
+        "import json, sys; sys.path.insert(0, '.'); import main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    # Interpretador novo: nesta sessão de testes os módulos já podem ter sido importados
+    proc = subprocess.run([sys.executable, "-c", probe], cwd=RAG_DIR, capture_output=True, text=True, check=True)
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
+
+
+def test_worker_snapshot_is_written_to_the_data_dir(tmp_path, monkeypatch):
+    """Com vários workers o snapshot vai para RAG_DATA_DIR, não para dentro do código."""
+    import main
+
+    monkeypatch.setenv("RAG_DATA_DIR", str(tmp_path / "data"))
+    # Restaurados ao fim do teste: _prepare_workers os define no ambiente do processo
+    for var in ("RAG_SNAPSHOT", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        monkeypatch.setenv(var, "")
+    written = []
+    monkeypatch.setattr(main, "rebuild_index", lambda: ({}, None))
+    monkeypatch.setattr(main, "export_snapshot", lambda path, client: written.append(path))
+
+    main._prepare_workers(2)
+    assert written == [tmp_path / "data" / "serving.ragsnap"]
+    assert main.os.environ["RAG_SNAPSHOT"] == str(tmp_path / "data" / "serving.ragsnap")
@@ -0,0 +1,122 @@
+"""
+Testes da leitura de Parquet/Arrow mapeados em memória e do cache CSV → Parquet.
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.feather as feather  # noqa: E402
+
+import csv_chunk_processor  # noqa: E402
+import table_reader  # noqa: E402
+from csv_chunk_processor import CSVChunkProcessor, chunk_point_id  # noqa: E402
+from embedders import HashingEmbedder, TokenOverlapReranker  # noqa: E402
+from lexical_index import BM25Index  # noqa: E402
+from vector_store import NumpyVectorStore  # noqa: E402
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_reader, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "people.csv"
+    pd.DataFrame({
+        "id": [1, 2, 3],
+        "name": ["Ana Souza", "Bruno Lima", None],
+        "salary": [1500.5, 2300.0, 990.25],
+        "month": ["2025-06", "2025-07", "2025-06"],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def _chunks(df):
+    # build_chunks não usa o modelo de embeddings
+    processor = CSVChunkProcessor.__new__(CSVChunkProcessor)
+    chunks = processor.build_chunks(df, "people.csv", rows_per_window=2)
+    return [(c["text"], c["metadata"]) for c in chunks]
+
+
+def test_parquet_and_arrow_give_the_same_chunks_as_csv(tmp_path, csv_path):
+    expected = _chunks(pd.read_csv(csv_path))
+    parquet = table_reader.convert_csv_to_parquet(csv_path, str(tmp_path / "people.parquet"))
+    arrow = str(tmp_path / "people.arrow")
+    feather.write_feather(pa.Table.from_pandas(pd.read_csv(csv_path), preserve_index=False), arrow)
+
+    for path in (parquet, arrow):
+        assert _chunks(table_reader.read_table(path)) == expected
+        assert table_reader.table_shape(path) == (3, ["id", "name", "salary", "month"])
+        assert list(table_reader.read_table(path, columns=["name"]).columns) == ["name"]
+        batches = list(table_reader.iter_batches(path, batch_rows=2))
+        assert [len(b) for b in batches] == [2, 1]
+
+
+def test_csv_is_cached_as_parquet_until_it_changes(csv_path):
+    assert _chunks(table_reader.read_table(csv_path)) == _chunks(pd.read_csv(csv_path))
+    first = table_reader.cached_parquet(csv_path)
+    assert first.endswith(".parquet") and os.path.exists(first)
+    assert table_reader.cached_parquet(csv_path) == first
+
+    pd.DataFrame({"id": [9], "name": ["Davi Rocha"]}).to_csv(csv_path, index=False)
+    second = table_reader.cached_parquet(csv_path)
+    assert second != first and not os.path.exists(first)
+    assert table_reader.read_table(csv_path)["name"].tolist() == ["Davi Rocha"]
+
+
+def test_same_named_csvs_in_other_folders_keep_their_own_cache(csv_path, tmp_path):
+    other = tmp_path / "other" / "people.csv"
+    other.parent.mkdir()
+    pd.DataFrame({"id": [7], "name": ["Eva Prado"]}).to_csv(other, index=False)
+    first = table_reader.cached_parquet(csv_path)
+    second = table_reader.cached_parquet(str(other))
+    assert first != second and os.path.exists(first) and os.path.exists(second)
+    assert table_reader.read_table(csv_path)["name"].tolist()[:2] == ["Ana Souza", "Bruno Lima"]
+    assert table_reader.read_table(str(other))["name"].tolist() == ["Eva Prado"]
+
+
+def test_csv_batches_without_the_cache_keep_the_whole_file_dtypes(tmp_path, monkeypatch):
+    """Sem o cache, o lote com o valor ausente não muda o tipo da coluna só naquele lote."""
+    monkeypatch.setenv("RAG_PARQUET_CACHE", "0")
+    path = tmp_path / "people.csv"
+    pd.DataFrame({"id": [1, 2, 3, 4], "age": [30, 41, None, 25], "flag": ["s", "n", "s", 1]}).to_csv(
+        path, index=False
+    )
+    whole = pd.read_csv(path)
+    batches = list(table_reader.iter_batches(str(path), batch_rows=2))
+    assert [b["age"].dtype for b in batches] == [whole["age"].dtype] * 2
+    assert _chunks(pd.concat(batches, ignore_index=True)) == _chunks(whole)
+
+
+def test_ingestion_reads_record_batches_aligned_to_row_windows(tmp_path, monkeypatch):
+    """A ingestão lê o arquivo em lotes (múltiplos da janela de linhas) e gera os mesmos chunks."""
+    monkeypatch.setattr(table_reader, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "people.csv"
+    df = pd.DataFrame({"id": range(1, 8), "name": [f"Pessoa {i}" for i in range(1, 8)]})
+    df.to_csv(path, index=False)
+    seen = []
+
+    def spy(*args, **kwargs):
+        for batch in table_reader.iter_batches(*args, **kwargs):
+            seen.append(len(batch))
+            yield batch
+
+    monkeypatch.setattr(csv_chunk_processor, "iter_batches", spy)
+    processor = CSVChunkProcessor(embedder=HashingEmbedder(dim=16), reranker=TokenOverlapReranker())
+    store = NumpyVectorStore(tmp_path / "db")
+    lexical = BM25Index()
+    result = processor.process_csv_to_qdrant(str(path), "people", client=store, rows_per_window=2,
+                                             batch_rows=3, lexical_index=lexical)
+
+    # Lotes de 4 linhas: nenhuma janela de 2 linhas fica dividida entre dois lotes
+    assert seen == [4, 3]
+    assert (result["total_rows"], result["total_columns"]) == (7, 2)
+    expected = processor.build_chunks(df, "people.csv", rows_per_window=2)
+    ids, payloads = [], []
+    for batch_ids, _, batch_payloads in store.scroll("people"):
+        ids.extend(batch_ids)
+        payloads.extend(json.dumps(p, sort_keys=True) for p in batch_payloads)
+    assert sorted(payloads) == sorted(json.dumps(c["metadata"], sort_keys=True) for c in expected)
+    assert set(ids) == {chunk_point_id("people.csv", n) for n in range(len(expected))}
+    assert lexical.search("Pessoa 7", limit=1)[0][0] == ("people.csv", 6)
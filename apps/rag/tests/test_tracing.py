@@ -0,0 +1,79 @@
+"""
+Testes dos spans por requisição, da propagação entre serviços e do profiling (src/tracing.py).
+"""
+
+import json
+
+import tracing
+from serving import BoundedExecutor, ServingSettings
+
+
+def test_spans_nest_under_the_callers_span():
+    with tracing.start_trace("POST /x", request_id="req-1", parent_id="caller",
+                             debug="timing") as trace, tracing.span("outer"), tracing.span("inner", rows=3):
+        headers = tracing.propagation_headers()
+    spans = {s.name: s for s in trace.spans}
+    assert spans["POST /x"].parent_id == "caller"
+    assert spans["outer"].parent_id == spans["POST /x"].span_id
+    assert spans["inner"].parent_id == spans["outer"].span_id
+    assert spans["inner"].attributes == {"rows": 3}
+    assert headers == {"X-Request-ID": "req-1", "X-Parent-Span-ID": spans["inner"].span_id}
+    assert tracing.current_trace() is None
+
+
+def test_malformed_request_id_is_replaced():
+    with tracing.start_trace("GET /", request_id="bad id\n") as trace:
+        pass
+    assert trace.trace_id != "bad id\n"
+    assert tracing.clean_id(trace.trace_id) == trace.trace_id
+
+
+def test_spans_are_exported_as_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setenv("RAG_TRACE_FILE", str(path))
+    with tracing.start_trace("GET /", request_id="req-2"), tracing.span("embed"):
+        pass
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["name"] for line in lines] == ["embed", "GET /"]
+    assert {line["trace_id"] for line in lines} == {"req-2"}
+    assert all(line["service"] == "rag" for line in lines)
+
+
+def test_span_outside_a_request_is_a_no_op(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_TRACE_FILE", str(tmp_path / "spans.jsonl"))
+    with tracing.span("embed") as span:
+        assert span is None
+    assert tracing.propagation_headers() == {}
+    assert not (tmp_path / "spans.jsonl").exists()
+
+
+def test_debug_header_is_limited_by_the_environment(monkeypatch):
+    monkeypatch.delenv("RAG_DEBUG_HEADER", raising=False)
+    assert tracing.parse_debug("timing") == "timing"
+    assert tracing.parse_debug("profile=cprofile") == "timing"
+    monkeypatch.setenv("RAG_DEBUG_HEADER", "profile")
+    assert tracing.parse_debug("profile=cprofile") == "cprofile"
+    monkeypatch.setenv("RAG_DEBUG_HEADER", "off")
+    assert tracing.parse_debug("timing") is None
+
+
+def test_call_profiles_only_when_asked():
+    def work(n):
+        return sum(range(n))
+
+    with tracing.start_trace("GET /", debug="timing") as trace:
+        assert tracing.call(work, 10) == 45
+    assert trace.profile is None
+    with tracing.start_trace("GET /", debug="cprofile") as trace:
+        assert tracing.call(work, 10) == 45
+    assert "work" in trace.profile
+
+
+def test_executor_jobs_run_in_the_callers_trace():
+    executor = BoundedExecutor(ServingSettings(executor_workers=1, max_in_flight=1))
+    try:
+        with tracing.start_trace("GET /", debug="timing") as trace:
+            seen = executor.submit(tracing.current_trace).result(timeout=5)
+        assert seen is trace
+    finally:
+        executor.shutdown()
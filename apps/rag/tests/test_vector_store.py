@@ -0,0 +1,153 @@
+"""
+Testes do backend vetorial NumPy (memmap) comparado ao Qdrant em memória.
+"""
+
+import json
+import threading
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from vector_store import NumpyVectorStore, QdrantVectorStore
+
+
+def _fill(store, vectors):
+    store.ensure_collection("c", vectors.shape[1])
+    payloads = [{"csv_file": "a.csv" if i % 2 else "b.csv", "row_index": i} for i in range(len(vectors))]
+    store.upsert("c", list(range(1, len(vectors) + 1)), vectors, payloads)
+
+
+def test_numpy_matches_qdrant_top_k(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    queries = rng.standard_normal((5, 16)).astype(np.float32)
+
+    numpy_store = NumpyVectorStore(tmp_path)
+    qdrant_store = QdrantVectorStore(QdrantClient(":memory:"))
+    _fill(numpy_store, vectors)
+    _fill(qdrant_store, vectors)
+
+    for a, b in zip(numpy_store.query_batch("c", queries, 10), qdrant_store.query_batch("c", queries, 10)):
+        assert [h.id for h in a] == [h.id for h in b]
+        assert np.allclose([h.score for h in a], [h.score for h in b], atol=1e-4)
+
+
+def test_numpy_store_persists_and_reopens_readonly(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, vectors)
+    store.upsert("c", [2], np.array([[0, 0, 0, 1]], dtype=np.float32), [{"csv_file": "a.csv"}])
+
+    reopened = NumpyVectorStore(tmp_path, readonly=True)
+    assert reopened.count("c") == 4
+    hits = reopened.query_batch("c", np.array([[0, 0, 0, 1]], dtype=np.float32), 2)[0]
+    assert {h.id for h in hits} == {2, 4}
+
+
+def test_numpy_delete_by_field(tmp_path):
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, np.eye(6, dtype=np.float32))
+    store.delete_by_field("c", "csv_file", "a.csv")
+    assert store.count("c") == 3
+    hits = store.query_batch("c", np.ones((1, 6), dtype=np.float32), 10)[0]
+    assert all(h.payload["csv_file"] == "b.csv" for h in hits)
+
+
+def test_numpy_upserts_only_append_to_the_points_log(tmp_path):
+    """Cada upsert acrescenta suas linhas; reescrever tudo deixaria a ingestão quadrática."""
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, np.eye(4, dtype=np.float32))
+    log = tmp_path / "c" / "points.jsonl"
+    size = log.stat().st_size
+    store.upsert("c", [5], np.array([[1, 1, 0, 0]], dtype=np.float32), [{"csv_file": "c.csv"}])
+    assert size < log.stat().st_size < 2 * size
+    # Linhas que sobraram de um upsert interrompido (sem meta.json) são ignoradas
+    with open(log, "ab") as fh:
+        fh.write(b'[5, 6, {"csv_file": "partial')
+    store.upsert("c", [1], np.array([[0, 0, 1, 1]], dtype=np.float32), [{"csv_file": "updated.csv"}])
+
+    reopened = NumpyVectorStore(tmp_path, readonly=True)
+    assert reopened.count("c") == 5
+    hits = reopened.query_batch("c", np.array([[0, 0, 1, 1]], dtype=np.float32), 1)[0]
+    assert (hits[0].id, hits[0].payload) == (1, {"csv_file": "updated.csv"})
+
+
+def test_numpy_reads_and_converts_the_former_points_json(tmp_path):
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, np.eye(3, dtype=np.float32))
+    coll = tmp_path / "c"
+    meta = json.loads((coll / "meta.json").read_text())
+    meta.pop("points_bytes")
+    (coll / "meta.json").write_text(json.dumps(meta))
+    (coll / "points.json").write_text(json.dumps({"ids": [1, 2, 3], "payloads": [{"n": 1}, {"n": 2}, {"n": 3}]}))
+    (coll / "points.jsonl").unlink()
+
+    assert NumpyVectorStore(tmp_path, readonly=True).count("c") == 3
+    converted = NumpyVectorStore(tmp_path)
+    assert converted.count("c") == 3
+    assert not (coll / "points.json").exists()
+    hits = NumpyVectorStore(tmp_path, readonly=True).query_batch("c", np.array([[0, 1, 0]], dtype=np.float32), 1)[0]
+    assert (hits[0].id, hits[0].payload) == (2, {"n": 2})
+
+
+def test_delete_by_field_keeps_the_given_ids(tmp_path):
+    for store in (NumpyVectorStore(tmp_path), QdrantVectorStore(QdrantClient(":memory:"))):
+        _fill(store, np.eye(6, dtype=np.float32))
+        # Ids 2, 4 e 6 são de a.csv; 2 é mantido
+        store.delete_by_field("c", "csv_file", "a.csv", keep_ids={2})
+        assert store.count("c") == 4
+        hits = store.query_batch("c", np.ones((1, 6), dtype=np.float32), 10)[0]
+        assert sorted(h.id for h in hits) == [1, 2, 3, 5]
+
+
+def test_numpy_deletes_and_replacements_are_tombstones(tmp_path):
+    """Linhas gravadas não mudam: upsert de id existente e delete só acrescentam ao log."""
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, np.eye(6, dtype=np.float32))
+    store.delete_by_field("c", "csv_file", "a.csv")
+    store.upsert("c", [1], np.array([[0, 1, 0, 0, 0, 0]], dtype=np.float32), [{"csv_file": "b.csv", "moved": True}])
+    assert json.loads((tmp_path / "c" / "meta.json").read_text())["count"] == 7
+
+    for served in (store, NumpyVectorStore(tmp_path, readonly=True)):
+        assert served.count("c") == 3
+        ids, vectors, payloads = next(served.scroll("c"))
+        assert sorted(ids) == [1, 3, 5]
+        assert payloads[ids.index(1)] == {"csv_file": "b.csv", "moved": True}
+        hits = served.query_batch("c", np.array([[0, 1, 0, 0, 0, 0]], dtype=np.float32), 10)[0]
+        assert [h.id for h in hits][0] == 1 and sorted(h.id for h in hits) == [1, 3, 5]
+
+
+def test_numpy_searches_during_reingestion_see_consistent_points(tmp_path):
+    """Buscas concorrentes com upserts e deletes nunca misturam o vetor de um ponto com o id/payload de outro."""
+    dim = 32
+    store = NumpyVectorStore(tmp_path)
+    store.ensure_collection("c", dim)
+    vectors = np.eye(dim, dtype=np.float32)
+    ids = list(range(1, dim + 1))
+    store.upsert("c", ids, vectors, [{"csv_file": "a.csv" if i % 2 else "b.csv", "n": i} for i in ids])
+    in_a = [i for i in ids if i % 2]
+    done = threading.Event()
+
+    def reingest():
+        for _ in range(60):
+            # Como update_files: pontos novos primeiro, depois os que sobraram do arquivo saem
+            kept = in_a[:8]
+            store.upsert("c", kept, vectors[[i - 1 for i in kept]], [{"csv_file": "a.csv", "n": i} for i in kept])
+            store.delete_by_field("c", "csv_file", "a.csv", keep_ids=kept)
+            gone = in_a[8:]
+            store.upsert("c", gone, vectors[[i - 1 for i in gone]], [{"csv_file": "a.csv", "n": i} for i in gone])
+        done.set()
+
+    writer = threading.Thread(target=reingest)
+    writer.start()
+    checked = 0
+    while not done.is_set() or checked == 0:
+        for hits in store.query_batch("c", vectors, 4):
+            for h in hits:
+                assert h.payload["n"] == h.id
+            if hits and hits[0].score > 0.99:
+                checked += 1
+        for query, hits in enumerate(store.query_batch("c", vectors, 1), start=1):
+            assert not hits or hits[0].score < 0.99 or hits[0].id == query
+    writer.join()
+    assert store.count("c") == dim
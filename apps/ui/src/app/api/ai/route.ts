@@ -3,17 +3,29 @@ import { z } from 'zod';
 
 const Body = z.object({ message: z.string().min(1) });
 
+// Request id shared by the AI and RAG spans of this chat turn
+const REQUEST_ID_HEADER = 'x-request-id';
+// "timing" or "profile": the AI returns its spans (and profile) under `debug`
+const DEBUG_HEADER = 'x-debug';
+
 export async function POST(req: NextRequest) {
   const json = await req.json();
   const parsed = Body.safeParse(json);
   if (!parsed.success) {
     return NextResponse.json({ error: 'Invalid body' }, { status: 400 });
   }
+  const requestId = req.headers.get(REQUEST_ID_HEADER) || crypto.randomUUID().replace(/-/g, '');
+  const headers: Record<string, string> = {
+    "Content-Type": "application/json",
+    [REQUEST_ID_HEADER]: requestId,
+  };
+  const debug = req.headers.get(DEBUG_HEADER);
+  if (debug) {
+    headers[DEBUG_HEADER] = debug;
+  }
   const response = await fetch(process.env.AI_API || "http://localhost:8000/ai/generate", {
       method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
+      headers,
       body: JSON.stringify({
         message: parsed.data.message,
       }),
@@ -21,7 +33,7 @@ export async function POST(req: NextRequest) {
 
     const externalData = await response.json();
   return NextResponse.json(
-    { ok: true, message: externalData },
-    { status: 201 }
+    { ok: true, message: externalData, requestId },
+    { status: 201, headers: { [REQUEST_ID_HEADER]: requestId } }
   );
 }
@@ -0,0 +1,7 @@
+"""Metrics, structured logs and request tracing shared by the RAG and AI services.
+
+Dependency-free (standard library only): ``metrics`` renders the Prometheus
+text format, ``logs`` formats records as text or JSON lines and ``tracing``
+records the spans of a request. Each service configures its own registry,
+logger and tracer on top of them.
+"""
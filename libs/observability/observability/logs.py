@@ -0,0 +1,77 @@
+"""Structured logging shared by the services.
+
+Modules log through ``logging.getLogger("<service>.<area>")`` and pass
+context as ``extra`` fields. ``configure_logging`` attaches one handler to
+the service's root logger that writes either ``key=value`` text or one JSON
+object per line, at the level and in the format the service's environment
+variables ask for.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and the extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """``time level logger message key=value ...`` for reading in a terminal."""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={json.dumps(v, ensure_ascii=False, default=str)}" for k, v in fields.items())
+        return line
+
+
+def configure_logging(
+    root_logger: str,
+    env_prefix: str,
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+) -> logging.Logger:
+    """Route the ``root_logger`` loggers to stderr; calling it again only updates the settings.
+
+    ``level`` and ``fmt`` default to <env_prefix>_LOG_LEVEL (INFO) and
+    <env_prefix>_LOG_FORMAT (text | json).
+    """
+    logger = logging.getLogger(root_logger)
+    level = (level or os.getenv(f"{env_prefix}_LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.getenv(f"{env_prefix}_LOG_FORMAT", "text")
+    handler = next((h for h in logger.handlers if getattr(h, "_observability_handler", False)), None)
+    if handler is None:
+        handler = logging.StreamHandler(sys.stderr)
+        handler._observability_handler = True  # type: ignore[attr-defined]
+        logger.addHandler(handler)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
@@ -0,0 +1,290 @@
+"""Request-scoped spans propagated between the UI, AI and RAG services.
+
+A request carries its id in ``X-Request-ID`` (created by the first service
+that sees it) and the span that made the call in ``X-Parent-Span-ID``, so
+the spans every service records for it form one tree. Each service has one
+``Tracer``: finished spans are appended as JSON lines to the file its
+trace-file variable names (nothing is written when unset); files from
+several services can be concatenated and grouped by ``trace_id``.
+
+``X-Debug: timing`` returns the spans of that one request in the response,
+and ``X-Debug: profile`` (or ``profile=cprofile`` / ``profile=pyinstrument``)
+also profiles it. The tracer's debug-header variable limits what the header
+may ask for: "timing" (default), "profile" or "off".
+
+Tracers keep their current trace and span in their own context variables,
+so two services loaded into one process (the AI with RAG_MODE=inprocess)
+record separate traces, joined through the propagation headers as over HTTP.
+"""
+
+import cProfile
+import importlib.util
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+REQUEST_ID_HEADER = "X-Request-ID"
+PARENT_SPAN_HEADER = "X-Parent-Span-ID"
+DEBUG_HEADER = "X-Debug"
+
+PROFILERS = ("cprofile", "pyinstrument")
+_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def clean_id(value: Optional[str]) -> Optional[str]:
+    """An id taken from a header, or None when missing or malformed."""
+    if value and _ID_RE.match(value):
+        return value
+    return None
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    service: str = ""
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "service": self.service,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+        }
+
+
+class JsonLinesExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.as_dict(), ensure_ascii=False, default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Trace:
+    """The spans one request produces in this process.
+
+    ``debug`` is None, "timing" or the profiler to run; with it set the
+    finished spans are kept so they can be returned with the response.
+    """
+
+    def __init__(
+        self,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        debug: Optional[str] = None,
+        exporter: Callable[[], Optional[JsonLinesExporter]] = lambda: None,
+    ) -> None:
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.debug = debug
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self.profile: Optional[str] = None
+        self._exporter = exporter
+        self._lock = threading.Lock()
+
+    @property
+    def profiler(self) -> Optional[str]:
+        return self.debug if self.debug in PROFILERS else None
+
+    def finish(self, span: Span) -> None:
+        if self.debug is not None:
+            with self._lock:
+                self.spans.append(span)
+        exporter = self._exporter()
+        if exporter is not None:
+            exporter.export(span)
+
+    def debug_info(self) -> Dict[str, Any]:
+        """Per-span timings (and the profile, when one ran) for the response."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        info: Dict[str, Any] = {
+            "request_id": self.trace_id,
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000.0, 3),
+            "spans": [
+                {"name": s.name, "span_id": s.span_id, "parent_id": s.parent_id,
+                 "duration_ms": round(s.duration_ms, 3), "attributes": s.attributes}
+                for s in spans
+            ],
+        }
+        if self.profile is not None:
+            info["profile"] = self.profile
+        return info
+
+
+class Tracer:
+    """Spans of one service: its name, its settings and its current trace and span."""
+
+    def __init__(self, service: str, trace_file_env: str, debug_header_env: str) -> None:
+        self.service = service
+        self.trace_file_env = trace_file_env
+        self.debug_header_env = debug_header_env
+        self._trace: ContextVar[Optional[Trace]] = ContextVar(f"{service}_trace", default=None)
+        self._span: ContextVar[Optional[Span]] = ContextVar(f"{service}_span", default=None)
+        self._exporter: Optional[JsonLinesExporter] = None
+        self._exporter_path: Optional[str] = None
+        self._exporter_lock = threading.Lock()
+
+    def get_exporter(self) -> Optional[JsonLinesExporter]:
+        """The exporter for the current trace file, or None when the variable is unset."""
+        path = os.getenv(self.trace_file_env) or None
+        with self._exporter_lock:
+            if path != self._exporter_path:
+                self._exporter = JsonLinesExporter(path) if path else None
+                self._exporter_path = path
+            return self._exporter
+
+    def current_trace(self) -> Optional[Trace]:
+        return self._trace.get()
+
+    def parse_debug(self, value: Optional[str]) -> Optional[str]:
+        """Debug mode asked by an ``X-Debug`` header, within what the debug-header variable allows."""
+        allowed = os.getenv(self.debug_header_env, "timing")
+        if not value or allowed == "off":
+            return None
+        value = value.strip().lower()
+        if value == "timing":
+            return "timing"
+        if value.startswith("profile") and allowed == "profile":
+            _, _, name = value.partition("=")
+            if name in PROFILERS:
+                return name
+            # Sampling profiler when installed, the standard library otherwise
+            return "pyinstrument" if importlib.util.find_spec("pyinstrument") else "cprofile"
+        return "timing" if value.startswith("profile") else None
+
+    @contextmanager
+    def start_trace(
+        self,
+        name: str,
+        request_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        debug: Optional[str] = None,
+        **attributes: Any,
+    ) -> Iterator[Trace]:
+        """Open the root span of a request; ids usually come from the incoming headers."""
+        trace = Trace(clean_id(request_id) or new_id(), clean_id(parent_id), debug, self.get_exporter)
+        token = self._trace.set(trace)
+        try:
+            with self.span(name, **attributes):
+                yield trace
+        finally:
+            self._trace.reset(token)
+
+    def _new_span(self, trace: Trace, name: str, start: float, attributes: Dict[str, Any]) -> Span:
+        parent = self._span.get()
+        return Span(
+            name=name,
+            trace_id=trace.trace_id,
+            span_id=new_id(),
+            parent_id=parent.span_id if parent is not None else trace.parent_id,
+            start=start,
+            attributes=dict(attributes),
+            service=self.service,
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Time a child of the current span; a no-op outside a request."""
+        trace = self._trace.get()
+        if trace is None:
+            yield None
+            return
+        current = self._new_span(trace, name, time.time(), attributes)
+        token = self._span.set(current)
+        t0 = time.perf_counter()
+        try:
+            yield current
+        except BaseException as e:
+            current.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.duration_ms = (time.perf_counter() - t0) * 1000.0
+            self._span.reset(token)
+            trace.finish(current)
+
+    def add_span(self, name: str, duration_ms: float, **attributes: Any) -> None:
+        """Record a span that ended just now, e.g. time spent waiting in a queue."""
+        trace = self._trace.get()
+        if trace is None:
+            return
+        finished = self._new_span(trace, name, time.time() - duration_ms / 1000.0, attributes)
+        finished.duration_ms = duration_ms
+        trace.finish(finished)
+
+    def propagation_headers(self) -> Dict[str, str]:
+        """Headers that make a downstream call part of the current request."""
+        trace = self._trace.get()
+        if trace is None:
+            return {}
+        headers = {REQUEST_ID_HEADER: trace.trace_id}
+        parent = self._span.get()
+        if parent is not None:
+            headers[PARENT_SPAN_HEADER] = parent.span_id
+        return headers
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``fn``, profiling it when the current request asked for a profile."""
+        trace = self._trace.get()
+        if trace is None or trace.profiler is None:
+            return fn(*args, **kwargs)
+        result, trace.profile = run_profiled(trace.profiler, fn, *args, **kwargs)
+        return result
+
+
+# ---------------------------
+# Profiling
+# ---------------------------
+def run_profiled(profiler: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, str]:
+    """Run ``fn`` under a profiler; returns its result and the profile as text.
+
+    Both profilers only see the calling thread, so call this from the thread
+    doing the work (e.g. inside an executor job).
+    """
+    if profiler == "pyinstrument":
+        from pyinstrument import Profiler
+
+        sampler = Profiler(interval=0.001)
+        sampler.start()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            sampler.stop()
+        return result, sampler.output_text(unicode=True, color=False)
+
+    profile = cProfile.Profile()
+    result = profile.runcall(fn, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(40)
+    return result, out.getvalue()
@@ -0,0 +1,29 @@
+"""
+Testes do núcleo de rastreamento compartilhado pelos serviços.
+"""
+
+import json
+
+from observability.tracing import Tracer
+
+
+def test_tracers_of_two_services_keep_separate_traces(tmp_path, monkeypatch):
+    """Com os dois serviços num processo, cada um grava os próprios spans, ligados pelos cabeçalhos."""
+    monkeypatch.setenv("A_TRACE_FILE", str(tmp_path / "a.jsonl"))
+    monkeypatch.delenv("B_TRACE_FILE", raising=False)
+    a = Tracer("a", "A_TRACE_FILE", "A_DEBUG_HEADER")
+    b = Tracer("b", "B_TRACE_FILE", "B_DEBUG_HEADER")
+
+    with a.start_trace("POST /a", request_id="req-1", debug="timing") as outer, a.span("call b"):
+        headers = a.propagation_headers()
+        assert b.current_trace() is None and b.propagation_headers() == {}
+        with b.start_trace("b.search", request_id=headers["X-Request-ID"],
+                           parent_id=headers["X-Parent-Span-ID"], debug="timing") as inner, b.span("embed"):
+            pass
+        assert a.current_trace() is outer
+
+    assert [s.name for s in outer.spans] == ["call b", "POST /a"]
+    assert [s.name for s in inner.spans] == ["embed", "b.search"]
+    assert inner.trace_id == "req-1" and inner.parent_id == outer.spans[0].span_id
+    lines = [json.loads(line) for line in (tmp_path / "a.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert {line["service"] for line in lines} == {"a"} and len(lines) == 2